@@ -1,22 +1,58 @@
-from flask import Flask
-from database.__init__ import conn
+from flask import Flask, g, request
+from database.__init__ import init_database
+from database.slow_ops import slow_operations
 from views.user_view import user
 from views.task_view import task
+from views.ops_view import ops
+from helpers.metrics import start_request_timer, observe_request
+from helpers.json_provider import FastJSONProvider
+import app_config
 #pip install flask
 
-app = Flask(__name__)
+def create_app(config=app_config):
+    """
+    Create the Flask application.
 
-print(conn.database)
+    Importing this module does not connect to MongoDB. The connection settings and indexes are applied here, and each worker process opens its own connection on its first request, so the application can be created before a pre-forking server forks its workers.
 
-app.register_blueprint(user)
-app.register_blueprint(task)
+    Args:
+        config (module): The configuration of the database connections, the pool and the indexes. Defaults to the app_config module.
 
-@app.route("/")
-def index():
-    projectInfo = {"Project Name": "Task Tracker Project", "Team members": ["Viraj Patel", "Aryan Handa", "Payal Rangra", "Manpreet Kaur","Dil Raval"]}
-    return projectInfo
+    Returns:
+        flask.Flask: The application.
+    """
+    app = Flask(__name__)
+
+    # Encode the ObjectId, datetime and bytes values of the responses, with orjson when it is installed.
+    app.json = FastJSONProvider(app)
+
+    # Point the database connections at the configuration and create the declared indexes.
+    init_database(config)
+
+    # Record the duration of every request in the metrics of /metrics and, if it is slow, in the slow operations.
+    @app.before_request
+    def start_request():
+        start_request_timer(g)
+        slow_operations.start_request()
+
+    @app.after_request
+    def finish_request(response):
+        slow_operations.finish_request(request.endpoint, request.method, response.status_code)
+        return observe_request(g, request, response)
+
+    app.register_blueprint(user)
+    app.register_blueprint(task)
+    app.register_blueprint(ops)
+
+    @app.route("/")
+    def index():
+        projectInfo = {"Project Name": "Task Tracker Project", "Team members": ["Viraj Patel", "Aryan Handa", "Payal Rangra", "Manpreet Kaur","Dil Raval"]}
+        return projectInfo
+
+    return app
 
 if __name__ == "__main__":
-    app.run()
+    create_app().run()
 
-#flask --app app run
\ No newline at end of file
+#flask --app app run
+#gunicorn "app:create_app()" --workers 4
@@ -1,7 +1,156 @@
+import os
+
 CONST_MONGO_URL = "<your_mongodb_connection_string>"
 CONST_DATABASE = "TaskTrackerDB"
 CONST_USER_COLLECTION = "users"
 CONST_TASK_COLLECTION = "tasks"
+CONST_TASK_LIST_VERSION_COLLECTION = "task_list_versions"
+CONST_TASK_STATS_COLLECTION = "task_stats"
+CONST_TASK_TOMBSTONE_COLLECTION = "task_tombstones"
+CONST_TASK_IMPORT_COLLECTION = "task_imports"
+
+# Options of the MongoDB clients (see database/__init__.py). Each worker process opens its own pool on first use.
+# Maximum and minimum number of pooled connections per process.
+MONGO_MAX_POOL_SIZE = 100
+MONGO_MIN_POOL_SIZE = 0
+# Number of milliseconds an idle pooled connection is kept open (None keeps it open).
+MONGO_MAX_IDLE_TIME_MS = 60000
+# Number of milliseconds to wait for a connection to open and for a server to be available.
+MONGO_CONNECT_TIMEOUT_MS = 5000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+# Number of milliseconds a request waits for a free pooled connection before failing (None waits forever).
+MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000
+# Number of milliseconds to wait for the reply of a command (None waits forever).
+MONGO_SOCKET_TIMEOUT_MS = 30000
+# Read preference of the queries.
+MONGO_READ_PREFERENCE = "primary"
+# Write concern of the writes.
+MONGO_WRITE_CONCERN = {"w": "majority", "wTimeoutMS": 5000}
+# Number of latest pool checkout wait times kept to compute their percentiles (see database/monitoring.py).
+MONGO_POOL_WAIT_SAMPLES = 1024
+# Number of milliseconds the MongoDB ping of /healthz and /readyz may take.
+HEALTH_CHECK_TIMEOUT_MS = 500
+# Serve /debug/stats and /debug/slow-ops. They expose the settings, the connection pools and the query shapes of the process without authentication, so they answer 404 unless enabled, for example on a worker only reachable from the operators' network.
+DEBUG_ROUTES_ENABLED = False
 
 JWT_EXPIRATION = 86400 * 30
-TOKEN_SECRET = "python"
\ No newline at end of file
+TOKEN_SECRET = "python"
+
+# Default number of tasks returned by one page of the task list endpoints.
+TASK_PAGE_SIZE = 50
+# Maximum number of tasks a client can request in one page.
+TASK_MAX_PAGE_SIZE = 500
+# Fields of a task returned by the task list endpoints.
+TASK_PROJECTION = {"createdByUid": 1, "createdByName": 1, "assignedToUid": 1, "assignedToName": 1, "description": 1, "done": 1, "version": 1}
+# Fields of a user returned by the users list endpoint, with '_id' renamed to 'id' by the database.
+USER_LIST_PROJECTION = {"_id": 0, "id": "$_id", "email": 1, "name": 1}
+
+# Create the indexes declared in database/indexes.py when the application starts. The startup fails if they cannot be created.
+ENSURE_INDEXES = True
+# Run explain() on the canonical query of each controller at startup and fail if any of them is planned as a COLLSCAN.
+VERIFY_INDEXES = False
+
+# Maximum number of tasks accepted by one bulk request.
+TASK_BULK_MAX_SIZE = 1000
+
+# Search backend of /tasks/search: "text" uses the text index of MongoDB, "memory" the in-process inverted index of helpers/task_search.py, and "auto" the text index, switching to the inverted index if the server has no text search (as the mongomock stand-in).
+TASK_SEARCH_BACKEND = "auto"
+# Maximum number of characters of a search query.
+TASK_SEARCH_MAX_QUERY_LENGTH = 200
+# Number of ranked results a client can page through for one search query.
+TASK_SEARCH_MAX_RESULTS = 1000
+# Maximum number of users whose tasks are kept in the in-process inverted index, and number of seconds their entries stay valid. It bounds how long a change made through another worker can go unnoticed.
+TASK_SEARCH_INDEX_MAX_USERS = 1000
+TASK_SEARCH_INDEX_TTL = 300
+
+# Maximum number of verified tokens kept in the claims cache of helpers/token_validation.py.
+JWT_CACHE_SIZE = 10000
+
+# Cost factor of the bcrypt password hashes. Stored hashes with another cost are rehashed at login.
+BCRYPT_ROUNDS = 12
+# Number of worker processes hashing and checking passwords. 0 runs bcrypt on the request thread.
+BCRYPT_POOL_SIZE = os.cpu_count() or 1
+# Number of bcrypt calls that can wait for a free worker process before new calls are rejected.
+BCRYPT_QUEUE_DEPTH = 32
+# Maximum time in seconds to wait for a bcrypt call.
+BCRYPT_TIMEOUT = 5
+
+# Concurrency limits of the expensive routes, by endpoint: at most 'limit' requests run at once, and up to 'queue' more wait at most 'timeout' seconds for a slot. Other requests get a 503.
+ROUTE_CONCURRENCY_LIMITS = {
+    "user.login": {"limit": 2 * BCRYPT_POOL_SIZE, "queue": BCRYPT_QUEUE_DEPTH, "timeout": 0.5},
+    "user.create": {"limit": BCRYPT_POOL_SIZE, "queue": BCRYPT_QUEUE_DEPTH // 2, "timeout": 0.5},
+    "user.fetch": {"limit": 4, "queue": 8, "timeout": 0.5},
+    "task.importTasks": {"limit": 4, "queue": 4, "timeout": 0.5},
+}
+# Login attempts allowed per email: a burst of LOGIN_EMAIL_BURST, then LOGIN_EMAIL_RATE per second. Other attempts get a 429.
+LOGIN_EMAIL_RATE = 0.1
+LOGIN_EMAIL_BURST = 5
+# Login attempts allowed per IP address: a burst of LOGIN_IP_BURST, then LOGIN_IP_RATE per second.
+LOGIN_IP_RATE = 1
+LOGIN_IP_BURST = 20
+# Maximum number of emails and IP addresses tracked by the login throttling.
+RATE_LIMIT_MAX_KEYS = 100000
+
+# Maximum number of users kept in the in-process user cache of helpers/user_cache.py.
+USER_CACHE_SIZE = 10000
+# Number of seconds a cached user, or the cached list of all users, stays valid.
+USER_CACHE_TTL = 300
+
+# Source of the task events of /tasks/stream: "auto" follows a change stream of the tasks and task tombstones collections when the database supports it (replica sets and sharded clusters), and uses the events published by the controllers of the process otherwise; "local" always uses the events of the process.
+TASK_EVENTS_BACKEND = "auto"
+# Number of recent task events kept to resume a stream from its Last-Event-ID header.
+TASK_EVENTS_REPLAY_SIZE = 1000
+# Number of seconds to wait before reopening a change stream that failed.
+TASK_EVENTS_RETRY_DELAY = 5
+# Maximum number of events waiting to be sent on one task stream. A client that falls further behind is disconnected, and resumes from its last event.
+TASK_STREAM_BUFFER_SIZE = 256
+# Maximum number of open task streams per worker process. In the synchronous serving mode, each open stream holds a thread.
+TASK_STREAM_MAX_SUBSCRIBERS = 200
+# Number of seconds without events after which a heartbeat is sent on a task stream, so proxies keep it open and closed connections are detected.
+TASK_STREAM_HEARTBEAT = 15
+# Number of milliseconds a client waits before reconnecting a closed task stream.
+TASK_STREAM_RETRY_MS = 3000
+
+# Number of seconds the tombstones of deleted tasks are kept for /tasks/changes, before scripts/compact_tombstones.py removes them. A client whose sync token is older must sync again from scratch.
+TASK_TOMBSTONE_RETENTION = 30 * 24 * 3600
+# Number of seconds a task write may take to become visible, including the clock differences between the workers. The sync tokens of /tasks/changes never go past the changes of this last delay.
+TASK_CHANGES_SETTLE = 5
+
+# Number of documents read from MongoDB per round trip by /tasks/export and /users/export. It bounds the memory of an export, whatever its size.
+EXPORT_BATCH_SIZE = 1000
+# Number of bytes of NDJSON or CSV gathered before a chunk of an export is compressed and sent.
+EXPORT_CHUNK_SIZE = 64 * 1024
+# gzip compression level of the exports, from 1 (fastest) to 9 (smallest).
+EXPORT_GZIP_LEVEL = 6
+
+# Number of lines of a task import whose users are resolved with one query and whose tasks are saved with one insert_many. The checkpoint of a resumable import is saved after each chunk.
+TASK_IMPORT_CHUNK_SIZE = 1000
+# Number of bytes of the upload of a task import read, or decompressed, at a time.
+TASK_IMPORT_READ_SIZE = 64 * 1024
+# Maximum number of bytes of one line of a task import. Longer lines are reported as errors without being held in memory.
+TASK_IMPORT_MAX_LINE_BYTES = 64 * 1024
+# Maximum number of line errors listed by the report of a task import. The others are only counted.
+TASK_IMPORT_MAX_ERRORS = 1000
+# Number of seconds the checkpoint of a task import is kept after its last chunk. An import cannot be resumed after that.
+TASK_IMPORT_CHECKPOINT_TTL = 7 * 24 * 3600
+
+# Maximum number of serialized task lists kept by the response cache of helpers/response_cache.py in each worker process.
+RESPONSE_CACHE_SIZE = 10000
+# Upper bounds, in seconds, of the buckets of the latency histograms of /metrics (HTTP requests, MongoDB commands and JWT validations).
+METRICS_LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+# Upper bounds, in seconds, of the buckets of the bcrypt histogram of /metrics.
+METRICS_BCRYPT_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+
+# Duration, in milliseconds, above which a MongoDB command is recorded by the slow operation recorder of database/slow_ops.py.
+SLOW_OP_THRESHOLD_MS = 100
+# Duration, in milliseconds, above which a request is recorded with its time spent in MongoDB.
+SLOW_REQUEST_THRESHOLD_MS = 500
+# Fraction of the slow queries explained with the 'executionStats' verbosity (0 disables explain), and maximum number of queued explains.
+SLOW_OP_EXPLAIN_SAMPLE_RATE = 0.1
+SLOW_OP_EXPLAIN_QUEUE_SIZE = 16
+# Number of latest slow operations returned by /debug/slow-ops.
+SLOW_OP_BUFFER_SIZE = 200
+# Log file of the slow operations, one per process ({pid} is replaced by the process ID), for example "/var/log/taskops/slow_ops-{pid}.log". Rotated at SLOW_OP_LOG_MAX_BYTES. None disables it, so the workers do not write files in their working directory unless a log directory is configured.
+SLOW_OP_LOG_FILE = None
+SLOW_OP_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_OP_LOG_BACKUP_COUNT = 5
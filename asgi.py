@@ -0,0 +1,57 @@
+from quart import Quart, Blueprint, g, request
+from database.__init__ import async_conn, init_database
+from database.async_db import require_async_driver
+from database.slow_ops import slow_operations
+from views.async_user_view import user
+from views.async_task_view import task
+from views.ops_view import create_ops_blueprint
+from helpers.metrics import start_request_timer, observe_request
+from helpers.json_provider import FastJSONProvider
+import app_config
+#pip install quart uvicorn
+
+# Async serving mode (ASGI) of the API.
+# It serves the same HTTP contract as the synchronous WSGI application of app.py, with controllers running on the async driver of PyMongo,
+# so a request waiting on MongoDB holds no worker thread and one process can keep many thousands of connections open.
+
+app = Quart(__name__)
+
+# Encode the ObjectId, datetime and bytes values of the responses, with orjson when it is installed.
+app.json = FastJSONProvider(app)
+
+@app.before_request
+async def start_timer():
+    start_request_timer(g)
+    slow_operations.start_request()
+
+@app.after_request
+async def record_request(response):
+    slow_operations.finish_request(request.endpoint, request.method, response.status_code)
+    return observe_request(g, request, response)
+
+app.register_blueprint(user)
+app.register_blueprint(task)
+# The operational routes share their handlers with the synchronous mode, and check MongoDB with the async client.
+app.register_blueprint(create_ops_blueprint(Blueprint, request, async_conn.ping))
+
+@app.route("/")
+async def index():
+    projectInfo = {"Project Name": "Task Tracker Project", "Team members": ["Viraj Patel", "Aryan Handa", "Payal Rangra", "Manpreet Kaur","Dil Raval"]}
+    return projectInfo
+
+@app.before_serving
+async def prepare_database():
+    # Refuse to start without the async driver, rather than failing on the first request.
+    require_async_driver()
+    # Apply the connection settings and create the declared indexes when each worker starts, after it was forked.
+    init_database(app_config)
+
+@app.after_serving
+async def close_database():
+    # Close the async MongoDB client when the server stops.
+    await async_conn.close()
+
+if __name__ == "__main__":
+    app.run()
+
+#uvicorn asgi:app --workers 4
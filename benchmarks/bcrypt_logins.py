@@ -0,0 +1,60 @@
+# Micro-benchmark of the password checks done by a login.
+#
+# Usage (from the project root directory):
+#   python benchmarks/bcrypt_logins.py --logins 200 --concurrency 16
+#
+# It checks a password against a hash with the configured cost factor (app_config.BCRYPT_ROUNDS), from many threads at once, through helpers.password_hashing.
+# It reports the logins per second of the process and per CPU core.
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Make the project modules importable when the script is run from the project root directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_config as config
+from helpers.password_hashing import hash_password, check_password
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the bcrypt password checks of the login endpoint.")
+    parser.add_argument("--logins", type=int, default=200, help="number of password checks to run")
+    parser.add_argument("--concurrency", type=int, default=16, help="number of concurrent request threads")
+    parser.add_argument("--rounds", type=int, default=config.BCRYPT_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument("--pool-size", type=int, default=config.BCRYPT_POOL_SIZE, help="number of worker processes, 0 to hash on the request threads")
+    arguments = parser.parse_args()
+
+    # Apply the settings of the run.
+    config.BCRYPT_ROUNDS = arguments.rounds
+    config.BCRYPT_POOL_SIZE = arguments.pool_size
+    config.BCRYPT_QUEUE_DEPTH = arguments.concurrency
+
+    # Hash the password once, as it is stored in the users collection.
+    hashed_password = hash_password("benchmark-password")
+
+    # Run the password checks from concurrent threads, like concurrent login requests.
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=arguments.concurrency) as threads:
+        results = list(threads.map(lambda _: check_password("benchmark-password", hashed_password), range(arguments.logins)))
+    elapsed = time.perf_counter() - start
+
+    if not all(results):
+        raise SystemExit("Password check failed")
+
+    cores = max(1, min(arguments.pool_size or 1, os.cpu_count() or 1))
+    logins_per_second = arguments.logins / elapsed
+
+    print(f"bcrypt rounds:        {arguments.rounds}")
+    print(f"worker processes:     {arguments.pool_size}")
+    print(f"concurrent requests:  {arguments.concurrency}")
+    print(f"logins:               {arguments.logins} in {elapsed:.2f} s")
+    print(f"logins per second:    {logins_per_second:.1f}")
+    print(f"logins per second per core: {logins_per_second / cores:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+# End-to-end benchmark of every route of the user and task blueprints.
+#
+# Usage (from the project root directory):
+#   python benchmarks/routes.py --users 50 --tasks 5000 --requests 500 --concurrency 8 --output results.json
+#   python benchmarks/routes.py --baseline results.json --threshold 0.2
+#
+# It creates the application with create_app() against a local mongod if one answers at --mongo-url, or else against mongomock (pip install mongomock), an in-process stand-in of MongoDB.
+# It seeds a dataset of users and tasks in a dedicated database, then sends --requests requests to each route from --concurrency threads, through the Flask test client.
+# It reports, for each route, the p50, p95 and p99 latency, the throughput, the status codes and the peak resident memory of the process while the route ran.
+# The results are written as JSON with --output. With --baseline, the run fails if the p95 latency or the throughput of a route is worse than in the baseline by more than --threshold.
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Make the project modules importable when the script is run from the project root directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_config as config
+
+# Function to pick the MongoDB backend.
+def use_backend(backend, mongo_url):
+    """
+    Function to pick the MongoDB backend of the run, before the database package is imported.
+
+    Args:
+        backend (str): 'mongod', 'mongomock' or 'auto' to use mongod if it answers at mongo_url and mongomock otherwise.
+        mongo_url (str): The connection string of the local mongod.
+
+    Returns:
+        str: The backend used.
+    """
+    import pymongo
+
+    if backend in ("auto", "mongod"):
+        try:
+            pymongo.MongoClient(mongo_url, serverSelectionTimeoutMS=500).admin.command("ping")
+            config.CONST_MONGO_URL = mongo_url
+            return "mongod"
+        except Exception:
+            if backend == "mongod":
+                raise SystemExit(f"No mongod answers at {mongo_url}")
+
+    try:
+        import mongomock
+        import mongomock.store
+    except ImportError:
+        raise SystemExit("No mongod answers at %s and mongomock is not installed (pip install mongomock)" % mongo_url)
+
+    # Every client of the run shares one in-memory server.
+    server = mongomock.store.ServerStore()
+    pymongo.MongoClient = lambda *args, **kwargs: mongomock.MongoClient(*args, _store=server, **kwargs)
+
+    # mongomock changes the projection it is given while it reads the documents, and the task lists share config.TASK_PROJECTION between threads: give it a copy.
+    find = mongomock.Collection.find
+    def find_with_copied_projection(self, filter=None, projection=None, *args, **kwargs):
+        return find(self, filter, dict(projection) if isinstance(projection, dict) else projection, *args, **kwargs)
+    mongomock.Collection.find = find_with_copied_projection
+
+    config.CONST_MONGO_URL = "mongodb://localhost:27017"
+    return "mongomock"
+
+# Class sampling the resident memory of the process.
+class MemorySampler:
+    """
+    Class sampling the resident memory of the process on a background thread, to report its peak while a route runs.
+    """
+    # Constructor
+    def __init__(self, interval=0.01):
+        """
+        Constructor for the MemorySampler class.
+
+        Args:
+            interval (float): The number of seconds between two samples.
+        """
+        self.interval = interval
+        self.peak = 0
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    # Method to read the resident memory.
+    @staticmethod
+    def rss():
+        """
+        Method to read the current resident memory of the process.
+
+        Returns:
+            int: The resident memory in bytes. Where /proc is not available, the peak resident memory of the process is returned.
+        """
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def __enter__(self):
+        self.peak = self.rss()
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__stop.set()
+        self.__thread.join()
+        self.peak = max(self.peak, self.rss())
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+# Words of the descriptions of the seeded tasks, searched by the task search route.
+DESCRIPTION_WORDS = ["review", "update", "deploy", "report", "budget", "release", "client", "meeting", "invoice", "migration",
+                     "dashboard", "contract", "security", "audit", "training", "support", "feedback", "metrics", "survey", "roadmap"]
+
+# Class building the requests of each route.
+class Workload:
+    """
+    Class holding the seeded dataset and building the requests of each route.
+    """
+    # Constructor
+    def __init__(self, database, users, tasks, bulk_size, seed):
+        """
+        Constructor for the Workload class. Seeds the dataset.
+
+        Args:
+            database (pymongo.database.Database): The database of the run.
+            users (int): The number of users to create.
+            tasks (int): The number of tasks to create, assigned at random between the users.
+            bulk_size (int): The number of tasks of each bulk request.
+            seed (int): The seed of the random generator.
+        """
+        from bson.objectid import ObjectId
+        from helpers.user_accounts import login_response
+        from helpers.password_hashing import hash_password
+
+        self.random = random.Random(seed)
+        self.bulk_size = bulk_size
+
+        # Hash the password once: every seeded user has the same password.
+        self.password = "benchmark-password"
+        hashed_password = hash_password(self.password)
+
+        self.users = [{"_id": ObjectId(), "name": f"User {index}", "email": f"user{index}@benchmark.test", "password": hashed_password}
+                      for index in range(users)]
+        database[config.CONST_USER_COLLECTION].insert_many(self.users)
+
+        self.tokens = {str(user["_id"]): login_response(user)["token"] for user in self.users}
+
+        # Tasks of the dataset. The delete routes take theirs with take_tasks().
+        self.tasks = [self.__task(ObjectId) for _ in range(tasks)]
+        database[config.CONST_TASK_COLLECTION].insert_many(self.tasks)
+
+    # Method to build a task document.
+    def __task(self, ObjectId):
+        created_by = self.random.choice(self.users)
+        assigned_to = self.random.choice(self.users)
+        return {"_id": ObjectId(), "createdByUid": str(created_by["_id"]), "createdByName": created_by["name"],
+                "assignedToUid": str(assigned_to["_id"]), "assignedToName": assigned_to["name"],
+                "description": " ".join(["Benchmark task"] + self.random.sample(DESCRIPTION_WORDS, 3)), "done": False, "version": 0}
+
+    # Method to get the authentication header of a user.
+    def headers(self, user_id):
+        """
+        Method to get the authentication header of a user.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            dict: The 'x-access-token' header.
+        """
+        return {"x-access-token": self.tokens[user_id]}
+
+    # Method to pick a user.
+    def user(self, number):
+        """
+        Method to pick the user of a request.
+
+        Args:
+            number (int): The request number.
+
+        Returns:
+            str: The ID of the user.
+        """
+        return str(self.users[number % len(self.users)]["_id"])
+
+    # Method to reserve tasks for a delete route.
+    def take_tasks(self, count):
+        """
+        Method to remove tasks from the dataset, so that a delete route deletes each task once.
+
+        Args:
+            count (int): The number of tasks.
+
+        Returns:
+            list: The task documents, or fewer if the dataset is exhausted.
+        """
+        taken, self.tasks = self.tasks[:count], self.tasks[count:]
+        return taken
+
+# Function to list the routes of the benchmark.
+def routes(workload):
+    """
+    Function to list the routes of views/user_view.py and views/task_view.py with a function building each request.
+
+    Args:
+        workload (Workload): The seeded dataset.
+
+    Returns:
+        list: (name, function) tuples. The function takes the request number and returns the method, the path and the keyword arguments of the request.
+    """
+    def create_user(number):
+        return "POST", "/users/", {"json": {"name": f"New user {number}", "email": f"new{number}-{os.getpid()}@benchmark.test", "password": workload.password}}
+
+    def login(number):
+        user = workload.users[number % len(workload.users)]
+        return "POST", "/users/login", {"json": {"email": user["email"], "password": workload.password}}
+
+    def fetch_users(number):
+        return "GET", "/users/", {"headers": workload.headers(workload.user(number))}
+
+    def create_task(number):
+        return "POST", "/tasks/", {"headers": workload.headers(workload.user(number)),
+                                   "json": {"description": f"Task {number}", "assignedToUid": workload.user(number + 1)}}
+
+    def create_tasks(number):
+        return "POST", "/tasks/bulk", {"headers": workload.headers(workload.user(number)),
+                                       "json": [{"description": f"Task {number}-{index}", "assignedToUid": workload.user(number + index)}
+                                                for index in range(workload.bulk_size)]}
+
+    def created_by(number):
+        return "GET", "/tasks/createdby/", {"headers": workload.headers(workload.user(number))}
+
+    def assigned_to(number):
+        return "GET", "/tasks/assignedto/", {"headers": workload.headers(workload.user(number))}
+
+    def assigned_to_not_modified(number):
+        # A client revalidating its copy: 'If-None-Match: *' matches the current ETag, so the response is a 304.
+        return "GET", "/tasks/assignedto/", {"headers": {**workload.headers(workload.user(number)), "If-None-Match": "*"}}
+
+    def stats(number):
+        return "GET", "/tasks/stats", {"headers": workload.headers(workload.user(number))}
+
+    def search(number):
+        words = DESCRIPTION_WORDS[number % len(DESCRIPTION_WORDS)], DESCRIPTION_WORDS[(number * 7 + 3) % len(DESCRIPTION_WORDS)]
+        return "GET", "/tasks/search", {"headers": workload.headers(workload.user(number)), "query_string": {"q": " ".join(words)}}
+
+    def changes(number):
+        # A client reconnecting after a minute: only the tasks written since then are read.
+        return "GET", "/tasks/changes", {"headers": workload.headers(workload.user(number)), "query_string": {"since": str(int((time.time() - 60) * 1_000_000))}}
+
+    def export(number):
+        # A full export of the tasks of a user, compressed as by a browser.
+        return "GET", "/tasks/export", {"headers": {**workload.headers(workload.user(number)), "Accept-Encoding": "gzip"}}
+
+    def update_task(number):
+        task = workload.tasks[number % len(workload.tasks)]
+        return "PATCH", f"/tasks/{task['_id']}", {"headers": workload.headers(task["assignedToUid"]), "json": {"done": number % 2 == 0}}
+
+    def update_tasks(number):
+        user_id = workload.user(number)
+        task_ids = [str(task["_id"]) for task in workload.tasks if task["assignedToUid"] == user_id][:workload.bulk_size]
+        return "PATCH", "/tasks/bulk", {"headers": workload.headers(user_id), "json": {"taskUids": task_ids or [str(workload.tasks[0]["_id"])], "done": number % 2 == 0}}
+
+    def delete_task(number):
+        task = workload.take_tasks(1)[0]
+        return "DELETE", f"/tasks/{task['_id']}", {"headers": workload.headers(task["createdByUid"])}
+
+    def delete_tasks(number):
+        tasks = workload.take_tasks(workload.bulk_size)
+        return "DELETE", "/tasks/bulk", {"headers": workload.headers(tasks[0]["createdByUid"]), "json": {"taskUids": [str(task["_id"]) for task in tasks]}}
+
+    # The delete routes run last, as they remove tasks from the dataset.
+    return [("user.create", create_user), ("user.login", login), ("user.fetch", fetch_users),
+            ("task.createTask", create_task), ("task.createTasks", create_tasks),
+            ("task.search_created_by", created_by), ("task.get_tasks_assigned_to_current_user", assigned_to),
+            ("task.get_tasks_assigned_to_current_user.304", assigned_to_not_modified), ("task.get_stats_of_current_user", stats),
+            ("task.search_tasks_of_current_user", search), ("task.get_changes_of_current_user", changes),
+            ("task.export_tasks_of_current_user", export),
+            ("task.updateTask", update_task), ("task.updateTasks", update_tasks),
+            ("task.deleteTask", delete_task), ("task.deleteTasks", delete_tasks)]
+
+# Function to run the requests of a route.
+def run_route(app, build_request, requests, concurrency):
+    """
+    Function to send the requests of a route from concurrent threads.
+
+    Args:
+        app (flask.Flask): The application.
+        build_request (function): The function building each request from its number.
+        requests (int): The number of requests.
+        concurrency (int): The number of threads.
+
+    Returns:
+        dict: The latency percentiles, throughput, status codes, first error of each failing status code and peak resident memory of the route.
+    """
+    numbers = itertools.count()
+    build_lock = threading.Lock()
+    local = threading.local()
+
+    def send(_):
+        # One test client per thread.
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+
+        with build_lock:
+            method, path, arguments = build_request(next(numbers))
+
+        started = time.perf_counter()
+        response = client.open(path, method=method, **arguments)
+        latency = time.perf_counter() - started
+        return latency, response.status_code, response.get_data(as_text=True)[:200] if response.status_code >= 400 else None
+
+    with MemorySampler() as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as threads:
+            results = list(threads.map(send, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _, _ in results)
+    # Count the status codes, and keep the first error body of each failing status code.
+    statuses = {}
+    errors = {}
+    for _, status, error in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if error is not None:
+            errors.setdefault(str(status), error)
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    return {"requests": requests, "throughput": requests / elapsed, "mean_ms": statistics.mean(latencies),
+            "p50_ms": percentile(0.50), "p95_ms": percentile(0.95), "p99_ms": percentile(0.99), "max_ms": latencies[-1],
+            "statuses": statuses, "errors": errors, "peak_rss_mb": memory.peak / (1024 * 1024)}
+
+# Function to compare the results with a baseline.
+def compare(results, baseline, threshold):
+    """
+    Function to compare the results of each route with a baseline.
+
+    Args:
+        results (dict): The results of this run, by route.
+        baseline (dict): The results of the baseline run, by route.
+        threshold (float): The allowed relative regression, for example 0.2 for 20%.
+
+    Returns:
+        list: A message for each regression.
+    """
+    regressions = []
+    for route, result in results.items():
+        reference = baseline.get(route)
+        if reference is None:
+            continue
+        if result["p95_ms"] > reference["p95_ms"] * (1 + threshold):
+            regressions.append(f"{route}: p95 {result['p95_ms']:.2f} ms, baseline {reference['p95_ms']:.2f} ms")
+        if result["throughput"] < reference["throughput"] * (1 - threshold):
+            regressions.append(f"{route}: throughput {result['throughput']:.1f}/s, baseline {reference['throughput']:.1f}/s")
+    return regressions
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark every route of the user and task blueprints.")
+    parser.add_argument("--backend", choices=("auto", "mongod", "mongomock"), default="auto", help="MongoDB backend of the run")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017", help="connection string of the local mongod")
+    parser.add_argument("--database", default="TaskTrackerBenchmark", help="database of the run, dropped before seeding")
+    parser.add_argument("--users", type=int, default=50, help="number of seeded users")
+    parser.add_argument("--tasks", type=int, default=5000, help="number of seeded tasks")
+    parser.add_argument("--bulk-size", type=int, default=20, help="number of tasks of each bulk request")
+    parser.add_argument("--requests", type=int, default=500, help="number of requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of concurrent clients")
+    parser.add_argument("--rounds", type=int, default=config.BCRYPT_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument("--routes", help="comma-separated routes to run (default: all)")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the dataset")
+    parser.add_argument("--output", help="file to write the results to, as JSON")
+    parser.add_argument("--baseline", help="results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression against the baseline")
+    arguments = parser.parse_args()
+
+    backend = use_backend(arguments.backend, arguments.mongo_url)
+
+    # Settings of the run, applied before the application modules create their limiters and caches.
+    config.CONST_DATABASE = arguments.database
+    config.BCRYPT_ROUNDS = arguments.rounds
+    config.SLOW_OP_LOG_FILE = None
+    # The login throttling would reject most of the login requests of the benchmark.
+    config.LOGIN_EMAIL_RATE = config.LOGIN_IP_RATE = 1e9
+    config.LOGIN_EMAIL_BURST = config.LOGIN_IP_BURST = 1e9
+
+    from app import create_app
+    from database.__init__ import conn
+
+    # Start from an empty database.
+    conn.configure(config.CONST_DATABASE, config.CONST_MONGO_URL)
+    conn.database.client.drop_database(config.CONST_DATABASE)
+    app = create_app(config)
+
+    seeding_started = time.perf_counter()
+    workload = Workload(conn.database, arguments.users, arguments.tasks, arguments.bulk_size, arguments.seed)
+    print(f"backend: {backend}, seeded {arguments.users} users and {arguments.tasks} tasks in {time.perf_counter() - seeding_started:.1f} s")
+
+    selected = set(arguments.routes.split(",")) if arguments.routes else None
+    results = {}
+    for name, build_request in routes(workload):
+        if selected and name not in selected:
+            continue
+
+        # The delete routes need one task per request, or one bulk of tasks per request.
+        requests = arguments.requests
+        if name == "task.deleteTask":
+            requests = min(requests, len(workload.tasks))
+        elif name == "task.deleteTasks":
+            requests = min(requests, len(workload.tasks) // arguments.bulk_size)
+        if not requests:
+            continue
+
+        results[name] = run_route(app, build_request, requests, arguments.concurrency)
+        result = results[name]
+        print(f"{name:<42} {result['throughput']:9.1f}/s  p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+              f"p99 {result['p99_ms']:8.2f} ms  rss {result['peak_rss_mb']:7.1f} MB  {result['statuses']}")
+
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump({"environment": {"backend": backend, "python": platform.python_version(), "platform": platform.platform(),
+                                       "users": arguments.users, "tasks": arguments.tasks, "bulk_size": arguments.bulk_size,
+                                       "requests": arguments.requests, "concurrency": arguments.concurrency, "rounds": arguments.rounds},
+                       "routes": results}, output, indent=2)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline:
+            regressions = compare(results, json.load(baseline)["routes"], arguments.threshold)
+        if regressions:
+            print("Regressions beyond %d%%:" % (arguments.threshold * 100))
+            for regression in regressions:
+                print("  " + regression)
+            raise SystemExit(1)
+        print("No regression beyond %d%% of the baseline." % (arguments.threshold * 100))
+
+if __name__ == "__main__":
+    main()
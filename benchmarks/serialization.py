@@ -0,0 +1,106 @@
+# Micro-benchmark of the serialization of a task list response.
+#
+# Usage (from the project root directory):
+#   python benchmarks/serialization.py --tasks 10000 --runs 20
+#
+# It serializes one page of --tasks task documents, as read from MongoDB, the way the task list endpoints did before and after helpers/json_provider.py:
+# - before: convert the '_id' of each document to a string, then serialize with the default JSON provider of Flask (json module, sorted keys),
+# - after: serialize the documents as they are with FastJSONProvider, with orjson if it is installed and with its json module fallback.
+# It reports the median and best time of each method.
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from bson.objectid import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+# Make the project modules importable when the script is run from the project root directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import helpers.json_provider as json_provider
+
+# Function to build the documents of a page.
+def task_documents(count):
+    """
+    Function to build task documents as returned by the task list queries.
+
+    Args:
+        count (int): The number of documents.
+
+    Returns:
+        list: The documents, with ObjectId '_id' values.
+    """
+    return [{"_id": ObjectId(), "createdByUid": str(ObjectId()), "createdByName": f"User {index % 100}",
+             "assignedToUid": str(ObjectId()), "assignedToName": f"User {index % 37}",
+             "description": f"Review the quarterly report number {index}", "done": index % 3 == 0, "version": index % 5}
+            for index in range(count)]
+
+# Function to time a serialization method.
+def measure(serialize, documents, runs):
+    """
+    Function to time a serialization method.
+
+    Args:
+        serialize (function): The method, taking the documents and returning the body of the response.
+        documents (list): The documents of the page.
+        runs (int): The number of runs.
+
+    Returns:
+        tuple: The median and best time in milliseconds, and the size of the body in bytes.
+    """
+    times = []
+    for _ in range(runs):
+        # Each run gets fresh documents, as the conversion of the '_id' values changes them.
+        page = [dict(document) for document in documents]
+        started = time.perf_counter()
+        body = serialize(page)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), min(times), len(body)
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the serialization of a task list response.")
+    parser.add_argument("--tasks", type=int, default=10000, help="number of tasks of the response")
+    parser.add_argument("--runs", type=int, default=20, help="number of runs of each method")
+    arguments = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = json_provider.FastJSONProvider(app)
+    documents = task_documents(arguments.tasks)
+
+    def before(page):
+        for document in page:
+            document["_id"] = str(document["_id"])
+        return default_provider.response({"tasks": page, "next_cursor": None}).get_data()
+
+    def after(page):
+        return fast_provider.response({"tasks": page, "next_cursor": None}).get_data()
+
+    def after_without_orjson(page):
+        orjson, json_provider.orjson = json_provider.orjson, None
+        try:
+            return after(page)
+        finally:
+            json_provider.orjson = orjson
+
+    methods = [("before: str(_id) loop + Flask json", before), ("after: FastJSONProvider, json module", after_without_orjson)]
+    if json_provider.orjson is not None:
+        methods.append(("after: FastJSONProvider, orjson", after))
+    else:
+        print("orjson is not installed (pip install orjson): only the json module fallback is measured.")
+
+    with app.app_context():
+        print(f"tasks per response: {arguments.tasks}, runs: {arguments.runs}")
+        for name, serialize in methods:
+            median, best, size = measure(serialize, documents, arguments.runs)
+            print(f"{name:<40} median {median:8.2f} ms  best {best:8.2f} ms  {size / 1024:8.0f} KiB")
+
+if __name__ == "__main__":
+    main()
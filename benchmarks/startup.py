@@ -0,0 +1,70 @@
+# Benchmark of the startup time of the application.
+#
+# Usage (from the project root directory):
+#   python benchmarks/startup.py --runs 10 --path /
+#
+# Each run starts a fresh Python process, like a new worker of the server, and measures in it:
+# - the time to import the application module (app.py),
+# - the time to create the application with create_app(),
+# - the time to serve the first request, which opens the MongoDB connection if the route uses the database.
+# It reports the median and the maximum of each step, and of the import-to-first-request latency.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Project root directory, from which the application is imported.
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code run by each fresh process. It prints the timings of the run as JSON.
+RUN_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import app_config
+app_config.ENSURE_INDEXES = {ensure_indexes}
+from app import create_app
+imported = time.perf_counter()
+app = create_app(app_config)
+created = time.perf_counter()
+response = app.test_client().get({path!r})
+served = time.perf_counter()
+print(json.dumps({{"import": imported - start, "create_app": created - imported, "first_request": served - created,
+                  "import_to_first_request": served - start, "status": response.status_code}}))
+"""
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the import-to-first-request latency of a new worker process.")
+    parser.add_argument("--runs", type=int, default=10, help="number of fresh processes to start")
+    parser.add_argument("--path", default="/", help="path of the first request")
+    parser.add_argument("--ensure-indexes", action="store_true", help="create the declared indexes in create_app(), as with ENSURE_INDEXES")
+    arguments = parser.parse_args()
+
+    code = RUN_CODE.format(ensure_indexes=arguments.ensure_indexes, path=arguments.path)
+
+    runs = []
+    for _ in range(arguments.runs):
+        # Start a fresh interpreter, so that nothing is imported or connected yet.
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIRECTORY, capture_output=True, text=True, check=True).stdout
+        elapsed = time.perf_counter() - start
+
+        # The timings are on the last line, after anything the application printed.
+        run = json.loads(output.strip().splitlines()[-1])
+        run["process"] = elapsed
+        runs.append(run)
+
+    print(f"runs:                    {arguments.runs}")
+    print(f"first request:           GET {arguments.path} -> {runs[-1]['status']}")
+    for step in ("import", "create_app", "first_request", "import_to_first_request", "process"):
+        values = [run[step] * 1000 for run in runs]
+        print(f"{step + ':':<24} median {statistics.median(values):8.1f} ms   max {max(values):8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+# Import the necessary modules.
+#
+# Async versions of the controller functions of controllers/task_controller.py, used by the async serving mode (asgi.py).
+# They take the same arguments, return the same values and raise the same errors as their synchronous versions, but await the async driver of PyMongo.
+# The validation, the documents, the filters, the outcome of each task and the side effects come from helpers/task_writes.py, shared with the synchronous versions: only the reads and writes are awaited here.
+
+from database.__init__ import async_conn
+from bson.objectid import ObjectId
+from helpers.pagination import fetch_page_async
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure
+from controllers.async_user_controller import get_users_by_ids
+from helpers.response_cache import response_cache
+from helpers.task_changes import next_seq, changes_query, merge_changes, TASK_OWNER_FIELDS, TOMBSTONE_OWNER_FIELDS, CHANGES_SORT, INITIAL_TOKEN
+from helpers.task_search import search_index, user_tasks_query, text_search, search_page, rank_tasks
+from helpers.task_stats import format_stats
+from helpers.task_import import ImportInterrupted, ImportReport, parse_chunk, build_tasks, checkpoint_upsert
+from helpers.task_writes import (BULK_MARKER_FIELD, BULK_TASK_FIELDS, UPDATED_TASK_FIELDS, apply_effects_async, created_effects, deleted_effects, build_task, check_task_batch,
+                                 build_task_batch, insert_errors, record_batch, owner_filter, status_update, check_mismatch, updated_task_result, check_status, parse_task_ids,
+                                 bulk_update_writes, bulk_delete_writes, failed_writes, bulk_update_outcome, delete_candidates, bulk_delete_outcome)
+import app_config as config
+
+async def create_task(task_info):
+    """
+    Create a new task in the database.
+
+    See task_controller.create_task().
+
+    Args:
+        task_info (dict): A dictionary containing the task information ('created_by_uid', 'assigned_to_uid' and 'description').
+
+    Returns:
+        pymongo.results.InsertOneResult: The result of the insert operation.
+
+    Raises:
+        ValueError: If the user information is invalid.
+    """
+    try:
+        new_task = build_task(task_info, await get_users_by_ids([task_info['created_by_uid'], task_info['assigned_to_uid']]))
+        created_task = await async_conn.database[config.CONST_TASK_COLLECTION].insert_one(new_task)
+        await apply_effects_async(async_conn.database, created_effects([new_task]))
+        return created_task
+
+    except Exception as err:  # If there is any exception, raise a ValueError
+        raise ValueError(str(err))
+
+async def create_tasks(created_by_uid, tasks_info):
+    """
+    Create many tasks in the database at once.
+
+    See task_controller.create_tasks().
+
+    Args:
+        created_by_uid (str): The ID of the user who creates the tasks.
+        tasks_info (list): A list of dictionaries containing the task information ('assignedToUid' and 'description').
+
+    Returns:
+        list: One dictionary per task, containing the 'index' of the task and either the 'id' of the created task or an 'error' message.
+
+    Raises:
+        ValueError: If the list of tasks is invalid, the user creating the tasks does not exist, or there is an error saving the tasks.
+    """
+    try:
+        results, user_ids = check_task_batch(created_by_uid, tasks_info)
+        new_tasks, positions = build_task_batch(created_by_uid, tasks_info, results, await get_users_by_ids(user_ids))
+
+        if not new_tasks:
+            return results
+
+        failed_inserts = {}
+        try:
+            await async_conn.database[config.CONST_TASK_COLLECTION].insert_many(new_tasks, ordered=False)
+        except BulkWriteError as err:
+            failed_inserts = insert_errors(err)
+
+        saved_tasks = record_batch(results, positions, new_tasks, failed_inserts)
+        await apply_effects_async(async_conn.database, created_effects(saved_tasks))
+
+        return results
+
+    except Exception as err:  # If there is any exception, raise a ValueError
+        raise ValueError(str(err))
+
+async def import_tasks(created_by_uid, lines, import_id=None):
+    """
+    Import tasks created by the user from the lines of an upload.
+
+    See task_controller.import_tasks().
+
+    Args:
+        created_by_uid (str): The ID of the user importing the tasks.
+        lines (async iterable): The (number, content) of the lines of the upload (see task_import.read_lines_async()).
+        import_id (str): The import ID, or None for an import that cannot be resumed.
+
+    Returns:
+        dict: The report of the import.
+
+    Raises:
+        ValueError: If the user importing the tasks does not exist, or there is an error saving a chunk.
+    """
+    try:
+        created_by_user = (await get_users_by_ids([created_by_uid])).get(created_by_uid)
+        if not created_by_user:
+            raise ValueError('Invalid user information')
+
+        checkpoint = None
+        if import_id is not None:
+            checkpoint_filter, checkpoint_fields = checkpoint_upsert(created_by_uid, import_id)
+            checkpoint = await async_conn.database[config.CONST_TASK_IMPORT_COLLECTION].find_one_and_update(
+                checkpoint_filter, checkpoint_fields, upsert=True, return_document=ReturnDocument.AFTER)
+        report = ImportReport(import_id, checkpoint)
+
+        chunk = []
+        try:
+            async for line_number, line in lines:
+                if line_number <= report.resumed_from:
+                    continue
+
+                chunk.append((line_number, line))
+                if len(chunk) >= config.TASK_IMPORT_CHUNK_SIZE:
+                    await _import_chunk(created_by_user, chunk, report, checkpoint)
+                    chunk = []
+        except ImportInterrupted as err:
+            report.interrupted = str(err)
+
+        if chunk:
+            await _import_chunk(created_by_user, chunk, report, checkpoint)
+
+        return report.summary()
+
+    except Exception as err:  # If there is any exception, raise a ValueError
+        raise ValueError(str(err))
+
+async def _import_chunk(created_by_user, chunk, report, checkpoint):
+    """
+    Import one chunk of lines of an import, then update the checkpoint of the import. See task_controller._import_chunk().
+    """
+    created_by_uid = str(created_by_user['_id'])
+
+    task_infos, user_ids = parse_chunk(chunk, report)
+    user_names = {user_id: user['name'] for user_id, user in (await get_users_by_ids(user_ids - {created_by_uid})).items()}
+    user_names[created_by_uid] = created_by_user['name']
+
+    new_tasks, line_numbers = build_tasks(created_by_uid, user_names, task_infos, report, checkpoint)
+
+    saved_tasks = []
+    if new_tasks:
+        failed_inserts = {}
+        try:
+            await async_conn.database[config.CONST_TASK_COLLECTION].insert_many(new_tasks, ordered=False)
+        except BulkWriteError as err:
+            failed_inserts = insert_errors(err)
+
+        saved_tasks = report.record_inserts(new_tasks, line_numbers, failed_inserts, checkpoint)
+
+    await apply_effects_async(async_conn.database, created_effects(saved_tasks))
+
+    report.lines = chunk[-1][0]
+    if checkpoint is not None:
+        await async_conn.database[config.CONST_TASK_IMPORT_COLLECTION].update_one({"_id": checkpoint["_id"]}, report.checkpoint_update())
+
+async def get_task_created_by_user(user_id, limit=config.TASK_PAGE_SIZE, after=None, filters=None, direction=1, projection=config.TASK_PROJECTION):
+    """
+    Get one page of tasks created by the user.
+
+    See task_controller.get_task_created_by_user().
+
+    Args:
+        user_id (str): The ID of the user.
+        limit (int): The maximum number of tasks to return.
+        after (str): The cursor returned by the previous page, or None for the first page.
+        filters (dict): The additional filters of the tasks, or None.
+        direction (int): The direction of the '_id' order.
+        projection (dict): The fields to return.
+
+    Returns:
+        tuple: A list of tasks and the cursor of the next page (None if this is the last page).
+
+    Raises:
+        ValueError: If there is an error in fetching the tasks.
+    """
+    try:
+        task_collection = async_conn.database.get_collection(config.CONST_TASK_COLLECTION)
+        return await fetch_page_async(task_collection, {**(filters or {}), "createdByUid": user_id}, limit, after, projection, direction)
+
+    except Exception as error:
+        raise ValueError("Error on trying to fetch tasks created by user.", error)
+
+async def get_tasks_assigned_to_user(assignedToUid, limit=config.TASK_PAGE_SIZE, after=None, filters=None, direction=1, projection=config.TASK_PROJECTION):
+    """
+    Get one page of tasks assigned to the user.
+
+    See task_controller.get_tasks_assigned_to_user().
+
+    Args:
+        assignedToUid (str): The ID of the user.
+        limit (int): The maximum number of tasks to return.
+        after (str): The cursor returned by the previous page, or None for the first page.
+        filters (dict): The additional filters of the tasks, or None.
+        direction (int): The direction of the '_id' order.
+        projection (dict): The fields to return.
+
+    Returns:
+        tuple: A list of tasks and the cursor of the next page (None if this is the last page).
+
+    Raises:
+        ValueError: If there is an error in fetching the tasks.
+    """
+    try:
+        task_collection = async_conn.database[config.CONST_TASK_COLLECTION]
+        return await fetch_page_async(task_collection, {**(filters or {}), "assignedToUid": assignedToUid}, limit, after, projection, direction)
+
+    except Exception as err:
+        raise ValueError("Error fetching tasks assigned to user: ", err)
+
+async def get_task_list_version(user_id):
+    """
+    Get the version of the task lists of the user.
+
+    See task_controller.get_task_list_version().
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        str: The version.
+
+    Raises:
+        ValueError: If there is an error in fetching the version.
+    """
+    try:
+        return await response_cache.version_async(async_conn.database[config.CONST_TASK_LIST_VERSION_COLLECTION], user_id)
+
+    except Exception as err:
+        raise ValueError("Error fetching task list version: ", err)
+
+async def get_task_stats(user_id):
+    """
+    Get the task counters of the user.
+
+    See task_controller.get_task_stats().
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        dict: The number of tasks created by and assigned to the user, each split into done and open tasks.
+
+    Raises:
+        ValueError: If there is an error in fetching the counters.
+    """
+    try:
+        counters = await async_conn.database[config.CONST_TASK_STATS_COLLECTION].find_one({"_id": user_id})
+        return format_stats(counters)
+
+    except Exception as err:
+        raise ValueError("Error fetching task stats: ", err)
+
+async def get_task_changes(user_id, since=INITIAL_TOKEN, limit=config.TASK_PAGE_SIZE):
+    """
+    Get the changes of the tasks of the user since a sync token.
+
+    See task_controller.get_task_changes().
+
+    Args:
+        user_id (str): The ID of the user.
+        since (tuple): The sequence number and the task ID (or None) of the token.
+        limit (int): The maximum number of changes to return.
+
+    Returns:
+        dict: The changed tasks, the IDs of the deleted tasks, the token of the next sync and whether more changes are waiting.
+
+    Raises:
+        ValueError: If there is an error in fetching the changes.
+    """
+    try:
+        tasks = await async_conn.database[config.CONST_TASK_COLLECTION].find(
+            changes_query(TASK_OWNER_FIELDS, user_id, since), {**config.TASK_PROJECTION, "seq": 1}).sort(CHANGES_SORT).limit(limit + 1).to_list(None)
+
+        deleted = []
+        if since != INITIAL_TOKEN:
+            deleted = await async_conn.database[config.CONST_TASK_TOMBSTONE_COLLECTION].find(
+                changes_query(TOMBSTONE_OWNER_FIELDS, user_id, since), {"seq": 1}).sort(CHANGES_SORT).limit(limit + 1).to_list(None)
+
+        return merge_changes(tasks, deleted, limit, since)
+
+    except Exception as err:
+        raise ValueError("Error fetching task changes: ", err)
+
+def export_tasks(user_id):
+    """
+    Open an async cursor over every task created by or assigned to the user, for an export.
+
+    See task_controller.export_tasks().
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        pymongo.asynchronous.cursor.AsyncCursor: The cursor of the tasks. The caller iterates and closes it.
+
+    Raises:
+        ValueError: If there is an error in opening the cursor.
+    """
+    try:
+        return async_conn.database[config.CONST_TASK_COLLECTION].find(
+            user_tasks_query(user_id), dict(config.TASK_PROJECTION), batch_size=config.EXPORT_BATCH_SIZE).sort("_id", 1)
+
+    except Exception as err:
+        raise ValueError("Error exporting tasks: ", err)
+
+async def search_tasks(user_id, terms, limit=config.TASK_PAGE_SIZE, offset=0):
+    """
+    Search the descriptions of the tasks created by or assigned to the user.
+
+    See task_controller.search_tasks().
+
+    Args:
+        user_id (str): The ID of the user.
+        terms (list): The search terms.
+        limit (int): The maximum number of tasks to return.
+        offset (int): The number of results to skip.
+
+    Returns:
+        tuple: A list of tasks with their 'score', from the best to the worst match, and the cursor of the next page (None if this is the last page).
+
+    Raises:
+        ValueError: If there is an error in searching the tasks.
+    """
+    try:
+        task_collection = async_conn.database[config.CONST_TASK_COLLECTION]
+
+        if search_index.text_search:
+            try:
+                query, projection, sort = text_search(user_id, terms)
+                tasks = await task_collection.find(query, projection).sort(sort).skip(offset).limit(limit + 1).to_list(None)
+                return search_page(tasks, limit, offset)
+            except (NotImplementedError, OperationFailure) as err:
+                search_index.disable_text_search(err)
+
+        ranked = search_index.search(user_id, terms, offset + limit + 1)
+        if ranked is None:
+            search_index.load(user_id, await task_collection.find(user_tasks_query(user_id), {"description": 1}).to_list(None))
+            ranked = search_index.search(user_id, terms, offset + limit + 1) or []
+        ranked, next_cursor = search_page(ranked[offset:], limit, offset)
+
+        tasks = await task_collection.find({"_id": {"$in": [task_id for task_id, _ in ranked]}}, config.TASK_PROJECTION).to_list(None)
+        return rank_tasks(ranked, tasks), next_cursor
+
+    except Exception as err:
+        raise ValueError("Error searching tasks: ", err)
+
+async def update_task(user_info, task_id, done, expected_version=None):
+    """
+    Update the status of a task in the database.
+
+    See task_controller.update_task().
+
+    Args:
+        user_info (dict): A dictionary containing user-related information retrieved from the token, including the user's ID.
+        task_id (str): The ID of the task to be updated.
+        done (bool): The new status of the task.
+        expected_version (int): The version the task must have to be updated, or None to update any version.
+
+    Returns:
+        dict: The '_id', 'createdByUid', new 'done' status and new 'version' of the updated task, or 'Version Mismatch' if the task does not have the expected version.
+
+    Raises:
+        ValueError: If the task is not found or the user is not authorized to update the task.
+    """
+    try:
+        task_collection = async_conn.database[config.CONST_TASK_COLLECTION]
+
+        updated_task = await task_collection.find_one_and_update(
+            owner_filter(task_id, "assignedToUid", user_info["id"], expected_version),
+            status_update(done, next_seq()),
+            projection=UPDATED_TASK_FIELDS,
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if updated_task is None:
+            # Find the task to know why the update did not match.
+            current_task = await task_collection.find_one({"_id": ObjectId(task_id)}, {"assignedToUid": 1})
+            return check_mismatch(current_task, "assignedToUid", user_info["id"], 'Task not found', 'Users can only change status when task is assigned to them.')
+
+        updated_task, effects = updated_task_result(updated_task, user_info["id"], done)
+        await apply_effects_async(async_conn.database, effects)
+        return updated_task
+
+    except Exception as err:
+        raise ValueError('Error on updating task: ' f'{err}')
+
+async def delete_task(user_information, task_id, expected_version=None):
+    """
+    Delete a task from the database.
+
+    See task_controller.delete_task().
+
+    Args:
+        user_information (dict): A dictionary containing user-related information retrieved from the token, including the user's ID.
+        task_id (str): The ID of the task to be deleted.
+        expected_version (int): The version the task must have to be deleted, or None to delete any version.
+
+    Returns:
+        dict: The deleted task, or 'Version Mismatch' if the task does not have the expected version.
+
+    Raises:
+        ValueError: If the task is not found or the user is not authorized to delete the task.
+    """
+    try:
+        current_user_id = user_information["id"]
+        task_collection = async_conn.database.get_collection(config.CONST_TASK_COLLECTION)
+
+        deleted_task = await task_collection.find_one_and_delete(owner_filter(task_id, "createdByUid", current_user_id, expected_version))
+
+        if deleted_task is None:
+            # Find the task to know why the delete did not match.
+            current_task = await task_collection.find_one({'_id': ObjectId(task_id)}, {'createdByUid': 1})
+            return check_mismatch(current_task, "createdByUid", current_user_id, f"Task not found with id = {str(task_id)} in the database.",
+                                  'Users can only delete when task is created by them.')
+
+        await apply_effects_async(async_conn.database, deleted_effects([deleted_task]))
+        return deleted_task
+
+    except Exception as error:
+        raise ValueError('Error on deleting task: ' f'{error}')
+
+async def update_tasks(user_info, task_ids, done):
+    """
+    Update the status of many tasks in the database at once.
+
+    See task_controller.update_tasks().
+
+    Args:
+        user_info (dict): A dictionary containing user-related information retrieved from the token, including the user's ID.
+        task_ids (list): The IDs of the tasks to be updated.
+        done (bool): The new status of the tasks.
+
+    Returns:
+        dict: The 'matched', 'modified' and 'rejected' tasks.
+
+    Raises:
+        ValueError: If the request is invalid or there is an error updating the tasks.
+    """
+    try:
+        check_status(done)
+        rejected = []
+        object_ids = parse_task_ids(task_ids, rejected)
+
+        user_id = str(user_info['id'])
+
+        if not object_ids:
+            return {'matched': [], 'modified': [], 'rejected': rejected}
+
+        task_collection = async_conn.database[config.CONST_TASK_COLLECTION]
+
+        marker = ObjectId()
+        failed = set()
+        try:
+            modified_count = (await task_collection.bulk_write(bulk_update_writes(object_ids, user_id, done, marker), ordered=False)).modified_count
+        except BulkWriteError as err:
+            modified_count = err.details.get('nModified', 0)
+            failed = failed_writes(err, object_ids, rejected)
+
+        current_tasks = {task['_id']: task async for task in task_collection.find({'_id': {'$in': object_ids}}, {**BULK_TASK_FIELDS, BULK_MARKER_FIELD: 1})}
+        result, effects = bulk_update_outcome(object_ids, current_tasks, user_id, done, marker, modified_count, failed, rejected)
+        await apply_effects_async(async_conn.database, effects)
+
+        return result
+
+    except Exception as err:
+        raise ValueError('Error on updating tasks: ' f'{err}')
+
+async def delete_tasks(user_information, task_ids):
+    """
+    Delete many tasks from the database at once.
+
+    See task_controller.delete_tasks().
+
+    Args:
+        user_information (dict): A dictionary containing user-related information retrieved from the token, including the user's ID.
+        task_ids (list): The IDs of the tasks to be deleted.
+
+    Returns:
+        dict: The 'deleted' and 'rejected' tasks, and the number of 'tasksAffected'.
+
+    Raises:
+        ValueError: If the request is invalid or there is an error deleting the tasks.
+    """
+    try:
+        current_user_id = str(user_information['id'])
+
+        rejected = []
+        object_ids = parse_task_ids(task_ids, rejected)
+
+        task_collection = async_conn.database.get_collection(config.CONST_TASK_COLLECTION)
+
+        current_tasks = {}
+        if object_ids:
+            current_tasks = {task['_id']: task async for task in task_collection.find({'_id': {'$in': object_ids}}, BULK_TASK_FIELDS)}
+        candidates = delete_candidates(object_ids, current_tasks, current_user_id, rejected)
+
+        if not candidates:
+            return {'deleted': [], 'rejected': rejected, 'tasksAffected': 0}
+
+        failed = set()
+        try:
+            deleted_count = (await task_collection.bulk_write(bulk_delete_writes(candidates, current_user_id), ordered=False)).deleted_count
+        except BulkWriteError as err:
+            deleted_count = err.details.get('nRemoved', 0)
+            failed = failed_writes(err, list(candidates), rejected)
+
+        remaining_ids = set()
+        if deleted_count < len(candidates):
+            remaining_ids = {task['_id'] async for task in task_collection.find({'_id': {'$in': list(candidates)}}, {'_id': 1})}
+        result, effects = bulk_delete_outcome(candidates, remaining_ids, deleted_count, failed, rejected)
+        await apply_effects_async(async_conn.database, effects)
+
+        return result
+
+    except Exception as error:
+        raise ValueError('Error on deleting tasks: ' f'{error}')
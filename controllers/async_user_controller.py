@@ -0,0 +1,173 @@
+# Import the necessary modules.
+#
+# Async versions of the controller functions of controllers/user_controller.py, used by the async serving mode (asgi.py).
+# They take the same arguments, return the same values and raise the same errors as their synchronous versions, but await the async driver of PyMongo and the password hashing pool.
+# The documents, the filters and the use of the user cache come from helpers/user_accounts.py, shared with the synchronous versions.
+
+from database.__init__ import async_conn
+import app_config as config
+from helpers.password_hashing import hash_password_async, check_password_async, needs_rehash, HashingPoolBusy
+from pymongo.errors import DuplicateKeyError
+from helpers.user_cache import user_cache
+from helpers.user_accounts import (new_user_document, cache_new_user, login_response, rehash_update, cached_users, add_read_user, is_cached_list, user_list_pipeline,
+                                   USER_EXPORT_PROJECTION)
+
+async def create_user(user_information):
+    """
+    Create a new user in the database.
+
+    See user_controller.create_user().
+
+    Args:
+        user_information (dict): A dictionary containing the 'name', 'email' and 'password' of the user.
+
+    Returns:
+        pymongo.results.InsertOneResult: The result of the insert operation, or 'Duplicated User' if the email is already used.
+
+    Raises:
+        ValueError: If there is an error creating the user.
+        HashingPoolBusy: If the password hashing pool cannot take the call.
+    """
+    try:
+        new_user = new_user_document(user_information, await hash_password_async(user_information["password"]))
+
+        try:
+            # Insert the new user into the database
+            created_user = await async_conn.database[config.CONST_USER_COLLECTION].insert_one(new_user)
+        except DuplicateKeyError:
+            # The unique index on email rejected the insert, so a user with the same email already exists
+            return 'Duplicated User'
+
+        cache_new_user(new_user)
+
+        return created_user
+
+    except HashingPoolBusy:
+        raise
+    except Exception as err:
+        raise ValueError("Error on creating user.", err)
+
+async def login_user(user_information):
+    """
+    Handles the user login process by checking the provided credentials against the database.
+
+    See user_controller.login_user().
+
+    Args:
+        user_information (dict): A dictionary containing the 'email' and 'password' of the user.
+
+    Returns:
+        dict: A dictionary containing the JWT token, expiration time, and logged user information, or 'Invalid Email' or 'Invalid Password'.
+
+    Raises:
+        ValueError: If there is an error logging in the user.
+        HashingPoolBusy: If the password hashing pool cannot take the call.
+    """
+    try:
+        email = user_information["email"]
+        password = user_information["password"]
+
+        db_collection = async_conn.database[config.CONST_USER_COLLECTION]
+
+        # Find the user with the provided email, in the user cache first
+        current_user = user_cache.get_by_email(email)
+        if current_user is None:
+            current_user = await db_collection.find_one({'email': email})
+
+            if not current_user:
+                return "Invalid Email"
+
+            user_cache.put(current_user)
+
+        # Check the password without blocking the event loop
+        if not await check_password_async(password, current_user["password"]):
+            return "Invalid Password"
+
+        # Rehash the password if it was hashed with another cost factor
+        if needs_rehash(current_user["password"]):
+            new_password = await hash_password_async(password)
+            await db_collection.update_one(*rehash_update(current_user, new_password))
+            user_cache.put({**current_user, 'password': new_password})
+
+        return login_response(current_user)
+
+    except HashingPoolBusy:
+        raise
+    except Exception as err:
+        raise ValueError("Error on trying to login.", err)
+
+async def get_users_by_ids(user_ids):
+    """
+    Get users by their IDs, from the user cache first.
+
+    See user_controller.get_users_by_ids().
+
+    Args:
+        user_ids (iterable): The IDs of the users (str).
+
+    Returns:
+        dict: The user documents found, by ID. Unknown IDs are left out.
+    """
+    users, missing_ids = cached_users(user_ids)
+
+    # Read the missing users with a single query and cache them.
+    if missing_ids:
+        async for user in async_conn.database[config.CONST_USER_COLLECTION].find({'_id': {'$in': missing_ids}}):
+            add_read_user(users, user)
+
+    return users
+
+async def fetch_all_users(sort=None, projection=config.USER_LIST_PROJECTION):
+    """
+    Fetches all users from the database and returns them as a list of dictionaries.
+
+    See user_controller.fetch_all_users().
+
+    Args:
+        sort (list): The (field, direction) sort of the users, or None for the storage order.
+        projection (dict): The fields to return.
+
+    Returns:
+        List[Dict[str, str]]: A list of dictionaries containing the ID, email, and name of each user.
+
+    Raises:
+        ValueError: If there is an error fetching the users.
+    """
+    try:
+        db_collection = async_conn.database[config.CONST_USER_COLLECTION]
+
+        # Read a sorted list or a list with fewer fields from the database, without caching it
+        if not is_cached_list(sort, projection):
+            return await (await db_collection.aggregate(user_list_pipeline(sort, projection))).to_list(None)
+
+        # Return the cached list of users if it is still valid
+        users = user_cache.get_all()
+        if users is not None:
+            return users
+
+        users = await (await db_collection.aggregate([{"$project": config.USER_LIST_PROJECTION}])).to_list(None)
+
+        user_cache.put_all(users)
+
+        return users
+
+    except Exception as err:
+        raise ValueError("Error on trying to fetch users.", err)
+
+def export_users():
+    """
+    Open an async cursor over every user, for an export.
+
+    See user_controller.export_users().
+
+    Returns:
+        pymongo.asynchronous.cursor.AsyncCursor: The cursor of the users. The caller iterates and closes it.
+
+    Raises:
+        ValueError: If there is an error opening the cursor.
+    """
+    try:
+        return async_conn.database[config.CONST_USER_COLLECTION].find({}, USER_EXPORT_PROJECTION, batch_size=config.EXPORT_BATCH_SIZE).sort("_id", 1)
+
+    except Exception as err:
+        raise ValueError("Error on trying to export users.", err)
@@ -1,14 +1,27 @@
 # Import the necessary modules.
 
-from models.task_model import Task
 from database.__init__ import conn
 from bson.objectid import ObjectId
+from helpers.pagination import fetch_page
+from controllers.user_controller import get_users_by_ids
+from helpers.response_cache import response_cache
+from helpers.task_changes import next_seq, changes_query, merge_changes, TASK_OWNER_FIELDS, TOMBSTONE_OWNER_FIELDS, CHANGES_SORT, INITIAL_TOKEN
+from helpers.task_search import search_index, user_tasks_query, text_search, search_page, rank_tasks
+from helpers.task_stats import format_stats
+from helpers.task_import import ImportInterrupted, ImportReport, parse_chunk, build_tasks, checkpoint_upsert
+from helpers.task_writes import (BULK_MARKER_FIELD, BULK_TASK_FIELDS, UPDATED_TASK_FIELDS, apply_effects, created_effects, deleted_effects, build_task, check_task_batch,
+                                 build_task_batch, insert_errors, record_batch, owner_filter, status_update, check_mismatch, updated_task_result, check_status, parse_task_ids,
+                                 bulk_update_writes, bulk_delete_writes, failed_writes, bulk_update_outcome, delete_candidates, bulk_delete_outcome)
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure
 import app_config as config
 
 def create_task(task_info):
     """
     Create a new task in the database.
 
+    The users are resolved from the user cache, so when both are cached the insert is the only database call.
+
     Args:
         task_info (dict): A dictionary containing the task information.
             Required keys:
@@ -23,45 +36,179 @@ def create_task(task_info):
         ValueError: If the user information is invalid.
     """
     try:
-        # Find the users by their IDs
-        created_by_user = conn.database[config.CONST_USER_COLLECTION].find_one(
-            {'_id': ObjectId(task_info['created_by_uid'])})
-        assigned_to_user = conn.database[config.CONST_USER_COLLECTION].find_one(
-            {'_id': ObjectId(task_info['assigned_to_uid'])})
-        
-        # Check if the user information is valid
-        if not created_by_user or not assigned_to_user:
-            raise ValueError('Invalid user information')
-        
-        # Create a new task object
-        new_task = Task()
-        new_task.createdByUid = task_info['created_by_uid']  # Set the created by user ID
-        new_task.createdByName = created_by_user['name']  # Set the created by user name
-        new_task.assignedToUid = task_info['assigned_to_uid']  # Set the assigned to user ID
-        new_task.assignedToName = assigned_to_user['name']  # Set the assigned to user name
-        new_task.description = task_info['description']  # Set the description of the task
-        
+        # Find the users by their IDs, from the user cache first, and build the task
+        new_task = build_task(task_info, get_users_by_ids([task_info['created_by_uid'], task_info['assigned_to_uid']]))
+
         # Save the task to the database
-        created_task = conn.database[config.CONST_TASK_COLLECTION].insert_one(new_task.__dict__)
-        
+        created_task = conn.database[config.CONST_TASK_COLLECTION].insert_one(new_task)
+
+        # The task lists, the counters and the search entries of both users have changed, and their streams get the new task
+        apply_effects(conn.database, created_effects([new_task]))
+
         return created_task
-    
+
     except ValueError as err:  # If there is an invalid user information, raise a ValueError
         raise ValueError(str(err))
     except Exception as err:  # If there is any other exception, raise a ValueError
         raise ValueError(str(err))
 
-def get_task_created_by_user(user_id):
+def create_tasks(created_by_uid, tasks_info):
+    """
+    Create many tasks in the database at once.
+
+    All the users referenced by the tasks are resolved from the user cache, with one '$in' query for the users missing from it, and all the valid tasks are saved with one unordered insert_many, so the number of round trips does not depend on the number of tasks.
+
+    Args:
+        created_by_uid (str): The ID of the user who creates the tasks.
+        tasks_info (list): A list of dictionaries containing the task information.
+            Required keys of each dictionary:
+                - 'assignedToUid': The ID of the user to whom the task is assigned.
+                - 'description': The description of the task.
+
+    Returns:
+        list: One dictionary per task, in the order of tasks_info, containing the 'index' of the task and either the 'id' of the created task or an 'error' message.
+
+    Raises:
+        ValueError: If the list of tasks is invalid, the user creating the tasks does not exist, or there is an error saving the tasks.
+    """
+    try:
+        # Validate each task and collect the IDs of the users to resolve.
+        results, user_ids = check_task_batch(created_by_uid, tasks_info)
+
+        # Find all the users by their IDs, from the user cache first and then with a single query, and build the documents of the valid tasks.
+        new_tasks, positions = build_task_batch(created_by_uid, tasks_info, results, get_users_by_ids(user_ids))
+
+        if not new_tasks:
+            return results
+
+        # Save all the tasks to the database in one unordered batch.
+        failed_inserts = {}
+        try:
+            conn.database[config.CONST_TASK_COLLECTION].insert_many(new_tasks, ordered=False)
+        except BulkWriteError as err:
+            failed_inserts = insert_errors(err)
+
+        # Record the ID or the error of each task.
+        saved_tasks = record_batch(results, positions, new_tasks, failed_inserts)
+
+        # The task lists, the counters and the search entries of the creator and of the assigned users have changed, and their streams get the new tasks.
+        apply_effects(conn.database, created_effects(saved_tasks))
+
+        return results
+
+    except Exception as err:  # If there is any exception, raise a ValueError
+        raise ValueError(str(err))
+
+def import_tasks(created_by_uid, lines, import_id=None):
+    """
+    Import tasks created by the user from the lines of an upload.
+
+    The lines are read as they arrive and imported in chunks of config.TASK_IMPORT_CHUNK_SIZE: the assigned users of a chunk are resolved from the user cache, with one '$in' query for the users missing from it,
+    and its valid tasks are saved with one unordered insert_many, so the number of round trips is about two per chunk instead of three per task.
+    With an import ID, the lines recorded by the checkpoint of the import are skipped, and the checkpoint is updated after each chunk.
+
+    Args:
+        created_by_uid (str): The ID of the user importing the tasks.
+        lines (iterable): The (number, content) of the lines of the upload (see task_import.read_lines()).
+        import_id (str): The import ID, or None for an import that cannot be resumed.
+
+    Returns:
+        dict: The report of the import, with the counters, the errors by line number and the throughput (see task_import.ImportReport.summary()).
+
+    Raises:
+        ValueError: If the user importing the tasks does not exist, or there is an error saving a chunk. The chunks saved before are kept, and recorded by the checkpoint.
+    """
+    try:
+        # Check if the user importing the tasks is valid.
+        created_by_user = get_users_by_ids([created_by_uid]).get(created_by_uid)
+        if not created_by_user:
+            raise ValueError('Invalid user information')
+
+        # Read the checkpoint of the import, creating it for a new import.
+        checkpoint = None
+        if import_id is not None:
+            checkpoint_filter, checkpoint_fields = checkpoint_upsert(created_by_uid, import_id)
+            checkpoint = conn.database[config.CONST_TASK_IMPORT_COLLECTION].find_one_and_update(
+                checkpoint_filter, checkpoint_fields, upsert=True, return_document=ReturnDocument.AFTER)
+        report = ImportReport(import_id, checkpoint)
+
+        chunk = []
+        try:
+            for line_number, line in lines:
+                # Skip the lines imported before an interruption.
+                if line_number <= report.resumed_from:
+                    continue
+
+                chunk.append((line_number, line))
+                if len(chunk) >= config.TASK_IMPORT_CHUNK_SIZE:
+                    _import_chunk(created_by_user, chunk, report, checkpoint)
+                    chunk = []
+        except ImportInterrupted as err:
+            # The upload ended early: import the complete lines read before.
+            report.interrupted = str(err)
+
+        if chunk:
+            _import_chunk(created_by_user, chunk, report, checkpoint)
+
+        return report.summary()
+
+    except Exception as err:  # If there is any exception, raise a ValueError
+        raise ValueError(str(err))
+
+def _import_chunk(created_by_user, chunk, report, checkpoint):
+    """
+    Import one chunk of lines of an import, then update the checkpoint of the import. See import_tasks().
+
+    Args:
+        created_by_user (dict): The user importing the tasks.
+        chunk (list): The (number, content) of the lines.
+        report (ImportReport): The report of the import.
+        checkpoint (dict): The checkpoint of the import, or None.
+    """
+    created_by_uid = str(created_by_user['_id'])
+
+    # Validate the lines and find their assigned users, from the user cache first and then with a single query.
+    task_infos, user_ids = parse_chunk(chunk, report)
+    user_names = {user_id: user['name'] for user_id, user in get_users_by_ids(user_ids - {created_by_uid}).items()}
+    user_names[created_by_uid] = created_by_user['name']
+
+    new_tasks, line_numbers = build_tasks(created_by_uid, user_names, task_infos, report, checkpoint)
+
+    saved_tasks = []
+    if new_tasks:
+        # Save the tasks of the chunk in one unordered batch.
+        failed_inserts = {}
+        try:
+            conn.database[config.CONST_TASK_COLLECTION].insert_many(new_tasks, ordered=False)
+        except BulkWriteError as err:
+            failed_inserts = insert_errors(err)
+
+        saved_tasks = report.record_inserts(new_tasks, line_numbers, failed_inserts, checkpoint)
+
+    # The task lists, the counters and the search entries of the creator and of the assigned users have changed, and their streams get the new tasks.
+    apply_effects(conn.database, created_effects(saved_tasks))
+
+    # Record the progress of the import.
+    report.lines = chunk[-1][0]
+    if checkpoint is not None:
+        conn.database[config.CONST_TASK_IMPORT_COLLECTION].update_one({"_id": checkpoint["_id"]}, report.checkpoint_update())
+
+def get_task_created_by_user(user_id, limit=config.TASK_PAGE_SIZE, after=None, filters=None, direction=1, projection=config.TASK_PROJECTION):
     """
     Get tasks created by the user.
 
-    This function retrieves tasks created by the user with the given user ID.
+    This function retrieves one page of tasks created by the user with the given user ID, using keyset pagination on '_id'.
 
     Args:
         user_id (str): The ID of the user.
+        limit (int): The maximum number of tasks to return.
+        after (str): The cursor returned by the previous page, or None for the first page.
+        filters (dict): The additional filters of the tasks (see list_query.parse_task_list_query()), or None.
+        direction (int): 1 for the oldest tasks first, -1 for the newest first.
+        projection (dict): The fields to return.
 
     Returns:
-        list: A list of tasks created by the user, with each task's '_id' field converted to a string.
+        tuple: A list of tasks created by the user, and the cursor of the next page (None if this is the last page).
 
     Raises:
         ValueError: If there is an error in fetching the tasks.
@@ -70,65 +217,209 @@ def get_task_created_by_user(user_id):
         # Connect to the tasks collection of the database.
         task_collection = conn.database.get_collection(config.CONST_TASK_COLLECTION)
 
-        # Retrieve tasks created by the user.
-        # Find tasks where the 'createdByUid' field matches the given user ID.
-        task_list = list(task_collection.find({"createdByUid": user_id}))
-
-        # Convert the '_id' field of each task to a string.
-        # This is done to ensure that the '_id' field is serialized as a string when returned.
-        for task in task_list:
-            task["_id"] = str(task["_id"])
-
-        return task_list  # Return the list of tasks created by the user
+        # Retrieve one page of tasks created by the user.
+        # Find tasks where the 'createdByUid' field matches the given user ID and the filters, returning only the requested fields.
+        return fetch_page(task_collection, {**(filters or {}), "createdByUid": user_id}, limit, after, projection, direction)
     
     except Exception as error:
         # Raise a ValueError with an appropriate error message if there is an error in fetching the tasks.
         raise ValueError("Error on trying to fetch tasks created by user.", error)
 
-def get_tasks_assigned_to_user(assignedToUid):
+def get_tasks_assigned_to_user(assignedToUid, limit=config.TASK_PAGE_SIZE, after=None, filters=None, direction=1, projection=config.TASK_PROJECTION):
     """
     Get tasks assigned to the user.
 
-    This function retrieves tasks assigned to the user with the given assignedToUid.
+    This function retrieves one page of tasks assigned to the user with the given assignedToUid, using keyset pagination on '_id'.
 
     Args:
         assignedToUid (str): The ID of the user.
+        limit (int): The maximum number of tasks to return.
+        after (str): The cursor returned by the previous page, or None for the first page.
+        filters (dict): The additional filters of the tasks (see list_query.parse_task_list_query()), or None.
+        direction (int): 1 for the oldest tasks first, -1 for the newest first.
+        projection (dict): The fields to return.
 
     Returns:
-        list: A list of tasks assigned to the user, with each task's '_id' field converted to a string.
+        tuple: A list of tasks assigned to the user, and the cursor of the next page (None if this is the last page).
 
     Raises:
         ValueError: If there is an error in fetching the tasks.
     """
     try:
-        # Retrieve tasks assigned to the user
-        tasks = conn.database[config.CONST_TASK_COLLECTION].find(
-            {"assignedToUid": assignedToUid})  # Find tasks assigned to the user
-
-        # Convert the tasks to a list
-        user_tasks = list(tasks)
-
-        # Convert the '_id' field of each task to a string
-        for task in user_tasks:
-            task["_id"] = str(task["_id"])  # Convert task ID to string
-
-        return user_tasks  # Return the list of tasks assigned to the user
+        # Retrieve one page of tasks assigned to the user matching the filters, returning only the requested fields.
+        return fetch_page(conn.database[config.CONST_TASK_COLLECTION], {**(filters or {}), "assignedToUid": assignedToUid}, limit, after, projection, direction)
     
     except Exception as err:
         # Raise a ValueError with an appropriate error message if there is an error in fetching the tasks.
         raise ValueError("Error fetching tasks assigned to user: ", err)
 
-def update_task(user_info, task_id, done):
+def get_task_stats(user_id):
+    """
+    Get the task counters of the user.
+
+    The counters are kept up to date by the task writes, so this is a single lookup by '_id' in the task stats collection, whatever the number of tasks of the user.
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        dict: The number of tasks created by and assigned to the user, each split into done and open tasks.
+
+    Raises:
+        ValueError: If there is an error in fetching the counters.
+    """
+    try:
+        counters = conn.database[config.CONST_TASK_STATS_COLLECTION].find_one({"_id": user_id})
+        return format_stats(counters)
+
+    except Exception as err:
+        # Raise a ValueError with an appropriate error message if there is an error in fetching the counters.
+        raise ValueError("Error fetching task stats: ", err)
+
+def get_task_changes(user_id, since=INITIAL_TOKEN, limit=config.TASK_PAGE_SIZE):
+    """
+    Get the changes of the tasks of the user since a sync token.
+
+    The tasks created by or assigned to the user that were written after the token are read in change order, with the tombstones of the tasks deleted after it, so the cost of a sync depends on the number of changes, not on the number of tasks.
+    A first sync (without token) reads every task of the user, page by page.
+
+    Args:
+        user_id (str): The ID of the user.
+        since (tuple): The sequence number and the task ID (or None) of the token, see task_changes.parse_since().
+        limit (int): The maximum number of changes to return.
+
+    Returns:
+        dict: The changed tasks, the IDs of the deleted tasks, the token of the next sync and whether more changes are waiting.
+
+    Raises:
+        ValueError: If there is an error in fetching the changes.
+    """
+    try:
+        # Read one extra change of each kind to know if more changes are waiting.
+        tasks = list(conn.database[config.CONST_TASK_COLLECTION].find(
+            changes_query(TASK_OWNER_FIELDS, user_id, since), {**config.TASK_PROJECTION, "seq": 1}).sort(CHANGES_SORT).limit(limit + 1))
+
+        # A first sync has no local tasks to delete.
+        deleted = []
+        if since != INITIAL_TOKEN:
+            deleted = list(conn.database[config.CONST_TASK_TOMBSTONE_COLLECTION].find(
+                changes_query(TOMBSTONE_OWNER_FIELDS, user_id, since), {"seq": 1}).sort(CHANGES_SORT).limit(limit + 1))
+
+        return merge_changes(tasks, deleted, limit, since)
+
+    except Exception as err:
+        # Raise a ValueError with an appropriate error message if there is an error in fetching the changes.
+        raise ValueError("Error fetching task changes: ", err)
+
+def export_tasks(user_id):
+    """
+    Open a cursor over every task created by or assigned to the user, for an export.
+
+    The tasks are read in creation order, in batches of config.EXPORT_BATCH_SIZE, as the cursor is iterated: they are never all held in memory.
+    Each branch of the filter is served by the (user, '_id') index of its field, so the database merges the two lists without sorting them.
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        pymongo.cursor.Cursor: The cursor of the tasks. The caller iterates and closes it.
+
+    Raises:
+        ValueError: If there is an error in opening the cursor.
+    """
+    try:
+        # The projection is copied, as the driver may add '_id' to the dictionary it is given.
+        return conn.database[config.CONST_TASK_COLLECTION].find(
+            user_tasks_query(user_id), dict(config.TASK_PROJECTION), batch_size=config.EXPORT_BATCH_SIZE).sort("_id", 1)
+
+    except Exception as err:
+        # Raise a ValueError with an appropriate error message if there is an error in opening the cursor.
+        raise ValueError("Error exporting tasks: ", err)
+
+def search_tasks(user_id, terms, limit=config.TASK_PAGE_SIZE, offset=0):
+    """
+    Search the descriptions of the tasks created by or assigned to the user.
+
+    The search uses the text index of the tasks collection. If the server has no text search (as the mongomock stand-in) and config.TASK_SEARCH_BACKEND is "auto", the process switches to the in-process inverted index of helpers/task_search.py.
+    The inverted index is built from the tasks of the user at the first search, then only the page of results is read from the database.
+
+    Args:
+        user_id (str): The ID of the user.
+        terms (list): The search terms (see task_search.parse_search_arguments()).
+        limit (int): The maximum number of tasks to return.
+        offset (int): The number of results to skip.
+
+    Returns:
+        tuple: A list of tasks with their 'score', from the best to the worst match, and the cursor of the next page (None if this is the last page).
+
+    Raises:
+        ValueError: If there is an error in searching the tasks.
+    """
+    try:
+        # Connect to the tasks collection of the database.
+        task_collection = conn.database[config.CONST_TASK_COLLECTION]
+
+        if search_index.text_search:
+            try:
+                # Rank the tasks of the user with the text index, reading one extra task to know if there is a next page.
+                query, projection, sort = text_search(user_id, terms)
+                tasks = list(task_collection.find(query, projection).sort(sort).skip(offset).limit(limit + 1))
+                return search_page(tasks, limit, offset)
+            except (NotImplementedError, OperationFailure) as err:
+                search_index.disable_text_search(err)
+
+        # Rank the tasks of the user with the inverted index, building the entry of the user first if needed.
+        ranked = search_index.search(user_id, terms, offset + limit + 1)
+        if ranked is None:
+            search_index.load(user_id, task_collection.find(user_tasks_query(user_id), {"description": 1}))
+            ranked = search_index.search(user_id, terms, offset + limit + 1) or []
+        ranked, next_cursor = search_page(ranked[offset:], limit, offset)
+
+        # Read the tasks of the page.
+        tasks = task_collection.find({"_id": {"$in": [task_id for task_id, _ in ranked]}}, config.TASK_PROJECTION)
+        return rank_tasks(ranked, tasks), next_cursor
+
+    except Exception as err:
+        # Raise a ValueError with an appropriate error message if there is an error in searching the tasks.
+        raise ValueError("Error searching tasks: ", err)
+
+def get_task_list_version(user_id):
+    """
+    Get the version of the task lists of the user, from which the ETag of the lists is derived.
+
+    The version is bumped by every task write of the user, through any worker (see helpers/response_cache.py), so reading it is a single lookup by '_id'.
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        str: The version.
+
+    Raises:
+        ValueError: If there is an error in fetching the version.
+    """
+    try:
+        return response_cache.version(conn.database[config.CONST_TASK_LIST_VERSION_COLLECTION], user_id)
+
+    except Exception as err:
+        # Raise a ValueError with an appropriate error message if there is an error in fetching the version.
+        raise ValueError("Error fetching task list version: ", err)
+
+def update_task(user_info, task_id, done, expected_version=None):
     """
     Update the status of a task in the database.
 
+    The ownership rule (only the assigned user can change the status) and the expected version are part of the filter of a single find_one_and_update, so a successful update takes one round trip and nothing can change the task between the check and the write.
+    The task is only read again when the update does not match, to tell apart a missing task, a forbidden update and a version conflict.
+
     Args:
         user_info (dict): A dictionary containing user-related information retrieved from the token, including the user's ID.
         task_id (str): The ID of the task to be updated.
         done (bool): The new status of the task.
+        expected_version (int): The version the task must have to be updated (from the If-Match header), or None to update any version.
 
     Returns:
-        pymongo.results.UpdateResult: The result of the update operation.
+        dict: The '_id', 'createdByUid', new 'done' status and new 'version' of the updated task, or 'Version Mismatch' if the task does not have the expected version.
 
     Raises:
         ValueError: If the task is not found or the user is not authorized to update the task.
@@ -137,40 +428,44 @@ def update_task(user_info, task_id, done):
         # Connect to the tasks collection of the database.
         task_collection = conn.database[config.CONST_TASK_COLLECTION]
 
-        # Find the task with _id = task_id.
-        current_task = task_collection.find_one({"_id": ObjectId(task_id)})
-
-        # Check if the task exists.
-        if current_task is None:
-            raise ValueError('Task not found')
+        # Update the status of the task if it is assigned to the user and, if given, has the expected version, stamping it with a new change sequence number and incrementing its version.
+        # The task is returned as it was before the update, to know if its status changed.
+        updated_task = task_collection.find_one_and_update(
+            owner_filter(task_id, "assignedToUid", user_info["id"], expected_version),
+            status_update(done, next_seq()),
+            projection=UPDATED_TASK_FIELDS,
+            return_document=ReturnDocument.BEFORE
+        )
 
-        # Check if the user is authorized to update the task.
-        if str(current_task['assignedToUid']) != str(user_info["id"]):
-            raise ValueError('Users can only change status when task is assigned to them.')
+        if updated_task is None:
+            # Find the task with _id = task_id to know why the update did not match.
+            current_task = task_collection.find_one({"_id": ObjectId(task_id)}, {"assignedToUid": 1})
+            return check_mismatch(current_task, "assignedToUid", user_info["id"], 'Task not found', 'Users can only change status when task is assigned to them.')
 
-        # Update the 'done' field of the task with _id = task_id to the new status.
-        # The $set operator is used to update the value of the 'done' field.
-        updated_result = task_collection.update_one(
-            {"_id": ObjectId(task_id)},  # Query to find the task
-            {"$set": {"done": done}}  # Update operation to set the 'done' field
-        )
+        # The task lists of the assigned user and of the creator have changed, their done counters change if the status changed, and their streams get the new status and version.
+        updated_task, effects = updated_task_result(updated_task, user_info["id"], done)
+        apply_effects(conn.database, effects)
 
-        # Return the result of the update operation.
-        return updated_result
+        # Return the updated task, with its new status and version.
+        return updated_task
 
     except Exception as err:
         # Raise a ValueError with an appropriate error message if there is an error in updating the task.
         raise ValueError('Error on updating task: ' f'{err}')
 
-def delete_task(user_information, task_id):
+def delete_task(user_information, task_id, expected_version=None):
     """Delete a task from the database.
 
+    The ownership rule (only the creator can delete the task) and the expected version are part of the filter of a single find_one_and_delete, so a successful delete takes one round trip.
+    The task is only read again when the delete does not match, to tell apart a missing task, a forbidden delete and a version conflict.
+
     Args:
         user_information (dict): A dictionary containing user-related information retrieved from the token, including the user's ID.
         task_id (str): The ID of the task to be deleted.
+        expected_version (int): The version the task must have to be deleted (from the If-Match header), or None to delete any version.
 
     Returns:
-        pymongo.results.DeleteResult: The result of the delete operation.
+        dict: The deleted task, or 'Version Mismatch' if the task does not have the expected version.
 
     Raises:
         ValueError: If the task is not found or the user is not authorized to delete the task.
@@ -180,35 +475,143 @@ def delete_task(user_information, task_id):
         # Extract the current user ID from the user_information dictionary.
         current_user_id = user_information["id"]
         
-        # Using db_connection property
-        # task_collection = conn.db_connection[config.CONST_DATABASE][config.CONST_TASK_COLLECTION]
-        # task_collection = conn.db_connection.get_database(config.CONST_DATABASE).get_collection(config.CONST_TASK_COLLECTION)
-        
-        # task_collection = conn.database[config.CONST_TASK_COLLECTION]
-        
         # Connect to the tasks collection of the database.
         task_collection = conn.database.get_collection(config.CONST_TASK_COLLECTION)
+
+        # Delete the task with _id = {task_id} if it was created by the user and, if given, has the expected version.
+        deleted_task = task_collection.find_one_and_delete(owner_filter(task_id, "createdByUid", current_user_id, expected_version))
+
+        if deleted_task is None:
+            # Find the task with _id = task_id to know why the delete did not match.
+            current_task = task_collection.find_one({'_id': ObjectId(task_id)}, {'createdByUid': 1})
+            return check_mismatch(current_task, "createdByUid", current_user_id, f"Task not found with id = {str(task_id)} in the database.",
+                                  'Users can only delete when task is created by them.')
+
+        # The task lists, the counters and the search entries of the creator and of the assigned user have changed, their streams get the deletion, and the task gets a tombstone for the delta sync of both users.
+        apply_effects(conn.database, deleted_effects([deleted_task]))
         
-        # Find the task with _id = task_id.
-        current_task = task_collection.find_one({'_id': ObjectId(task_id)})
-        
-        # Check if the task exists.
-        # print("Current_task = ", current_task)
-        
-        # Checking whether given taskUid is valid(present in the database) or not. If not then raise error .
-        if (current_task == None):
-            raise ValueError(f"Task not found with id = {str(task_id)} in the database.")
-               
-        # Checking whether createdByUid of the task is equal to the uid of the user making the request.
-        if str(current_task["createdByUid"]) != current_user_id:
-            raise ValueError('Users can only delete when task is created by them.')
-         
-        # Delete the task with _id = {task_id} from task collection of the database.
-        deleted_result = task_collection.delete_one({"_id": ObjectId(task_id)})
-        
-        # Return the delete_result.
-        return deleted_result
+        # Return the deleted task.
+        return deleted_task
         
     except Exception as error:
         raise ValueError('Error on deleting task: ' f'{error}')
-    
\ No newline at end of file
+    
+def update_tasks(user_info, task_ids, done):
+    """
+    Update the status of many tasks in the database at once.
+
+    The tasks are updated with one unordered bulk write, whose filters hold the ownership rule (only the assigned user can change the status) and the change of status.
+    The tasks are then read back with one query: the ones holding the marker of the request were modified by it, and the others tell apart a missing task, a forbidden update and a task that already had the status.
+    The reported outcome and the side effects (counters, events, cached lists) come from the marked tasks, so a task changed by a concurrent request is not reported or counted as modified by this one.
+
+    Args:
+        user_info (dict): A dictionary containing user-related information retrieved from the token, including the user's ID.
+        task_ids (list): The IDs of the tasks to be updated.
+        done (bool): The new status of the tasks.
+
+    Returns:
+        dict: A dictionary containing:
+            - 'matched': The IDs of the tasks the user is allowed to update.
+            - 'modified': The IDs of the tasks whose status was changed.
+            - 'rejected': A list of dictionaries with the 'id' and the 'error' of each rejected task.
+
+    Raises:
+        ValueError: If the request is invalid or there is an error updating the tasks.
+    """
+    try:
+        # Check that the new status is a boolean and parse the task IDs.
+        check_status(done)
+        rejected = []
+        object_ids = parse_task_ids(task_ids, rejected)
+
+        user_id = str(user_info['id'])
+
+        if not object_ids:
+            return {'matched': [], 'modified': [], 'rejected': rejected}
+
+        # Connect to the tasks collection of the database.
+        task_collection = conn.database[config.CONST_TASK_COLLECTION]
+
+        # Update the tasks assigned to the user whose status differs with one unordered bulk write, stamping each one with a new change sequence number and the marker of the request.
+        marker = ObjectId()
+        failed = set()
+        try:
+            modified_count = task_collection.bulk_write(bulk_update_writes(object_ids, user_id, done, marker), ordered=False).modified_count
+        except BulkWriteError as err:
+            modified_count = err.details.get('nModified', 0)
+            failed = failed_writes(err, object_ids, rejected)
+
+        # Read the tasks back with a single query, to know which ones were modified, and why the others were not.
+        current_tasks = {task['_id']: task for task in task_collection.find({'_id': {'$in': object_ids}}, {**BULK_TASK_FIELDS, BULK_MARKER_FIELD: 1})}
+        result, effects = bulk_update_outcome(object_ids, current_tasks, user_id, done, marker, modified_count, failed, rejected)
+
+        # The task lists and the done counters of the user and of the creators of the modified tasks have changed, and their streams get the new status.
+        apply_effects(conn.database, effects)
+
+        return result
+
+    except Exception as err:
+        # Raise a ValueError with an appropriate error message if there is an error in updating the tasks.
+        raise ValueError('Error on updating tasks: ' f'{err}')
+
+def delete_tasks(user_information, task_ids):
+    """
+    Delete many tasks from the database at once.
+
+    The tasks are read first with one query, to tell apart a missing task, a forbidden delete and a task the user may delete, at its current version.
+    The tasks the user may delete are then deleted with one unordered bulk write, whose filters hold the ownership rule (only the creator can delete a task) and the version read, so a task changed in the meantime is left in place.
+    The reported outcome, the side effects (counters, search entries, events, cached lists) and the tombstones come from the tasks as read.
+
+    Args:
+        user_information (dict): A dictionary containing user-related information retrieved from the token, including the user's ID.
+        task_ids (list): The IDs of the tasks to be deleted.
+
+    Returns:
+        dict: A dictionary containing:
+            - 'deleted': The IDs of the deleted tasks.
+            - 'rejected': A list of dictionaries with the 'id' and the 'error' of each rejected task.
+            - 'tasksAffected': The number of documents deleted from the task collection of the database.
+
+    Raises:
+        ValueError: If the request is invalid or there is an error deleting the tasks.
+    """
+    try:
+        # Extract the current user ID from the user_information dictionary.
+        current_user_id = str(user_information['id'])
+
+        rejected = []
+        object_ids = parse_task_ids(task_ids, rejected)
+
+        # Connect to the tasks collection of the database.
+        task_collection = conn.database.get_collection(config.CONST_TASK_COLLECTION)
+
+        # Read the tasks with a single query, to know which ones the user may delete.
+        current_tasks = {}
+        if object_ids:
+            current_tasks = {task['_id']: task for task in task_collection.find({'_id': {'$in': object_ids}}, BULK_TASK_FIELDS)}
+        candidates = delete_candidates(object_ids, current_tasks, current_user_id, rejected)
+
+        if not candidates:
+            return {'deleted': [], 'rejected': rejected, 'tasksAffected': 0}
+
+        # Delete them with one unordered bulk write, each at the version read.
+        failed = set()
+        try:
+            deleted_count = task_collection.bulk_write(bulk_delete_writes(candidates, current_user_id), ordered=False).deleted_count
+        except BulkWriteError as err:
+            deleted_count = err.details.get('nRemoved', 0)
+            failed = failed_writes(err, list(candidates), rejected)
+
+        # Fewer deletions than candidates means that another request changed or deleted some of them in the meantime: read the ones left.
+        remaining_ids = set()
+        if deleted_count < len(candidates):
+            remaining_ids = {task['_id'] for task in task_collection.find({'_id': {'$in': list(candidates)}}, {'_id': 1})}
+        result, effects = bulk_delete_outcome(candidates, remaining_ids, deleted_count, failed, rejected)
+
+        # The task lists, the counters and the search entries of the user and of the users the deleted tasks were assigned to have changed, their streams get the deletions, and the tasks get tombstones.
+        apply_effects(conn.database, effects)
+
+        return result
+
+    except Exception as error:
+        raise ValueError('Error on deleting tasks: ' f'{error}')
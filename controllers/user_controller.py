@@ -1,25 +1,28 @@
-from models.user_model import User
 from database.__init__ import conn
 import app_config as config
-import bcrypt # pip install bcrypt
-from datetime import datetime, timedelta
-import jwt # pip install pyjwt
+from helpers.password_hashing import hash_password, check_password, needs_rehash, HashingPoolBusy
+from pymongo.errors import DuplicateKeyError
+from helpers.user_cache import user_cache
+from helpers.user_accounts import (new_user_document, cache_new_user, login_response, rehash_update, cached_users, add_read_user, is_cached_list, user_list_pipeline,
+                                   USER_EXPORT_PROJECTION)
 
 def generate_hash_password(password):
     """
     Generate a hashed password using bcrypt.
 
+    The password is hashed with the cost factor config.BCRYPT_ROUNDS on the password hashing pool, so the request thread is not blocked by bcrypt.
+
     Args:
         password (str): The password to be hashed.
 
     Returns:
         bytes: The hashed password.
-    """
-    # Generate a salt for hashing the password
-    salt = bcrypt.gensalt()
 
-    # Hash the password using the generated salt
-    hashed_password = bcrypt.hashpw(password.encode("utf-8"), salt)
+    Raises:
+        HashingPoolBusy: If the password hashing pool cannot take the call.
+    """
+    # Hash the password on the password hashing pool
+    hashed_password = hash_password(password)
 
     # Return the hashed password
     return hashed_password
@@ -40,29 +43,31 @@ def create_user(user_information):
 
     Raises:
         ValueError: If there is an error creating the user.
+        HashingPoolBusy: If the password hashing pool cannot take the call.
     """
     try:
-        # Create a new User object
-        new_user = User()
-
-        # Set the user's name, email, and hashed password
-        new_user.name = user_information["name"]
-        new_user.email = user_information["email"]
-        new_user.password = generate_hash_password(user_information["password"])
+        # Create the new user, with the hashed password
+        new_user = new_user_document(user_information, generate_hash_password(user_information["password"]))
 
         # Connect to the user collection of the database
         db_collection = conn.database[config.CONST_USER_COLLECTION]
 
-        # Check if a user with the same email already exists
-        if db_collection.find_one({'email': new_user.email}):
+        try:
+            # Insert the new user into the database
+            created_user = db_collection.insert_one(new_user)
+        except DuplicateKeyError:
+            # The unique index on email rejected the insert, so a user with the same email already exists
             return 'Duplicated User'
 
-        # Insert the new user into the database
-        created_user = db_collection.insert_one(new_user.__dict__)
+        # Cache the new user (insert_one set its '_id') and drop the cached list of all users
+        cache_new_user(new_user)
 
         # Return the result of the insert operation
         return created_user
 
+    except HashingPoolBusy:
+        # Let the view answer that the server is busy
+        raise
     except Exception as err:
         # If there is an error creating the user, raise a ValueError
         raise ValueError("Error on creating user.", err)
@@ -77,57 +82,93 @@ def login_user(user_information):
                 - 'email': The email of the user.
                 - 'password': The password of the user.
 
+    If the stored password hash was made with a cost factor other than config.BCRYPT_ROUNDS, it is replaced by a hash with the configured cost factor.
+
     Returns:
         dict: A dictionary containing the JWT token, expiration time, and logged user information.
+
+    Raises:
+        ValueError: If there is an error logging in the user.
+        HashingPoolBusy: If the password hashing pool cannot take the call.
     """
     try:
         # Extract user information from the request
         email = user_information["email"]
-        password = user_information["password"].encode('utf-8')
+        password = user_information["password"]
 
         # Connect to the user collection of the database
         db_collection = conn.database[config.CONST_USER_COLLECTION]
 
-        # Find the user with the provided email
-        current_user = db_collection.find_one({'email': email})
+        # Find the user with the provided email, in the user cache first
+        current_user = user_cache.get_by_email(email)
+        if current_user is None:
+            current_user = db_collection.find_one({'email': email})
+
+            # Check if the user exists
+            if not current_user:
+                return "Invalid Email"
 
-        # Check if the user exists
-        if not current_user:
-            return "Invalid Email"
+            # Cache the user for the next requests
+            user_cache.put(current_user)
         
         # Check if the provided password matches the hashed password in the database
-        if not bcrypt.checkpw(password, current_user["password"]):
+        if not check_password(password, current_user["password"]):
             return "Invalid Password"
-        
-        # Create a dictionary with the logged user information
-        logged_user = {}
-        logged_user['id'] = str(current_user['_id'])
-        logged_user['email'] = current_user['email']
-        logged_user['name'] = current_user['name']
-
-        # Calculate the expiration time for the JWT token
-        expiration = datetime.utcnow() + timedelta(seconds = config.JWT_EXPIRATION)
-
-        # Create the JWT token data
-        jwt_data = {'email': logged_user['email'], 'id': logged_user['id'], 'exp': expiration}
-
-        # Encode the JWT token with the secret key
-        jwt_to_return = jwt.encode(payload=jwt_data, key=config.TOKEN_SECRET)
 
+        # Rehash the password if it was hashed with another cost factor
+        if needs_rehash(current_user["password"]):
+            new_password = hash_password(password)
+            db_collection.update_one(*rehash_update(current_user, new_password))
+            user_cache.put({**current_user, 'password': new_password})
+        
         # Return the JWT token, expiration time, and logged user information
-        return {'token': jwt_to_return, 'expiration': config.JWT_EXPIRATION, 'logged_user': logged_user}
+        return login_response(current_user)
     
+    except HashingPoolBusy:
+        # Let the view answer that the server is busy
+        raise
     except Exception as err:
         # If there is an error logging in the user, raise a ValueError with the error message
         raise ValueError("Error on trying to login.", err)
 
 
-def fetch_all_users():
+def get_users_by_ids(user_ids):
+    """
+    Get users by their IDs, from the user cache first.
+
+    The users missing from the cache are read with a single '$in' query and added to the cache.
+
+    Args:
+        user_ids (iterable): The IDs of the users (str).
+
+    Returns:
+        dict: The user documents found, by ID. Unknown IDs are left out.
+
+    Raises:
+        bson.errors.InvalidId: If an ID is not a valid ObjectId.
+    """
+    # Take the users from the cache.
+    users, missing_ids = cached_users(user_ids)
+
+    # Read the missing users with a single query and cache them.
+    if missing_ids:
+        for user in conn.database[config.CONST_USER_COLLECTION].find({'_id': {'$in': missing_ids}}):
+            add_read_user(users, user)
+
+    return users
+
+def fetch_all_users(sort=None, projection=config.USER_LIST_PROJECTION):
     """
     Fetches all users from the database and returns them as a list of dictionaries.
 
+    The full list in storage order is kept in the user cache for config.USER_CACHE_TTL seconds, and dropped when a user is created. Sorted lists and lists with fewer fields are read from the database, walking the index serving the sort.
+
+    Args:
+        sort (list): The (field, direction) sort of the users (see list_query.parse_user_list_query()), or None for the storage order.
+        projection (dict): The fields to return.
+
     Returns:
-        List[Dict[str, str]]: A list of dictionaries representing the users. Each dictionary contains the user's ID, email, and name.
+        List[Dict]: A list of dictionaries representing the users. Each dictionary contains the user's ID (an ObjectId, encoded as a string by the JSON provider), email, and name.
 
     Raises:
         ValueError: If there is an error fetching the users.
@@ -135,16 +176,21 @@ def fetch_all_users():
     try:
         # Connect to the user collection of the database
         db_collection = conn.database[config.CONST_USER_COLLECTION]
-        users = []
-
-        # Iterate over each user in the database, create a dictionary with their ID, email, and name,
-        # and add it to the list of users
-        for user in db_collection.find():
-            current_user = {}
-            current_user["id"] = str(user["_id"])
-            current_user["email"] = user["email"]
-            current_user["name"] = user["name"]
-            users.append(current_user)
+
+        # Read a sorted list or a list with fewer fields from the database, without caching it
+        if not is_cached_list(sort, projection):
+            return list(db_collection.aggregate(user_list_pipeline(sort, projection)))
+
+        # Return the cached list of users if it is still valid
+        users = user_cache.get_all()
+        if users is not None:
+            return users
+
+        # Read the ID, email, and name of each user, with the '_id' field renamed to 'id' by the database
+        users = list(db_collection.aggregate([{"$project": config.USER_LIST_PROJECTION}]))
+
+        # Cache the list of users
+        user_cache.put_all(users)
         
         # Return the fetch users.
         return users
@@ -152,3 +198,23 @@ def fetch_all_users():
     except Exception as err:
         # If there is an error fetching the users, raise a ValueError with the error message
         raise ValueError("Error on trying to fetch users.", err)
+
+def export_users():
+    """
+    Open a cursor over every user, for an export.
+
+    The users are read in '_id' order, in batches of config.EXPORT_BATCH_SIZE, as the cursor is iterated: unlike fetch_all_users(), they are never all held in memory, and the user cache is not used.
+    Only the ID, email and name of the users are read.
+
+    Returns:
+        pymongo.cursor.Cursor: The cursor of the users. The caller iterates and closes it.
+
+    Raises:
+        ValueError: If there is an error opening the cursor.
+    """
+    try:
+        return conn.database[config.CONST_USER_COLLECTION].find({}, USER_EXPORT_PROJECTION, batch_size=config.EXPORT_BATCH_SIZE).sort("_id", 1)
+
+    except Exception as err:
+        # If there is an error opening the cursor, raise a ValueError with the error message
+        raise ValueError("Error on trying to export users.", err)
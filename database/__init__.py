@@ -1,17 +1,79 @@
 # Import the necessary modules.
 
 from .db import Database
+from .async_db import AsyncDatabase
+from .indexes import INDEXES, CANONICAL_QUERIES
+from .monitoring import pool_monitor, command_monitor, command_metrics
+from .slow_ops import slow_operations
 import app_config as config
 
 ##pip install pymongo
 
+# Function to build the options of the MongoDB clients from the configuration.
+def client_options(settings):
+    """
+    Function to build the keyword arguments of the MongoDB clients from the configuration.
+
+    Args:
+        settings (module): The configuration, such as the app_config module.
+
+    Returns:
+        dict: The pool size, timeouts, read preference, write concern and event listeners of the clients.
+    """
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "readPreference": settings.MONGO_READ_PREFERENCE,
+        # Publish the pool and command events to the statistics of database/monitoring.py, to the metrics of /metrics and to the slow operation recorder.
+        "event_listeners": [pool_monitor, command_monitor, command_metrics, slow_operations],
+    }
+    # Write concern options (w, wTimeoutMS, journal) are passed as they are.
+    options.update(settings.MONGO_WRITE_CONCERN)
+    return options
+
 # Create an instance of the Database class and initialize it with the MongoDB connection string and the database name retrieved from the app_config module.
-conn = Database(connection_string=config.CONST_MONGO_URL, database_name=config.CONST_DATABASE)
+# It does not connect until the database object is first used, in the process that uses it.
+conn = Database(connection_string=config.CONST_MONGO_URL, database_name=config.CONST_DATABASE, client_options=client_options(config))
+
+# Explain the sampled slow queries with this connection.
+slow_operations.attach(conn)
+
+# Create an instance of the AsyncDatabase class for the async serving mode (asgi.py).
+# It does not connect until the first request of the async mode uses it.
+async_conn = AsyncDatabase(connection_string=config.CONST_MONGO_URL, database_name=config.CONST_DATABASE, client_options=client_options(config))
+
+# Function to prepare the database connections of an application.
+def init_database(settings):
+    """
+    Function to point the database connections at the given configuration and create the declared indexes.
+
+    Indexes are created with a connection that is closed before returning, so a server that forks its workers after creating the application does not pass an open MongoClient to them.
+
+    Args:
+        settings (module): The configuration, such as the app_config module.
+
+    Raises:
+        Exception: If ENSURE_INDEXES is set and the indexes cannot be created, as user creation relies on the unique index of the emails,
+            or if VERIFY_INDEXES is set and a canonical query is planned as a collection scan.
+    """
+    conn.configure(settings.CONST_DATABASE, settings.CONST_MONGO_URL, client_options(settings))
+    async_conn.configure(settings.CONST_DATABASE, settings.CONST_MONGO_URL, client_options(settings))
+
+    if not settings.ENSURE_INDEXES:
+        return
 
-# Print the database object of the connection object.
-# This is used for debugging purposes.
-print("conn.database = ", conn.database)
+    try:
+        # Create the declared indexes of each collection. This is idempotent, so it runs on every startup.
+        # A failure stops the startup rather than serving without the unique indexes.
+        conn.ensure_indexes(INDEXES)
 
-# Connect to the MongoDB database using the connection object.
-# This establishes the connection with the MongoDB server/cluster.
-conn.connect()
+        # Check that no canonical query of the controllers is planned as a collection scan.
+        if settings.VERIFY_INDEXES:
+            conn.verify_indexes(CANONICAL_QUERIES)
+    finally:
+        conn.close()
@@ -0,0 +1,138 @@
+import importlib.util
+import os
+import pymongo
+
+# Function to check that the installed PyMongo has the async driver.
+def require_async_driver():
+    """
+    Function to check that the installed PyMongo has the async driver (pymongo.asynchronous), added in PyMongo 4.10.
+
+    Raises:
+        RuntimeError: If the async driver is missing, with the installed version and how to upgrade.
+    """
+    if importlib.util.find_spec("pymongo.asynchronous") is None:
+        raise RuntimeError(f"The async serving mode requires PyMongo 4.10 or later (pymongo.asynchronous), but PyMongo {pymongo.version} is installed. "
+                           "Run 'pip install -r requirements.txt', or serve the synchronous application of app.py.")
+
+class AsyncDatabase():
+    """
+    The AsyncDatabase class provides an interface for interacting with MongoDB databases through the async driver of PyMongo.
+    It is used by the async serving mode (asgi.py) and mirrors the Database class.
+
+    The client is created on first use, from the event loop that serves the requests, as an async client is bound to the event loop it was created in, and again in any process forked after it was created.
+    """
+
+    # Constructor
+    def __init__(self, database_name=None, connection_string=None, client_options=None):
+        """
+        Constructor for the AsyncDatabase class.
+
+        Args:
+            database_name (str): The name of the database.
+            connection_string (str): The connection string to the MongoDB instance.
+            client_options (dict): Keyword arguments of the AsyncMongoClient, such as the pool size, timeouts, read preference and write concern.
+
+        Raises:
+            Exception: If either database_name or connection_string is None.
+        """
+        # Check if both database_name and connection_string are provided
+        if((database_name == None) or (connection_string == None)):
+            raise Exception("Mongo DB requires database name and string connection!")
+
+        # Set the database name
+        self.__database_name = database_name
+        # Set the connection string
+        self.__connection_string = connection_string
+        # Set the database connection object to None
+        self.__db_connection = None
+        # Set the database object to None
+        self.__database = None
+        # Set the options of the AsyncMongoClient
+        self.__client_options = dict(client_options or {})
+        # ID of the process that created the client
+        self.__pid = None
+
+    # Method to change the connection settings.
+    def configure(self, database_name, connection_string, client_options=None):
+        """
+        Method to change the connection settings, before the client is created.
+
+        Args:
+            database_name (str): The name of the database.
+            connection_string (str): The connection string to the MongoDB instance.
+            client_options (dict): Keyword arguments of the AsyncMongoClient.
+        """
+        self.__database_name = database_name
+        self.__connection_string = connection_string
+        self.__client_options = dict(client_options or {})
+        self.__db_connection = None
+        self.__database = None
+        self.__pid = None
+
+    # Getter for database object.
+    @property
+    def database(self):
+        """
+        Getter for the database object. Connects on first use in each process.
+
+        Returns:
+            pymongo.asynchronous.database.AsyncDatabase: The database object.
+        """
+        if self.__database is None or self.__pid != os.getpid():
+            self.connect()
+
+        # Return the database object.
+        return self.__database
+
+    # Getter for connection object.
+    @property
+    def db_connection(self):
+        """
+        Getter for the database connection object.
+
+        Returns:
+            pymongo.AsyncMongoClient: The database connection object.
+        """
+        # Return the database connection object.
+        return self.__db_connection
+
+    # Method to connect with database.
+    def connect(self):
+        """
+        Method to create the async client and the database object.
+
+        No I/O happens here; the driver connects when the first command is awaited.
+        """
+        # Imported here so that the synchronous mode does not require a PyMongo version with the async driver.
+        require_async_driver()
+        from pymongo import AsyncMongoClient
+
+        self.__db_connection = AsyncMongoClient(self.__connection_string, **self.__client_options)
+        self.__pid = os.getpid()
+        self.__database = self.__db_connection[str(self.__database_name)]
+
+    # Method to check that the database answers.
+    async def ping(self, timeout_ms):
+        """
+        Method to send a ping command to the database, failing if it does not answer in time. See Database.ping().
+
+        Args:
+            timeout_ms (int): The number of milliseconds the ping may take.
+
+        Raises:
+            Exception: If the database cannot be reached or does not answer in time.
+        """
+        with pymongo.timeout(timeout_ms / 1000):
+            await self.database.command("ping")
+
+    # Method to close the connection.
+    async def close(self):
+        """
+        Method to close the async client, if it was created.
+        """
+        if self.__db_connection is not None and self.__pid == os.getpid():
+            await self.__db_connection.close()
+
+        self.__db_connection = None
+        self.__database = None
+        self.__pid = None
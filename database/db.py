@@ -1,3 +1,6 @@
+import os
+import threading
+import pymongo
 from pymongo import MongoClient
 
 class Database():
@@ -6,10 +9,13 @@ class Database():
     It handles connection and database object management.
     
     The class maintains a connection to a MongoDB instance/Cluster, and a reference to a specific database within that instance.
+
+    The connection is opened lazily, on first use of the database object, and again in any process forked after it was opened: a MongoClient is not fork-safe, so each worker of a pre-forking server gets its own client.
+    A lock guards the connection, so the threads of a worker serving their first requests at once share one client instead of each opening its own.
     """
     
     # Constructor
-    def __init__(self, database_name=None, connection_string=None):
+    def __init__(self, database_name=None, connection_string=None, client_options=None):
         """
         Constructor for the Database class.
 
@@ -18,6 +24,7 @@ class Database():
         Args:
             database_name (str): The name of the database.
             connection_string (str): The connection string to the MongoDB instance.
+            client_options (dict): Keyword arguments of the MongoClient, such as the pool size, timeouts, read preference and write concern.
 
         Raises:
             Exception: If either database_name or connection_string is None.
@@ -34,18 +41,48 @@ class Database():
         self.__db_connection = None
         # Set the database object to None
         self.__database = None
+        # Set the options of the MongoClient
+        self.__client_options = dict(client_options or {})
+        # ID of the process that opened the connection
+        self.__pid = None
+        # Lock protecting the connection, reentrant as the database getter connects with it held
+        self.__lock = threading.RLock()
+
+    # Method to change the connection settings.
+    def configure(self, database_name, connection_string, client_options=None):
+        """
+        Method to change the connection settings. An open connection is closed, and the next use of the database object connects with the new settings.
+
+        Args:
+            database_name (str): The name of the database.
+            connection_string (str): The connection string to the MongoDB instance.
+            client_options (dict): Keyword arguments of the MongoClient.
+        """
+        with self.__lock:
+            self.close()
+            self.__database_name = database_name
+            self.__connection_string = connection_string
+            self.__client_options = dict(client_options or {})
     
     # Getter for database object.
     @property
     def database(self):
         """
-        Getter for the database object.
+        Getter for the database object. Connects on first use in each process.
 
         Returns:
             pymongo.database.Database: The database object.
+
+        Raises:
+            Exception: If the connection cannot be opened.
         """
-        # Return the database object.
-        return self.__database
+        with self.__lock:
+            # Connect if there is no connection yet, or if it was opened by the parent of this process.
+            if self.__database is None or self.__pid != os.getpid():
+                self.connect()
+
+            # Return the database object.
+            return self.__database
     
     # Getter for connection object.
     @property
@@ -67,15 +104,137 @@ class Database():
         Raises:
             Exception: If connection to MongoDB fails.
         """
-        try:
-            # Connection object to MongoDB instance/Cluster. Connecting to a Cluster.
-            # __db_connection :  Establishing a connection to a MongoDB server (Cluster (which contains databases.)) (databases). __db_connection is the connection object to the MongoDB instance.
-            self.__db_connection = MongoClient(self.__connection_string)
-            db_name = str(self.__database_name)
+        with self.__lock:
+            try:
+                # Connection object to MongoDB instance/Cluster. Connecting to a Cluster.
+                # __db_connection :  Establishing a connection to a MongoDB server (Cluster (which contains databases.)) (databases). __db_connection is the connection object to the MongoDB instance.
+                self.__db_connection = MongoClient(self.__connection_string, **self.__client_options)
+                self.__pid = os.getpid()
+                db_name = str(self.__database_name)
             
-            # __database : It is assigned a reference to a specific database within the MongoDB instance, obtained by accessing the __db_connection object and selecting the database specified by the db_name. __database is a reference to a specific database within that MongoDB instance (Here, __db_connection is the MongoDB instance).
-            # Database connection object (Connection with database name = self.__database_name). Connecting to {__database_name} database within cluster.
-            self.__database =  self.__db_connection[db_name]
+                # __database : It is assigned a reference to a specific database within the MongoDB instance, obtained by accessing the __db_connection object and selecting the database specified by the db_name. __database is a reference to a specific database within that MongoDB instance (Here, __db_connection is the MongoDB instance).
+                # Database connection object (Connection with database name = self.__database_name). Connecting to {__database_name} database within cluster.
+                self.__database =  self.__db_connection[db_name]
+
+            except Exception as err:
+                # Leave no half-open connection, so that the next use of the database object tries again.
+                self.__db_connection = None
+                self.__database = None
+                self.__pid = None
+                raise Exception(f"Mongo DB connection error! {err}") from err
+
+    # Getter for the pool settings.
+    @property
+    def pool_options(self):
+        """
+        Getter for the pool settings of the MongoClient.
+
+        Returns:
+            dict: The maximum and minimum pool size, maximum idle time, wait queue timeout and server selection timeout.
+        """
+        return {name: self.__client_options.get(name) for name in
+                ("maxPoolSize", "minPoolSize", "maxIdleTimeMS", "waitQueueTimeoutMS", "serverSelectionTimeoutMS")}
+
+    # Method to check that the database answers.
+    def ping(self, timeout_ms):
+        """
+        Method to send a ping command to the database, failing if it does not answer in time.
+
+        Args:
+            timeout_ms (int): The number of milliseconds the ping may take, including server selection and connection checkout.
+
+        Raises:
+            Exception: If the database cannot be reached or does not answer in time.
+        """
+        with pymongo.timeout(timeout_ms / 1000):
+            self.database.command("ping")
+
+    # Method to close the connection.
+    def close(self):
+        """
+        Method to close the connection, if it was opened by this process. The next use of the database object connects again.
+        """
+        with self.__lock:
+            # A client inherited from the parent process is dropped without being closed, as its sockets belong to the parent.
+            if self.__db_connection is not None and self.__pid == os.getpid():
+                self.__db_connection.close()
+
+            self.__db_connection = None
+            self.__database = None
+            self.__pid = None
+
+    # Method to create the declared indexes.
+    def ensure_indexes(self, indexes):
+        """
+        Method to create the declared indexes of each collection.
+
+        Creating an index that already exists with the same options is a no-op in MongoDB, so this method is idempotent and safe to call at every startup.
+
+        Args:
+            indexes (dict): A dictionary mapping each collection name to a list of pymongo.IndexModel.
+
+        Returns:
+            dict: A dictionary mapping each collection name to the list of index names.
+        """
+        created_indexes = {}
+
+        for collection_name, index_models in indexes.items():
+            # Create the indexes of the collection in one command.
+            created_indexes[collection_name] = self.database[collection_name].create_indexes(index_models)
+
+        return created_indexes
+
+    # Method to check that no canonical query is planned as a collection scan.
+    def verify_indexes(self, queries):
+        """
+        Method to check that every canonical query is served by an index.
+
+        Runs explain() on each query and inspects its winning plan.
+
+        Args:
+            queries (list): A list of (name, collection name, filter, sort) tuples.
+
+        Raises:
+            Exception: If any query is planned as a COLLSCAN.
+        """
+        collection_scans = []
+
+        for name, collection_name, query, sort in queries:
+            # Build the cursor of the query without running it.
+            cursor = self.database[collection_name].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+
+            # Ask the query planner for the winning plan.
+            winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+
+            # Record the query if any stage of the plan scans the whole collection.
+            if "COLLSCAN" in _plan_stages(winning_plan):
+                collection_scans.append(f"{name} on {collection_name}")
+
+        if collection_scans:
+            raise Exception("Queries planned as COLLSCAN: " + ", ".join(collection_scans))
+
+# Function to list the stages of a query plan.
+def _plan_stages(plan):
+    """
+    Function to list every stage of a query plan, including the nested input stages.
+
+    Args:
+        plan (dict or list): The query plan, or a part of it.
+
+    Returns:
+        list: The names of the stages.
+    """
+    stages = []
+
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
 
-        except Exception as err:
-            print("Mongo DB connection error!", err)
+    return stages
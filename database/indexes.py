@@ -0,0 +1,96 @@
+# Import the necessary modules.
+
+from pymongo import ASCENDING, TEXT, IndexModel
+import app_config as config
+
+# Registry of the indexes declared for each collection of the database.
+# Database.ensure_indexes() creates them at startup. Creating an index that already exists with the same options is a no-op, so this is safe to run on every start.
+INDEXES = {
+    config.CONST_USER_COLLECTION: [
+        # Unique index on email. Used by create_user and login_user, and enforces that no two users share an email.
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # Users sorted by name. Used by fetch_all_users with sort=name.
+        IndexModel([("name", ASCENDING), ("_id", ASCENDING)], name="name_id"),
+    ],
+    config.CONST_TASK_COLLECTION: [
+        # Tasks created by a user, paginated on '_id'. Used by get_task_created_by_user and delete_task.
+        IndexModel([("createdByUid", ASCENDING), ("_id", ASCENDING)], name="createdByUid_id"),
+        # Tasks assigned to a user, paginated on '_id'. Used by get_tasks_assigned_to_user and update_task.
+        IndexModel([("assignedToUid", ASCENDING), ("_id", ASCENDING)], name="assignedToUid_id"),
+        # Tasks created by or assigned to a user with a given status, paginated on '_id'. Used by the task lists with done=.
+        IndexModel([("createdByUid", ASCENDING), ("done", ASCENDING), ("_id", ASCENDING)], name="createdByUid_done_id"),
+        IndexModel([("assignedToUid", ASCENDING), ("done", ASCENDING), ("_id", ASCENDING)], name="assignedToUid_done_id"),
+        # Tasks between a creator and an assigned user, paginated on '_id'. Used by the task lists with assignedToUid= or createdByUid=.
+        IndexModel([("createdByUid", ASCENDING), ("assignedToUid", ASCENDING), ("_id", ASCENDING)], name="createdByUid_assignedToUid_id"),
+        # Tasks created by or assigned to a user, in change order. Used by get_task_changes.
+        IndexModel([("createdByUid", ASCENDING), ("seq", ASCENDING), ("_id", ASCENDING)], name="createdByUid_seq_id"),
+        IndexModel([("assignedToUid", ASCENDING), ("seq", ASCENDING), ("_id", ASCENDING)], name="assignedToUid_seq_id"),
+        # Text index on the description, with English stemming and stop words. Used by search_tasks.
+        IndexModel([("description", TEXT)], name="description_text", default_language="english"),
+    ],
+    config.CONST_TASK_TOMBSTONE_COLLECTION: [
+        # Tombstones of the tasks of a user, in change order. Used by get_task_changes.
+        IndexModel([("users", ASCENDING), ("seq", ASCENDING), ("_id", ASCENDING)], name="users_seq_id"),
+        # Tombstones by age. Used by scripts/compact_tombstones.py.
+        IndexModel([("seq", ASCENDING)], name="seq"),
+    ],
+    config.CONST_TASK_IMPORT_COLLECTION: [
+        # Checkpoints of the task imports, removed by the server config.TASK_IMPORT_CHECKPOINT_TTL seconds after their last update.
+        IndexModel([("updatedAt", ASCENDING)], name="updatedAt_ttl", expireAfterSeconds=config.TASK_IMPORT_CHECKPOINT_TTL),
+    ],
+}
+
+# Canonical query of each controller, checked by Database.verify_indexes().
+# Each entry is (controller function, collection name, filter, sort). Values are only placeholders; the query planner only looks at the shape.
+CANONICAL_QUERIES = [
+    ("create_user", config.CONST_USER_COLLECTION, {"email": ""}, None),
+    ("login_user", config.CONST_USER_COLLECTION, {"email": ""}, None),
+    ("get_task_created_by_user", config.CONST_TASK_COLLECTION, {"createdByUid": ""}, [("_id", ASCENDING)]),
+    ("get_tasks_assigned_to_user", config.CONST_TASK_COLLECTION, {"assignedToUid": ""}, [("_id", ASCENDING)]),
+    ("get_task_created_by_user?done", config.CONST_TASK_COLLECTION, {"createdByUid": "", "done": False}, [("_id", ASCENDING)]),
+    ("get_task_created_by_user?assignedToUid", config.CONST_TASK_COLLECTION, {"createdByUid": "", "assignedToUid": ""}, [("_id", ASCENDING)]),
+    ("get_tasks_assigned_to_user?done", config.CONST_TASK_COLLECTION, {"assignedToUid": "", "done": False}, [("_id", ASCENDING)]),
+    ("get_tasks_assigned_to_user?createdByUid", config.CONST_TASK_COLLECTION, {"assignedToUid": "", "createdByUid": ""}, [("_id", ASCENDING)]),
+    ("get_task_changes", config.CONST_TASK_COLLECTION, {"createdByUid": "", "seq": {"$gt": 0}}, [("seq", ASCENDING), ("_id", ASCENDING)]),
+    ("get_task_changes", config.CONST_TASK_COLLECTION, {"assignedToUid": "", "seq": {"$gt": 0}}, [("seq", ASCENDING), ("_id", ASCENDING)]),
+    ("get_task_changes", config.CONST_TASK_TOMBSTONE_COLLECTION, {"users": "", "seq": {"$gt": 0}}, [("seq", ASCENDING), ("_id", ASCENDING)]),
+    ("compact_tombstones", config.CONST_TASK_TOMBSTONE_COLLECTION, {"seq": {"$lt": 0}}, None),
+    ("fetch_all_users?sort=email", config.CONST_USER_COLLECTION, {}, [("email", ASCENDING)]),
+    ("fetch_all_users?sort=name", config.CONST_USER_COLLECTION, {}, [("name", ASCENDING), ("_id", ASCENDING)]),
+    ("export_tasks", config.CONST_TASK_COLLECTION, {"$or": [{"createdByUid": ""}, {"assignedToUid": ""}]}, [("_id", ASCENDING)]),
+    ("export_users", config.CONST_USER_COLLECTION, {}, [("_id", ASCENDING)]),
+    ("search_tasks", config.CONST_TASK_COLLECTION, {"$text": {"$search": "x"}, "$or": [{"createdByUid": ""}, {"assignedToUid": ""}]}, None),
+]
+
+# Function to find the declared index serving a query.
+def index_for(collection_name, equality_fields, sort_field):
+    """
+    Function to find a declared index serving a query with equality filters and a sort, without scanning the collection or sorting in memory.
+
+    An index serves the query if its first keys are the equality fields, in any order, and its next key is the sort field. The index can be read in both directions, so the direction of the sort does not matter.
+
+    Args:
+        collection_name (str): The name of the collection.
+        equality_fields (list): The fields of the equality filters.
+        sort_field (str): The sort field.
+
+    Returns:
+        list: The (field, direction) of the keys of the index from the sort field, which give the full sort order, or None if no declared index serves the query.
+    """
+    equality_fields = set(equality_fields)
+
+    # The '_id' index of every collection serves a sort on '_id' without filters.
+    if not equality_fields and sort_field == "_id":
+        return [("_id", ASCENDING)]
+
+    for index_model in INDEXES.get(collection_name, []):
+        keys = list(index_model.document["key"].items())
+        prefix = [field for field, _ in keys[:len(equality_fields)]]
+
+        # Text and other special indexes cannot serve a sort.
+        if any(not isinstance(direction, int) for _, direction in keys):
+            continue
+        if set(prefix) == equality_fields and len(keys) > len(prefix) and keys[len(prefix)][0] == sort_field:
+            return keys[len(prefix):]
+
+    return None
@@ -0,0 +1,223 @@
+# Import the necessary modules.
+
+import threading
+from collections import deque
+
+from pymongo import monitoring
+
+from helpers.metrics import mongo_command_seconds, mongo_command_failures
+import app_config as config
+
+# Class listening to the connection pool events of the MongoDB clients.
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Class listening to the connection pool events of the MongoDB clients of this process.
+
+    It keeps the number of open and in-use connections of each server pool, the number of times each pool was cleared, and the wait times of the latest connection checkouts, to size the pool of a worker from measurements.
+    """
+    # Constructor
+    def __init__(self, samples):
+        """
+        Constructor for the PoolMonitor class.
+
+        Args:
+            samples (int): The number of latest checkout wait times kept to compute the percentiles.
+        """
+        # Counters of each server pool, by address
+        self.__pools = {}
+        # Latest checkout wait times, in seconds
+        self.__wait_times = deque(maxlen=samples)
+        # Counters
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.max_wait = 0.0
+        # Lock protecting the counters
+        self.__lock = threading.Lock()
+
+    # Method to get the counters of a server pool, with the lock held.
+    def __pool(self, address):
+        name = "%s:%s" % address
+        if name not in self.__pools:
+            self.__pools[name] = {"open": 0, "in_use": 0, "cleared": 0}
+        return self.__pools[name]
+
+    def pool_created(self, event):
+        with self.__lock:
+            self.__pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        # The pool was cleared after a network error or a server change: its connections are being closed.
+        with self.__lock:
+            self.__pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        with self.__lock:
+            self.__pools.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        with self.__lock:
+            self.__pool(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self.__lock:
+            pool = self.__pool(event.address)
+            pool["open"] = max(0, pool["open"] - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        # The reason is 'timeout' when the wait queue timeout expired, 'poolClosed' or 'connectionError'.
+        with self.__lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+            self.__record_wait(event)
+
+    def connection_checked_out(self, event):
+        with self.__lock:
+            self.__pool(event.address)["in_use"] += 1
+            self.checkouts += 1
+            self.__record_wait(event)
+
+    def connection_checked_in(self, event):
+        with self.__lock:
+            pool = self.__pool(event.address)
+            pool["in_use"] = max(0, pool["in_use"] - 1)
+
+    # Method to record the wait time of a checkout, with the lock held.
+    def __record_wait(self, event):
+        # The duration of the checkout is reported by PyMongo 4.7 or later.
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            self.__wait_times.append(duration)
+            self.max_wait = max(self.max_wait, duration)
+
+    # Method to get the statistics of the pools.
+    def stats(self):
+        """
+        Method to get the statistics of the connection pools.
+
+        Returns:
+            dict: The open, in-use and available connections and the cleared count of each server pool, the checkout counters and the percentiles of the latest checkout wait times, in milliseconds.
+        """
+        with self.__lock:
+            pools = {name: {**pool, "available": max(0, pool["open"] - pool["in_use"])} for name, pool in self.__pools.items()}
+            wait_times = sorted(self.__wait_times)
+            checkout_failures = dict(self.checkout_failures)
+
+        return {"pools": pools, "checkouts": self.checkouts, "checkout_failures": checkout_failures,
+                "checkout_wait_ms": _summary(wait_times, self.max_wait)}
+
+# Class listening to the commands sent by the MongoDB clients.
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Class listening to the commands sent by the MongoDB clients of this process.
+
+    It keeps the number of commands, failures and their durations by command name.
+    """
+    # Constructor
+    def __init__(self):
+        """
+        Constructor for the CommandMonitor class.
+        """
+        # Counters by command name
+        self.__commands = {}
+        # Lock protecting the counters
+        self.__lock = threading.Lock()
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.__record(event.command_name, event.duration_micros, failed=False)
+
+    def failed(self, event):
+        self.__record(event.command_name, event.duration_micros, failed=True)
+
+    # Method to record a finished command.
+    def __record(self, command_name, duration_micros, failed):
+        with self.__lock:
+            command = self.__commands.get(command_name)
+            if command is None:
+                command = self.__commands[command_name] = {"count": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+            duration_ms = duration_micros / 1000
+            command["count"] += 1
+            command["failed"] += int(failed)
+            command["total_ms"] += duration_ms
+            command["max_ms"] = max(command["max_ms"], duration_ms)
+
+    # Method to get the statistics of the commands.
+    def stats(self):
+        """
+        Method to get the statistics of the commands.
+
+        Returns:
+            dict: The count, failures, mean and maximum duration of each command name, in milliseconds.
+        """
+        with self.__lock:
+            return {name: {"count": command["count"], "failed": command["failed"],
+                           "mean_ms": command["total_ms"] / command["count"], "max_ms": command["max_ms"]}
+                    for name, command in self.__commands.items()}
+
+# Class recording the metrics of the commands sent by the MongoDB clients.
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Class recording the duration of the commands sent by the MongoDB clients, by collection and command name.
+
+    The collection is read from the command when it starts and kept until the command ends, by request and connection ID.
+    """
+    # Constructor
+    def __init__(self):
+        """
+        Constructor for the CommandMetrics class.
+        """
+        # Collection of each running command, by (request ID, connection ID)
+        self.__collections = {}
+
+    def started(self, event):
+        # Most commands name their collection in their first field; getMore names it in 'collection'.
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        self.__collections[(event.request_id, event.connection_id)] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        collection = self.__collections.pop((event.request_id, event.connection_id), "")
+        mongo_command_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self.__collections.pop((event.request_id, event.connection_id), "")
+        mongo_command_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_command_failures.inc(collection, event.command_name)
+
+# Function to summarize a sorted list of durations.
+def _summary(durations, maximum):
+    """
+    Function to summarize a sorted list of durations.
+
+    Args:
+        durations (list): The durations in seconds, sorted.
+        maximum (float): The maximum duration seen since the start of the process, in seconds.
+
+    Returns:
+        dict: The number of samples and the mean, p50, p95, p99 and maximum durations, in milliseconds.
+    """
+    if not durations:
+        return {"samples": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": maximum * 1000}
+
+    def percentile(fraction):
+        return durations[min(len(durations) - 1, int(fraction * len(durations)))] * 1000
+
+    return {"samples": len(durations), "mean": sum(durations) / len(durations) * 1000,
+            "p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99), "max": maximum * 1000}
+
+# Listeners of the MongoDB clients of this process.
+pool_monitor = PoolMonitor(config.MONGO_POOL_WAIT_SAMPLES)
+command_monitor = CommandMonitor()
+command_metrics = CommandMetrics()
@@ -0,0 +1,359 @@
+# Import the necessary modules.
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+
+import app_config as config
+
+# Fields of a command that are not part of the query, removed before running explain on it.
+_COMMAND_METADATA = ("lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern", "apiVersion", "apiStrict", "apiDeprecationErrors")
+# Commands that can be explained.
+_EXPLAINABLE_COMMANDS = ("find", "aggregate", "count", "distinct")
+# Module name prefixes of the application code, from the most to the least specific caller.
+_CALLER_PREFIXES = ("controllers.", "views.", "helpers.", "scripts.")
+
+# Mongo time of the current request, as [start time, seconds spent in Mongo commands].
+_current_request = contextvars.ContextVar("slow_operations_request", default=None)
+
+# Class recording the slow MongoDB commands and requests.
+class SlowOperationRecorder(monitoring.CommandListener):
+    """
+    Class recording the MongoDB commands that take longer than config.SLOW_OP_THRESHOLD_MS, and the requests that take longer than config.SLOW_REQUEST_THRESHOLD_MS.
+
+    A slow command is recorded with its collection, the shape of its filter (the values are replaced by '?'), its duration, the number of documents it returned or wrote, and the controller function that sent it.
+    A sample of the slow queries is explained with the 'executionStats' verbosity on a background thread, and the winning plan is added to their entry.
+    A slow request is recorded with its total duration and the time spent in Mongo commands; the rest is spent reading the cursors, serializing and in the application code.
+
+    The latest entries are kept in memory for /debug/slow-ops, and every entry is written as a JSON line to a rotating log file.
+    """
+    # Constructor
+    def __init__(self, buffer_size):
+        """
+        Constructor for the SlowOperationRecorder class.
+
+        Args:
+            buffer_size (int): The number of latest entries kept in memory.
+        """
+        # Running commands, by (request ID, connection ID)
+        self.__commands = {}
+        # Latest entries
+        self.__entries = deque(maxlen=buffer_size)
+        # Database connection used to run explain, set by attach()
+        self.__database = None
+        # Queue and thread running the sampled explains, created on first use
+        self.__explain_queue = None
+        self.__explain_lock = threading.Lock()
+        # Marks the explain thread, so that its own commands are not recorded
+        self.__local = threading.local()
+        # Logger writing the entries to the log file, created on first use
+        self.__logger = None
+        self.__logger_lock = threading.Lock()
+
+    # Method to set the database used to run explain.
+    def attach(self, database):
+        """
+        Method to set the database connection used to explain the sampled slow queries.
+
+        Args:
+            database (Database): The database connection.
+        """
+        self.__database = database
+
+    def started(self, event):
+        # Keep the command until it finishes, as the finished event does not carry it.
+        if getattr(self.__local, "explaining", False):
+            return
+        self.__commands[(event.request_id, event.connection_id)] = (event.command, event.database_name)
+
+    def succeeded(self, event):
+        self.__finished(event, event.reply, failure=None)
+
+    def failed(self, event):
+        self.__finished(event, None, failure=str(event.failure.get("errmsg", event.failure)))
+
+    # Method to record a finished command.
+    def __finished(self, event, reply, failure):
+        started = self.__commands.pop((event.request_id, event.connection_id), None)
+        if started is None:
+            return
+
+        duration = event.duration_micros / 1e6
+
+        # Add the duration to the Mongo time of the current request.
+        current_request = _current_request.get()
+        if current_request is not None:
+            current_request[1] += duration
+
+        if duration * 1000 < config.SLOW_OP_THRESHOLD_MS:
+            return
+
+        command, database_name = started
+        command_name = event.command_name
+        collection = command.get(command_name)
+        if command_name == "getMore":
+            collection = command.get("collection")
+
+        entry = {
+            "type": "command",
+            "time": datetime.now(timezone.utc).isoformat(),
+            "command": command_name,
+            "database": database_name,
+            "collection": collection if isinstance(collection, str) else None,
+            "duration_ms": round(duration * 1000, 3),
+            "shape": _command_shape(command_name, command),
+            "documents": _document_count(command_name, reply),
+            "caller": _caller(),
+        }
+        if failure is not None:
+            entry["error"] = failure
+
+        self.__record(entry)
+
+        # Explain a sample of the slow queries.
+        if (command_name in _EXPLAINABLE_COMMANDS and failure is None and self.__database is not None
+                and random.random() < config.SLOW_OP_EXPLAIN_SAMPLE_RATE):
+            self.__queue_explain(entry, command)
+
+    # Method to start measuring a request.
+    def start_request(self):
+        """
+        Method to start measuring the duration and the Mongo time of the current request.
+        """
+        _current_request.set([time.perf_counter(), 0.0])
+
+    # Method to finish measuring a request.
+    def finish_request(self, endpoint, method, status):
+        """
+        Method to finish measuring the current request, recording it if it is slow.
+
+        Args:
+            endpoint (str): The route of the request.
+            method (str): The HTTP method of the request.
+            status (int): The status code of the response.
+        """
+        current_request = _current_request.get()
+        if current_request is None:
+            return
+        _current_request.set(None)
+
+        duration = time.perf_counter() - current_request[0]
+        if duration * 1000 < config.SLOW_REQUEST_THRESHOLD_MS:
+            return
+
+        self.__record({
+            "type": "request",
+            "time": datetime.now(timezone.utc).isoformat(),
+            "endpoint": endpoint or "unmatched",
+            "method": method,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "mongo_ms": round(current_request[1] * 1000, 3),
+            "other_ms": round((duration - current_request[1]) * 1000, 3),
+        })
+
+    # Method to get the latest entries.
+    def entries(self, limit=None):
+        """
+        Method to get the latest entries, from the most recent.
+
+        Args:
+            limit (int): The maximum number of entries, or None for all the kept entries.
+
+        Returns:
+            list: The entries.
+        """
+        entries = list(self.__entries)
+        entries.reverse()
+        return entries[:limit] if limit is not None else entries
+
+    # Method to record an entry.
+    def __record(self, entry):
+        self.__entries.append(entry)
+
+        logger = self.__get_logger()
+        if logger is not None:
+            logger.warning(json.dumps(entry, default=str))
+
+    # Method to get the logger of the log file.
+    def __get_logger(self):
+        if self.__logger is None and config.SLOW_OP_LOG_FILE:
+            with self.__logger_lock:
+                if self.__logger is None:
+                    logger = logging.getLogger("taskops.slow_operations")
+                    logger.propagate = False
+
+                    # One file per process, as a rotating file cannot be shared between processes.
+                    handler = logging.handlers.RotatingFileHandler(
+                        config.SLOW_OP_LOG_FILE.format(pid=os.getpid()),
+                        maxBytes=config.SLOW_OP_LOG_MAX_BYTES, backupCount=config.SLOW_OP_LOG_BACKUP_COUNT, delay=True)
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger.addHandler(handler)
+
+                    self.__logger = logger
+        return self.__logger
+
+    # Method to queue an explain.
+    def __queue_explain(self, entry, command):
+        # Mark the explain as pending. The explain thread only replaces this value, so the entry can be read meanwhile.
+        entry["explain"] = None
+
+        with self.__explain_lock:
+            if self.__explain_queue is None:
+                self.__explain_queue = queue.Queue(maxsize=config.SLOW_OP_EXPLAIN_QUEUE_SIZE)
+                threading.Thread(target=self.__run_explains, name="slow-op-explain", daemon=True).start()
+
+        # Skip the explain if the thread is already busy with many of them.
+        try:
+            self.__explain_queue.put_nowait((entry, {name: value for name, value in command.items() if name not in _COMMAND_METADATA}))
+        except queue.Full:
+            entry["explain"] = {"error": "Explain queue is full"}
+
+    # Method run by the explain thread.
+    def __run_explains(self):
+        self.__local.explaining = True
+
+        while True:
+            entry, command = self.__explain_queue.get()
+            try:
+                explained = self.__database.database.command("explain", command, verbosity="executionStats")
+                entry["explain"] = _explain_summary(explained)
+            except Exception as err:
+                entry["explain"] = {"error": str(err)}
+
+            logger = self.__get_logger()
+            if logger is not None:
+                logger.warning(json.dumps({"type": "explain", "time": entry["time"], "command": entry["command"],
+                                           "collection": entry["collection"], "explain": entry["explain"]}, default=str))
+
+# Function to get the shape of a value.
+def _shape(value):
+    """
+    Function to get the shape of a filter or pipeline, replacing every value by '?'.
+
+    Args:
+        value: The filter, pipeline or value.
+
+    Returns:
+        The shape, with the same keys and operators.
+    """
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Keep the structure of the lists of expressions ($and, $or, pipelines), not the lists of values ($in).
+        if value and all(isinstance(item, dict) for item in value):
+            return [_shape(item) for item in value]
+        return "?"
+    return "?"
+
+# Function to get the shape of a command.
+def _command_shape(command_name, command):
+    """
+    Function to get the parts of a command that describe how it reads the collection, with their values redacted.
+
+    Args:
+        command_name (str): The name of the command.
+        command (dict): The command.
+
+    Returns:
+        dict: The shape of the filter and, if present, the sort, projection and limit of the command.
+    """
+    if command_name == "find":
+        shape = {"filter": _shape(command.get("filter", {}))}
+        for option in ("sort", "projection", "limit", "hint"):
+            if option in command:
+                shape[option] = command[option]
+        return shape
+    if command_name == "aggregate":
+        return {"pipeline": _shape(command.get("pipeline", []))}
+    if command_name in ("count", "distinct"):
+        return {"filter": _shape(command.get("query", {}))}
+    if command_name == "findAndModify":
+        return {"filter": _shape(command.get("query", {})), "remove": bool(command.get("remove"))}
+    if command_name in ("update", "delete"):
+        statements = command.get(command_name + "s", [])
+        return {"filter": _shape(statements[0].get("q", {})) if statements else None, "statements": len(statements)}
+    if command_name == "insert":
+        return {"documents": len(command.get("documents", []))}
+    return {}
+
+# Function to count the documents of a reply.
+def _document_count(command_name, reply):
+    """
+    Function to count the documents returned or written by a command.
+
+    Args:
+        command_name (str): The name of the command.
+        reply (dict): The reply of the command, or None if it failed.
+
+    Returns:
+        int: The number of documents, or None if it is not known.
+    """
+    if not reply:
+        return None
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    if "n" in reply:
+        return reply["n"]
+    return None
+
+# Function to find the application function that sent a command.
+def _caller():
+    """
+    Function to find the application function that sent the current command, from the call stack.
+
+    Returns:
+        str: The module and function name of the closest controller, or of the closest view or helper if no controller is on the stack.
+    """
+    callers = {}
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        for prefix in _CALLER_PREFIXES:
+            if module.startswith(prefix) and prefix not in callers:
+                callers[prefix] = f"{module}.{frame.f_code.co_name}"
+        if "controllers." in callers:
+            break
+        frame = frame.f_back
+
+    for prefix in _CALLER_PREFIXES:
+        if prefix in callers:
+            return callers[prefix]
+    return None
+
+# Function to summarize the result of explain.
+def _explain_summary(explained):
+    """
+    Function to keep the winning plan and the execution statistics of the result of explain.
+
+    Args:
+        explained (dict): The result of the explain command.
+
+    Returns:
+        dict: The winning plan, the number of returned documents and of examined keys and documents, and the execution time.
+    """
+    stats = explained.get("executionStats", {})
+    return {
+        "winningPlan": explained.get("queryPlanner", {}).get("winningPlan"),
+        "nReturned": stats.get("nReturned"),
+        "totalKeysExamined": stats.get("totalKeysExamined"),
+        "totalDocsExamined": stats.get("totalDocsExamined"),
+        "executionTimeMillis": stats.get("executionTimeMillis"),
+    }
+
+# Recorder of the slow operations of this process.
+slow_operations = SlowOperationRecorder(config.SLOW_OP_BUFFER_SIZE)
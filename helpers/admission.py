@@ -0,0 +1,369 @@
+# Import the necessary modules.
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from helpers.metrics import admission_rejections
+import app_config as config
+
+# Class representing a concurrency limit with a short wait queue.
+class ConcurrencyLimiter:
+    """
+    Class representing a concurrency limit with a short wait queue.
+
+    At most 'limit' requests run at once. Up to 'queue' more requests wait at most 'timeout' seconds for a free slot. Any other request is rejected at once, so an overloaded route answers quickly instead of piling up work.
+    """
+    # Constructor
+    def __init__(self, limit, queue, timeout):
+        """
+        Constructor for the ConcurrencyLimiter class.
+
+        Args:
+            limit (int): The maximum number of requests running at once.
+            queue (int): The maximum number of requests waiting for a slot.
+            timeout (float): The maximum time in seconds a request waits for a slot.
+        """
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        # Slots of the running requests
+        self.__slots = threading.BoundedSemaphore(limit)
+        # Lock protecting the counters
+        self.__lock = threading.Lock()
+        # Number of requests waiting for a slot
+        self.waiting = 0
+        # Number of requests running
+        self.in_flight = 0
+        # Number of admitted requests
+        self.admitted = 0
+        # Number of rejected requests
+        self.rejected = 0
+
+    # Method to take a slot.
+    def acquire(self):
+        """
+        Method to take a slot, waiting in the queue if needed.
+
+        Returns:
+            bool: True if the request got a slot and must call release(), False if it is rejected.
+        """
+        # Take a free slot without waiting if there is one.
+        admitted = self.__slots.acquire(blocking=False)
+
+        if not admitted:
+            # Join the wait queue if it is not full.
+            with self.__lock:
+                if self.waiting >= self.queue:
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+
+            admitted = self.__slots.acquire(timeout=self.timeout)
+
+            with self.__lock:
+                self.waiting -= 1
+
+        with self.__lock:
+            if admitted:
+                self.admitted += 1
+                self.in_flight += 1
+            else:
+                self.rejected += 1
+
+        return admitted
+
+    # Method to give back a slot.
+    def release(self):
+        """
+        Method to give back the slot taken by acquire().
+        """
+        with self.__lock:
+            self.in_flight -= 1
+        self.__slots.release()
+
+    # Method to get the statistics of the limiter.
+    def stats(self):
+        """
+        Method to get the statistics of the limiter.
+
+        Returns:
+            dict: The settings and counters of the limiter.
+        """
+        return {"limit": self.limit, "queue": self.queue, "in_flight": self.in_flight, "waiting": self.waiting,
+                "admitted": self.admitted, "rejected": self.rejected}
+
+# Class representing a concurrency limit with a short wait queue, for the async serving mode.
+class AsyncConcurrencyLimiter:
+    """
+    Class representing a concurrency limit with a short wait queue, for the requests of an event loop. See ConcurrencyLimiter.
+
+    The waiting requests await an asyncio semaphore instead of blocking a thread. The counters are only changed from the event loop, so they need no lock.
+    """
+    # Constructor
+    def __init__(self, limit, queue, timeout):
+        """
+        Constructor for the AsyncConcurrencyLimiter class.
+
+        Args:
+            limit (int): The maximum number of requests running at once.
+            queue (int): The maximum number of requests waiting for a slot.
+            timeout (float): The maximum time in seconds a request waits for a slot.
+        """
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        # Slots of the running requests
+        self.__slots = asyncio.BoundedSemaphore(limit)
+        # Number of requests waiting for a slot
+        self.waiting = 0
+        # Number of requests running
+        self.in_flight = 0
+        # Number of admitted requests
+        self.admitted = 0
+        # Number of rejected requests
+        self.rejected = 0
+
+    # Method to take a slot.
+    async def acquire(self):
+        """
+        Method to take a slot, waiting in the queue if needed.
+
+        Returns:
+            bool: True if the request got a slot and must call release(), False if it is rejected.
+        """
+        admitted = True
+
+        if self.__slots.locked():
+            # Join the wait queue if it is not full.
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return False
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.__slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                admitted = False
+            finally:
+                self.waiting -= 1
+        else:
+            # A free slot is taken without waiting.
+            await self.__slots.acquire()
+
+        if admitted:
+            self.admitted += 1
+            self.in_flight += 1
+        else:
+            self.rejected += 1
+
+        return admitted
+
+    # Method to give back a slot.
+    def release(self):
+        """
+        Method to give back the slot taken by acquire().
+        """
+        self.in_flight -= 1
+        self.__slots.release()
+
+    # Method to get the statistics of the limiter.
+    def stats(self):
+        """
+        Method to get the statistics of the limiter.
+
+        Returns:
+            dict: The settings and counters of the limiter.
+        """
+        return {"limit": self.limit, "queue": self.queue, "in_flight": self.in_flight, "waiting": self.waiting,
+                "admitted": self.admitted, "rejected": self.rejected}
+
+# Class representing token buckets keyed by client.
+class RateLimiter:
+    """
+    Class representing token buckets keyed by client (for example an email or an IP address).
+
+    Each key gets 'burst' tokens, refilled at 'rate' tokens per second. Each request takes one token and is rejected when the bucket is empty.
+    The number of tracked keys is bounded; the least recently used keys are forgotten first.
+    """
+    # Constructor
+    def __init__(self, rate, burst, max_keys):
+        """
+        Constructor for the RateLimiter class.
+
+        Args:
+            rate (float): The number of tokens added to each bucket per second.
+            burst (int): The capacity of each bucket.
+            max_keys (int): The maximum number of tracked keys.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # Buckets of the keys, as [tokens, time of the last refill], from the least to the most recently used
+        self.__buckets = OrderedDict()
+        # Lock protecting the buckets
+        self.__lock = threading.Lock()
+        # Number of rejected requests
+        self.rejected = 0
+
+    # Method to take a token from the bucket of a key.
+    def take(self, key):
+        """
+        Method to take a token from the bucket of a key.
+
+        Args:
+            key (str): The key of the client.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise the number of seconds until a token is available.
+        """
+        now = time.monotonic()
+
+        with self.__lock:
+            bucket = self.__buckets.get(key)
+
+            if bucket is None:
+                bucket = [float(self.burst), now]
+                self.__buckets[key] = bucket
+                # Forget the least recently used keys.
+                while len(self.__buckets) > self.max_keys:
+                    self.__buckets.popitem(last=False)
+            else:
+                self.__buckets.move_to_end(key)
+                # Refill the bucket for the time elapsed since the last request.
+                bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+
+            self.rejected += 1
+            return (1 - bucket[0]) / self.rate
+
+    # Method to get the statistics of the limiter.
+    def stats(self):
+        """
+        Method to get the statistics of the limiter.
+
+        Returns:
+            dict: The settings and counters of the limiter.
+        """
+        return {"rate": self.rate, "burst": self.burst, "keys": len(self.__buckets), "rejected": self.rejected}
+
+# Concurrency limiters of the expensive routes, by endpoint, for the synchronous and the async serving modes.
+route_limiters = {endpoint: ConcurrencyLimiter(**settings) for endpoint, settings in config.ROUTE_CONCURRENCY_LIMITS.items()}
+async_route_limiters = {endpoint: AsyncConcurrencyLimiter(**settings) for endpoint, settings in config.ROUTE_CONCURRENCY_LIMITS.items()}
+
+# Response of the requests rejected by a concurrency limit.
+BUSY_RESPONSE = ({'error': 'Server is busy, please try again later.'}, 503, {'Retry-After': '1'})
+
+# Login throttling by email and by IP address.
+login_email_limiter = RateLimiter(config.LOGIN_EMAIL_RATE, config.LOGIN_EMAIL_BURST, config.RATE_LIMIT_MAX_KEYS)
+login_ip_limiter = RateLimiter(config.LOGIN_IP_RATE, config.LOGIN_IP_BURST, config.RATE_LIMIT_MAX_KEYS)
+
+# Decorator to limit the number of concurrent requests of a view.
+def limit_concurrency(endpoint):
+    """
+    Decorator to limit the number of concurrent requests of a view, with the settings of config.ROUTE_CONCURRENCY_LIMITS[endpoint].
+
+    Rejected requests get a JSON response with an error message, a Retry-After header and a HTTP status code of 503, and are counted by the admission_rejected_total metric.
+
+    Args:
+        endpoint (str): The endpoint of the view, as in config.ROUTE_CONCURRENCY_LIMITS.
+
+    Returns:
+        function: The decorator.
+    """
+    def decorator(view):
+        limiter = route_limiters.get(endpoint)
+
+        # Leave the view untouched if the endpoint has no limit.
+        if limiter is None:
+            return view
+
+        @wraps(view)
+        def limited_view(*args, **kwargs):
+            if not limiter.acquire():
+                admission_rejections.inc(endpoint)
+                return BUSY_RESPONSE
+            try:
+                return view(*args, **kwargs)
+            finally:
+                limiter.release()
+
+        return limited_view
+
+    return decorator
+
+# Decorator to limit the number of concurrent requests of an async view.
+def limit_concurrency_async(endpoint):
+    """
+    Decorator to limit the number of concurrent requests of an async view of the async serving mode. See limit_concurrency().
+
+    Args:
+        endpoint (str): The endpoint of the view, as in config.ROUTE_CONCURRENCY_LIMITS.
+
+    Returns:
+        function: The decorator.
+    """
+    def decorator(view):
+        limiter = async_route_limiters.get(endpoint)
+
+        # Leave the view untouched if the endpoint has no limit.
+        if limiter is None:
+            return view
+
+        @wraps(view)
+        async def limited_view(*args, **kwargs):
+            if not await limiter.acquire():
+                admission_rejections.inc(endpoint)
+                return BUSY_RESPONSE
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                limiter.release()
+
+        return limited_view
+
+    return decorator
+
+# Function to throttle the login attempts of a client.
+def throttle_login(email, ip_address):
+    """
+    Function to throttle the login attempts by email and by IP address.
+
+    Args:
+        email (str): The email of the login attempt.
+        ip_address (str): The IP address of the client.
+
+    Returns:
+        int: 0 if the attempt is allowed, otherwise the number of seconds the client should wait (for the Retry-After header).
+    """
+    # Check the IP address first, so a flood over many emails does not fill the email buckets.
+    retry_after = login_ip_limiter.take(str(ip_address))
+    if retry_after:
+        admission_rejections.inc("login_ip")
+    else:
+        retry_after = login_email_limiter.take(str(email).lower())
+        if retry_after:
+            admission_rejections.inc("login_email")
+
+    return math.ceil(retry_after)
+
+# Function to get the statistics of the admission control.
+def admission_stats():
+    """
+    Function to get the statistics of the admission control.
+
+    Returns:
+        dict: The statistics of each route limiter of both serving modes and of the login throttling.
+    """
+    return {
+        "routes": {endpoint: limiter.stats() for endpoint, limiter in route_limiters.items()},
+        "async_routes": {endpoint: limiter.stats() for endpoint, limiter in async_route_limiters.items()},
+        "login_throttle": {"email": login_email_limiter.stats(), "ip": login_ip_limiter.stats()},
+    }
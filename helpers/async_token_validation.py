@@ -0,0 +1,42 @@
+# Import the necessary modules.
+
+from quart import request, g, jsonify # Import Quart modules # pip install quart
+from helpers.token_validation import decode_token
+
+# Function to create a before_request hook that authenticates the requests of an async blueprint.
+def require_jwt_async(missing_status, missing_message, invalid_status, invalid_message, public_endpoints=()):
+    """
+    Function to create a before_request hook that authenticates the requests of a blueprint of the async serving mode.
+
+    It behaves like helpers.token_validation.require_jwt() and shares its cache of verified tokens. The user information is stored in quart.g.user_information.
+
+    Args:
+        missing_status (int): The HTTP status code returned if the token is missing.
+        missing_message (str): The error message returned if the token is missing.
+        invalid_status (int): The HTTP status code returned if the token is invalid or expired.
+        invalid_message (str): The error message returned if the token is invalid or expired.
+        public_endpoints (iterable): The endpoints of the blueprint that do not require a token.
+
+    Returns:
+        function: The before_request hook.
+    """
+    public_endpoints = frozenset(public_endpoints)
+
+    async def authenticate():
+        # Skip the endpoints that do not require a token
+        if request.endpoint in public_endpoints:
+            return None
+
+        # Validate the JWT token
+        user_information = decode_token(request.headers.get('x-access-token'))
+
+        if user_information == 400:
+            return jsonify({"error": missing_message}), missing_status
+        if user_information == 401:
+            return jsonify({"error": invalid_message}), invalid_status
+
+        # Make the user information available to the view
+        g.user_information = user_information
+        return None
+
+    return authenticate
@@ -0,0 +1,50 @@
+# Import the necessary modules.
+
+from flask import request # Import Flask modules
+
+# Function to build the ETag of a task from its version.
+def task_etag(version):
+    """
+    Function to build the ETag of a task from its version.
+
+    Args:
+        version (int): The version of the task. Tasks created before versioning have no version and are treated as version 0.
+
+    Returns:
+        str: The ETag value, without quotes.
+    """
+    return str(version or 0)
+
+# Function to read the task version expected by the client from the If-Match header.
+def get_if_match_version():
+    """
+    Function to read the task version expected by the client from the If-Match header.
+
+    See parse_if_match_version().
+
+    Returns:
+        The expected version (int), None if the header is missing or is '*', or -1 if the header does not contain a valid task ETag.
+    """
+    return parse_if_match_version(request.if_match)
+
+# Function to get the task version from a parsed If-Match header.
+def parse_if_match_version(if_match):
+    """
+    Function to get the task version expected by the client from a parsed If-Match header.
+
+    Args:
+        if_match (werkzeug.datastructures.ETags): The parsed If-Match header.
+
+    Returns:
+        The expected version (int), None if the header is missing or is '*', or -1 if the header does not contain a valid task ETag (so that it matches no task).
+    """
+    # No precondition if the header is missing or matches any version.
+    if not if_match or if_match.star_tag:
+        return None
+
+    # Use the first strong ETag of the header.
+    for etag in if_match.as_set():
+        if etag.isdigit():
+            return int(etag)
+
+    return -1
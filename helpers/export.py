@@ -0,0 +1,219 @@
+# Import the necessary modules.
+#
+# Streaming exports of the tasks and users, served by /tasks/export and /users/export.
+#
+# The documents are read from a MongoDB cursor in batches of config.EXPORT_BATCH_SIZE and written as NDJSON (one JSON object per line) or CSV as they arrive, in chunks of about config.EXPORT_CHUNK_SIZE bytes.
+# The chunks are compressed on the fly when the client accepts gzip. Nothing holds more than one batch of documents and one chunk, so the memory of a worker does not grow with the size of the export,
+# and the first chunk is sent while the cursor is still being read.
+
+import csv
+import io
+import zlib
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+from helpers.json_provider import dumps_bytes
+import app_config as config
+
+# Columns of an exported task, as (column name, task field).
+TASK_EXPORT_FIELDS = [("_id", "_id")] + [(field, field) for field in config.TASK_PROJECTION if field != "_id"]
+# Columns of an exported user, as (column name, user field). The password is never read.
+USER_EXPORT_FIELDS = [("id", "_id"), ("email", "email"), ("name", "name")]
+# Content types of the export formats.
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Function to validate the query parameters of an export.
+def parse_export_arguments(args, accept_encodings):
+    """
+    Function to validate the query parameters of an export and negotiate its compression.
+
+    The 'format' query parameter is 'ndjson' (the default) or 'csv'. The export is compressed with gzip if the Accept-Encoding header of the request allows it.
+
+    Args:
+        args (dict): The query parameters of the request.
+        accept_encodings (werkzeug.datastructures.Accept): The encodings accepted by the client.
+
+    Returns:
+        tuple: The format (str) and whether to compress the export (bool).
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    export_format = args.get("format", default="ndjson")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"The format parameter must be one of: {', '.join(EXPORT_FORMATS)}.")
+
+    return export_format, accept_encodings["gzip"] > 0
+
+# Function to build the headers of an export response.
+def export_headers(name, export_format, compress):
+    """
+    Function to build the content type and the headers of an export response.
+
+    Args:
+        name (str): The name of the exported collection, used as the file name.
+        export_format (str): 'ndjson' or 'csv'.
+        compress (bool): Whether the export is compressed with gzip.
+
+    Returns:
+        tuple: The content type (str) and the headers (dict).
+    """
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{export_format}"', "Cache-Control": "no-store", "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return EXPORT_FORMATS[export_format], headers
+
+# First characters that make a spreadsheet read a CSV cell as a formula.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Function to write a value in a CSV cell.
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # Text written by the users (such as a task description) is quoted, so a spreadsheet opening the export never runs it as a formula.
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+# Function to get the encoder of an export format.
+def _encoder(export_format, fields):
+    """
+    Function to get the header and the document encoder of an export format.
+
+    Args:
+        export_format (str): 'ndjson' or 'csv'.
+        fields (list): The columns of the export, as (column name, document field).
+
+    Returns:
+        tuple: The header (bytes, empty for NDJSON) and a function encoding one document as one line (bytes).
+    """
+    if export_format == "ndjson":
+        return b"", lambda document: dumps_bytes({name: document.get(field) for name, field in fields}) + b"\n"
+
+    # The CSV writer writes each row to a reused buffer.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def encode_row(row):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue().encode("utf-8")
+
+    return encode_row([name for name, _ in fields]), lambda document: encode_row([_csv_value(document.get(field)) for _, field in fields])
+
+# Class representing the output of an export.
+class _ExportOutput:
+    """
+    Class representing the output of an export: the lines are gathered in chunks of about config.EXPORT_CHUNK_SIZE bytes, compressed with gzip if requested.
+    """
+    # Constructor
+    def __init__(self, header, compress):
+        """
+        Constructor for the _ExportOutput class.
+
+        Args:
+            header (bytes): The first line of the export.
+            compress (bool): Whether to compress the output with gzip.
+        """
+        # Lines of the current chunk and their size
+        self.lines = [header]
+        self.size = len(header)
+        # gzip compressor (wbits 31 writes the gzip header and trailer)
+        self.compressor = zlib.compressobj(config.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+
+    # Method to add a line.
+    def add(self, line):
+        """
+        Method to add a line to the current chunk.
+
+        Args:
+            line (bytes): The line.
+
+        Returns:
+            bool: True if the chunk is full and must be sent with take().
+        """
+        self.lines.append(line)
+        self.size += len(line)
+        return self.size >= config.EXPORT_CHUNK_SIZE
+
+    # Method to take the current chunk.
+    def take(self, final=False):
+        """
+        Method to take the current chunk, compressed if requested.
+
+        Each compressed chunk is flushed, so the client can decompress everything sent so far.
+
+        Args:
+            final (bool): Whether this is the last chunk of the export.
+
+        Returns:
+            bytes: The chunk, possibly empty.
+        """
+        data = b"".join(self.lines)
+        self.lines = []
+        self.size = 0
+
+        if self.compressor is None:
+            return data
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+# Function to stream an export from a cursor.
+def export_stream(documents, export_format, fields, compress):
+    """
+    Function to generate the body of an export from a cursor, in the synchronous serving mode.
+
+    Args:
+        documents (pymongo.cursor.Cursor): The cursor of the exported documents.
+        export_format (str): 'ndjson' or 'csv'.
+        fields (list): The columns of the export, as (column name, document field).
+        compress (bool): Whether to compress the export with gzip.
+
+    Yields:
+        bytes: The chunks of the body.
+    """
+    header, encode = _encoder(export_format, fields)
+    output = _ExportOutput(header, compress)
+
+    try:
+        for document in documents:
+            if output.add(encode(document)):
+                yield output.take()
+
+        yield output.take(final=True)
+    finally:
+        # Release the server cursor if the client disconnects before the end.
+        documents.close()
+
+# Function to stream an export from an async cursor.
+async def export_stream_async(documents, export_format, fields, compress):
+    """
+    Function to generate the body of an export from an async cursor, in the async serving mode. See export_stream().
+
+    Args:
+        documents (pymongo.asynchronous.cursor.AsyncCursor): The cursor of the exported documents.
+        export_format (str): 'ndjson' or 'csv'.
+        fields (list): The columns of the export, as (column name, document field).
+        compress (bool): Whether to compress the export with gzip.
+
+    Yields:
+        bytes: The chunks of the body.
+    """
+    header, encode = _encoder(export_format, fields)
+    output = _ExportOutput(header, compress)
+
+    try:
+        async for document in documents:
+            if output.add(encode(document)):
+                yield output.take()
+
+        yield output.take(final=True)
+    finally:
+        await documents.close()
@@ -0,0 +1,133 @@
+# Import the necessary modules.
+#
+# JSON provider of the Flask and Quart applications (app.py and asgi.py).
+#
+# The task and user lists are serialized with orjson when it is installed (pip install orjson), and with the json module otherwise.
+# MongoDB values are encoded by the provider itself, so the controllers return the documents as they are read, without converting each '_id' to a string first.
+
+import base64
+import json
+from datetime import date, datetime, timezone
+
+from bson.objectid import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Function to encode the values the JSON encoder does not know.
+def _default(value):
+    """
+    Function to encode the values that are not JSON types.
+
+    Args:
+        value: The value to encode.
+
+    Returns:
+        The ObjectId as a string, bytes in base64, or the value as encoded by Flask (UUID, Decimal, dataclass).
+
+    Raises:
+        TypeError: If the value cannot be encoded.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return DefaultJSONProvider.default(value)
+
+# Function to encode dates for the json module.
+def _default_json(value):
+    """
+    Function to encode the values that are not JSON types, for the json module.
+
+    Dates are encoded in ISO 8601 like orjson does, so the responses do not depend on which encoder is installed. Naive datetimes are UTC, as read from MongoDB.
+
+    Args:
+        value: The value to encode.
+
+    Returns:
+        The encoded value.
+
+    Raises:
+        TypeError: If the value cannot be encoded.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return _default(value)
+
+# Function to serialize a value to bytes.
+def dumps_bytes(obj, indent=False, sort_keys=False):
+    """
+    Function to serialize a value as JSON, to UTF-8 bytes, with orjson when it is installed.
+
+    It encodes the values like the JSON provider of the applications, and can be used outside of a request, such as for the task events of helpers/task_events.py.
+
+    Args:
+        obj: The value to serialize.
+        indent (bool): Whether to indent the output by 2 spaces.
+        sort_keys (bool): Whether to sort the keys of the objects.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    return json.dumps(obj, default=_default_json, ensure_ascii=False, sort_keys=sort_keys,
+                      indent=2 if indent else None, separators=None if indent else (",", ":")).encode("utf-8")
+
+# Class representing the JSON provider of the applications.
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Class representing a JSON provider that encodes ObjectId, datetime and bytes values, with orjson when it is installed.
+
+    ObjectId values are encoded as their hexadecimal string, datetimes in ISO 8601 (naive datetimes are UTC), and bytes in base64.
+    Keys are not sorted, and non-ASCII characters are written as UTF-8, which is faster and smaller.
+    """
+    ensure_ascii = False
+    sort_keys = False
+
+    # Method to serialize a value to bytes.
+    def dumps_bytes(self, obj, indent=False):
+        """
+        Method to serialize a value as JSON, to UTF-8 bytes.
+
+        Args:
+            obj: The value to serialize.
+            indent (bool): Whether to indent the output by 2 spaces.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        return dumps_bytes(obj, indent=indent, sort_keys=self.sort_keys)
+
+    def dumps(self, obj, **kwargs):
+        # Calls with options of the json module (such as 'cls') are served by it.
+        if orjson is None or set(kwargs) - {"indent", "separators", "sort_keys", "ensure_ascii"}:
+            kwargs.setdefault("default", _default_json)
+            kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+            kwargs.setdefault("sort_keys", self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, indent=bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Build the body as bytes, without a round trip through str.
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
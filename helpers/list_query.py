@@ -0,0 +1,236 @@
+# Import the necessary modules.
+#
+# Query parameters of the list endpoints: filters, sort and fields.
+#
+#   GET /tasks/createdby/?done=false&assignedToUid=<user ID>&sort=-_id&fields=description,done
+#   GET /tasks/assignedto/?done=true&createdByUid=<user ID>
+#   GET /users/?sort=name&fields=id,name
+#
+# A query compiles to a MongoDB filter, a sort and a projection. The filter and the sort are only accepted if an index declared in database/indexes.py serves them (see indexes.index_for()),
+# so a list request never scans the collection or sorts in memory, whatever the parameters.
+
+from bson.objectid import ObjectId
+
+from database.indexes import index_for
+import app_config as config
+
+# Query parameters read by the pagination of the task lists (see helpers/pagination.py).
+PAGE_PARAMETERS = {"limit", "after"}
+
+# Function to validate a boolean query parameter.
+def _parse_bool(name, value):
+    """
+    Function to validate a boolean query parameter.
+
+    Args:
+        name (str): The name of the query parameter.
+        value (str): The value of the query parameter.
+
+    Returns:
+        bool: The value of the query parameter.
+
+    Raises:
+        ValueError: If the value is not 'true' or 'false'.
+    """
+    if value not in ("true", "false"):
+        raise ValueError(f"The {name} parameter must be true or false.")
+
+    return value == "true"
+
+# Function to validate a user ID query parameter.
+def _parse_user_id(name, value):
+    """
+    Function to validate a user ID query parameter.
+
+    Args:
+        name (str): The name of the query parameter.
+        value (str): The value of the query parameter.
+
+    Returns:
+        str: The user ID, stored as a string in the tasks.
+
+    Raises:
+        ValueError: If the value is not a valid user ID.
+    """
+    if not ObjectId.is_valid(value):
+        raise ValueError(f"The {name} parameter is not a valid user ID.")
+
+    return value
+
+# Filters of the task lists, with the function validating the value of each.
+TASK_FILTERS = {"done": _parse_bool, "assignedToUid": _parse_user_id, "createdByUid": _parse_user_id}
+# Sort fields of the task lists. Keyset pagination needs a unique sort key, so the tasks are only sorted by '_id', which is their creation order.
+TASK_SORT_FIELDS = ("_id",)
+# Sort fields of the users list.
+USER_SORT_FIELDS = ("email", "name")
+# Fields of a task that can be requested, read once as the projection dictionary is handed to the driver.
+TASK_FIELDS = tuple(field for field in config.TASK_PROJECTION if field != "_id")
+# Fields of a user that can be requested.
+USER_FIELDS = tuple(field for field in config.USER_LIST_PROJECTION if field != "_id")
+
+# Function to validate and compile the query parameters of a task list.
+def parse_task_list_query(args, owner_field):
+    """
+    Function to validate and compile the query parameters of a task list.
+
+    The 'done' query parameter filters the tasks by status ('true' or 'false').
+    The 'assignedToUid' or 'createdByUid' query parameter filters the tasks by the other user of the task. The owner field of the list cannot be filtered, it is the current user.
+    The 'sort' query parameter is '_id' (oldest first, the default) or '-_id' (newest first).
+    The 'fields' query parameter is a comma separated list of the task fields to return. '_id' is always returned, as it is the cursor of the next page.
+
+    Args:
+        args (dict): The query parameters of the request.
+        owner_field (str): The field of the task holding the current user, 'createdByUid' or 'assignedToUid'.
+
+    Returns:
+        tuple: The filter (dict) to add to the owner filter, the sort direction (1 or -1) and the projection (dict).
+
+    Raises:
+        ValueError: If a query parameter is unknown or invalid, or no declared index serves the filter and the sort.
+    """
+    filters = {field: parse for field, parse in TASK_FILTERS.items() if field != owner_field}
+    _check_parameters(args, set(filters) | {"sort", "fields"} | PAGE_PARAMETERS)
+
+    # Read the filters from the query parameters.
+    query = {field: parse(field, args.get(field)) for field, parse in filters.items() if field in args}
+
+    # Read the sort from the query parameters.
+    sort_field, direction = _parse_sort(args, TASK_SORT_FIELDS, "_id")
+
+    # Reject the combinations that would scan the tasks of the user or sort them in memory.
+    _require_index(config.CONST_TASK_COLLECTION, [owner_field, *query], sort_field)
+
+    # Read the fields from the query parameters.
+    fields = _parse_fields(args, TASK_FIELDS)
+    projection = {field: 1 for field in fields} if fields else config.TASK_PROJECTION
+
+    return query, direction, projection
+
+# Function to validate and compile the query parameters of the users list.
+def parse_user_list_query(args):
+    """
+    Function to validate and compile the query parameters of the users list.
+
+    The 'sort' query parameter is 'email' or 'name', prefixed with '-' for the descending order. Users with the same name are sorted by '_id'. Without it, the users are returned in storage order.
+    The 'fields' query parameter is a comma separated list of the user fields to return ('id', 'email' and 'name').
+
+    Args:
+        args (dict): The query parameters of the request.
+
+    Returns:
+        tuple: The sort (list of (field, direction), or None to keep the storage order) and the projection (dict).
+
+    Raises:
+        ValueError: If a query parameter is unknown or invalid, or no declared index serves the sort.
+    """
+    _check_parameters(args, {"sort", "fields"})
+
+    # Read the sort from the query parameters. The full sort order is the one of the index serving it.
+    sort = None
+    if "sort" in args:
+        sort_field, direction = _parse_sort(args, USER_SORT_FIELDS, "")
+        keys = _require_index(config.CONST_USER_COLLECTION, [], sort_field)
+        sort = [(field, key_direction * direction) for field, key_direction in keys]
+
+    # Read the fields from the query parameters. The projection keeps the renaming of '_id' to 'id'.
+    fields = _parse_fields(args, USER_FIELDS)
+    projection = config.USER_LIST_PROJECTION
+    if fields:
+        projection = {"_id": 0, **{field: config.USER_LIST_PROJECTION[field] for field in fields}}
+
+    return sort, projection
+
+# Function to reject unknown and repeated query parameters.
+def _check_parameters(args, allowed):
+    """
+    Function to reject unknown and repeated query parameters, so a misspelled filter is not silently ignored.
+
+    Args:
+        args (werkzeug.datastructures.MultiDict): The query parameters of the request.
+        allowed (set): The names of the accepted query parameters.
+
+    Raises:
+        ValueError: If a query parameter is not accepted or is given more than once.
+    """
+    for name in args:
+        if name not in allowed:
+            raise ValueError(f"Unknown query parameter {name}, expected one of: {', '.join(sorted(allowed))}.")
+        if len(args.getlist(name)) > 1:
+            raise ValueError(f"The {name} parameter is given more than once.")
+
+# Function to validate the sort query parameter.
+def _parse_sort(args, sort_fields, default):
+    """
+    Function to validate the 'sort' query parameter, a field name prefixed with '-' for the descending order.
+
+    Args:
+        args (dict): The query parameters of the request.
+        sort_fields (tuple): The fields the list can be sorted by.
+        default (str): The sort field when the parameter is missing.
+
+    Returns:
+        tuple: The sort field (str) and the direction (1 or -1).
+
+    Raises:
+        ValueError: If the field cannot be sorted by.
+    """
+    sort = args.get("sort") or default
+
+    direction = 1
+    if sort.startswith("-"):
+        sort, direction = sort[1:], -1
+
+    if sort not in sort_fields:
+        raise ValueError(f"The sort parameter must be one of: {', '.join(sort_fields)}, optionally prefixed with '-'.")
+
+    return sort, direction
+
+# Function to validate the fields query parameter.
+def _parse_fields(args, fields):
+    """
+    Function to validate the 'fields' query parameter, a comma separated list of field names.
+
+    Args:
+        args (dict): The query parameters of the request.
+        fields (tuple): The fields the list can return.
+
+    Returns:
+        list: The requested fields without duplicates, or None to return every field.
+
+    Raises:
+        ValueError: If a field is unknown or no field is requested.
+    """
+    if "fields" not in args:
+        return None
+
+    requested = list(dict.fromkeys(field.strip() for field in args.get("fields").split(",") if field.strip()))
+    if not requested:
+        raise ValueError("The fields parameter must name at least one field.")
+
+    for field in requested:
+        if field not in fields:
+            raise ValueError(f"Unknown field {field}, expected some of: {', '.join(fields)}.")
+
+    return requested
+
+# Function to check that a declared index serves a filter and a sort.
+def _require_index(collection_name, equality_fields, sort_field):
+    """
+    Function to check that a declared index serves a filter and a sort. See indexes.index_for().
+
+    Args:
+        collection_name (str): The name of the collection.
+        equality_fields (list): The fields of the equality filters.
+        sort_field (str): The sort field.
+
+    Returns:
+        list: The (field, direction) of the keys of the index from the sort field.
+
+    Raises:
+        ValueError: If no declared index serves the filter and the sort.
+    """
+    keys = index_for(collection_name, equality_fields, sort_field)
+    if keys is None:
+        raise ValueError(f"No index serves the filters on {', '.join(equality_fields)} with the sort on {sort_field}, please use fewer filters.")
+
+    return keys
@@ -0,0 +1,283 @@
+# Import the necessary modules.
+#
+# In-process metrics of the API, exposed in the Prometheus text format by the /metrics route.
+#
+# Recording a value must stay cheap under full load, so every series keeps one pre-allocated array of counters per thread.
+# A thread only ever writes its own array, so recording takes no lock; the arrays are only summed, under a lock, when the metrics are read.
+
+import bisect
+import threading
+import time
+
+import app_config as config
+
+# Class representing the per-thread counter arrays of a series.
+class _Shards:
+    """
+    Class representing the per-thread arrays of counters of a series.
+
+    The arrays of the threads that have ended are folded into a single array, so a server starting a thread per request does not accumulate them.
+    """
+    # Constructor
+    def __init__(self, size):
+        """
+        Constructor for the _Shards class.
+
+        Args:
+            size (int): The number of counters of each array.
+        """
+        self.__size = size
+        # Array of the current thread
+        self.__local = threading.local()
+        # Arrays of all the threads, as (thread, counters)
+        self.__shards = []
+        # Sum of the arrays of the threads that have ended
+        self.__retired = [0] * size
+        # Lock protecting the list of arrays
+        self.__lock = threading.Lock()
+
+    # Method to get the array of the current thread.
+    def local(self):
+        """
+        Method to get the array of counters of the current thread, creating it on the first call of the thread.
+
+        Returns:
+            list: The counters, written by this thread only.
+        """
+        try:
+            return self.__local.counters
+        except AttributeError:
+            counters = [0] * self.__size
+
+            with self.__lock:
+                # Fold the arrays of the ended threads before the list grows past the number of running threads.
+                if len(self.__shards) >= 2 * threading.active_count():
+                    self.__fold()
+                self.__shards.append((threading.current_thread(), counters))
+
+            self.__local.counters = counters
+            return counters
+
+    # Method to sum the arrays.
+    def totals(self):
+        """
+        Method to sum the arrays of all the threads.
+
+        Returns:
+            list: The sum of each counter.
+        """
+        with self.__lock:
+            self.__fold()
+            totals = list(self.__retired)
+            for _, counters in self.__shards:
+                for index, value in enumerate(counters):
+                    totals[index] += value
+        return totals
+
+    # Method to fold the arrays of the ended threads, with the lock held.
+    def __fold(self):
+        running = []
+        for thread, counters in self.__shards:
+            if thread.is_alive():
+                running.append((thread, counters))
+            else:
+                for index, value in enumerate(counters):
+                    self.__retired[index] += value
+        self.__shards = running
+
+# Class representing a metric with labels.
+class _Metric:
+    """
+    Class representing a metric with labels, made of one series per combination of label values.
+    """
+    # Type of the metric in the Prometheus text format
+    kind = None
+
+    # Constructor
+    def __init__(self, name, documentation, labelnames):
+        """
+        Constructor for the _Metric class.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labelnames (tuple): The names of the labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Series by label values
+        self._series = {}
+        # Lock protecting the creation of series
+        self.__lock = threading.Lock()
+
+        # Register the metric, so that it is rendered by /metrics.
+        REGISTRY.append(self)
+
+    # Method to get the counters of a series.
+    def _shards(self, labelvalues):
+        shards = self._series.get(labelvalues)
+        if shards is None:
+            with self.__lock:
+                shards = self._series.setdefault(labelvalues, _Shards(self._size()))
+        return shards.local()
+
+    # Method to render the labels of a series.
+    def _labels(self, labelvalues, extra=()):
+        pairs = list(zip(self.labelnames, labelvalues)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join('%s="%s"' % (name, _escape(value)) for name, value in pairs) + "}"
+
+    # Method to render the metric.
+    def render(self):
+        """
+        Method to render the metric in the Prometheus text format.
+
+        Returns:
+            list: The lines of the metric.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, shards in list(self._series.items()):
+            lines.extend(self._render_series(labelvalues, shards.totals()))
+        return lines
+
+# Class representing a counter.
+class Counter(_Metric):
+    """
+    Class representing a counter, a value that only increases.
+    """
+    kind = "counter"
+
+    def _size(self):
+        return 1
+
+    # Method to increment the counter.
+    def inc(self, *labelvalues, amount=1):
+        """
+        Method to increment the series of the given label values.
+
+        Args:
+            *labelvalues: The values of the labels, in the order of the label names.
+            amount (int): The increment.
+        """
+        self._shards(labelvalues)[0] += amount
+
+    def _render_series(self, labelvalues, totals):
+        return [f"{self.name}{self._labels(labelvalues)} {totals[0]}"]
+
+# Class representing a histogram.
+class Histogram(_Metric):
+    """
+    Class representing a histogram of durations, with fixed buckets.
+    """
+    kind = "histogram"
+
+    # Constructor
+    def __init__(self, name, documentation, labelnames, buckets):
+        """
+        Constructor for the Histogram class.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labelnames (tuple): The names of the labels.
+            buckets (list): The upper bounds of the buckets, in increasing order. The +Inf bucket is added.
+        """
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _size(self):
+        # One counter per bucket, the +Inf bucket and the sum of the values.
+        return len(self.buckets) + 2
+
+    # Method to record a value.
+    def observe(self, value, *labelvalues):
+        """
+        Method to record a value in the series of the given label values.
+
+        Args:
+            value (float): The value, in seconds.
+            *labelvalues: The values of the labels, in the order of the label names.
+        """
+        counters = self._shards(labelvalues)
+        counters[bisect.bisect_left(self.buckets, value)] += 1
+        counters[-1] += value
+
+    def _render_series(self, labelvalues, totals):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), totals[:-1]):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._labels(labelvalues, [('le', bound)])} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(labelvalues)} {totals[-1]}")
+        lines.append(f"{self.name}_count{self._labels(labelvalues)} {cumulative}")
+        return lines
+
+# Function to escape a label value.
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+# Metrics rendered by /metrics, in the order they were created.
+REGISTRY = []
+
+# Duration of the HTTP requests.
+request_seconds = Histogram("http_request_duration_seconds", "Duration of the HTTP requests, by route, method and status code.",
+                            ("endpoint", "method", "status"), config.METRICS_LATENCY_BUCKETS)
+# Duration of the MongoDB commands, recorded by database/monitoring.py.
+mongo_command_seconds = Histogram("mongo_command_duration_seconds", "Duration of the MongoDB commands, by collection and command.",
+                                  ("collection", "command"), config.METRICS_LATENCY_BUCKETS)
+# Number of failed MongoDB commands, recorded by database/monitoring.py.
+mongo_command_failures = Counter("mongo_command_failures_total", "Number of failed MongoDB commands, by collection and command.",
+                                 ("collection", "command"))
+# Duration of the JWT validations.
+jwt_validation_seconds = Histogram("jwt_validation_duration_seconds", "Duration of the JWT validations, by result (cached, verified, invalid or missing).",
+                                   ("result",), config.METRICS_LATENCY_BUCKETS)
+# Duration of the bcrypt calls, including the wait for the pool.
+bcrypt_seconds = Histogram("bcrypt_duration_seconds", "Duration of the bcrypt calls, including the wait for the pool, by operation (hash or check).",
+                           ("operation",), config.METRICS_BCRYPT_BUCKETS)
+# Number of requests rejected by the admission control of helpers/admission.py.
+admission_rejections = Counter("admission_rejected_total", "Number of requests rejected by the admission control, by limiter (the endpoint of a concurrency limit, or login_ip and login_email for the login throttling).",
+                               ("limiter",))
+
+# Function to start measuring the duration of a request.
+def start_request_timer(g):
+    """
+    Function to start measuring the duration of the current request.
+
+    Args:
+        g: The request context globals (flask.g or quart.g).
+    """
+    g.request_started = time.perf_counter()
+
+# Function to record the duration of a request.
+def observe_request(g, request, response):
+    """
+    Function to record the duration of the current request, by route, method and status code.
+
+    Args:
+        g: The request context globals (flask.g or quart.g).
+        request: The current request.
+        response: The response of the request.
+
+    Returns:
+        The response, unchanged.
+    """
+    started = getattr(g, "request_started", None)
+    if started is not None:
+        # Requests that match no route share one series, so unknown paths cannot create new series.
+        request_seconds.observe(time.perf_counter() - started, request.endpoint or "unmatched", request.method, response.status_code)
+    return response
+
+# Function to render the metrics.
+def render_metrics():
+    """
+    Function to render all the metrics of this process in the Prometheus text format.
+
+    Returns:
+        str: The metrics.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,159 @@
+# Import the necessary modules.
+
+from flask import request # Import Flask modules
+from bson.objectid import ObjectId
+import app_config as config
+
+# Function to read and validate the pagination query parameters of the request.
+def get_page_arguments():
+    """
+    Function to read and validate the pagination query parameters of the request.
+
+    See parse_page_arguments().
+
+    Returns:
+        tuple: The page size (int) and the cursor (str or None).
+
+    Raises:
+        ValueError: If 'limit' is not a positive integer or 'after' is not a valid cursor.
+    """
+    return parse_page_arguments(request.args)
+
+# Function to validate the pagination query parameters.
+def parse_page_arguments(args):
+    """
+    Function to validate the pagination query parameters.
+
+    The 'limit' query parameter is the maximum number of documents to return. It defaults to config.TASK_PAGE_SIZE and is capped at config.TASK_MAX_PAGE_SIZE.
+    The 'after' query parameter is the cursor returned as 'next_cursor' by the previous page. It is optional.
+
+    Args:
+        args (dict): The query parameters of the request.
+
+    Returns:
+        tuple: The page size (int) and the cursor (str or None).
+
+    Raises:
+        ValueError: If 'limit' is not a positive integer or 'after' is not a valid cursor.
+    """
+    # Read the page size from the query parameters.
+    limit = parse_limit(args)
+
+    # Read the cursor from the query parameters.
+    after = args.get("after") or None
+
+    # Check if the cursor is a valid ObjectId.
+    if after is not None and not ObjectId.is_valid(after):
+        raise ValueError("The after parameter is not a valid cursor.")
+
+    return limit, after
+
+# Function to validate the page size query parameter.
+def parse_limit(args):
+    """
+    Function to validate the 'limit' query parameter, the maximum number of documents to return.
+
+    It defaults to config.TASK_PAGE_SIZE and is capped at config.TASK_MAX_PAGE_SIZE.
+
+    Args:
+        args (dict): The query parameters of the request.
+
+    Returns:
+        int: The page size.
+
+    Raises:
+        ValueError: If 'limit' is not a positive integer.
+    """
+    limit = args.get("limit", default=config.TASK_PAGE_SIZE)
+
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("The limit parameter must be an integer.")
+
+    # Check if the page size is positive.
+    if limit < 1:
+        raise ValueError("The limit parameter must be greater than zero.")
+
+    # Cap the page size so one request never materializes an unbounded number of documents.
+    return min(limit, config.TASK_MAX_PAGE_SIZE)
+
+# Function to fetch one page of documents using keyset pagination on '_id'.
+def fetch_page(collection, query, limit, after=None, projection=None, direction=1):
+    """
+    Function to fetch one page of documents using keyset pagination on '_id'.
+
+    The documents are returned in '_id' order, ascending by default. Only the documents after the cursor are read, so the cost of a page does not depend on its position in the result set.
+
+    Args:
+        collection (pymongo.collection.Collection): The collection to read from.
+        query (dict): The filter of the documents.
+        limit (int): The maximum number of documents to return.
+        after (str): The '_id' of the last document of the previous page, or None for the first page.
+        projection (dict): The fields to return.
+        direction (int): 1 for the ascending '_id' order, -1 for the descending order.
+
+    Returns:
+        tuple: The list of documents as read, and the cursor of the next page (str or None if this is the last page). The '_id' values are ObjectId; the JSON provider encodes them as strings.
+    """
+    # Read one extra document to know if there is a next page.
+    documents = list(collection.find(_page_query(query, after, direction), projection).sort("_id", direction).limit(limit + 1))
+
+    next_cursor = None
+    if len(documents) > limit:
+        # Drop the extra document. It only tells that another page exists.
+        documents = documents[:limit]
+        next_cursor = str(documents[-1]["_id"])
+
+    return documents, next_cursor
+
+# Function to fetch one page of documents with an async driver.
+async def fetch_page_async(collection, query, limit, after=None, projection=None, direction=1):
+    """
+    Function to fetch one page of documents using keyset pagination on '_id', with an async driver.
+
+    See fetch_page().
+
+    Args:
+        collection (pymongo.asynchronous.collection.AsyncCollection): The collection to read from.
+        query (dict): The filter of the documents.
+        limit (int): The maximum number of documents to return.
+        after (str): The '_id' of the last document of the previous page, or None for the first page.
+        projection (dict): The fields to return.
+        direction (int): 1 for the ascending '_id' order, -1 for the descending order.
+
+    Returns:
+        tuple: The list of documents as read, and the cursor of the next page (str or None if this is the last page).
+    """
+    # Read one extra document to know if there is a next page.
+    documents = await collection.find(_page_query(query, after, direction), projection).sort("_id", direction).limit(limit + 1).to_list(None)
+
+    next_cursor = None
+    if len(documents) > limit:
+        # Drop the extra document. It only tells that another page exists.
+        documents = documents[:limit]
+        next_cursor = str(documents[-1]["_id"])
+
+    return documents, next_cursor
+
+# Function to build the filter of a page.
+def _page_query(query, after, direction=1):
+    """
+    Function to build the filter of a page, reading only the documents after the cursor.
+
+    Args:
+        query (dict): The filter of the documents.
+        after (str): The '_id' of the last document of the previous page, or None for the first page.
+        direction (int): The direction of the '_id' order.
+
+    Returns:
+        dict: A copy of the filter, restricted to the documents after the cursor.
+    """
+    # Copy the filter so the caller's dictionary is left untouched.
+    page_query = dict(query)
+
+    # Only read the documents after the cursor.
+    if after is not None:
+        page_query["_id"] = {"$gt" if direction > 0 else "$lt": ObjectId(after)}
+
+    return page_query
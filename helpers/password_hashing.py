@@ -0,0 +1,249 @@
+# Import the necessary modules.
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt # pip install bcrypt
+from helpers.metrics import bcrypt_seconds
+import app_config as config
+
+# Exception raised when the password hashing pool cannot take more work.
+class HashingPoolBusy(Exception):
+    """Exception raised when the password hashing pool is full or does not answer in time."""
+
+# Pool of worker processes and the semaphore bounding the work queued on it.
+# Both are created lazily and recreated after a fork, as a process pool cannot be shared between processes.
+_executor = None
+_slots = None
+_owner_pid = None
+_pool_lock = threading.Lock()
+
+# Function to hash a password in a worker process.
+def _hash(password, rounds):
+    """
+    Function to hash a password in a worker process.
+
+    Args:
+        password (bytes): The password to be hashed.
+        rounds (int): The bcrypt cost factor.
+
+    Returns:
+        bytes: The hashed password.
+    """
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+# Function to check a password in a worker process.
+def _check(password, hashed_password):
+    """
+    Function to check a password against its hash in a worker process.
+
+    Args:
+        password (bytes): The password to be checked.
+        hashed_password (bytes): The stored hash of the password.
+
+    Returns:
+        bool: True if the password matches the hash.
+    """
+    return bcrypt.checkpw(password, hashed_password)
+
+# Function to get the pool of the current process.
+def _get_pool():
+    """
+    Function to get the pool of worker processes of the current process, creating it if needed.
+
+    Returns:
+        tuple: The executor and the semaphore bounding the number of queued calls.
+    """
+    global _executor, _slots, _owner_pid
+
+    with _pool_lock:
+        if _executor is None or _owner_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=config.BCRYPT_POOL_SIZE)
+            _slots = threading.BoundedSemaphore(config.BCRYPT_POOL_SIZE + config.BCRYPT_QUEUE_DEPTH)
+            _owner_pid = os.getpid()
+
+        return _executor, _slots
+
+# Function to queue a bcrypt call on the pool.
+def _submit(function, *args):
+    """
+    Function to queue a bcrypt call on the pool of worker processes, if the pool can take it.
+
+    The call holds a slot of the pool until it finishes or is cancelled, not until its caller stops waiting, so calls that timed out still count against the queue depth while they run.
+
+    Args:
+        function (function): The function to call.
+        *args: The arguments of the function.
+
+    Returns:
+        concurrent.futures.Future: The future of the call.
+
+    Raises:
+        HashingPoolBusy: If the queue of the pool is full.
+    """
+    executor, slots = _get_pool()
+
+    # Reject the call at once if the pool already has as much work as it can queue.
+    if not slots.acquire(blocking=False):
+        raise HashingPoolBusy("Password hashing queue is full")
+
+    try:
+        future = executor.submit(function, *args)
+    except BaseException:
+        slots.release()
+        raise
+
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+# Function to run a bcrypt call on the pool.
+def _run(function, *args):
+    """
+    Function to run a bcrypt call on the pool of worker processes.
+
+    The call runs inline when config.BCRYPT_POOL_SIZE is 0.
+
+    Args:
+        function (function): The function to call.
+        *args: The arguments of the function.
+
+    Returns:
+        The result of the function.
+
+    Raises:
+        HashingPoolBusy: If the queue of the pool is full or the call does not finish within config.BCRYPT_TIMEOUT seconds.
+    """
+    if not config.BCRYPT_POOL_SIZE:
+        return function(*args)
+
+    future = _submit(function, *args)
+    try:
+        return future.result(timeout=config.BCRYPT_TIMEOUT)
+    except FutureTimeoutError:
+        # Drop the call if it is still queued. A call already running keeps its slot until it finishes.
+        future.cancel()
+        raise HashingPoolBusy("Password hashing timed out")
+
+# Function to run a bcrypt call on the pool from an event loop.
+async def _run_async(function, *args):
+    """
+    Function to run a bcrypt call on the pool of worker processes and await its result, without blocking the event loop.
+
+    When config.BCRYPT_POOL_SIZE is 0, the call runs on the default thread pool of the event loop.
+
+    Args:
+        function (function): The function to call.
+        *args: The arguments of the function.
+
+    Returns:
+        The result of the function.
+
+    Raises:
+        HashingPoolBusy: If the queue of the pool is full or the call does not finish within config.BCRYPT_TIMEOUT seconds.
+    """
+    if not config.BCRYPT_POOL_SIZE:
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    future = _submit(function, *args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), config.BCRYPT_TIMEOUT)
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise HashingPoolBusy("Password hashing timed out")
+
+# Function to hash a password.
+def hash_password(password):
+    """
+    Function to hash a password with the configured cost factor, on the pool of worker processes.
+
+    Args:
+        password (str): The password to be hashed.
+
+    Returns:
+        bytes: The hashed password.
+
+    Raises:
+        HashingPoolBusy: If the pool cannot take the call.
+    """
+    started = time.perf_counter()
+    hashed_password = _run(_hash, password.encode("utf-8"), config.BCRYPT_ROUNDS)
+    bcrypt_seconds.observe(time.perf_counter() - started, "hash")
+    return hashed_password
+
+# Function to check a password.
+def check_password(password, hashed_password):
+    """
+    Function to check a password against its hash, on the pool of worker processes.
+
+    Args:
+        password (str): The password to be checked.
+        hashed_password (bytes): The stored hash of the password.
+
+    Returns:
+        bool: True if the password matches the hash.
+
+    Raises:
+        HashingPoolBusy: If the pool cannot take the call.
+    """
+    started = time.perf_counter()
+    matches = _run(_check, password.encode("utf-8"), hashed_password)
+    bcrypt_seconds.observe(time.perf_counter() - started, "check")
+    return matches
+
+# Function to check if a hash uses the configured cost factor.
+def needs_rehash(hashed_password):
+    """
+    Function to check if a stored hash was made with a cost factor other than config.BCRYPT_ROUNDS.
+
+    Args:
+        hashed_password (bytes): The stored hash, in the '$2b$<cost>$<salt+hash>' format.
+
+    Returns:
+        bool: True if the hash should be recomputed with the configured cost factor.
+    """
+    try:
+        return int(hashed_password.split(b"$")[2]) != config.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+# Function to hash a password from an event loop.
+async def hash_password_async(password):
+    """
+    Function to hash a password with the configured cost factor, awaiting the pool of worker processes.
+
+    Args:
+        password (str): The password to be hashed.
+
+    Returns:
+        bytes: The hashed password.
+
+    Raises:
+        HashingPoolBusy: If the pool cannot take the call.
+    """
+    started = time.perf_counter()
+    hashed_password = await _run_async(_hash, password.encode("utf-8"), config.BCRYPT_ROUNDS)
+    bcrypt_seconds.observe(time.perf_counter() - started, "hash")
+    return hashed_password
+
+# Function to check a password from an event loop.
+async def check_password_async(password, hashed_password):
+    """
+    Function to check a password against its hash, awaiting the pool of worker processes.
+
+    Args:
+        password (str): The password to be checked.
+        hashed_password (bytes): The stored hash of the password.
+
+    Returns:
+        bool: True if the password matches the hash.
+
+    Raises:
+        HashingPoolBusy: If the pool cannot take the call.
+    """
+    started = time.perf_counter()
+    matches = await _run_async(_check, password.encode("utf-8"), hashed_password)
+    bcrypt_seconds.observe(time.perf_counter() - started, "check")
+    return matches
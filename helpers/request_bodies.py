@@ -0,0 +1,97 @@
+# Import the necessary modules.
+#
+# Checks of the request bodies and shapes of the responses, shared by the views of both serving modes (views/*_view.py and views/async_*_view.py).
+# Only reading the body and building the response objects differ between Flask and Quart, so the validation and the messages are kept here to keep the two modes identical.
+
+# Required fields of the request bodies, with the error message of each missing field, in the order they are checked.
+USER_CREATE_FIELDS = [("email", 'Email is needed in the request.'), ("password", 'Password is needed in the request.'), ("name", 'Name is needed in the request.')]
+USER_LOGIN_FIELDS = USER_CREATE_FIELDS[:2]
+TASK_UPDATE_FIELDS = [("done", 'Status done not found in the request')]
+TASK_BULK_DELETE_FIELDS = [("taskUids", 'Task IDs not found in the request')]
+TASK_BULK_UPDATE_FIELDS = TASK_BULK_DELETE_FIELDS + TASK_UPDATE_FIELDS
+
+# Error messages of the failed logins, by result of the login controller.
+_LOGIN_ERRORS = {"Invalid Email": 'Email not found.', "Invalid Password": 'Invalid Password.'}
+# Error message of an overloaded password hashing pool, answered with a 503.
+BUSY_ERROR = 'Server is busy, please try again later.'
+# Error message of a task write whose If-Match version is not the current one, answered with a 412.
+VERSION_MISMATCH_ERROR = 'Task was modified by another request, please reload it'
+
+# Function to find the first missing field of a request body.
+def missing_field(data, fields):
+    """
+    Function to find the first required field missing from a request body.
+
+    Args:
+        data (dict): The request body.
+        fields (list): The (field, error message) of the required fields.
+
+    Returns:
+        str: The error message of the first missing field, or None if all of them are present.
+    """
+    for field, error in fields:
+        if field not in data:
+            return error
+    return None
+
+# Function to get the error message of a failed login.
+def login_error(login_attempt):
+    """
+    Function to get the error message of a failed login, answered with a 401.
+
+    Args:
+        login_attempt: The result of login_user(): the login response, or 'Invalid Email' or 'Invalid Password'.
+
+    Returns:
+        str: The error message, or None if the login succeeded.
+    """
+    if isinstance(login_attempt, str):
+        return _LOGIN_ERRORS[login_attempt]
+    return None
+
+# Function to build the task information of a task creation.
+def task_info_of(data, created_by_uid):
+    """
+    Function to build the task information passed to create_task() from the body of POST /tasks/.
+
+    Args:
+        data (dict): The request body, with the 'description' and the 'assignedToUid' of the task.
+        created_by_uid (str): The ID of the user from the token.
+
+    Returns:
+        dict: The 'description', 'assigned_to_uid' and 'created_by_uid' of the task.
+
+    Raises:
+        ValueError: If a required field is missing.
+    """
+    # Checking if required keys are in the request data
+    if 'description' not in data or 'assignedToUid' not in data:
+        raise ValueError('Error validating information')
+
+    return {'description': data['description'], 'assigned_to_uid': data['assignedToUid'], 'created_by_uid': created_by_uid}
+
+# Function to build the response body of a bulk create.
+def created_tasks_body(results):
+    """
+    Function to build the response body of a bulk create.
+
+    Args:
+        results (list): The result of each task, from create_tasks().
+
+    Returns:
+        dict: The results and the number of created tasks.
+    """
+    return {'results': results, 'inserted': sum(1 for result in results if 'id' in result)}
+
+# Function to build the response body of a bulk update.
+def updated_tasks_body(result):
+    """
+    Function to build the response body of a bulk update.
+
+    Args:
+        result (dict): The 'matched', 'modified' and 'rejected' tasks, from update_tasks().
+
+    Returns:
+        dict: The result with the number of matched and modified tasks.
+    """
+    return {**result, 'matchedCount': len(result['matched']), 'modifiedCount': len(result['modified'])}
@@ -0,0 +1,200 @@
+# Import the necessary modules.
+
+import os
+import threading
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+import app_config as config
+
+# Class representing an in-process cache of the serialized task list responses.
+class ResponseCache:
+    """
+    Class representing an in-process cache of the serialized task list responses, validated by per-user versions kept in MongoDB.
+
+    Every user has a version in the task list versions collection, bumped by the controllers with an '$inc' upsert each time a task created by or assigned to the user is written. The ETag of a task list is derived from the version of the user, so a client sending it back in If-None-Match gets a 304 after a single lookup by '_id', without the tasks being read.
+    The serialized bodies are kept in the process by (user, endpoint, version, query string) and the least recently used body is evicted first. A bumped version makes the older bodies unreachable, so they are never served again and age out of the cache.
+
+    The versions are shared by all the workers, so a write made through any worker changes the ETag seen by the others at once. Each version document gets a random epoch when it is created, part of the version, so a version document that is removed and created again never gives back an ETag that was used before.
+    A bump is made after its task write: a version read by a request always covers the writes that bumped it. If a bump fails, it is reported and the lists of the user stay at their version until the next write.
+    """
+    # Constructor
+    def __init__(self, max_size):
+        """
+        Constructor for the ResponseCache class.
+
+        Args:
+            max_size (int): The maximum number of cached bodies.
+        """
+        self.max_size = max_size
+        # Serialized bodies by key, from the least to the most recently used
+        self.__bodies = OrderedDict()
+        # Lock protecting the bodies
+        self.__lock = threading.Lock()
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    # Method to get the current version of a user.
+    def version(self, collection, user_id):
+        """
+        Method to read the current version of the task lists of a user.
+
+        Args:
+            collection (pymongo.collection.Collection): The task list versions collection.
+            user_id (str): The ID of the user.
+
+        Returns:
+            str: The version, '0' if the lists of the user were never written.
+        """
+        return _format_version(collection.find_one({"_id": str(user_id)}))
+
+    # Method to get the current version of a user with an async driver.
+    async def version_async(self, collection, user_id):
+        """
+        Method to read the current version of the task lists of a user, with an async driver. See version().
+
+        Args:
+            collection (pymongo.asynchronous.collection.AsyncCollection): The task list versions collection.
+            user_id (str): The ID of the user.
+
+        Returns:
+            str: The version.
+        """
+        return _format_version(await collection.find_one({"_id": str(user_id)}))
+
+    # Method to bump the version of users.
+    def bump(self, collection, user_ids):
+        """
+        Method to give a new version to users whose task lists have changed, in one unordered bulk write.
+
+        The task write has already succeeded, so a failure is reported and not raised: failing the request would make the client retry a write that was made.
+
+        Args:
+            collection (pymongo.collection.Collection): The task list versions collection.
+            user_ids (iterable): The IDs of the users.
+        """
+        updates = _version_updates(user_ids)
+        if not updates:
+            return
+        try:
+            collection.bulk_write(updates, ordered=False)
+        except PyMongoError as err:
+            print(f"Task list versions not updated, cached task lists may be served until the next write: {err}")
+
+    # Method to bump the version of users with an async driver.
+    async def bump_async(self, collection, user_ids):
+        """
+        Method to give a new version to users whose task lists have changed, with an async driver. See bump().
+
+        Args:
+            collection (pymongo.asynchronous.collection.AsyncCollection): The task list versions collection.
+            user_ids (iterable): The IDs of the users.
+        """
+        updates = _version_updates(user_ids)
+        if not updates:
+            return
+        try:
+            await collection.bulk_write(updates, ordered=False)
+        except PyMongoError as err:
+            print(f"Task list versions not updated, cached task lists may be served until the next write: {err}")
+
+    # Method to build the ETag of a version.
+    def etag(self, version):
+        """
+        Method to build the ETag of a version.
+
+        Args:
+            version (str): The version returned by version().
+
+        Returns:
+            str: The ETag value, without quotes.
+        """
+        return f"tasks-{version}"
+
+    # Method to get a serialized body.
+    def get(self, key):
+        """
+        Method to get a cached body.
+
+        Args:
+            key (tuple): The (user ID, endpoint, version, query string) of the response.
+
+        Returns:
+            bytes: The serialized body, or None if it is not cached.
+        """
+        with self.__lock:
+            body = self.__bodies.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+
+            self.__bodies.move_to_end(key)
+            self.hits += 1
+            return body
+
+    # Method to add a serialized body.
+    def put(self, key, body):
+        """
+        Method to cache a body, evicting the least recently used bodies if the cache is full.
+
+        Args:
+            key (tuple): The (user ID, endpoint, version, query string) of the response.
+            body (bytes): The serialized body.
+        """
+        with self.__lock:
+            self.__bodies[key] = body
+            self.__bodies.move_to_end(key)
+
+            # Evict the least recently used bodies.
+            while len(self.__bodies) > self.max_size:
+                self.__bodies.popitem(last=False)
+                self.evictions += 1
+
+    # Method to count a request answered with 304.
+    def count_not_modified(self):
+        """
+        Method to count a request answered with 304 Not Modified.
+        """
+        with self.__lock:
+            self.not_modified += 1
+
+    # Method to get the statistics of the cache.
+    def stats(self):
+        """
+        Method to get the statistics of the cache.
+
+        Returns:
+            dict: The sizes, counters and hit ratio of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {"size": len(self.__bodies), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "not_modified": self.not_modified, "evictions": self.evictions}
+
+# Function to build the version updates of users.
+def _version_updates(user_ids):
+    """
+    Function to build the '$inc' upserts giving a new version to users, one per user.
+
+    Args:
+        user_ids (iterable): The IDs of the users.
+
+    Returns:
+        list: The pymongo.UpdateOne operations.
+    """
+    return [UpdateOne({"_id": user_id}, {"$inc": {"version": 1}, "$setOnInsert": {"epoch": os.urandom(4).hex()}}, upsert=True)
+            for user_id in dict.fromkeys(str(user_id) for user_id in user_ids if user_id)]
+
+# Function to format the version of a user.
+def _format_version(document):
+    if document is None:
+        return "0"
+    return f"{document.get('epoch')}-{document.get('version')}"
+
+# Cache of the task list responses of this process.
+response_cache = ResponseCache(config.RESPONSE_CACHE_SIZE)
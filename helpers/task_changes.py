@@ -0,0 +1,230 @@
+# Import the necessary modules.
+#
+# Change tracking of the tasks, served by the /tasks/changes endpoint (delta sync).
+#
+# Every task write stamps the task with a change sequence number, 'seq': the time of the write in microseconds, made strictly increasing within the process.
+# Deleting a task writes a tombstone with the task ID, its two users and the sequence number of the deletion. Tombstones are kept config.TASK_TOMBSTONE_RETENTION seconds, then removed by scripts/compact_tombstones.py.
+# A client keeps the token of its last sync and reads the tasks and tombstones of its user with a greater sequence number, so a reconnect costs in proportion to the changes made since, not to the size of the task lists.
+#
+# Sequence numbers are read from the clock of each worker, so the task writes need no extra round trip to a shared counter.
+# A write can become visible slightly after a write with a greater sequence number, so a token never goes past the changes of the last config.TASK_CHANGES_SETTLE seconds: those are returned again by the next sync, never skipped.
+# This assumes that the clocks of the workers agree, and that the writes complete, within that delay.
+
+import math
+import threading
+import time
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+import app_config as config
+
+# Task fields holding the users of a task.
+TASK_OWNER_FIELDS = ("createdByUid", "assignedToUid")
+# Tombstone field holding the users of the deleted task.
+TOMBSTONE_OWNER_FIELDS = ("users",)
+# Order of the changes. Tasks written before change tracking have no 'seq' and come first.
+CHANGES_SORT = [("seq", 1), ("_id", 1)]
+# Token of a first sync, reading every task of the user.
+INITIAL_TOKEN = (0, None)
+
+# Exception raised when a sync token is older than the tombstones.
+class SyncTokenExpired(ValueError):
+    """Exception raised when the deletions made since a sync token may have been compacted, so the client must sync again from scratch."""
+
+# Last sequence number given by this process, and the lock protecting it.
+_last_seq = 0
+_seq_lock = threading.Lock()
+
+# Function to get new sequence numbers.
+def next_seq(count=1):
+    """
+    Function to get new change sequence numbers, greater than all the ones given before by this process.
+
+    Args:
+        count (int): The number of consecutive sequence numbers to reserve.
+
+    Returns:
+        int: The first sequence number. The next count - 1 numbers are reserved too.
+    """
+    global _last_seq
+
+    with _seq_lock:
+        first = max(time.time_ns() // 1000, _last_seq + 1)
+        _last_seq = first + count - 1
+        return first
+
+# Function to build the writes of the tombstones of deleted tasks.
+def tombstone_updates(tasks, seq):
+    """
+    Function to build the writes of the tombstones of deleted tasks.
+
+    Each tombstone is keyed by the task ID and upserted, keeping the greatest sequence number, so writing the tombstone of a task twice never fails on a duplicate key and never moves it back in the change order.
+
+    Args:
+        tasks (list): The deleted tasks, with their '_id', 'createdByUid' and 'assignedToUid' fields.
+        seq (int): The first sequence number of the deletions, one per task.
+
+    Returns:
+        list: The UpdateOne operations of the tombstones.
+    """
+    return [UpdateOne({"_id": task["_id"]},
+                      {"$max": {"seq": seq + position}, "$set": {"users": list(dict.fromkeys([str(task.get("createdByUid")), str(task.get("assignedToUid"))]))}},
+                      upsert=True)
+            for position, task in enumerate(tasks)]
+
+# Function to write the tombstones of deleted tasks.
+def write_tombstones(collection, tasks):
+    """
+    Function to write the tombstones of the tasks a delete returned, in one unordered bulk write.
+
+    The tasks have already been deleted, so a failure is reported and not raised: failing the request would make the client retry a delete that was made.
+
+    Args:
+        collection (pymongo.collection.Collection): The task tombstones collection.
+        tasks (list): The deleted tasks.
+    """
+    if not tasks:
+        return
+    try:
+        collection.bulk_write(tombstone_updates(tasks, next_seq(len(tasks))), ordered=False)
+    except PyMongoError as err:
+        print(f"Task tombstones not written, the clients must sync again from scratch to see these deletions: {err}")
+
+# Function to write the tombstones of deleted tasks with an async driver.
+async def write_tombstones_async(collection, tasks):
+    """
+    Function to write the tombstones of deleted tasks, with an async driver.
+
+    See write_tombstones().
+
+    Args:
+        collection (pymongo.asynchronous.collection.AsyncCollection): The task tombstones collection.
+        tasks (list): The deleted tasks.
+    """
+    if not tasks:
+        return
+    try:
+        await collection.bulk_write(tombstone_updates(tasks, next_seq(len(tasks))), ordered=False)
+    except PyMongoError as err:
+        print(f"Task tombstones not written, the clients must sync again from scratch to see these deletions: {err}")
+
+# Function to validate the sync token query parameter.
+def parse_since(args):
+    """
+    Function to validate the 'since' query parameter, the token returned as 'next_token' by the previous sync.
+
+    Without it, the sync reads every task of the user.
+
+    Args:
+        args (dict): The query parameters of the request.
+
+    Returns:
+        tuple: The sequence number (int) and the task ID (ObjectId or None) of the token.
+
+    Raises:
+        ValueError: If the token is invalid.
+        SyncTokenExpired: If the token is older than the retention of the tombstones.
+    """
+    since = args.get("since")
+    if not since:
+        return INITIAL_TOKEN
+
+    seq, _, last_id = since.partition(".")
+    if not seq.isdigit() or (last_id and not ObjectId.is_valid(last_id)):
+        raise ValueError("The since parameter is not a valid sync token.")
+
+    seq = int(seq)
+    if seq and seq < (time.time() - config.TASK_TOMBSTONE_RETENTION) * 1_000_000:
+        raise SyncTokenExpired("The since token is older than the retention of deleted tasks, please sync again without it.")
+
+    return seq, ObjectId(last_id) if last_id else None
+
+# Function to build the filter of the changes after a token.
+def changes_query(owner_fields, user_id, since):
+    """
+    Function to build the filter of the documents of a user changed after a token.
+
+    There is one branch per owner field, so each branch is served by an (owner, 'seq', '_id') index and the results are merged in CHANGES_SORT order.
+
+    Args:
+        owner_fields (tuple): The fields holding the users of the documents.
+        user_id (str): The ID of the user.
+        since (tuple): The sequence number and the task ID (or None) of the token.
+
+    Returns:
+        dict: The filter.
+    """
+    seq, last_id = since
+
+    if last_id is not None:
+        # The token is inside a page: continue after its task, among the changes with the same sequence number.
+        conditions = [{"seq": {"$gt": seq}}, {"seq": seq or None, "_id": {"$gt": last_id}}]
+    elif seq:
+        conditions = [{"seq": {"$gt": seq}}]
+    else:
+        conditions = [{}]
+
+    return {"$or": [{field: user_id, **condition} for field in owner_fields for condition in conditions]}
+
+# Function to build one sync response from the changed tasks and the tombstones.
+def merge_changes(tasks, deleted, limit, since):
+    """
+    Function to merge the changed tasks and the tombstones in CHANGES_SORT order, keep one page and compute the next token.
+
+    Args:
+        tasks (list): The changed tasks, in CHANGES_SORT order, at most limit + 1.
+        deleted (list): The tombstones, in CHANGES_SORT order, at most limit + 1.
+        limit (int): The maximum number of changes to return.
+        since (tuple): The token of the request.
+
+    Returns:
+        dict: The changed tasks ('changed'), the IDs of the deleted tasks ('deleted'), the token of the next sync ('next_token'), whether more changes can be read at once ('has_more'),
+            and the number of seconds to wait before the next sync when more changes are waiting but the token cannot go past them yet ('retry_after', or None).
+    """
+    changes = sorted([(task.get("seq") or 0, task["_id"], task) for task in tasks] + [(tombstone["seq"], tombstone["_id"], None) for tombstone in deleted],
+                     key=lambda change: change[:2])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # The changes up to this sequence number are all visible.
+    settled = int((time.time() - config.TASK_CHANGES_SETTLE) * 1_000_000)
+
+    if has_more and changes[-1][0] <= settled:
+        # Continue after the last change of the page.
+        token = changes[-1][:2]
+    elif settled > since[0]:
+        # Every change up to the settled sequence number was returned.
+        token = (settled, None)
+    else:
+        token = since
+
+    retry_after = None
+    if has_more and token != changes[-1][:2]:
+        # The page ends with changes that are not settled yet, so the next sync would return them again: wait until they are.
+        has_more = False
+        retry_after = max(1, math.ceil(min(changes[-1][0] - settled, config.TASK_CHANGES_SETTLE * 1_000_000) / 1_000_000))
+
+    changed = []
+    for _, _, task in changes:
+        if task is not None:
+            task.pop("seq", None)
+            changed.append(task)
+
+    return {"changed": changed, "deleted": [task_id for _, task_id, task in changes if task is None],
+            "next_token": format_token(token), "has_more": has_more, "retry_after": retry_after}
+
+# Function to format a sync token.
+def format_token(token):
+    """
+    Function to format a sync token.
+
+    Args:
+        token (tuple): The sequence number and the task ID (or None) of the token.
+
+    Returns:
+        str: The token, as '<seq>' or '<seq>.<task ID>'.
+    """
+    seq, last_id = token
+    return f"{seq}.{last_id}" if last_id is not None else str(seq)
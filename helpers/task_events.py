@@ -0,0 +1,481 @@
+# Import the necessary modules.
+#
+# Task events pushed to the clients by the /tasks/stream endpoint, as Server-Sent Events.
+#
+# The task controllers publish an event after each task write (create, update, delete) to the event hub, with the users it concerns: the creator and the assigned user of the task.
+# The hub fans each event out to the open streams of these users. Every stream has a bounded buffer: a client that falls behind is disconnected instead of growing its buffer, and resumes with Last-Event-ID.
+# The last events are kept for this resume. A client resuming from an event that is no longer kept gets a 'reset' event, telling it to read its task lists again.
+#
+# When the database supports change streams (replica sets and sharded clusters), the hub follows a change stream of the tasks and task tombstones collections instead, so the clients also get the writes made through the other worker processes.
+# The deletions are read from the tombstones, which name the users of the deleted task, so they reach the same streams as the other events. The controllers of the process then stop publishing. A standalone server or the mongomock stand-in has no change streams, and the hub keeps the events published in this process.
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+from pymongo.errors import OperationFailure
+
+from database.__init__ import conn
+from helpers.json_provider import dumps_bytes
+import app_config as config
+
+# Fields of a task sent with its 'create' event. The 'update' events only carry the changed fields.
+EVENT_TASK_FIELDS = ("_id",) + tuple(config.TASK_PROJECTION)
+# Error code of MongoDB when change streams are not supported by the deployment.
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+# Comment sent on an idle stream.
+HEARTBEAT_FRAME = b": heartbeat\n\n"
+
+# Exception raised when a process has too many open streams.
+class StreamBusy(Exception):
+    """Exception raised when the maximum number of open task streams of the process is reached."""
+
+# Function to format an event as a Server-Sent Events frame.
+def format_event(event_id, event_type, data):
+    """
+    Function to format an event as a Server-Sent Events frame.
+
+    Args:
+        event_id (str): The ID of the event, sent back by the client in Last-Event-ID when it reconnects.
+        event_type (str): The type of the event.
+        data (dict): The data of the event.
+
+    Returns:
+        bytes: The frame.
+    """
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode("ascii"), event_type.encode("ascii"), dumps_bytes(data))
+
+# Function to tell if an error means that the database has no change streams.
+def is_change_stream_missing(err):
+    """
+    Function to tell if the error of opening a change stream means that the database cannot run it.
+
+    Args:
+        err (Exception): The error of the change stream.
+
+    Returns:
+        bool: True if the server is a standalone, or a stand-in without change streams (mongomock has no watch method).
+    """
+    return isinstance(err, (NotImplementedError, TypeError)) or (isinstance(err, OperationFailure) and err.code == CHANGE_STREAM_NOT_SUPPORTED)
+
+# Function to get the data of a task event.
+def event_data(event_type, task):
+    """
+    Function to get the data of a task event.
+
+    Args:
+        event_type (str): 'create', 'update' or 'delete'.
+        task (dict): The task document.
+
+    Returns:
+        dict: The task fields of a 'create' event, the '_id', 'done' and 'version' of an 'update' event, and the '_id' of a 'delete' event.
+    """
+    if event_type == "create":
+        return {field: task.get(field) for field in EVENT_TASK_FIELDS}
+    if event_type == "update":
+        return {"_id": task["_id"], "done": task.get("done"), "version": task.get("version", 0)}
+    return {"_id": task["_id"]}
+
+# Class representing an open stream of task events.
+class Subscription:
+    """
+    Class representing an open stream of task events of one user, with a bounded buffer.
+
+    The hub adds the events from the thread of the write, the stream reads them from its request thread or from the event loop of the async serving mode.
+    If the buffer is full when an event arrives, the subscription is closed and its buffer dropped: the client reconnects and resumes from the last event it got.
+    """
+    # Constructor
+    def __init__(self, user_id, buffer_size):
+        """
+        Constructor for the Subscription class.
+
+        Args:
+            user_id (str): The ID of the user of the stream.
+            buffer_size (int): The maximum number of events waiting to be sent.
+        """
+        self.user_id = user_id
+        self.buffer_size = buffer_size
+        # Whether the subscription was closed because its client fell behind
+        self.overflowed = False
+        # Frames waiting to be sent
+        self.__frames = deque()
+        # Condition protecting the frames, notified when a frame is added
+        self.__condition = threading.Condition()
+        # Event loop and event of an async reader, set when a frame is added
+        self.__loop = None
+        self.__wakeup = None
+
+    # Method to add a frame to the buffer.
+    def push(self, frame):
+        """
+        Method to add a frame to the buffer and wake up the reader.
+
+        Args:
+            frame (bytes): The frame of the event.
+
+        Returns:
+            bool: False if the buffer was full and the subscription is now closed, True otherwise.
+        """
+        with self.__condition:
+            if self.overflowed:
+                return False
+
+            if len(self.__frames) >= self.buffer_size:
+                # Drop the buffer instead of growing it: the client resumes from its last event.
+                self.overflowed = True
+                self.__frames.clear()
+            else:
+                self.__frames.append(frame)
+
+            self.__condition.notify()
+            loop, wakeup = self.__loop, self.__wakeup
+
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # The event loop of the reader is closed, its stream is gone.
+                pass
+
+        return not self.overflowed
+
+    # Method to wait for frames.
+    def get(self, timeout):
+        """
+        Method to wait for frames, from the request thread of the synchronous serving mode.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait.
+
+        Returns:
+            list: The frames waiting to be sent, empty if none arrived in time or the subscription is closed.
+        """
+        with self.__condition:
+            if not self.__frames and not self.overflowed:
+                self.__condition.wait(timeout)
+            return self.__drain()
+
+    # Method to wait for frames in an event loop.
+    async def get_async(self, timeout):
+        """
+        Method to wait for frames, from the event loop of the async serving mode. See get().
+
+        Args:
+            timeout (float): The maximum number of seconds to wait.
+
+        Returns:
+            list: The frames waiting to be sent, empty if none arrived in time or the subscription is closed.
+        """
+        with self.__condition:
+            if self.__frames or self.overflowed:
+                return self.__drain()
+
+            # Clear the wake-up event with the lock held, so a frame added from now on sets it again.
+            if self.__wakeup is None:
+                self.__loop, self.__wakeup = asyncio.get_running_loop(), asyncio.Event()
+            self.__wakeup.clear()
+
+        try:
+            await asyncio.wait_for(self.__wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        with self.__condition:
+            return self.__drain()
+
+    # Method to take the frames of the buffer, with the lock held.
+    def __drain(self):
+        frames = list(self.__frames)
+        self.__frames.clear()
+        return frames
+
+# Class representing the hub of the task events of the process.
+class TaskEventHub:
+    """
+    Class representing the hub dispatching the task events of the process to the open streams.
+
+    Each event is serialized once, whatever the number of streams it is sent to, and is only sent to the streams of the users it concerns.
+    The last events are kept in a ring buffer to resume the streams from Last-Event-ID.
+    """
+    # Constructor
+    def __init__(self, buffer_size, replay_size, max_subscribers, backend):
+        """
+        Constructor for the TaskEventHub class.
+
+        Args:
+            buffer_size (int): The maximum number of events waiting to be sent on one stream.
+            replay_size (int): The number of recent events kept to resume the streams.
+            max_subscribers (int): The maximum number of open streams.
+            backend (str): "auto" to follow a change stream of the tasks and task tombstones collections when the database supports it, "local" to only use the events published in this process.
+        """
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.backend = backend
+        # Random ID of this process, part of the IDs of the events published here, so an event ID of another worker or of an older process never matches
+        self.__process_id = os.urandom(4).hex()
+        # Source of the sequence numbers of the events published here
+        self.__counter = itertools.count(1)
+        # Recent events, as (event ID, user IDs, frame), from the oldest
+        self.__replay = deque(maxlen=replay_size)
+        # Open subscriptions by user ID
+        self.__subscribers = {}
+        # Lock protecting the recent events and the subscriptions
+        self.__lock = threading.Lock()
+        # Whether the change stream feed was started, and whether it currently delivers the events
+        self.__feed_started = False
+        self.feed_active = False
+        # Counters
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.rejected = 0
+        self.resumed = 0
+        self.resets = 0
+
+    # Method to publish task events from the controllers.
+    def publish(self, event_type, tasks):
+        """
+        Method to publish the events of tasks written by this process.
+
+        It does nothing while the change stream feed delivers the events, as the feed gets the same writes from the database.
+
+        Args:
+            event_type (str): 'create', 'update' or 'delete'.
+            tasks (list): The task documents, with their '_id', 'createdByUid' and 'assignedToUid' fields, and the fields of event_data().
+        """
+        if self.feed_active:
+            return
+
+        for task in tasks:
+            event_id = f"{self.__process_id}-{next(self.__counter)}"
+            self.dispatch(event_id, event_type, {str(task.get("createdByUid")), str(task.get("assignedToUid"))}, event_data(event_type, task))
+
+    # Method to send an event to the streams of its users.
+    def dispatch(self, event_id, event_type, user_ids, data):
+        """
+        Method to keep an event for resumes and send it to the open streams of its users.
+
+        Args:
+            event_id (str): The ID of the event.
+            event_type (str): The type of the event.
+            user_ids (set): The IDs of the users the event concerns.
+            data (dict): The data of the event.
+        """
+        frame = format_event(event_id, event_type, data)
+
+        with self.__lock:
+            self.__replay.append((event_id, user_ids, frame))
+            self.published += 1
+            subscriptions = [subscription for user_id in user_ids for subscription in self.__subscribers.get(user_id, ())]
+
+        # Add the frame to the buffers outside of the lock. A full buffer closes its subscription.
+        subscriptions = [subscription for subscription in subscriptions if not subscription.overflowed]
+        delivered = sum(1 for subscription in subscriptions if subscription.push(frame))
+
+        with self.__lock:
+            self.delivered += delivered
+            self.overflows += len(subscriptions) - delivered
+
+    # Method to open a stream.
+    def subscribe(self, user_id, last_event_id=None):
+        """
+        Method to open a stream of the events of a user.
+
+        The subscription is registered with the lock held, so no event is lost or sent twice between the events replayed from Last-Event-ID and the new ones.
+
+        Args:
+            user_id (str): The ID of the user.
+            last_event_id (str): The ID of the last event the client got, from the Last-Event-ID header, or None for a new stream.
+
+        Returns:
+            tuple: The subscription and the frames to send first: the events after last_event_id, or a 'reset' event if they are no longer kept.
+
+        Raises:
+            StreamBusy: If the maximum number of open streams is reached.
+        """
+        self.start_feed()
+        user_id = str(user_id)
+        subscription = Subscription(user_id, self.buffer_size)
+
+        with self.__lock:
+            if sum(len(subscriptions) for subscriptions in self.__subscribers.values()) >= self.max_subscribers:
+                self.rejected += 1
+                raise StreamBusy("Too many open task streams")
+
+            self.__subscribers.setdefault(user_id, set()).add(subscription)
+
+            if not last_event_id:
+                return subscription, []
+
+            # Find the events after the last one the client got.
+            for position, (event_id, _, _) in enumerate(self.__replay):
+                if event_id == last_event_id:
+                    self.resumed += 1
+                    return subscription, [frame for _, user_ids, frame in itertools.islice(self.__replay, position + 1, None)
+                                          if user_id in user_ids]
+
+            # The events after the last one the client got are no longer kept.
+            self.resets += 1
+            last_id = self.__replay[-1][0] if self.__replay else last_event_id
+            return subscription, [format_event(last_id, "reset", {})]
+
+    # Method to close a stream.
+    def unsubscribe(self, subscription):
+        """
+        Method to close a stream.
+
+        Args:
+            subscription (Subscription): The subscription of the stream.
+        """
+        with self.__lock:
+            subscriptions = self.__subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.__subscribers[subscription.user_id]
+
+    # Method to write a stream in the synchronous serving mode.
+    def stream(self, subscription, frames):
+        """
+        Method to generate the body of a stream, from a request thread.
+
+        It sends the reconnection delay, the replayed frames and then the new events as they arrive, with a heartbeat comment when the stream is idle for config.TASK_STREAM_HEARTBEAT seconds.
+        The stream ends when its client falls behind. The subscription is closed when the client disconnects, at the latest on the next heartbeat.
+
+        Args:
+            subscription (Subscription): The subscription of the stream.
+            frames (list): The frames to send first.
+
+        Yields:
+            bytes: The chunks of the body.
+        """
+        try:
+            yield b"retry: %d\n\n" % config.TASK_STREAM_RETRY_MS + b"".join(frames)
+
+            while not subscription.overflowed:
+                frames = subscription.get(config.TASK_STREAM_HEARTBEAT)
+                if frames:
+                    yield b"".join(frames)
+                elif not subscription.overflowed:
+                    yield HEARTBEAT_FRAME
+        finally:
+            self.unsubscribe(subscription)
+
+    # Method to write a stream in the async serving mode.
+    async def stream_async(self, subscription, frames):
+        """
+        Method to generate the body of a stream, from the event loop of the async serving mode. See stream().
+
+        Args:
+            subscription (Subscription): The subscription of the stream.
+            frames (list): The frames to send first.
+
+        Yields:
+            bytes: The chunks of the body.
+        """
+        try:
+            yield b"retry: %d\n\n" % config.TASK_STREAM_RETRY_MS + b"".join(frames)
+
+            while not subscription.overflowed:
+                frames = await subscription.get_async(config.TASK_STREAM_HEARTBEAT)
+                if frames:
+                    yield b"".join(frames)
+                elif not subscription.overflowed:
+                    yield HEARTBEAT_FRAME
+        finally:
+            self.unsubscribe(subscription)
+
+    # Method to start the change stream feed.
+    def start_feed(self):
+        """
+        Method to start following the change stream of the tasks and task tombstones collections, once per process, in a background thread.
+
+        It does nothing with the "local" backend.
+        """
+        if self.backend != "auto" or self.__feed_started:
+            return
+
+        with self.__lock:
+            if self.__feed_started:
+                return
+            self.__feed_started = True
+
+        threading.Thread(target=self.__follow_changes, name="task-events", daemon=True).start()
+
+    # Method to follow the change stream of the tasks and task tombstones collections.
+    def __follow_changes(self):
+        """
+        Method to dispatch the changes of the tasks and task tombstones collections, reopening the change stream after a failure.
+
+        The events published by the controllers are used until the change stream is open, and again while it is being reopened.
+        If the database does not support change streams, the process keeps the events published by its controllers.
+        """
+        resume_token = None
+        # Changes of the tasks, and of the tombstones written for each confirmed deletion.
+        pipeline = [{"$match": {"ns.coll": {"$in": [config.CONST_TASK_COLLECTION, config.CONST_TASK_TOMBSTONE_COLLECTION]}}}]
+        while True:
+            try:
+                with conn.database.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as changes:
+                    self.feed_active = True
+                    for change in changes:
+                        resume_token = change["_id"]
+                        self.__dispatch_change(change)
+
+            except Exception as err:
+                if is_change_stream_missing(err):
+                    print("Change streams are not supported by the database, the task events of this process are used instead:", err)
+                    self.feed_active = False
+                    return
+                print("Task change stream error:", err)
+
+            # Use the events of this process until the change stream is reopened.
+            self.feed_active = False
+            time.sleep(config.TASK_EVENTS_RETRY_DELAY)
+
+    # Method to dispatch a change of the tasks or task tombstones collection.
+    def __dispatch_change(self, change):
+        """
+        Method to dispatch a change of the tasks or task tombstones collection as a task event. The ID of the event is the resume token of the change.
+
+        The deletions of the tasks collection do not say which users the task belonged to, so they are skipped: each deletion is dispatched from the tombstone the controller writes once the delete is confirmed, with the users of the task.
+
+        Args:
+            change (dict): The change event of the change stream.
+        """
+        if change.get("ns", {}).get("coll") == config.CONST_TASK_TOMBSTONE_COLLECTION:
+            # The removals of expired tombstones are not task events.
+            tombstone = change.get("fullDocument")
+            if change["operationType"] in ("insert", "update", "replace") and tombstone is not None:
+                self.dispatch(change["_id"]["_data"], "delete", set(tombstone.get("users") or ()), event_data("delete", tombstone))
+            return
+
+        event_type = {"insert": "create", "update": "update", "replace": "update"}.get(change["operationType"])
+        task = change.get("fullDocument")
+
+        # The task was deleted before its change was read. Its delete event follows, from its tombstone.
+        if event_type is None or task is None:
+            return
+
+        self.dispatch(change["_id"]["_data"], event_type, {str(task.get("createdByUid")), str(task.get("assignedToUid"))}, event_data(event_type, task))
+
+    # Method to get the statistics of the hub.
+    def stats(self):
+        """
+        Method to get the statistics of the hub.
+
+        Returns:
+            dict: The number of open streams, the source of the events and the counters of the hub.
+        """
+        with self.__lock:
+            subscribers = sum(len(subscriptions) for subscriptions in self.__subscribers.values())
+
+        return {"subscribers": subscribers, "users": len(self.__subscribers),
+                "max_subscribers": self.max_subscribers, "source": "change_stream" if self.feed_active else "local", "replay": len(self.__replay),
+                "published": self.published, "delivered": self.delivered, "overflows": self.overflows, "rejected": self.rejected,
+                "resumed": self.resumed, "resets": self.resets}
+
+# Hub of the task events of this process.
+task_events = TaskEventHub(config.TASK_STREAM_BUFFER_SIZE, config.TASK_EVENTS_REPLAY_SIZE, config.TASK_STREAM_MAX_SUBSCRIBERS, config.TASK_EVENTS_BACKEND)
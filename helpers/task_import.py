@@ -0,0 +1,465 @@
+# Import the necessary modules.
+#
+# Streaming import of tasks, served by POST /tasks/import.
+#
+# The body is NDJSON, one task per line ({"description": ..., "assignedToUid": ..., "done": ...}), optionally compressed with gzip (Content-Encoding: gzip).
+# It is read and decompressed in pieces of config.TASK_IMPORT_READ_SIZE bytes and split into lines as it arrives, so the upload is never held in memory.
+# The lines are imported in chunks of config.TASK_IMPORT_CHUNK_SIZE: the users of a chunk are resolved with one query and its tasks saved with one insert_many.
+#
+# An import with an 'import_id' keeps a checkpoint, the number of lines imported so far, updated after each chunk. Sending the same file again with the same 'import_id' skips those lines.
+# The tasks of such an import get IDs derived from the import and their line number, so a chunk saved just before an interruption, but not yet recorded by the checkpoint, is not saved twice.
+
+import hashlib
+import re
+import time
+import zlib
+from datetime import datetime, timezone
+
+from bson.objectid import ObjectId
+from werkzeug.exceptions import ClientDisconnected
+
+from helpers.task_writes import new_task_document, stamp_seq
+import app_config as config
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+# Characters allowed in an import ID.
+IMPORT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# Exception raised when the upload ends early.
+class ImportInterrupted(ValueError):
+    """Exception raised when the upload of an import ends before its end, or is not valid gzip. The complete lines read before are imported."""
+
+# Function to validate the query parameters and headers of an import.
+def parse_import_arguments(args, content_encoding):
+    """
+    Function to validate the query parameters and the Content-Encoding header of an import.
+
+    The optional 'import_id' query parameter names the import, so an interrupted import can be resumed by sending the same file with the same 'import_id'.
+
+    Args:
+        args (dict): The query parameters of the request.
+        content_encoding (str): The Content-Encoding header of the request, or None.
+
+    Returns:
+        tuple: The import ID (str or None) and whether the body is compressed with gzip (bool).
+
+    Raises:
+        ValueError: If a query parameter or the encoding is invalid.
+    """
+    for name in args:
+        if name != "import_id":
+            raise ValueError(f"Unknown query parameter {name}, expected: import_id.")
+
+    import_id = args.get("import_id")
+    if import_id is not None and not IMPORT_ID_PATTERN.match(import_id):
+        raise ValueError("The import_id parameter must be 1 to 64 letters, digits, '_', '-' or '.'.")
+
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise ValueError("The body of an import must be sent uncompressed or with Content-Encoding: gzip.")
+
+    return import_id, encoding == "gzip"
+
+# Class splitting an upload into lines.
+class LineReader:
+    """
+    Class splitting the pieces of an upload into numbered lines, decompressing them first if needed.
+
+    Only the current line is kept between two pieces. A line longer than config.TASK_IMPORT_MAX_LINE_BYTES is dropped and returned as None.
+    """
+    # Constructor
+    def __init__(self, compressed, expected_length):
+        """
+        Constructor for the LineReader class.
+
+        Args:
+            compressed (bool): Whether the upload is compressed with gzip.
+            expected_length (int): The Content-Length of the upload, or None if it is unknown.
+        """
+        # gzip decompressor (wbits 31 reads the gzip header and trailer)
+        self.decompressor = zlib.decompressobj(31) if compressed else None
+        # Number of bytes of the upload received, and number expected
+        self.received = 0
+        self.expected_length = expected_length
+        # Start of the current line, whether it is too long, and number of the last complete line
+        self.pending = b""
+        self.too_long = False
+        self.line_number = 0
+
+    # Method to read a piece of the upload.
+    def feed(self, data):
+        """
+        Method to read a piece of the upload.
+
+        Args:
+            data (bytes): The piece, as received.
+
+        Yields:
+            tuple: The number (int) and the content (bytes, or None if too long) of each line completed by the piece.
+
+        Raises:
+            ImportInterrupted: If the upload is not valid gzip.
+        """
+        self.received += len(data)
+
+        if self.decompressor is None:
+            yield from self.__split(data)
+            return
+
+        try:
+            while data:
+                # Decompress at most config.TASK_IMPORT_READ_SIZE bytes at a time, so a small upload cannot expand into a large buffer.
+                yield from self.__split(self.decompressor.decompress(data, config.TASK_IMPORT_READ_SIZE))
+
+                if self.decompressor.eof:
+                    # A gzip file can hold several members, one after the other.
+                    data = self.decompressor.unused_data
+                    if data:
+                        self.decompressor = zlib.decompressobj(31)
+                else:
+                    data = self.decompressor.unconsumed_tail
+        except zlib.error as err:
+            raise ImportInterrupted(f"The body is not valid gzip: {err}")
+
+    # Method to end the upload.
+    def finish(self):
+        """
+        Method to end the upload, returning its last line if it does not end with a newline.
+
+        The last line is only returned if the upload is known to be complete, from its Content-Length or the end of its gzip stream.
+        An uncompressed upload without Content-Length (chunked) gives no such proof, so its last line must end with a newline: otherwise it may be cut, and it is not returned.
+
+        Yields:
+            tuple: The number and the content of the last line.
+
+        Raises:
+            ImportInterrupted: If the upload is shorter than its Content-Length, its gzip stream is incomplete, or it has no Content-Length and does not end with a newline. The last partial line is not returned.
+        """
+        if self.decompressor is not None:
+            yield from self.__split(self.decompressor.flush())
+            if not self.decompressor.eof:
+                raise ImportInterrupted(f"The upload ended before the end of its gzip stream, after line {self.line_number}.")
+
+        if self.expected_length is not None and self.received < self.expected_length:
+            raise ImportInterrupted(f"The upload ended after {self.received} of {self.expected_length} bytes, after line {self.line_number}.")
+
+        if self.pending or self.too_long:
+            if self.decompressor is None and self.expected_length is None:
+                raise ImportInterrupted(f"The upload has no Content-Length and its last line does not end with a newline, after line {self.line_number}.")
+            yield self.__complete(b"")
+
+    # Method to split decompressed data into lines.
+    def __split(self, data):
+        parts = data.split(b"\n")
+        for part in parts[:-1]:
+            yield self.__complete(part)
+
+        # Keep the start of the next line, unless it is already too long.
+        if not self.too_long:
+            if len(self.pending) + len(parts[-1]) > config.TASK_IMPORT_MAX_LINE_BYTES:
+                self.pending, self.too_long = b"", True
+            else:
+                self.pending += parts[-1]
+
+    # Method to complete the current line.
+    def __complete(self, end):
+        self.line_number += 1
+        line = None if self.too_long or len(self.pending) + len(end) > config.TASK_IMPORT_MAX_LINE_BYTES else self.pending + end
+        self.pending, self.too_long = b"", False
+        return self.line_number, line
+
+# Function to read the lines of a synchronous upload.
+def read_lines(stream, reader):
+    """
+    Function to read the lines of an upload from a WSGI input stream.
+
+    Args:
+        stream (io.RawIOBase): The input stream of the request.
+        reader (LineReader): The reader of the upload.
+
+    Yields:
+        tuple: The number and the content of each line.
+
+    Raises:
+        ImportInterrupted: If the upload ends early or is not valid gzip.
+    """
+    while True:
+        try:
+            data = stream.read(config.TASK_IMPORT_READ_SIZE)
+        except ClientDisconnected:
+            data = b""
+        if not data:
+            break
+        yield from reader.feed(data)
+
+    yield from reader.finish()
+
+# Function to read the lines of an async upload.
+async def read_lines_async(body, reader):
+    """
+    Function to read the lines of an upload from the body of a Quart request. See read_lines().
+
+    Args:
+        body (quart.wrappers.request.Body): The body of the request.
+        reader (LineReader): The reader of the upload.
+
+    Yields:
+        tuple: The number and the content of each line.
+
+    Raises:
+        ImportInterrupted: If the upload ends early or is not valid gzip.
+    """
+    async for data in body:
+        for line in reader.feed(data):
+            yield line
+
+    for line in reader.finish():
+        yield line
+
+# Function to validate one line of an import.
+def parse_task_line(line):
+    """
+    Function to validate one line of an import.
+
+    Args:
+        line (bytes): The line, or None if it is too long.
+
+    Returns:
+        dict: The 'description', 'assignedToUid' and 'done' of the task, or None for a blank line.
+
+    Raises:
+        ValueError: If the line is not a valid task.
+    """
+    if line is None:
+        raise ValueError(f"The line is longer than {config.TASK_IMPORT_MAX_LINE_BYTES} bytes")
+    if not line.strip():
+        return None
+
+    try:
+        task_info = _loads(line)
+    except ValueError:
+        raise ValueError("Invalid JSON")
+
+    if not isinstance(task_info, dict) or not isinstance(task_info.get("description"), str) or "assignedToUid" not in task_info:
+        raise ValueError("Error validating information")
+    if not isinstance(task_info["assignedToUid"], str) or not ObjectId.is_valid(task_info["assignedToUid"]):
+        raise ValueError("Invalid user information")
+    if not isinstance(task_info.get("done", False), bool):
+        raise ValueError("The done field must be true or false")
+
+    return {"description": task_info["description"], "assignedToUid": task_info["assignedToUid"], "done": task_info.get("done", False)}
+
+# Function to validate a chunk of lines.
+def parse_chunk(chunk, report):
+    """
+    Function to validate a chunk of lines, recording the errors in the report.
+
+    Args:
+        chunk (list): The (number, content) of the lines.
+        report (ImportReport): The report of the import.
+
+    Returns:
+        tuple: The (number, task information) of the valid lines, and the IDs of their assigned users (set).
+    """
+    task_infos = []
+    for line_number, line in chunk:
+        try:
+            task_info = parse_task_line(line)
+        except ValueError as err:
+            report.error(line_number, str(err))
+            continue
+        if task_info is not None:
+            task_infos.append((line_number, task_info))
+
+    return task_infos, {task_info["assignedToUid"] for _, task_info in task_infos}
+
+# Function to build the tasks of a chunk.
+def build_tasks(created_by_uid, user_names, task_infos, report, checkpoint):
+    """
+    Function to build the task documents of the valid lines of a chunk.
+
+    Args:
+        created_by_uid (str): The ID of the user importing the tasks.
+        user_names (dict): The names of the users, by ID.
+        task_infos (list): The (number, task information) of the valid lines.
+        report (ImportReport): The report of the import.
+        checkpoint (dict): The checkpoint of the import, or None.
+
+    Returns:
+        tuple: The task documents, stamped with consecutive change sequence numbers, and the line number of each.
+    """
+    new_tasks = []
+    line_numbers = []
+    for line_number, task_info in task_infos:
+        # Check if the assigned user is valid.
+        if task_info["assignedToUid"] not in user_names:
+            report.error(line_number, "Invalid user information")
+            continue
+
+        new_task = new_task_document(created_by_uid, task_info["assignedToUid"], task_info["description"], user_names, done=task_info["done"])
+
+        if checkpoint is not None:
+            new_task["_id"] = import_task_id(checkpoint, line_number)
+
+        new_tasks.append(new_task)
+        line_numbers.append(line_number)
+
+    stamp_seq(new_tasks)
+    return new_tasks, line_numbers
+
+# Function to get the ID of an imported task.
+def import_task_id(checkpoint, line_number):
+    """
+    Function to get the ID of the task of a line of an import with a checkpoint.
+
+    The ID is the start time of the import, 4 bytes of a hash of the user and the import ID, and the line number, so the tasks of an import keep the order of the file and saving a line twice fails on the unique '_id'.
+
+    Args:
+        checkpoint (dict): The checkpoint of the import.
+        line_number (int): The line number.
+
+    Returns:
+        ObjectId: The ID of the task.
+    """
+    import_hash = hashlib.blake2b(checkpoint["_id"].encode("utf-8"), digest_size=4).digest()
+    return ObjectId(checkpoint["started"].to_bytes(4, "big") + import_hash + line_number.to_bytes(4, "big"))
+
+# Function to build the checkpoint of a new import.
+def new_checkpoint(user_id, import_id):
+    """
+    Function to build the fields of the checkpoint of a new import.
+
+    Args:
+        user_id (str): The ID of the user importing the tasks.
+        import_id (str): The import ID.
+
+    Returns:
+        tuple: The ID of the checkpoint (str) and the fields set when it is created (dict).
+    """
+    return f"{user_id}:{import_id}", {"user": user_id, "started": int(time.time()), "lines": 0, "imported": 0, "failed": 0}
+
+# Function to build the upsert of the checkpoint of an import.
+def checkpoint_upsert(user_id, import_id):
+    """
+    Function to build the upsert reading the checkpoint of an import, and creating it for a new import.
+
+    Args:
+        user_id (str): The ID of the user importing the tasks.
+        import_id (str): The import ID.
+
+    Returns:
+        tuple: The filter and the update of the checkpoint.
+    """
+    checkpoint_id, fields = new_checkpoint(user_id, import_id)
+    return {"_id": checkpoint_id}, {"$setOnInsert": fields, "$set": {"updatedAt": datetime.now(timezone.utc)}}
+
+# Class representing the report of an import.
+class ImportReport:
+    """
+    Class representing the report of an import: the counters, the first config.TASK_IMPORT_MAX_ERRORS errors with their line numbers, and the throughput.
+    """
+    # Constructor
+    def __init__(self, import_id, checkpoint):
+        """
+        Constructor for the ImportReport class.
+
+        Args:
+            import_id (str): The import ID, or None.
+            checkpoint (dict): The checkpoint of the import, or None. The counters continue from it.
+        """
+        self.import_id = import_id
+        # Number of lines read before this request, from the checkpoint
+        self.resumed_from = checkpoint["lines"] if checkpoint else 0
+        # Number of the last imported line, and counters of the import
+        self.lines = self.resumed_from
+        self.imported = checkpoint["imported"] if checkpoint else 0
+        self.failed = checkpoint["failed"] if checkpoint else 0
+        # Errors of the lines of this request, the number of errors left out of the report, and the reason the upload ended early
+        self.errors = []
+        self.errors_dropped = 0
+        self.interrupted = None
+        self.started = time.perf_counter()
+
+    # Method to record the error of a line.
+    def error(self, line_number, message):
+        """
+        Method to record the error of a line.
+
+        Args:
+            line_number (int): The line number, from 1.
+            message (str): The error message.
+        """
+        self.failed += 1
+        if len(self.errors) < config.TASK_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+        else:
+            self.errors_dropped += 1
+
+    # Method to get the counters saved by the checkpoint.
+    def progress(self):
+        """
+        Method to get the counters saved by the checkpoint of the import.
+
+        Returns:
+            dict: The number of the last imported line and the numbers of imported and failed lines.
+        """
+        return {"lines": self.lines, "imported": self.imported, "failed": self.failed}
+
+    # Method to record the inserts of a chunk.
+    def record_inserts(self, new_tasks, line_numbers, failed_inserts, checkpoint):
+        """
+        Method to record the outcome of the insert_many of the tasks of a chunk.
+
+        Args:
+            new_tasks (list): The task documents of the chunk.
+            line_numbers (list): The line number of each task document.
+            failed_inserts (dict): The write error of each failed insert, by position.
+            checkpoint (dict): The checkpoint of the import, or None.
+
+        Returns:
+            list: The task documents saved by this request.
+        """
+        saved_tasks = []
+        for position, new_task in enumerate(new_tasks):
+            write_error = failed_inserts.get(position)
+            if write_error is None:
+                saved_tasks.append(new_task)
+                self.imported += 1
+            elif checkpoint is not None and write_error.get("code") == 11000:
+                # The line was saved before an interruption, after the last checkpoint.
+                self.imported += 1
+            else:
+                self.error(line_numbers[position], write_error.get("errmsg", "Error saving task"))
+        return saved_tasks
+
+    # Method to get the update of the checkpoint.
+    def checkpoint_update(self):
+        """
+        Method to get the update recording the progress of the import in its checkpoint.
+
+        Returns:
+            dict: The update.
+        """
+        return {"$set": {**self.progress(), "updatedAt": datetime.now(timezone.utc)}}
+
+    # Method to get the report.
+    def summary(self):
+        """
+        Method to get the report of the import.
+
+        Returns:
+            dict: The report.
+        """
+        seconds = time.perf_counter() - self.started
+        report = {"import_id": self.import_id, "complete": self.interrupted is None, **self.progress(), "resumed_from": self.resumed_from,
+                  "errors": sorted(self.errors, key=lambda error: error["line"]), "errors_truncated": self.errors_dropped > 0,
+                  "seconds": round(seconds, 3), "lines_per_second": round((self.lines - self.resumed_from) / seconds) if seconds else 0}
+        if self.interrupted is not None:
+            report["error"] = self.interrupted
+        return report
@@ -0,0 +1,379 @@
+# Import the necessary modules.
+#
+# Full-text search over the descriptions of the tasks of a user, served by the /tasks/search endpoint.
+#
+# The search is backed by the text index of the tasks collection (see database/indexes.py).
+# The mongomock stand-in has no text search: with config.TASK_SEARCH_BACKEND = "auto", the first search failing with it switches the process to SearchIndex, an in-process inverted index of the descriptions.
+# SearchIndex only holds the tasks of the users who searched recently. The task controllers update it after each task creation and deletion, but it does not see the writes of the other workers, so the entry of a user is rebuilt from the database once it expires.
+
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+from helpers.pagination import parse_limit
+import app_config as config
+
+# Words ignored by the search, as most of them are by the English text index of MongoDB.
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it", "its", "of", "on", "or",
+    "that", "the", "this", "to", "was", "were", "will", "with",
+))
+
+# Pattern of a word of a description or of a query.
+_WORD = re.compile(r"\w+")
+
+# Share of the tasks of a user above which a term is common: the tasks containing only common terms of a query are ranked after the others.
+_COMMON_TERM_RATIO = 0.01
+
+# Error code of a $text query without a text index.
+_INDEX_NOT_FOUND = 27
+
+# Function to split a text into search terms.
+def tokenize(text):
+    """
+    Function to split a text into lowercase search terms, without stop words and one-character words.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The terms, in the order of the text and with their repetitions.
+    """
+    return [word for word in _WORD.findall(str(text).lower()) if len(word) > 1 and word not in STOP_WORDS]
+
+# Function to read and validate the search query parameters.
+def parse_search_arguments(args):
+    """
+    Function to validate the query parameters of a search.
+
+    The 'q' query parameter is the searched text. A task matches if its description contains any of its terms, and the tasks containing the most and the rarest terms come first.
+    The 'limit' query parameter is the page size (see pagination.parse_limit()), and the 'after' query parameter is the 'next_cursor' returned by the previous page.
+
+    Args:
+        args (dict): The query parameters of the request.
+
+    Returns:
+        tuple: The search terms (list), the page size (int) and the number of results to skip (int).
+
+    Raises:
+        ValueError: If a query parameter is missing or invalid.
+    """
+    query = (args.get("q") or "").strip()
+    if not query:
+        raise ValueError("The q parameter is required.")
+    if len(query) > config.TASK_SEARCH_MAX_QUERY_LENGTH:
+        raise ValueError(f"The q parameter must have at most {config.TASK_SEARCH_MAX_QUERY_LENGTH} characters.")
+
+    # Search each distinct term once.
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        raise ValueError("The q parameter has no searchable word.")
+
+    limit = parse_limit(args)
+
+    # The cursor of a ranked search is the number of results already returned.
+    after = args.get("after") or "0"
+    if not after.isdigit():
+        raise ValueError("The after parameter is not a valid cursor.")
+    offset = int(after)
+
+    # Only the first results can be paged through, so one request never ranks an unbounded number of tasks.
+    if offset >= config.TASK_SEARCH_MAX_RESULTS:
+        raise ValueError(f"Only the first {config.TASK_SEARCH_MAX_RESULTS} results of a search can be read.")
+    limit = min(limit, config.TASK_SEARCH_MAX_RESULTS - offset)
+
+    return terms, limit, offset
+
+# Function to build the filter of the tasks of a user.
+def user_tasks_query(user_id):
+    """
+    Function to build the filter of the tasks created by or assigned to a user.
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        dict: The filter.
+    """
+    return {"$or": [{"createdByUid": user_id}, {"assignedToUid": user_id}]}
+
+# Function to build the text search query.
+def text_search(user_id, terms):
+    """
+    Function to build the filter, projection and sort of a search with the text index.
+
+    The terms are searched as separate words, as by SearchIndex: the phrase and negation syntax of $search is not used.
+
+    Args:
+        user_id (str): The ID of the user.
+        terms (list): The search terms.
+
+    Returns:
+        tuple: The filter, the projection (the fields of config.TASK_PROJECTION and the 'score' of each task) and the sort.
+    """
+    score = {"$meta": "textScore"}
+    query = dict(user_tasks_query(user_id), **{"$text": {"$search": " ".join(terms)}})
+    return query, dict(config.TASK_PROJECTION, score=score), [("score", score), ("_id", ASCENDING)]
+
+# Function to tell if an error means that the server has no text search.
+def is_text_search_missing(err):
+    """
+    Function to tell if the error of a text search means that the server cannot run it.
+
+    Args:
+        err (Exception): The error of the search.
+
+    Returns:
+        bool: True if the server has no text search (mongomock) or the collection has no text index.
+    """
+    return isinstance(err, NotImplementedError) or (isinstance(err, OperationFailure) and err.code == _INDEX_NOT_FOUND)
+
+# Function to build a page of search results.
+def search_page(tasks, limit, offset):
+    """
+    Function to build a page of search results from the ranked tasks.
+
+    Args:
+        tasks (list): The tasks of the page, in rank order, with one more task if there is a next page.
+        limit (int): The page size.
+        offset (int): The number of results skipped.
+
+    Returns:
+        tuple: The tasks of the page and the cursor of the next page (str or None if this is the last page).
+    """
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        if offset + limit < config.TASK_SEARCH_MAX_RESULTS:
+            next_cursor = str(offset + limit)
+    return tasks, next_cursor
+
+# Function to put the tasks read by ID in rank order.
+def rank_tasks(ranked, tasks):
+    """
+    Function to put the tasks read for ranked results back in rank order, with their score.
+
+    Args:
+        ranked (list): The (task ID, score) results of SearchIndex.search().
+        tasks (iterable): The tasks read by ID. The tasks deleted in the meantime are missing.
+
+    Returns:
+        list: The tasks in rank order.
+    """
+    tasks_by_id = {task["_id"]: task for task in tasks}
+    page = []
+    for task_id, score in ranked:
+        task = tasks_by_id.get(task_id)
+        if task is not None:
+            task["score"] = round(score, 4)
+            page.append(task)
+    return page
+
+# Class representing the search entries of one user.
+class _UserEntry:
+    __slots__ = ("postings", "weights", "expires")
+
+    def __init__(self, expires):
+        # Weight of each term in the tasks containing it, by term then by binary task ID
+        self.postings = {}
+        # Weight of each term of each task, by binary task ID
+        self.weights = {}
+        # Expiry time of the entry
+        self.expires = expires
+
+    # Method to add or replace a task.
+    def add(self, task_id, weights):
+        key = task_id.binary
+        self.remove(task_id)
+        self.weights[key] = weights
+        for term, weight in weights.items():
+            self.postings.setdefault(term, {})[key] = weight
+
+    # Method to remove a task.
+    def remove(self, task_id):
+        key = task_id.binary
+        for term in self.weights.pop(key, {}):
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+
+# Class representing an in-process inverted index of the task descriptions.
+class SearchIndex:
+    """
+    Class representing an in-process inverted index of the descriptions of the tasks, by user.
+
+    Each user has its own postings (term to tasks), built from the tasks the user created or is assigned, so a search never reads the tasks of other users.
+    A task scores the sum, over the terms of the query it contains, of how often it contains the term relative to the length of its description, times the rarity of the term among the tasks of the user (tf-idf).
+    A search adds up the scores of the tasks over the postings of its terms, then keeps the best ones with a heap, so its cost grows with the number of tasks containing the terms.
+    When a query mixes terms found in more than _COMMON_TERM_RATIO of the tasks of the user with rarer terms, the tasks containing a rare term are ranked before the tasks only containing common terms; when all its terms are common, the tasks containing all of them come first.
+
+    Entries expire 'ttl' seconds after they were built and the number of users is bounded; the least recently used user is evicted first.
+    """
+    # Constructor
+    def __init__(self, max_users, ttl, text_search=True):
+        """
+        Constructor for the SearchIndex class.
+
+        Args:
+            max_users (int): The maximum number of users kept in the index.
+            ttl (float): The number of seconds the entry of a user stays valid.
+            text_search (bool): Whether the searches use the text index of MongoDB first.
+        """
+        self.max_users = max_users
+        self.ttl = ttl
+        self.text_search = text_search
+        # Entries by user ID, from the least to the most recently used
+        self.__users = OrderedDict()
+        # Lock protecting the entries
+        self.__lock = threading.Lock()
+        # Counters
+        self.builds = 0
+        self.evictions = 0
+
+    # Method to stop using the text index.
+    def disable_text_search(self, err):
+        """
+        Method to switch the searches of this process to the inverted index, after a text search failed.
+
+        Args:
+            err (Exception): The error of the text search.
+
+        Raises:
+            Exception: The error of the text search, if it does not mean that the server has no text search or config.TASK_SEARCH_BACKEND is not "auto".
+        """
+        if config.TASK_SEARCH_BACKEND != "auto" or not is_text_search_missing(err):
+            raise err
+        if self.text_search:
+            self.text_search = False
+            print(f"Text search is not available, /tasks/search uses the in-process index: {err}")
+
+    # Method to build the entry of a user.
+    def load(self, user_id, tasks):
+        """
+        Method to build or rebuild the entry of a user, evicting the least recently used users if the index is full.
+
+        Args:
+            user_id (str): The ID of the user.
+            tasks (iterable): All the tasks created by or assigned to the user, with their '_id' and 'description'.
+        """
+        entry = _UserEntry(time.monotonic() + self.ttl)
+        for task in tasks:
+            entry.add(task["_id"], _weights(task.get("description", "")))
+
+        with self.__lock:
+            self.__users.pop(user_id, None)
+            self.__users[user_id] = entry
+            self.builds += 1
+
+            # Evict the least recently used users.
+            while len(self.__users) > self.max_users:
+                self.__users.popitem(last=False)
+                self.evictions += 1
+
+    # Method to add tasks.
+    def add(self, tasks):
+        """
+        Method to add new tasks to the entries of their creator and of their assigned user, if they are in the index.
+
+        Args:
+            tasks (list): The tasks, with their '_id', 'createdByUid', 'assignedToUid' and 'description'.
+        """
+        with self.__lock:
+            for task in tasks:
+                for entry in self.__entries(task):
+                    entry.add(task["_id"], _weights(task.get("description", "")))
+
+    # Method to remove tasks.
+    def remove(self, tasks):
+        """
+        Method to remove deleted tasks from the entries of their creator and of their assigned user, if they are in the index.
+
+        Args:
+            tasks (list): The tasks, with their '_id', 'createdByUid' and 'assignedToUid'.
+        """
+        with self.__lock:
+            for task in tasks:
+                for entry in self.__entries(task):
+                    entry.remove(task["_id"])
+
+    # Method to search the tasks of a user.
+    def search(self, user_id, terms, count):
+        """
+        Method to rank the tasks of a user containing any of the terms.
+
+        Args:
+            user_id (str): The ID of the user.
+            terms (list): The distinct search terms.
+            count (int): The number of best results to return.
+
+        Returns:
+            list: The (task ID, score) of the best results, from the best to the worst, or None if the user is not in the index (or its entry has expired).
+        """
+        with self.__lock:
+            entry = self.__users.get(user_id)
+            if entry is None or entry.expires <= time.monotonic():
+                return None
+            self.__users.move_to_end(user_id)
+
+            # Postings of the terms of the query, with the weight of each term: the rarer the term among the tasks of the user, the higher its weight.
+            task_count = len(entry.weights)
+            postings = [(math.log(1 + task_count / len(entry.postings[term])), entry.postings[term]) for term in terms if term in entry.postings]
+            if not postings:
+                return []
+
+            # Score each task containing a term, adding the weights of the terms in the same order for every task, so equal scores stay equal.
+            scores = {}
+            for idf, term_postings in postings:
+                for key, weight in term_postings.items():
+                    scores[key] = scores.get(key, 0.0) + idf * weight
+
+            # The tasks containing the rare terms of the query, or all its terms if they are all common, come first, before the tasks only containing common terms.
+            first = ()
+            if len(postings) > 1:
+                rare_postings = [term_postings for _, term_postings in postings if len(term_postings) <= task_count * _COMMON_TERM_RATIO]
+                first = set().union(*rare_postings) if rare_postings else set(postings[0][1]).intersection(*[term_postings for _, term_postings in postings[1:]])
+
+            # Keep the best tasks, by score then by ID as the text index search.
+            best = heapq.nsmallest(count, scores.items(), key=lambda item: (item[0] not in first, -item[1], item[0]))
+
+        return [(ObjectId(key), score) for key, score in best]
+
+    # Method to get the statistics of the index.
+    def stats(self):
+        """
+        Method to get the statistics of the index.
+
+        Returns:
+            dict: The number of users and tasks in the index and the counters.
+        """
+        with self.__lock:
+            tasks = sum(len(entry.weights) for entry in self.__users.values())
+            return {"users": len(self.__users), "max_users": self.max_users, "tasks": tasks, "ttl": self.ttl,
+                    "builds": self.builds, "evictions": self.evictions, "text_search": self.text_search}
+
+    # Method to get the valid entries of the creator and of the assigned user of a task, with the lock held.
+    def __entries(self, task):
+        now = time.monotonic()
+        for user_id in {task.get("createdByUid"), task.get("assignedToUid")}:
+            entry = self.__users.get(user_id)
+            if entry is not None and entry.expires > now:
+                yield entry
+
+# Function to weight the terms of a description.
+def _weights(description):
+    terms = tokenize(description)
+    if not terms:
+        return {}
+    norm = 1 / math.sqrt(len(terms))
+    return {term: count * norm for term, count in Counter(terms).items()}
+
+# Inverted index of this process.
+search_index = SearchIndex(config.TASK_SEARCH_INDEX_MAX_USERS, config.TASK_SEARCH_INDEX_TTL, config.TASK_SEARCH_BACKEND != "memory")
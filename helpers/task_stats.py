@@ -0,0 +1,152 @@
+# Import the necessary modules.
+#
+# Per-user task counters, served by the /tasks/stats endpoint.
+#
+# Each user has one document in the task stats collection, keyed by the user ID, with the number of tasks the user created and was assigned, and how many of them are done.
+# The task controllers update the counters with '$inc' upserts after each write, so reading the stats of a user is a single lookup by '_id', whatever the number of its tasks.
+# The task write and the counter update are two separate writes: if the second one fails, the counters drift until scripts/reconcile_stats.py rebuilds them from the tasks with STATS_PIPELINE.
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+# Counter fields of a stats document.
+COUNTER_FIELDS = ("created", "createdDone", "assigned", "assignedDone")
+
+# Function to match the documents of one role in STATS_PIPELINE.
+def _role(name):
+    return {"$eq": ["$role", name]}
+
+# Aggregation pipeline computing the counters of every user from the tasks collection.
+# Each task is unwound into two documents, one for its creator and one for its assigned user, which are then grouped by user.
+STATS_PIPELINE = [
+    {"$project": {"_id": 0, "createdByUid": 1, "assignedToUid": 1, "done": 1, "role": {"$literal": ["created", "assigned"]}}},
+    {"$unwind": "$role"},
+    {"$group": {
+        "_id": {"$cond": [_role("created"), "$createdByUid", "$assignedToUid"]},
+        "created": {"$sum": {"$cond": [_role("created"), 1, 0]}},
+        "createdDone": {"$sum": {"$cond": [{"$and": [_role("created"), "$done"]}, 1, 0]}},
+        "assigned": {"$sum": {"$cond": [_role("assigned"), 1, 0]}},
+        "assignedDone": {"$sum": {"$cond": [{"$and": [_role("assigned"), "$done"]}, 1, 0]}},
+    }},
+]
+
+# Function to add a change to the counters of a user.
+def _add(deltas, user_id, field, amount):
+    if user_id:
+        counters = deltas.setdefault(str(user_id), {})
+        counters[field] = counters.get(field, 0) + amount
+
+# Function to get the counter changes of created or deleted tasks.
+def task_count_deltas(tasks, sign=1):
+    """
+    Function to get the changes of the counters when tasks are created (sign=1) or deleted (sign=-1).
+
+    Args:
+        tasks (list): The task documents, with their 'createdByUid', 'assignedToUid' and 'done' fields.
+        sign (int): 1 for created tasks, -1 for deleted tasks.
+
+    Returns:
+        dict: The changes of each counter, by user ID.
+    """
+    deltas = {}
+    for task in tasks:
+        _add(deltas, task.get("createdByUid"), "created", sign)
+        _add(deltas, task.get("assignedToUid"), "assigned", sign)
+        if task.get("done"):
+            _add(deltas, task.get("createdByUid"), "createdDone", sign)
+            _add(deltas, task.get("assignedToUid"), "assignedDone", sign)
+    return deltas
+
+# Function to get the counter changes of tasks whose status changed.
+def status_deltas(tasks, done):
+    """
+    Function to get the changes of the counters when the status of tasks changes.
+
+    Args:
+        tasks (list): The task documents whose status changed, with their 'createdByUid' and 'assignedToUid' fields.
+        done (bool): The new status of the tasks.
+
+    Returns:
+        dict: The changes of each counter, by user ID.
+    """
+    deltas = {}
+    sign = 1 if done else -1
+    for task in tasks:
+        _add(deltas, task.get("createdByUid"), "createdDone", sign)
+        _add(deltas, task.get("assignedToUid"), "assignedDone", sign)
+    return deltas
+
+# Function to build the counter updates.
+def counter_updates(deltas):
+    """
+    Function to build the '$inc' upserts applying counter changes, one per user.
+
+    Args:
+        deltas (dict): The changes of each counter, by user ID.
+
+    Returns:
+        list: The pymongo.UpdateOne operations, without the users whose counters do not change.
+    """
+    updates = []
+    for user_id, counters in deltas.items():
+        counters = {field: amount for field, amount in counters.items() if amount}
+        if counters:
+            updates.append(UpdateOne({"_id": user_id}, {"$inc": counters}, upsert=True))
+    return updates
+
+# Function to apply counter changes.
+def apply_deltas(collection, deltas):
+    """
+    Function to apply counter changes to the task stats collection, in one unordered bulk write.
+
+    The task write has already succeeded, so a failure is reported and not raised: failing the request would make the client retry a write that was made.
+
+    Args:
+        collection (pymongo.collection.Collection): The task stats collection.
+        deltas (dict): The changes of each counter, by user ID.
+    """
+    updates = counter_updates(deltas)
+    if not updates:
+        return
+    try:
+        collection.bulk_write(updates, ordered=False)
+    except PyMongoError as err:
+        print(f"Task stats not updated, run scripts/reconcile_stats.py to rebuild them: {err}")
+
+# Function to apply counter changes with an async driver.
+async def apply_deltas_async(collection, deltas):
+    """
+    Function to apply counter changes to the task stats collection, with an async driver.
+
+    See apply_deltas().
+
+    Args:
+        collection (pymongo.asynchronous.collection.AsyncCollection): The task stats collection.
+        deltas (dict): The changes of each counter, by user ID.
+    """
+    updates = counter_updates(deltas)
+    if not updates:
+        return
+    try:
+        await collection.bulk_write(updates, ordered=False)
+    except PyMongoError as err:
+        print(f"Task stats not updated, run scripts/reconcile_stats.py to rebuild them: {err}")
+
+# Function to format the stats of a user.
+def format_stats(counters):
+    """
+    Function to format the counters of a user as returned by the /tasks/stats endpoint.
+
+    Args:
+        counters (dict): The stats document of the user, or None if the user has no task.
+
+    Returns:
+        dict: The number of created and assigned tasks, each split into done and open tasks.
+    """
+    counters = counters or {}
+    stats = {}
+    for kind in ("created", "assigned"):
+        total = counters.get(kind, 0)
+        done = counters.get(kind + "Done", 0)
+        stats[kind] = {"total": total, "done": done, "open": total - done}
+    return stats
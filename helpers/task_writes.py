@@ -0,0 +1,628 @@
+# Import the necessary modules.
+#
+# Driver-independent parts of the task writes, shared by controllers/task_controller.py and controllers/async_task_controller.py.
+#
+# The validation of the requests, the task documents, the filters and updates, the classification of the outcome of each task and the side effects of a write are built here.
+# The controllers only send the reads and writes to the database, with the synchronous driver or awaiting the async one, so the two serving modes cannot drift apart.
+
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, UpdateOne
+
+from models.task_model import Task
+from helpers.response_cache import response_cache
+from helpers.task_changes import next_seq, write_tombstones, write_tombstones_async
+from helpers.task_events import task_events
+from helpers.task_search import search_index
+from helpers.task_stats import task_count_deltas, status_deltas, apply_deltas, apply_deltas_async
+import app_config as config
+
+# Field of the tasks holding the marker of the bulk update that last changed them.
+BULK_MARKER_FIELD = "bulkUpdateId"
+# Fields of the tasks read by the bulk updates and deletes.
+BULK_TASK_FIELDS = {"createdByUid": 1, "assignedToUid": 1, "done": 1, "version": 1}
+# Fields of a task returned by a single update, as it was before the update.
+UPDATED_TASK_FIELDS = {"version": 1, "createdByUid": 1, "done": 1}
+
+# Class representing the side effects of a task write.
+class TaskWriteEffects:
+    """
+    Class representing the side effects of a task write, applied once the write succeeded by apply_effects() or apply_effects_async().
+
+    The task lists of the users of the tasks get a new version, the counters of the users change by 'deltas', the search index adds or removes the tasks,
+    the streams of the users get one event per task, and deleted tasks get a tombstone.
+    """
+    # Constructor
+    def __init__(self, event_type, tasks, deltas):
+        """
+        Constructor for the TaskWriteEffects class.
+
+        Args:
+            event_type (str): 'create', 'update' or 'delete'.
+            tasks (list): The written tasks, with their '_id', 'createdByUid' and 'assignedToUid' fields, and the fields of their events.
+            deltas (dict): The changes of the counters, by user ID.
+        """
+        self.event_type = event_type
+        self.tasks = tasks
+        self.deltas = deltas
+
+    # Method to get the users whose task lists have changed.
+    def users(self):
+        """
+        Method to get the users whose task lists have changed: the creators and the assigned users of the tasks.
+
+        Returns:
+            list: The IDs of the users.
+        """
+        return [user_id for task in self.tasks for user_id in (task.get("createdByUid"), task.get("assignedToUid"))]
+
+# Function to get the side effects of created tasks.
+def created_effects(tasks):
+    """
+    Function to get the side effects of created tasks.
+
+    Args:
+        tasks (list): The saved task documents.
+
+    Returns:
+        TaskWriteEffects: The side effects.
+    """
+    return TaskWriteEffects("create", tasks, task_count_deltas(tasks))
+
+# Function to get the side effects of updated tasks.
+def updated_effects(tasks, done, changed=None):
+    """
+    Function to get the side effects of tasks whose status was set.
+
+    Args:
+        tasks (list): The updated tasks, with their new 'done' status and 'version'.
+        done (bool): The new status of the tasks.
+        changed (list): The tasks whose status changed, counted by the done counters, or None if all of them changed.
+
+    Returns:
+        TaskWriteEffects: The side effects.
+    """
+    return TaskWriteEffects("update", tasks, status_deltas(tasks if changed is None else changed, done))
+
+# Function to get the side effects of deleted tasks.
+def deleted_effects(tasks, counted=True):
+    """
+    Function to get the side effects of deleted tasks.
+
+    Args:
+        tasks (list): The deleted tasks, with their 'createdByUid', 'assignedToUid' and 'done' fields.
+        counted (bool): False if the counters must be left to scripts/reconcile_stats.py, because the request cannot tell which of the tasks it deleted itself.
+
+    Returns:
+        TaskWriteEffects: The side effects.
+    """
+    return TaskWriteEffects("delete", tasks, task_count_deltas(tasks, sign=-1) if counted else {})
+
+# Function to apply the side effects of a task write.
+def apply_effects(database, effects):
+    """
+    Function to apply the side effects of a task write.
+
+    Every step reports its own failures without raising, as the task write has already succeeded.
+
+    Args:
+        database (pymongo.database.Database): The database.
+        effects (TaskWriteEffects): The side effects.
+    """
+    if not effects.tasks:
+        return
+    response_cache.bump(database[config.CONST_TASK_LIST_VERSION_COLLECTION], effects.users())
+    apply_deltas(database[config.CONST_TASK_STATS_COLLECTION], effects.deltas)
+    _update_search_index(effects)
+    task_events.publish(effects.event_type, effects.tasks)
+    if effects.event_type == "delete":
+        write_tombstones(database[config.CONST_TASK_TOMBSTONE_COLLECTION], effects.tasks)
+
+# Function to apply the side effects of a task write with an async driver.
+async def apply_effects_async(database, effects):
+    """
+    Function to apply the side effects of a task write, with an async driver.
+
+    See apply_effects().
+
+    Args:
+        database (pymongo.asynchronous.database.AsyncDatabase): The database.
+        effects (TaskWriteEffects): The side effects.
+    """
+    if not effects.tasks:
+        return
+    await response_cache.bump_async(database[config.CONST_TASK_LIST_VERSION_COLLECTION], effects.users())
+    await apply_deltas_async(database[config.CONST_TASK_STATS_COLLECTION], effects.deltas)
+    _update_search_index(effects)
+    task_events.publish(effects.event_type, effects.tasks)
+    if effects.event_type == "delete":
+        await write_tombstones_async(database[config.CONST_TASK_TOMBSTONE_COLLECTION], effects.tasks)
+
+# Function to add or remove the written tasks in the search index.
+def _update_search_index(effects):
+    if effects.event_type == "create":
+        search_index.add(effects.tasks)
+    elif effects.event_type == "delete":
+        search_index.remove(effects.tasks)
+
+# Function to stamp tasks with change sequence numbers.
+def stamp_seq(tasks):
+    """
+    Function to stamp new task documents with consecutive change sequence numbers.
+
+    Args:
+        tasks (list): The task documents, updated in place.
+    """
+    if not tasks:
+        return
+    first_seq = next_seq(len(tasks))
+    for position, task in enumerate(tasks):
+        task["seq"] = first_seq + position
+
+# Function to build the document of a new task.
+def new_task_document(created_by_uid, assigned_to_uid, description, user_names, done=False):
+    """
+    Function to build the document of a new task.
+
+    Args:
+        created_by_uid (str): The ID of the user who creates the task.
+        assigned_to_uid (str): The ID of the user to whom the task is assigned.
+        description (str): The description of the task.
+        user_names (dict): The names of the users, by ID.
+        done (bool): The status of the task.
+
+    Returns:
+        dict: The task document, without '_id' and change sequence number.
+    """
+    new_task = Task()
+    new_task.createdByUid = created_by_uid  # Set the created by user ID
+    new_task.createdByName = user_names[created_by_uid]  # Set the created by user name
+    new_task.assignedToUid = assigned_to_uid  # Set the assigned to user ID
+    new_task.assignedToName = user_names[assigned_to_uid]  # Set the assigned to user name
+    new_task.description = description  # Set the description of the task
+    new_task.done = done  # Set the status of the task
+    return new_task.__dict__
+
+# Function to build the document of a task created by POST /tasks/.
+def build_task(task_info, users):
+    """
+    Function to build the document of a single new task.
+
+    Args:
+        task_info (dict): The 'created_by_uid', 'assigned_to_uid' and 'description' of the task.
+        users (dict): The user documents found, by ID.
+
+    Returns:
+        dict: The task document, stamped with a change sequence number.
+
+    Raises:
+        ValueError: If one of the users does not exist.
+    """
+    # Check if the user information is valid
+    if task_info['created_by_uid'] not in users or task_info['assigned_to_uid'] not in users:
+        raise ValueError('Invalid user information')
+
+    user_names = {user_id: user['name'] for user_id, user in users.items()}
+    new_task = new_task_document(task_info['created_by_uid'], task_info['assigned_to_uid'], task_info['description'], user_names)
+    stamp_seq([new_task])
+    return new_task
+
+# Function to validate a batch of new tasks.
+def check_task_batch(created_by_uid, tasks_info):
+    """
+    Function to validate the tasks of a bulk create, before their users are resolved.
+
+    Args:
+        created_by_uid (str): The ID of the user who creates the tasks.
+        tasks_info (list): A list of dictionaries containing the 'assignedToUid' and the 'description' of each task.
+
+    Returns:
+        tuple: The result of each task, in the order of the request, with the 'error' of the invalid ones, and the IDs of the users to resolve (set).
+
+    Raises:
+        ValueError: If tasks_info is not a non-empty list within the allowed size.
+    """
+    # Check that the tasks are a list within the allowed size.
+    if not isinstance(tasks_info, list) or not tasks_info:
+        raise ValueError('A non-empty list of tasks is required')
+    if len(tasks_info) > config.TASK_BULK_MAX_SIZE:
+        raise ValueError(f'A maximum of {config.TASK_BULK_MAX_SIZE} tasks can be created at once')
+
+    # Result of each task, in the order of the request.
+    results = [{'index': index} for index in range(len(tasks_info))]
+
+    # Validate each task and collect the IDs of the users to resolve.
+    user_ids = {created_by_uid}
+    for index, task_info in enumerate(tasks_info):
+        if not isinstance(task_info, dict) or 'description' not in task_info or 'assignedToUid' not in task_info:
+            results[index]['error'] = 'Error validating information'
+        elif not ObjectId.is_valid(task_info['assignedToUid']):
+            results[index]['error'] = 'Invalid user information'
+        else:
+            user_ids.add(task_info['assignedToUid'])
+
+    return results, user_ids
+
+# Function to build the documents of a batch of new tasks.
+def build_task_batch(created_by_uid, tasks_info, results, users):
+    """
+    Function to build the documents of the valid tasks of a bulk create, once their users are resolved.
+
+    Args:
+        created_by_uid (str): The ID of the user who creates the tasks.
+        tasks_info (list): The tasks of the request.
+        results (list): The result of each task, from check_task_batch(), updated in place.
+        users (dict): The user documents found, by ID.
+
+    Returns:
+        tuple: The task documents, stamped with consecutive change sequence numbers, and the index of each in the request.
+
+    Raises:
+        ValueError: If the user creating the tasks does not exist.
+    """
+    user_names = {user_id: user['name'] for user_id, user in users.items()}
+
+    # Check if the user creating the tasks is valid.
+    if created_by_uid not in user_names:
+        raise ValueError('Invalid user information')
+
+    new_tasks = []
+    positions = []
+    for index, task_info in enumerate(tasks_info):
+        if 'error' in results[index]:
+            continue
+
+        # Check if the assigned user is valid.
+        if task_info['assignedToUid'] not in user_names:
+            results[index]['error'] = 'Invalid user information'
+            continue
+
+        new_tasks.append(new_task_document(created_by_uid, task_info['assignedToUid'], task_info['description'], user_names))
+        positions.append(index)
+
+    stamp_seq(new_tasks)
+    return new_tasks, positions
+
+# Function to get the failed inserts of an insert_many.
+def insert_errors(err):
+    """
+    Function to get the failed inserts of an unordered insert_many.
+
+    Args:
+        err (BulkWriteError): The error raised by insert_many.
+
+    Returns:
+        dict: The write error of each failed insert, by position in the inserted documents.
+    """
+    return {write_error['index']: write_error for write_error in err.details.get('writeErrors', [])}
+
+# Function to record the outcome of the inserts of a bulk create.
+def record_batch(results, positions, new_tasks, failed_inserts):
+    """
+    Function to record the ID or the error of each task of a bulk create.
+
+    insert_many sets the '_id' of each document before sending it, so the IDs are known even if some inserts fail.
+
+    Args:
+        results (list): The result of each task, updated in place.
+        positions (list): The index in the request of each task document.
+        new_tasks (list): The task documents.
+        failed_inserts (dict): The write error of each failed insert, by position.
+
+    Returns:
+        list: The saved task documents.
+    """
+    saved_tasks = []
+    for position, index in enumerate(positions):
+        if position in failed_inserts:
+            results[index]['error'] = failed_inserts[position].get('errmsg', 'Error saving task')
+        else:
+            results[index]['id'] = new_tasks[position]['_id']
+            saved_tasks.append(new_tasks[position])
+    return saved_tasks
+
+# Function to build the filter of a single update or delete.
+def owner_filter(task_id, owner_field, user_id, expected_version):
+    """
+    Function to build the filter matching a task of the user and, if given, at the expected version.
+
+    Args:
+        task_id (str): The ID of the task.
+        owner_field (str): 'assignedToUid' for an update, 'createdByUid' for a delete.
+        user_id (str): The ID of the user.
+        expected_version (int): The version the task must have (from the If-Match header), or None to match any version.
+
+    Returns:
+        dict: The filter.
+    """
+    task_filter = {"_id": ObjectId(task_id), owner_field: str(user_id)}
+    if expected_version is not None:
+        task_filter["version"] = version_filter(expected_version)
+    return task_filter
+
+# Function to build the update setting the status of a task.
+def status_update(done, seq):
+    """
+    Function to build the update setting the status of a task, stamping it with a change sequence number and incrementing its version.
+
+    Args:
+        done (bool): The new status.
+        seq (int): The change sequence number.
+
+    Returns:
+        dict: The update.
+    """
+    return {"$set": {"done": done, "seq": seq}, "$inc": {"version": 1}}
+
+# Function to tell why a single update or delete did not match.
+def check_mismatch(current_task, owner_field, user_id, not_found_error, forbidden_error):
+    """
+    Function to tell why the filter of owner_filter() did not match a task.
+
+    Args:
+        current_task (dict): The task read after the write, with its owner field, or None.
+        owner_field (str): The owner field of the filter.
+        user_id (str): The ID of the user.
+        not_found_error (str): The error message of a missing task.
+        forbidden_error (str): The error message of a task of another user.
+
+    Returns:
+        str: 'Version Mismatch', as the task exists and belongs to the user, so it was modified since the client read it.
+
+    Raises:
+        ValueError: If the task does not exist or does not belong to the user.
+    """
+    if current_task is None:
+        raise ValueError(not_found_error)
+    if str(current_task[owner_field]) != str(user_id):
+        raise ValueError(forbidden_error)
+    return 'Version Mismatch'
+
+# Function to get the result and the side effects of a single update.
+def updated_task_result(updated_task, user_id, done):
+    """
+    Function to get the result and the side effects of a single update, from the task returned as it was before the update.
+
+    Args:
+        updated_task (dict): The task before the update, with the fields of UPDATED_TASK_FIELDS. Updated in place to its new status and version.
+        user_id (str): The ID of the user, to whom the task is assigned.
+        done (bool): The new status.
+
+    Returns:
+        tuple: The updated task and the TaskWriteEffects of the update. The done counters only change if the status changed.
+    """
+    changed = updated_task.get("done") != done
+    updated_task["done"] = done
+    updated_task["version"] = updated_task.get("version", 0) + 1
+
+    event_task = {**updated_task, "assignedToUid": str(user_id)}
+    return updated_task, updated_effects([event_task], done, changed=[event_task] if changed else [])
+
+# Function to check the new status of a task.
+def check_status(done):
+    """
+    Function to check that the new status of tasks is a boolean.
+
+    Args:
+        done: The status of the request.
+
+    Raises:
+        ValueError: If the status is not a boolean.
+    """
+    if not isinstance(done, bool):
+        raise ValueError('Status done must be a boolean')
+
+# Function to parse the task IDs of a bulk request.
+def parse_task_ids(task_ids, rejected):
+    """
+    Parse a list of task IDs received in a bulk request.
+
+    Duplicated IDs are ignored and invalid IDs are added to the rejected list.
+
+    Args:
+        task_ids (list): The IDs of the tasks.
+        rejected (list): The list of rejected tasks, updated in place.
+
+    Returns:
+        list: The valid task IDs as ObjectId, in the order of the request.
+
+    Raises:
+        ValueError: If task_ids is not a non-empty list within the allowed size.
+    """
+    # Check that the task IDs are a list within the allowed size.
+    if not isinstance(task_ids, list) or not task_ids:
+        raise ValueError('A non-empty list of task IDs is required')
+    if len(task_ids) > config.TASK_BULK_MAX_SIZE:
+        raise ValueError(f'A maximum of {config.TASK_BULK_MAX_SIZE} tasks can be changed at once')
+
+    object_ids = []
+    seen = set()
+    for task_id in task_ids:
+        # Reject the IDs that are not valid ObjectIds.
+        if not isinstance(task_id, str) or not ObjectId.is_valid(task_id):
+            rejected.append({'id': task_id, 'error': 'Invalid task ID'})
+        elif task_id not in seen:
+            seen.add(task_id)
+            object_ids.append(ObjectId(task_id))
+
+    return object_ids
+
+# Function to build the filter of the version of a task.
+def version_filter(expected_version):
+    """
+    Build the filter matching a task at the expected version.
+
+    Tasks created before versioning have no 'version' field and are treated as version 0.
+
+    Args:
+        expected_version (int): The version the client expects the task to have.
+
+    Returns:
+        The filter value of the 'version' field.
+    """
+    if expected_version == 0:
+        return {"$in": [0, None]}
+    return expected_version
+
+# Function to build the writes of a bulk update.
+def bulk_update_writes(object_ids, user_id, done, marker):
+    """
+    Build the writes of a bulk update.
+
+    Each filter holds the ownership rule (only the assigned user can change the status) and the change of status.
+    Each write stamps the task with a new change sequence number and with the marker of the request, from which the modified tasks are read back.
+
+    Args:
+        object_ids (list): The IDs of the tasks.
+        user_id (str): The ID of the user updating the tasks.
+        done (bool): The new status of the tasks.
+        marker (ObjectId): The marker of the request.
+
+    Returns:
+        list: The UpdateOne operations, in the order of object_ids.
+    """
+    first_seq = next_seq(len(object_ids))
+    return [UpdateOne({'_id': object_id, 'assignedToUid': user_id, 'done': {'$ne': done}},
+                      {'$set': {'done': done, 'seq': first_seq + position, BULK_MARKER_FIELD: marker}, '$inc': {'version': 1}})
+            for position, object_id in enumerate(object_ids)]
+
+# Function to build the writes of a bulk delete.
+def bulk_delete_writes(candidates, user_id):
+    """
+    Build the writes of a bulk delete.
+
+    Each filter holds the ownership rule (only the creator can delete a task) and the version of the task when it was read, so a task changed in the meantime is left in place.
+
+    Args:
+        candidates (dict): The tasks to delete, as read, by ID.
+        user_id (str): The ID of the user deleting the tasks.
+
+    Returns:
+        list: The DeleteOne operations, in the order of candidates.
+    """
+    return [DeleteOne({'_id': object_id, 'createdByUid': user_id, 'version': version_filter(task.get('version', 0))})
+            for object_id, task in candidates.items()]
+
+# Function to record the failed writes of a bulk write.
+def failed_writes(err, object_ids, rejected):
+    """
+    Record the writes of a bulk write that failed.
+
+    Args:
+        err (BulkWriteError): The error raised by the bulk write.
+        object_ids (list): The IDs of the tasks, in the order of the writes.
+        rejected (list): The list of rejected tasks, updated in place.
+
+    Returns:
+        set: The IDs of the tasks whose write failed.
+    """
+    failed = set()
+    for write_error in err.details.get('writeErrors', []):
+        object_id = object_ids[write_error['index']]
+        failed.add(object_id)
+        rejected.append({'id': object_id, 'error': write_error.get('errmsg', 'Error saving task')})
+    return failed
+
+# Function to get the outcome of a bulk update.
+def bulk_update_outcome(object_ids, current_tasks, user_id, done, marker, modified_count, failed, rejected):
+    """
+    Tell the outcome of each task of a bulk update from the tasks read back after it.
+
+    A task holding the marker of the request was modified by it. Any other task either does not exist, is not assigned to the user, or already had the status.
+
+    Args:
+        object_ids (list): The IDs of the tasks, in the order of the request.
+        current_tasks (dict): The tasks read back after the update, by ID, with the fields of BULK_TASK_FIELDS and the marker.
+        user_id (str): The ID of the user updating the tasks.
+        done (bool): The new status of the tasks.
+        marker (ObjectId): The marker of the request.
+        modified_count (int): The number of tasks modified by the bulk write.
+        failed (set): The IDs of the tasks whose write failed, already rejected.
+        rejected (list): The list of rejected tasks, updated in place.
+
+    Returns:
+        tuple: The result of the request ('matched', 'modified' and 'rejected' tasks) and the TaskWriteEffects of the modified tasks.
+    """
+    matched = []
+    modified_tasks = {}
+    for object_id in object_ids:
+        current_task = current_tasks.get(object_id)
+
+        if object_id in failed:
+            continue
+        elif current_task is None:
+            rejected.append({'id': object_id, 'error': 'Task not found'})
+        elif str(current_task['assignedToUid']) != user_id:
+            rejected.append({'id': object_id, 'error': 'Users can only change status when task is assigned to them.'})
+        else:
+            matched.append(object_id)
+            if current_task.pop(BULK_MARKER_FIELD, None) == marker:
+                modified_tasks[object_id] = current_task
+
+    if len(modified_tasks) < modified_count:
+        # Tasks modified by this request were changed again by another one before being read back.
+        print(f"Task stats of {modified_count - len(modified_tasks)} bulk updated tasks not updated, run scripts/reconcile_stats.py to rebuild them")
+
+    result = {'matched': matched, 'modified': list(modified_tasks), 'rejected': rejected}
+    return result, updated_effects(list(modified_tasks.values()), done)
+
+# Function to get the tasks a bulk delete may delete.
+def delete_candidates(object_ids, current_tasks, user_id, rejected):
+    """
+    Tell which tasks of a bulk delete the user may delete, from the tasks read before it.
+
+    Args:
+        object_ids (list): The IDs of the tasks, in the order of the request.
+        current_tasks (dict): The tasks read before the delete, by ID, with the fields of BULK_TASK_FIELDS.
+        user_id (str): The ID of the user deleting the tasks.
+        rejected (list): The list of rejected tasks, updated in place.
+
+    Returns:
+        dict: The tasks to delete, by ID, in the order of the request.
+    """
+    candidates = {}
+    for object_id in object_ids:
+        current_task = current_tasks.get(object_id)
+
+        # Check if the task exists and was created by the user.
+        if current_task is None:
+            rejected.append({'id': object_id, 'error': 'Task not found'})
+        elif str(current_task['createdByUid']) != user_id:
+            rejected.append({'id': object_id, 'error': 'Users can only delete when task is created by them.'})
+        else:
+            candidates[object_id] = current_task
+
+    return candidates
+
+# Function to get the outcome of a bulk delete.
+def bulk_delete_outcome(candidates, remaining_ids, deleted_count, failed, rejected):
+    """
+    Tell the outcome of each candidate of a bulk delete.
+
+    A candidate still in the database was changed by another request after it was read, and is left in place.
+    If fewer tasks were deleted than are gone, another request deleted some of the same tasks: a bulk write does not tell which ones each request deleted, so the counters are left to scripts/reconcile_stats.py.
+
+    Args:
+        candidates (dict): The tasks to delete, as read, by ID.
+        remaining_ids (set): The IDs of the candidates still in the database after the delete.
+        deleted_count (int): The number of tasks deleted by the bulk write.
+        failed (set): The IDs of the tasks whose write failed, already rejected.
+        rejected (list): The list of rejected tasks, updated in place.
+
+    Returns:
+        tuple: The result of the request ('deleted' and 'rejected' tasks, and 'tasksAffected') and the TaskWriteEffects of the deleted tasks.
+    """
+    deleted_tasks = {}
+    for object_id, task in candidates.items():
+        if object_id in failed:
+            continue
+        elif object_id in remaining_ids:
+            rejected.append({'id': object_id, 'error': 'Task was changed by another request.'})
+        else:
+            deleted_tasks[object_id] = task
+
+    counted = len(deleted_tasks) == deleted_count
+    if not counted:
+        print(f"Task stats of {len(deleted_tasks)} bulk deleted tasks not updated, run scripts/reconcile_stats.py to rebuild them")
+
+    result = {'deleted': list(deleted_tasks), 'rejected': rejected, 'tasksAffected': deleted_count}
+    return result, deleted_effects(list(deleted_tasks.values()), counted=counted)
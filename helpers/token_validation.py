@@ -1,48 +1,218 @@
 # Import the necessary modules.
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
 import jwt # Import the jwt module. # pip install pyjwt
-from flask import request # Import Flask modules
-import app_config as config 
+from flask import request, g, jsonify # Import Flask modules
+from helpers.metrics import jwt_validation_seconds # Import the histogram of the JWT validations
+import app_config as config
+
+# Class representing a size-bounded LRU cache of verified token claims.
+class ClaimsCache:
+    """
+    Class representing a size-bounded LRU cache of verified token claims.
+
+    The cache is keyed by the SHA-256 hash of the token, so the tokens themselves are never kept in memory. An entry is dropped when its 'exp' claim has passed.
+    """
+    # Constructor
+    def __init__(self, max_size):
+        """
+        Constructor for the ClaimsCache class.
+
+        Args:
+            max_size (int): The maximum number of tokens kept in the cache. The least recently used token is evicted first.
+        """
+        # Maximum number of entries
+        self.max_size = max_size
+        # Cached claims, ordered from the least to the most recently used
+        self.__entries = OrderedDict()
+        # Lock protecting the entries, as requests are served by several threads
+        self.__lock = threading.Lock()
+        # Number of lookups served from the cache
+        self.hits = 0
+        # Number of lookups that had to decode the token
+        self.misses = 0
+
+    # Method to get the claims of a token.
+    def get(self, key):
+        """
+        Method to get the claims of a token.
+
+        Args:
+            key (str): The hash of the token.
+
+        Returns:
+            dict: The claims of the token, or None if the token is not cached or has expired.
+        """
+        with self.__lock:
+            claims = self.__entries.get(key)
+
+            if claims is None:
+                self.misses += 1
+                return None
+
+            # Drop the entry if the token has expired.
+            if "exp" in claims and claims["exp"] <= time.time():
+                del self.__entries[key]
+                self.misses += 1
+                return None
+
+            # Mark the entry as the most recently used.
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    # Method to add the claims of a token.
+    def put(self, key, claims):
+        """
+        Method to add the claims of a verified token, evicting the least recently used token if the cache is full.
+
+        Args:
+            key (str): The hash of the token.
+            claims (dict): The claims of the token.
+        """
+        with self.__lock:
+            self.__entries[key] = claims
+            self.__entries.move_to_end(key)
+
+            # Evict the least recently used entries.
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    # Method to get the statistics of the cache.
+    def stats(self):
+        """
+        Method to get the statistics of the cache.
+
+        Returns:
+            dict: The size, maximum size, hits and misses of the cache.
+        """
+        return {"size": len(self.__entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+# Cache of the claims of the verified tokens.
+claims_cache = ClaimsCache(config.JWT_CACHE_SIZE)
 
 # Function to valid the token and exact and return the user information from the token.
 def validate_jwt():
     """
     Function to validate the token and extract and return the user information from the token.
-    
+
     This function checks if the token is present in the request headers. If the token is missing it returns 400. If the token is invalid, it returns 401. If the token is expired, it returns 401.
-    
+
+    See decode_token().
+
     Returns:
         The user information extracted from the token if the token is valid.
         Otherwise, returns 400, 401, or None.
     """
-    
+
     # Initialize variables
     token = None
-    user_information = None
-    
+
     try:
-        
+
         # Check if the token is present in the request headers
         if 'x-access-token' in request.headers:
             token = request.headers['x-access-token']
-        
-        # If the token is missing, return 400
-        if not token:
-            return 400 
-        
+
+        # Validate the token
+        return decode_token(token)
+
+    except jwt.ExpiredSignatureError:
+        # If the token is expired, return 401
+        return 401
+    except:
+        # If there is an error, return 400
+        return 400
+
+# Function to validate a token and return its user information.
+def decode_token(token):
+    """
+    Function to validate a token and return the user information from the token.
+
+    Verified tokens are cached until they expire, so a token sent again only costs a dictionary lookup instead of a signature check.
+
+    Args:
+        token (str): The token sent by the client, or None.
+
+    Returns:
+        The user information extracted from the token if the token is valid.
+        Otherwise, returns 400 if the token is missing or 401 if it is invalid or expired.
+    """
+    # Initialize variables
+    user_information = None
+    started = time.perf_counter()
+
+    # If the token is missing, return 400
+    if not token:
+        jwt_validation_seconds.observe(time.perf_counter() - started, "missing")
+        return 400
+
+    try:
+        # Return the cached user information if the token was already verified
+        token_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        user_information = claims_cache.get(token_key)
+        if user_information is not None:
+            jwt_validation_seconds.observe(time.perf_counter() - started, "cached")
+            return dict(user_information)
+
         try:
             # Decode the token and extract the user information
             user_information = jwt.decode(token, config.TOKEN_SECRET, algorithms = ["HS256"])
         except Exception:
             # If the token is invalid, return 401
+            jwt_validation_seconds.observe(time.perf_counter() - started, "invalid")
             return 401
-        
+
+        # Cache the verified user information
+        claims_cache.put(token_key, user_information)
+
         # Return the user information
-        return user_information
+        jwt_validation_seconds.observe(time.perf_counter() - started, "verified")
+        return dict(user_information)
 
-    except jwt.ExpiredSignatureError:
-        # If the token is expired, return 401
-        return 401
     except:
         # If there is an error, return 400
+        jwt_validation_seconds.observe(time.perf_counter() - started, "missing")
         return 400
+
+# Function to create a before_request hook that authenticates the requests of a blueprint.
+def require_jwt(missing_status, missing_message, invalid_status, invalid_message, public_endpoints=()):
+    """
+    Function to create a before_request hook that authenticates the requests of a blueprint.
+
+    The hook validates the token of the request and stores the user information in flask.g.user_information for the view. If the token is missing or invalid, the request is answered by the hook and the view is not called.
+
+    Args:
+        missing_status (int): The HTTP status code returned if the token is missing.
+        missing_message (str): The error message returned if the token is missing.
+        invalid_status (int): The HTTP status code returned if the token is invalid or expired.
+        invalid_message (str): The error message returned if the token is invalid or expired.
+        public_endpoints (iterable): The endpoints of the blueprint that do not require a token.
+
+    Returns:
+        function: The before_request hook.
+    """
+    public_endpoints = frozenset(public_endpoints)
+
+    def authenticate():
+        # Skip the endpoints that do not require a token
+        if request.endpoint in public_endpoints:
+            return None
+
+        # Validate the JWT token
+        user_information = validate_jwt()
+
+        if user_information == 400:
+            return jsonify({"error": missing_message}), missing_status
+        if user_information == 401:
+            return jsonify({"error": invalid_message}), invalid_status
+
+        # Make the user information available to the view
+        g.user_information = user_information
+        return None
+
+    return authenticate
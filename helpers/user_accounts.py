@@ -0,0 +1,159 @@
+# Import the necessary modules.
+#
+# Driver-independent parts of the user controllers, shared by controllers/user_controller.py and controllers/async_user_controller.py.
+#
+# The user documents, the login response, the filters and the choice between the user cache and the database are built here, so the controllers only send the reads and writes to the database.
+
+from datetime import datetime, timedelta
+
+import jwt # pip install pyjwt
+from bson.objectid import ObjectId
+
+from models.user_model import User
+from helpers.user_cache import user_cache
+import app_config as config
+
+# Fields of the users read by an export.
+USER_EXPORT_PROJECTION = {"email": 1, "name": 1}
+
+# Function to build the document of a new user.
+def new_user_document(user_information, hashed_password):
+    """
+    Function to build the document of a new user.
+
+    Args:
+        user_information (dict): The 'name' and 'email' of the user.
+        hashed_password (bytes): The hash of the password of the user.
+
+    Returns:
+        dict: The user document, without '_id'.
+    """
+    new_user = User()
+    new_user.name = user_information["name"]
+    new_user.email = user_information["email"]
+    new_user.password = hashed_password
+    return new_user.__dict__
+
+# Function to cache a new user.
+def cache_new_user(new_user):
+    """
+    Function to cache a user once it is saved, and drop the cached list of all users.
+
+    Args:
+        new_user (dict): The user document, with the '_id' set by insert_one.
+    """
+    user_cache.put(new_user)
+    user_cache.invalidate_all()
+
+# Function to build the response of a successful login.
+def login_response(current_user):
+    """
+    Create the JWT token of a user whose credentials were checked.
+
+    Args:
+        current_user (dict): The user document from the database.
+
+    Returns:
+        dict: A dictionary containing the JWT token, expiration time, and logged user information.
+    """
+    # Create a dictionary with the logged user information
+    logged_user = {}
+    logged_user['id'] = str(current_user['_id'])
+    logged_user['email'] = current_user['email']
+    logged_user['name'] = current_user['name']
+
+    # Calculate the expiration time for the JWT token
+    expiration = datetime.utcnow() + timedelta(seconds = config.JWT_EXPIRATION)
+
+    # Create the JWT token data
+    jwt_data = {'email': logged_user['email'], 'id': logged_user['id'], 'exp': expiration}
+
+    # Encode the JWT token with the secret key
+    jwt_to_return = jwt.encode(payload=jwt_data, key=config.TOKEN_SECRET)
+
+    # Return the JWT token, expiration time, and logged user information
+    return {'token': jwt_to_return, 'expiration': config.JWT_EXPIRATION, 'logged_user': logged_user}
+
+# Function to build the write replacing the password hash of a user.
+def rehash_update(current_user, new_password):
+    """
+    Function to build the write replacing a password hash made with another cost factor.
+
+    The filter holds the old hash, so a password changed in the meantime is not overwritten.
+
+    Args:
+        current_user (dict): The user document, with its old hash.
+        new_password (bytes): The new hash of the password.
+
+    Returns:
+        tuple: The filter and the update.
+    """
+    return {'_id': current_user['_id'], 'password': current_user['password']}, {'$set': {'password': new_password}}
+
+# Function to split users into cached and missing ones.
+def cached_users(user_ids):
+    """
+    Function to take users from the user cache.
+
+    Args:
+        user_ids (iterable): The IDs of the users (str).
+
+    Returns:
+        tuple: The cached user documents by ID, and the IDs of the users missing from the cache (ObjectId), to read with a single '$in' query.
+
+    Raises:
+        bson.errors.InvalidId: If an ID is not a valid ObjectId.
+    """
+    users = {}
+    missing_ids = []
+    for user_id in set(user_ids):
+        user = user_cache.get_by_id(user_id)
+        if user is None:
+            missing_ids.append(ObjectId(user_id))
+        else:
+            users[user_id] = user
+    return users, missing_ids
+
+# Function to add the users read from the database.
+def add_read_user(users, user):
+    """
+    Function to cache a user read from the database and add it to the users found.
+
+    Args:
+        users (dict): The user documents found, by ID, updated in place.
+        user (dict): The user document.
+    """
+    user_cache.put(user)
+    users[str(user['_id'])] = user
+
+# Function to tell if a users list can come from the user cache.
+def is_cached_list(sort, projection):
+    """
+    Function to tell if a users list is the full list in storage order, kept in the user cache.
+
+    Args:
+        sort (list): The (field, direction) sort of the users, or None for the storage order.
+        projection (dict): The fields to return.
+
+    Returns:
+        bool: True if the list can be taken from and kept in the user cache.
+    """
+    return sort is None and projection is config.USER_LIST_PROJECTION
+
+# Function to build the aggregation pipeline of a users list.
+def user_list_pipeline(sort, projection):
+    """
+    Function to build the aggregation pipeline of a users list.
+
+    The sort comes first so the database reads the users in the order of the index serving it.
+
+    Args:
+        sort (list): The (field, direction) sort of the users, or None for the storage order.
+        projection (dict): The fields to return.
+
+    Returns:
+        list: The stages of the pipeline.
+    """
+    pipeline = [{"$sort": dict(sort)}] if sort else []
+    pipeline.append({"$project": projection})
+    return pipeline
@@ -0,0 +1,196 @@
+# Import the necessary modules.
+
+import threading
+import time
+from collections import OrderedDict
+
+import app_config as config
+
+# Class representing an in-process cache of user documents.
+class UserCache:
+    """
+    Class representing an in-process cache of user documents, keyed by ID and by email.
+
+    Entries expire 'ttl' seconds after they were added and the number of entries is bounded; the least recently used user is evicted first.
+    The cache also keeps the list returned by fetch_all_users, under the same TTL.
+
+    The cache is local to the process: a change made by another worker is seen here once the entry expires.
+    """
+    # Constructor
+    def __init__(self, max_size, ttl):
+        """
+        Constructor for the UserCache class.
+
+        Args:
+            max_size (int): The maximum number of cached users.
+            ttl (float): The number of seconds an entry stays valid.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        # Cached users by ID, as (user, expiry time), from the least to the most recently used
+        self.__users = OrderedDict()
+        # IDs of the cached users by email
+        self.__ids_by_email = {}
+        # Cached list of all the users, as (users, expiry time)
+        self.__all_users = None
+        # Lock protecting the entries
+        self.__lock = threading.Lock()
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # Method to get a user by ID.
+    def get_by_id(self, user_id):
+        """
+        Method to get a cached user by ID.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            dict: The user document, or None if the user is not cached or its entry has expired.
+        """
+        with self.__lock:
+            return self.__get(user_id)
+
+    # Method to get a user by email.
+    def get_by_email(self, email):
+        """
+        Method to get a cached user by email.
+
+        Args:
+            email (str): The email of the user.
+
+        Returns:
+            dict: The user document, or None if the user is not cached or its entry has expired.
+        """
+        with self.__lock:
+            user_id = self.__ids_by_email.get(email)
+            if user_id is None:
+                self.misses += 1
+                return None
+            return self.__get(user_id)
+
+    # Method to add a user.
+    def put(self, user):
+        """
+        Method to add or replace a user, evicting the least recently used users if the cache is full.
+
+        Args:
+            user (dict): The user document, with its '_id' and 'email'.
+        """
+        user_id = str(user["_id"])
+
+        with self.__lock:
+            self.__remove(user_id)
+            self.__users[user_id] = (user, time.monotonic() + self.ttl)
+            self.__ids_by_email[user["email"]] = user_id
+
+            # Evict the least recently used users.
+            while len(self.__users) > self.max_size:
+                evicted_id, (evicted_user, _) = self.__users.popitem(last=False)
+                self.__forget_email(evicted_id, evicted_user)
+                self.evictions += 1
+
+    # Method to remove a user.
+    def invalidate(self, user_id):
+        """
+        Method to remove a user from the cache.
+
+        Args:
+            user_id (str): The ID of the user.
+        """
+        with self.__lock:
+            self.__remove(str(user_id))
+
+    # Method to get the list of all the users.
+    def get_all(self):
+        """
+        Method to get the cached list of all the users.
+
+        Returns:
+            list: The list returned by fetch_all_users, or None if it is not cached or has expired.
+        """
+        with self.__lock:
+            if self.__all_users is None or self.__all_users[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self.__all_users[0]
+
+    # Method to set the list of all the users.
+    def put_all(self, users):
+        """
+        Method to cache the list of all the users.
+
+        Args:
+            users (list): The list returned by fetch_all_users.
+        """
+        with self.__lock:
+            self.__all_users = (users, time.monotonic() + self.ttl)
+
+    # Method to drop the list of all the users.
+    def invalidate_all(self):
+        """
+        Method to drop the cached list of all the users, for example when a user is created.
+        """
+        with self.__lock:
+            self.__all_users = None
+
+    # Method to drop every entry.
+    def clear(self):
+        """
+        Method to drop every cached user and the cached list of all the users.
+        """
+        with self.__lock:
+            self.__users.clear()
+            self.__ids_by_email.clear()
+            self.__all_users = None
+
+    # Method to get the statistics of the cache.
+    def stats(self):
+        """
+        Method to get the statistics of the cache.
+
+        Returns:
+            dict: The size, counters and hit ratio of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {"size": len(self.__users), "max_size": self.max_size, "ttl": self.ttl, "hits": self.hits, "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0, "evictions": self.evictions, "expirations": self.expirations}
+
+    # Method to get a user by ID, with the lock held.
+    def __get(self, user_id):
+        entry = self.__users.get(user_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        # Drop the entry if it has expired.
+        if entry[1] <= time.monotonic():
+            self.__remove(user_id)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        # Mark the entry as the most recently used.
+        self.__users.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    # Method to remove a user, with the lock held.
+    def __remove(self, user_id):
+        entry = self.__users.pop(user_id, None)
+        if entry is not None:
+            self.__forget_email(user_id, entry[0])
+
+    # Method to remove the email of a user from the email index, with the lock held.
+    def __forget_email(self, user_id, user):
+        if self.__ids_by_email.get(user.get("email")) == user_id:
+            del self.__ids_by_email[user["email"]]
+
+# Cache of the users of this process.
+user_cache = UserCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
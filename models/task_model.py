@@ -7,7 +7,7 @@ class Task:
         """
         Constructor for the Task class.
 
-        Initializes the instance variables createdByUid, createdByName, assignedToUid, assignedToName, description and done to empty strings and False respectively.
+        Initializes the instance variables createdByUid, createdByName, assignedToUid, assignedToName, description, done, version and seq to empty strings, False and 0 respectively.
         """
         # UID of the user who created the task
         self.createdByUid = ""
@@ -21,13 +21,17 @@ class Task:
         self.description = ""
         # Flag indicating if the task is done or not
         self.done = False
+        # Version of the task, incremented on every change. Exposed to clients as the ETag of the task.
+        self.version = 0
+        # Sequence number of the last change of the task, set by the controllers on every write. Used by the delta sync of /tasks/changes.
+        self.seq = 0
     
     # Method to display detail about the task.
     def displayDetail(self):
         """
         Method to display detail about the task.
 
-        This method prints the createdByUid, createdByName, assignedToUid, assignedToName, description and done of the task.
+        This method prints the createdByUid, createdByName, assignedToUid, assignedToName, description, done, version and seq of the task.
         """
         # Print the createdByUid of the task
         print(f"\nCreated by ID = {self.createdByUid}")
@@ -45,7 +49,13 @@ class Task:
         print(f"Description = {self.description}")
         
         # Print the done status of the task
-        print(f"Done = {self.done}\n")
+        print(f"Done = {self.done}")
+        
+        # Print the version of the task
+        print(f"Version = {self.version}")
+
+        # Print the change sequence number of the task
+        print(f"Sequence = {self.seq}\n")
 
 
 # Object example 
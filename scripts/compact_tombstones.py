@@ -0,0 +1,59 @@
+# Compaction job of the tombstones of deleted tasks, read by /tasks/changes.
+#
+# Usage (from the project root directory):
+#   python scripts/compact_tombstones.py --dry-run
+#   python scripts/compact_tombstones.py
+#   python scripts/compact_tombstones.py --retention 604800
+#
+# It removes the tombstones older than the retention (config.TASK_TOMBSTONE_RETENTION seconds by default), in batches, walking the 'seq' index of the tombstones collection.
+# A sync token older than config.TASK_TOMBSTONE_RETENTION is refused by /tasks/changes with a 410, so the removed tombstones are never needed again.
+# Run it periodically, such as once a day. With a retention shorter than config.TASK_TOMBSTONE_RETENTION, clients with older tokens miss deletions: lower the setting first.
+
+import argparse
+import os
+import sys
+import time
+
+# Make the project modules importable when the script is run from the project root directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_config as config
+
+def main():
+    """
+    Remove the tombstones older than the retention.
+    """
+    parser = argparse.ArgumentParser(description="Remove the tombstones of deleted tasks older than the retention of /tasks/changes.")
+    parser.add_argument("--dry-run", action="store_true", help="only count the tombstones to remove")
+    parser.add_argument("--retention", type=int, default=config.TASK_TOMBSTONE_RETENTION, help="number of seconds the tombstones are kept")
+    parser.add_argument("--batch-size", type=int, default=10000, help="number of tombstones removed by each delete")
+    arguments = parser.parse_args()
+
+    from database.__init__ import conn
+
+    tombstone_collection = conn.database[config.CONST_TASK_TOMBSTONE_COLLECTION]
+    started = time.perf_counter()
+
+    # Tombstones are stamped with the time of the deletion in microseconds.
+    horizon = int((time.time() - arguments.retention) * 1_000_000)
+    expired = {"seq": {"$lt": horizon}}
+
+    try:
+        if arguments.dry_run:
+            print(f"{tombstone_collection.count_documents(expired)} tombstones older than {arguments.retention} s")
+            return
+
+        # Remove the tombstones in batches, so each delete holds the collection for a bounded time.
+        removed = 0
+        while True:
+            batch = [tombstone["_id"] for tombstone in tombstone_collection.find(expired, {"_id": 1}).sort("seq", 1).limit(arguments.batch_size)]
+            if not batch:
+                break
+            removed += tombstone_collection.delete_many({"_id": {"$in": batch}}).deleted_count
+    finally:
+        conn.close()
+
+    print(f"{removed} tombstones older than {arguments.retention} s removed in {time.perf_counter() - started:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Reconciliation job of the per-user task counters of /tasks/stats.
+#
+# Usage (from the project root directory):
+#   python scripts/reconcile_stats.py --dry-run
+#   python scripts/reconcile_stats.py
+#
+# It recomputes the counters of every user from the tasks collection with one aggregation pipeline (helpers.task_stats.STATS_PIPELINE), compares them with the task stats collection and reports the drift.
+# Unless --dry-run is given, it then rewrites the counters of the drifted users, and removes the counters of the users without tasks.
+# With --dry-run, it exits with status 1 if any counter drifted, so it can run as a periodic check.
+#
+# The task writes made while the job runs can be counted twice or missed by the rewritten counters. Run it when the traffic is low; the next run reports any remaining drift.
+
+import argparse
+import os
+import sys
+import time
+
+from pymongo import DeleteOne, ReplaceOne
+
+# Make the project modules importable when the script is run from the project root directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_config as config
+from helpers.task_stats import COUNTER_FIELDS, STATS_PIPELINE
+
+# Function to compare the counters.
+def find_drift(expected_counters, stored_counters):
+    """
+    Function to compare the counters computed from the tasks with the stored counters.
+
+    Args:
+        expected_counters (iterable): The counters computed by STATS_PIPELINE, one document per user.
+        stored_counters (dict): The stored counters, by user ID. The entries are removed as they are compared.
+
+    Yields:
+        tuple: (user ID, expected counters or None if the user has no task, stored counters or None) for each drifted user.
+    """
+    for expected in expected_counters:
+        user_id = expected.pop("_id")
+        expected = {field: expected.get(field, 0) for field in COUNTER_FIELDS}
+        stored = stored_counters.pop(user_id, None)
+        if stored is None or any(stored.get(field, 0) != expected[field] for field in COUNTER_FIELDS):
+            yield user_id, expected, stored
+
+    # The remaining stored counters belong to users without tasks: they should all be 0.
+    for user_id, stored in stored_counters.items():
+        if any(stored.get(field, 0) for field in COUNTER_FIELDS):
+            yield user_id, None, stored
+
+def main():
+    """
+    Recompute the task counters, report the drift and fix it.
+    """
+    parser = argparse.ArgumentParser(description="Rebuild the per-user task counters of /tasks/stats from the tasks and report the drift.")
+    parser.add_argument("--dry-run", action="store_true", help="only report the drift, and exit with status 1 if there is any")
+    parser.add_argument("--batch-size", type=int, default=1000, help="number of counters rewritten by each bulk write")
+    parser.add_argument("--show", type=int, default=10, help="number of drifted users to print")
+    arguments = parser.parse_args()
+
+    from database.__init__ import conn
+
+    database = conn.database
+    stats_collection = database[config.CONST_TASK_STATS_COLLECTION]
+    started = time.perf_counter()
+
+    try:
+        # Read the stored counters, then compute the expected ones in one pass over the tasks.
+        stored_counters = {document.pop("_id"): document for document in stats_collection.find()}
+        stored_users = len(stored_counters)
+        expected_counters = database[config.CONST_TASK_COLLECTION].aggregate(STATS_PIPELINE, allowDiskUse=True)
+
+        drifted = 0
+        drift_totals = dict.fromkeys(COUNTER_FIELDS, 0)
+        writes = []
+        for user_id, expected, stored in find_drift(expected_counters, stored_counters):
+            drifted += 1
+            for field in COUNTER_FIELDS:
+                drift_totals[field] += ((stored or {}).get(field, 0)) - ((expected or {}).get(field, 0))
+            if drifted <= arguments.show:
+                print(f"  {user_id}: stored {stored}, expected {expected}")
+
+            if not arguments.dry_run:
+                writes.append(DeleteOne({"_id": user_id}) if expected is None else ReplaceOne({"_id": user_id}, expected, upsert=True))
+                if len(writes) >= arguments.batch_size:
+                    stats_collection.bulk_write(writes, ordered=False)
+                    writes = []
+
+        if writes:
+            stats_collection.bulk_write(writes, ordered=False)
+    finally:
+        conn.close()
+
+    print(f"{stored_users} stored counters checked in {time.perf_counter() - started:.1f} s")
+    print(f"{drifted} users drifted; stored minus expected: {drift_totals}")
+    if drifted and arguments.dry_run:
+        raise SystemExit(1)
+    if drifted:
+        print(f"{drifted} counters rewritten")
+
+if __name__ == "__main__":
+    main()
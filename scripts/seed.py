@@ -0,0 +1,311 @@
+# Synthetic dataset generator and bulk seeder.
+#
+# Usage (from the project root directory):
+#   python scripts/seed.py --users 1000000 --tasks 50000000 --drop
+#   python scripts/seed.py --users 1000 --tasks 50000 --done-ratio 0.5 --assignee-skew 1.5 --seed 7
+#
+# It writes the users and tasks directly to the configured database (app_config.CONST_MONGO_URL and CONST_DATABASE) with batched, unordered insert_many calls, instead of going through the API.
+# The documents are generated as they are written, so the memory used does not depend on the size of the dataset.
+#
+# The dataset is deterministic for a given --seed: the IDs, names and emails of the users are derived from their number, and the tasks are drawn from a random generator seeded with --seed.
+# Task creators and assignees follow a power law: the user of rank r is picked with a probability proportional to 1 / r^skew, so a few users own most of the tasks, like in production.
+# All the users share one password (--password), hashed once with the configured cost factor.
+# The per-user task counters of /tasks/stats are then rebuilt from all the tasks of the collection.
+
+import argparse
+import itertools
+import os
+import random
+import struct
+import sys
+import time
+from math import gcd
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+
+# Make the project modules importable when the script is run from the project root directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_config as config
+
+# First byte of the counter part of the generated IDs, so that user and task IDs never collide.
+_USER_ID_KIND = 1
+_TASK_ID_KIND = 2
+# Words of the generated task descriptions.
+_WORDS = ("review", "update", "write", "fix", "deploy", "test", "plan", "call", "report", "design", "check", "prepare",
+          "budget", "release", "client", "meeting", "invoice", "backlog", "migration", "dashboard", "contract", "onboarding",
+          "database", "index", "roadmap", "security", "audit", "training", "support", "feedback", "metrics", "survey")
+
+# Function to build a deterministic ObjectId.
+def _object_id(timestamp, kind, number):
+    """
+    Function to build an ObjectId from a creation time and a number, so that the same dataset always gets the same IDs.
+
+    Args:
+        timestamp (int): The creation time, in seconds since the epoch.
+        kind (int): _USER_ID_KIND or _TASK_ID_KIND.
+        number (int): The number of the user or task.
+
+    Returns:
+        ObjectId: The ID.
+    """
+    return ObjectId(struct.pack(">IB", timestamp, kind) + number.to_bytes(7, "big"))
+
+# Class generating the dataset.
+class DatasetGenerator:
+    """
+    Class generating the users and tasks of a synthetic dataset, one document at a time.
+
+    The users are only referred to by their number: the ID, name and email of user n are computed from n, so generating a task does not require keeping the users in memory.
+    """
+    # Constructor
+    def __init__(self, users, seed, start_time, days, assignee_skew, creator_skew, done_ratio):
+        """
+        Constructor for the DatasetGenerator class.
+
+        Args:
+            users (int): The number of users.
+            seed (int): The seed of the random generator.
+            start_time (int): The creation time of the first user and task, in seconds since the epoch.
+            days (int): The number of days over which the tasks are created.
+            assignee_skew (float): The power-law exponent of the task assignees, 0 for a uniform distribution.
+            creator_skew (float): The power-law exponent of the task creators, 0 for a uniform distribution.
+            done_ratio (float): The fraction of the tasks that are done.
+        """
+        self.users = users
+        self.seed = seed
+        self.start_time = start_time
+        self.days = days
+        self.assignee_skew = assignee_skew
+        self.creator_skew = creator_skew
+        self.done_ratio = done_ratio
+
+        # The ranks of the power law are spread over the users by a fixed permutation, so the most active users are not the first ones created.
+        self.__stride = _coprime_stride(users, seed)
+
+    # Method to get the ID of a user.
+    def user_id(self, number):
+        """
+        Method to get the ID of a user from its number.
+
+        Args:
+            number (int): The number of the user, from 0.
+
+        Returns:
+            str: The ID of the user, as stored in the 'createdByUid' and 'assignedToUid' fields of the tasks.
+        """
+        return str(_object_id(self.start_time, _USER_ID_KIND, number))
+
+    # Method to get the name of a user.
+    @staticmethod
+    def user_name(number):
+        """
+        Method to get the name of a user from its number.
+
+        Args:
+            number (int): The number of the user, from 0.
+
+        Returns:
+            str: The name of the user.
+        """
+        return f"User {number}"
+
+    # Method to generate the users.
+    def generate_users(self, hashed_password):
+        """
+        Method to generate the user documents.
+
+        Args:
+            hashed_password (bytes): The password hash stored for every user.
+
+        Yields:
+            dict: The user documents, in the order of their numbers.
+        """
+        for number in range(self.users):
+            yield {"_id": _object_id(self.start_time, _USER_ID_KIND, number), "name": self.user_name(number),
+                   "email": f"user{number}@example.com", "password": hashed_password}
+
+    # Method to generate the tasks.
+    def generate_tasks(self, tasks):
+        """
+        Method to generate the task documents, in the order of their creation time.
+
+        Args:
+            tasks (int): The number of tasks.
+
+        Yields:
+            dict: The task documents.
+        """
+        generator = random.Random(self.seed)
+        seconds = self.days * 86400
+
+        for number in range(tasks):
+            created_by = self.__pick_user(generator, self.creator_skew)
+            assigned_to = self.__pick_user(generator, self.assignee_skew)
+            # Spread the creation times evenly, so the '_id' order is the creation order.
+            created_at = self.start_time + number * seconds // max(1, tasks)
+
+            yield {
+                "_id": _object_id(created_at, _TASK_ID_KIND, number),
+                "createdByUid": self.user_id(created_by),
+                "createdByName": self.user_name(created_by),
+                "assignedToUid": self.user_id(assigned_to),
+                "assignedToName": self.user_name(assigned_to),
+                "description": " ".join(generator.choice(_WORDS) for _ in range(generator.randint(2, 8))).capitalize(),
+                "done": generator.random() < self.done_ratio,
+                "version": 0,
+                # Change sequence number of /tasks/changes, in microseconds like the controllers set it.
+                "seq": created_at * 1_000_000,
+            }
+
+    # Method to pick the number of a user.
+    def __pick_user(self, generator, skew):
+        rank = _power_law_rank(generator.random(), self.users, skew)
+        return rank * self.__stride % self.users
+
+# Function to draw a rank from a power law.
+def _power_law_rank(uniform, count, skew):
+    """
+    Function to turn a uniform random number into a rank from 0 to count - 1, drawn from a bounded power law.
+
+    The rank r (from 1) has a probability density proportional to 1 / r^skew. It is computed with the inverse of the cumulative distribution of the continuous power law, so no table of weights is kept.
+
+    Args:
+        uniform (float): A uniform random number in [0, 1).
+        count (int): The number of ranks.
+        skew (float): The exponent of the power law, 0 for a uniform distribution.
+
+    Returns:
+        int: The rank, from 0.
+    """
+    if skew == 0:
+        rank = uniform * count
+    elif skew == 1:
+        rank = count ** uniform - 1
+    else:
+        exponent = 1 - skew
+        rank = ((count ** exponent - 1) * uniform + 1) ** (1 / exponent) - 1
+    return min(count - 1, int(rank))
+
+# Function to get a stride that permutes the users.
+def _coprime_stride(count, seed):
+    """
+    Function to get a stride coprime with count, so that 'rank * stride % count' visits every user once.
+
+    Args:
+        count (int): The number of users.
+        seed (int): The seed of the dataset.
+
+    Returns:
+        int: The stride.
+    """
+    stride = random.Random(seed).randrange(count // 2, count) if count > 2 else 1
+    while gcd(stride, count) != 1:
+        stride += 1
+    return stride
+
+# Function to write documents in batches.
+def insert_batches(collection, documents, batch_size, label):
+    """
+    Function to write documents to a collection with unordered insert_many calls of batch_size documents, printing the progress.
+
+    Args:
+        collection (pymongo.collection.Collection): The collection.
+        documents (iterable): The documents, generated as they are written.
+        batch_size (int): The number of documents of each insert_many call.
+        label (str): The name of the documents in the progress messages.
+
+    Returns:
+        int: The number of documents written.
+    """
+    written = 0
+    started = last_report = time.perf_counter()
+    documents = iter(documents)
+
+    while True:
+        batch = list(itertools.islice(documents, batch_size))
+        if not batch:
+            break
+
+        collection.insert_many(batch, ordered=False)
+        written += len(batch)
+
+        # Report the progress every few seconds.
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            print(f"  {written} {label} ({written / (now - started):.0f}/s)")
+            last_report = now
+
+    elapsed = time.perf_counter() - started
+    print(f"{written} {label} written in {elapsed:.1f} s ({written / max(elapsed, 1e-9):.0f}/s)")
+    return written
+
+def main():
+    """
+    Generate the dataset and write it to the configured database.
+    """
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset of users and tasks and write it to the configured database.")
+    parser.add_argument("--users", type=int, default=1000, help="number of users")
+    parser.add_argument("--tasks", type=int, default=50000, help="number of tasks")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the dataset")
+    parser.add_argument("--done-ratio", type=float, default=0.3, help="fraction of the tasks that are done")
+    parser.add_argument("--assignee-skew", type=float, default=1.1, help="power-law exponent of the task assignees, 0 for uniform")
+    parser.add_argument("--creator-skew", type=float, default=0.8, help="power-law exponent of the task creators, 0 for uniform")
+    parser.add_argument("--days", type=int, default=365, help="number of days over which the tasks are created")
+    parser.add_argument("--start-time", type=int, default=1700000000, help="creation time of the first user and task, in seconds since the epoch")
+    parser.add_argument("--batch-size", type=int, default=10000, help="number of documents of each insert_many call")
+    parser.add_argument("--password", default="password", help="password of every user")
+    parser.add_argument("--rounds", type=int, default=config.BCRYPT_ROUNDS, help="bcrypt cost factor of the password hash")
+    parser.add_argument("--drop", action="store_true", help="drop the users and tasks collections first")
+    parser.add_argument("--skip-indexes", action="store_true", help="do not create the declared indexes after writing")
+    arguments = parser.parse_args()
+
+    if arguments.users < 1 and arguments.tasks:
+        raise SystemExit("Tasks need at least one user")
+    if not 0 <= arguments.done_ratio <= 1:
+        raise SystemExit("--done-ratio must be between 0 and 1")
+
+    # Apply the settings of the run before the modules that read them are imported.
+    config.BCRYPT_ROUNDS = arguments.rounds
+
+    from database.__init__ import conn, INDEXES
+    from helpers.task_stats import STATS_PIPELINE
+    from helpers.password_hashing import hash_password
+
+    database = conn.database
+    if arguments.drop:
+        database.drop_collection(config.CONST_USER_COLLECTION)
+        database.drop_collection(config.CONST_TASK_COLLECTION)
+
+    # Hash the password once, as every user shares it.
+    hashed_password = hash_password(arguments.password)
+
+    generator = DatasetGenerator(arguments.users, arguments.seed, arguments.start_time, arguments.days,
+                                 arguments.assignee_skew, arguments.creator_skew, arguments.done_ratio)
+
+    try:
+        insert_batches(database[config.CONST_USER_COLLECTION], generator.generate_users(hashed_password), arguments.batch_size, "users")
+        insert_batches(database[config.CONST_TASK_COLLECTION], generator.generate_tasks(arguments.tasks), arguments.batch_size, "tasks")
+
+        # Rebuild the task counters from the tasks, with the pipeline of scripts/reconcile_stats.py.
+        database.drop_collection(config.CONST_TASK_STATS_COLLECTION)
+        insert_batches(database[config.CONST_TASK_STATS_COLLECTION],
+                       database[config.CONST_TASK_COLLECTION].aggregate(STATS_PIPELINE, allowDiskUse=True), arguments.batch_size, "task counters")
+
+        # The task lists changed without their versions being bumped: drop the versions, so the next ones get a new epoch and the cached lists are read again.
+        database.drop_collection(config.CONST_TASK_LIST_VERSION_COLLECTION)
+
+        # Indexes are built after the documents are written, which is faster than updating them on every insert.
+        if not arguments.skip_indexes:
+            started = time.perf_counter()
+            conn.ensure_indexes(INDEXES)
+            print(f"Indexes created in {time.perf_counter() - started:.1f} s")
+    except BulkWriteError as err:
+        # Seeding again without --drop fails on the existing IDs and emails.
+        raise SystemExit("Seeding failed: %s (use --drop to replace the existing dataset)" % err.details["writeErrors"][0]["errmsg"])
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
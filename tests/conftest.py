@@ -0,0 +1,96 @@
+# Fixtures of the tests.
+#
+# Usage (from the project root directory):
+#   python -m pytest -q tests
+#
+# The tests run the Flask application against mongomock (pip install mongomock), an in-process stand-in of MongoDB, set up as by the benchmark of benchmarks/routes.py.
+# Each test starts from an empty database. Users are inserted directly and authenticated with a token minted as by the login route, so the tests do not pay for bcrypt.
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+# Make the project modules importable when pytest is run from the project root directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_config as config
+from benchmarks.routes import use_backend
+from helpers.task_stats import STATS_PIPELINE
+from scripts.reconcile_stats import find_drift
+
+# Settings of the tests, applied before the database package is imported.
+use_backend("mongomock", config.CONST_MONGO_URL)
+config.CONST_DATABASE = "TaskTrackerTest"
+config.BCRYPT_ROUNDS = 4
+config.BCRYPT_POOL_SIZE = 0
+config.SLOW_OP_LOG_FILE = None
+
+@pytest.fixture(scope="session")
+def app():
+    """
+    The Flask application, created once for the session.
+    """
+    from app import create_app
+    return create_app()
+
+@pytest.fixture
+def db(app):
+    """
+    The database of the test, emptied first, with the declared indexes and an empty user cache.
+    """
+    from database.__init__ import conn
+    from database.indexes import INDEXES
+    from helpers.user_cache import user_cache
+
+    conn.database.client.drop_database(config.CONST_DATABASE)
+    user_cache.clear()
+    conn.ensure_indexes(INDEXES)
+    return conn.database
+
+@pytest.fixture
+def client(app, db):
+    """
+    The Flask test client, on an empty database.
+    """
+    return app.test_client()
+
+@pytest.fixture
+def make_user(db):
+    """
+    Function creating a user, returning its ID and the headers authenticating it.
+    """
+    from bson.objectid import ObjectId
+
+    def make_user(name):
+        user = {"_id": ObjectId(), "name": name, "email": f"{name.lower()}@test.example", "password": b"unused"}
+        db[config.CONST_USER_COLLECTION].insert_one(user)
+        token = jwt.encode({"email": user["email"], "id": str(user["_id"]), "exp": datetime.utcnow() + timedelta(seconds=config.JWT_EXPIRATION)}, config.TOKEN_SECRET)
+        return str(user["_id"]), {"x-access-token": token}
+
+    return make_user
+
+@pytest.fixture
+def create_tasks(client):
+    """
+    Function creating tasks through the bulk create route, returning their IDs.
+    """
+    def create_tasks(headers, assigned_to_uid, count):
+        response = client.post("/tasks/bulk", headers=headers, json=[{"description": f"Task {index}", "assignedToUid": assigned_to_uid} for index in range(count)])
+        assert response.status_code == 200
+        return [result["id"] for result in response.get_json()["results"]]
+
+    return create_tasks
+
+@pytest.fixture
+def assert_no_drift(db):
+    """
+    Function checking that the task counters of /tasks/stats match the tasks, as scripts/reconcile_stats.py does.
+    """
+    def assert_no_drift():
+        stored = {counters.pop("_id"): counters for counters in db[config.CONST_TASK_STATS_COLLECTION].find()}
+        assert list(find_drift(db[config.CONST_TASK_COLLECTION].aggregate(STATS_PIPELINE), stored)) == []
+
+    return assert_no_drift
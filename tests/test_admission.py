@@ -0,0 +1,102 @@
+# Tests of the admission control of helpers/admission.py.
+
+import asyncio
+import threading
+
+from helpers import admission
+from helpers.admission import AsyncConcurrencyLimiter, ConcurrencyLimiter, RateLimiter, limit_concurrency, limit_concurrency_async
+from helpers.metrics import admission_rejections, render_metrics
+
+def _rejections(limiter):
+    return sum(shards.totals()[0] for labelvalues, shards in admission_rejections._series.items() if labelvalues == (limiter,))
+
+def test_limit_concurrency_rejects_requests_beyond_the_queue(monkeypatch):
+    monkeypatch.setitem(admission.route_limiters, "test.sync", ConcurrencyLimiter(limit=1, queue=0, timeout=0.01))
+    running, release = threading.Event(), threading.Event()
+
+    @limit_concurrency("test.sync")
+    def view():
+        running.set()
+        release.wait()
+        return "done"
+
+    thread = threading.Thread(target=view)
+    thread.start()
+    running.wait()
+    try:
+        assert view()[1] == 503
+    finally:
+        release.set()
+        thread.join()
+
+    stats = admission.route_limiters["test.sync"].stats()
+    assert (stats["admitted"], stats["rejected"], stats["in_flight"]) == (1, 1, 0)
+    assert _rejections("test.sync") == 1
+
+def test_limit_concurrency_async_queues_then_rejects(monkeypatch):
+    monkeypatch.setitem(admission.async_route_limiters, "test.async", AsyncConcurrencyLimiter(limit=1, queue=1, timeout=0.05))
+
+    @limit_concurrency_async("test.async")
+    async def view(delay):
+        await asyncio.sleep(delay)
+        return "done"
+
+    async def requests():
+        # The first request runs, the second waits for its slot, the third finds the queue full, and the fourth gives up waiting.
+        first = asyncio.create_task(view(0.02))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(view(0.2))
+        await asyncio.sleep(0)
+        third = await view(0)
+        await first
+        await asyncio.sleep(0)
+        fourth = await view(0)
+        return await second, third, fourth
+
+    second, third, fourth = asyncio.run(requests())
+
+    assert second == "done"
+    assert third[1] == 503 and third[2] == {"Retry-After": "1"}
+    assert fourth[1] == 503
+    stats = admission.async_route_limiters["test.async"].stats()
+    assert (stats["admitted"], stats["rejected"], stats["in_flight"], stats["waiting"]) == (2, 2, 0, 0)
+    assert _rejections("test.async") == 2
+    assert 'admission_rejected_total{limiter="test.async"} 2' in render_metrics()
+
+def test_endpoints_without_limit_are_left_untouched():
+    def view():
+        return "done"
+
+    async def async_view():
+        return "done"
+
+    assert limit_concurrency("test.unlimited")(view) is view
+    assert limit_concurrency_async("test.unlimited")(async_view) is async_view
+
+def test_rate_limiter_forgets_the_least_recently_used_keys():
+    limiter = RateLimiter(rate=0.001, burst=1, max_keys=2)
+
+    assert limiter.take("a") == 0
+    assert limiter.take("b") == 0
+    assert limiter.take("a") > 0
+    assert limiter.take("c") == 0
+
+    # "b" was forgotten, so it gets a full bucket again.
+    assert limiter.take("b") == 0
+    assert limiter.stats()["keys"] == 2
+
+def test_login_attempts_beyond_the_burst_of_an_email_get_429(client, monkeypatch):
+    monkeypatch.setattr(admission, "login_email_limiter", RateLimiter(rate=0.001, burst=2, max_keys=10))
+    monkeypatch.setattr(admission, "login_ip_limiter", RateLimiter(rate=0.001, burst=10, max_keys=10))
+
+    statuses = [client.post("/users/login", json={"email": "ada@test.example", "password": "secret"}).status_code for _ in range(3)]
+    assert statuses == [401, 401, 429]
+
+    response = client.post("/users/login", json={"email": "ADA@test.example", "password": "secret"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+    assert _rejections("login_email") >= 2
+
+    # Another email from the same address is still allowed.
+    assert client.post("/users/login", json={"email": "bob@test.example", "password": "secret"}).status_code == 401
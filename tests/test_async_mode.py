@@ -0,0 +1,98 @@
+# Tests of the async serving mode of asgi.py.
+#
+# mongomock has no async client: the task writes of the async mode run against a mongod at config.CONST_MONGO_URL when PyMongo has the async driver, and are skipped otherwise.
+
+import asyncio
+import importlib.util
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from bson.objectid import ObjectId
+
+import app_config as config
+from database.async_db import require_async_driver
+
+# Skip the tests needing the async driver of PyMongo (4.10 or later).
+requires_async_driver = pytest.mark.skipif(importlib.util.find_spec("pymongo.asynchronous") is None, reason="the async driver is not installed")
+
+def test_ops_routes_answer_the_same_in_both_modes(client, monkeypatch):
+    from asgi import app as async_app
+
+    monkeypatch.setattr(config, "DEBUG_ROUTES_ENABLED", True)
+
+    async def fetch_stats():
+        response = await async_app.test_client().get("/debug/stats")
+        return response.status_code, await response.get_json()
+
+    status, async_stats = asyncio.run(fetch_stats())
+    response = client.get("/debug/stats")
+
+    assert status == response.status_code == 200
+    assert async_stats.keys() == response.get_json().keys()
+    assert "async_routes" in async_stats["admission"]
+
+@pytest.mark.skipif(importlib.util.find_spec("pymongo.asynchronous") is not None, reason="the async driver is installed")
+def test_the_async_mode_refuses_an_old_driver():
+    with pytest.raises(RuntimeError, match="PyMongo 4.10 or later"):
+        require_async_driver()
+
+async def _async_database():
+    """
+    The database of the async mode, emptied first, or a skip if no mongod answers.
+    """
+    from pymongo import AsyncMongoClient
+    from database.__init__ import async_conn
+
+    probe = AsyncMongoClient(config.CONST_MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        await probe.admin.command("ping")
+    except Exception:
+        pytest.skip(f"no mongod answers at {config.CONST_MONGO_URL}")
+    finally:
+        await probe.close()
+
+    await async_conn.database.client.drop_database(config.CONST_DATABASE)
+    return async_conn
+
+async def _async_user(database, name):
+    user = {"_id": ObjectId(), "name": name, "email": f"{name.lower()}@test.example", "password": b"unused"}
+    await database[config.CONST_USER_COLLECTION].insert_one(user)
+    token = jwt.encode({"email": user["email"], "id": str(user["_id"]), "exp": datetime.utcnow() + timedelta(seconds=config.JWT_EXPIRATION)}, config.TOKEN_SECRET)
+    return str(user["_id"]), {"x-access-token": token}
+
+@requires_async_driver
+def test_task_writes_of_the_async_mode_keep_the_side_effects_of_the_sync_mode():
+    from asgi import app as async_app
+    from helpers.user_cache import user_cache
+
+    async def scenario():
+        async_conn = await _async_database()
+        user_cache.clear()
+        try:
+            alice_id, alice = await _async_user(async_conn.database, "Alice")
+            bob_id, bob = await _async_user(async_conn.database, "Bob")
+            client = async_app.test_client()
+
+            created = await client.post("/tasks/bulk", headers=alice, json=[{"description": f"Task {index}", "assignedToUid": bob_id} for index in range(3)])
+            task_ids = [result["id"] for result in (await created.get_json())["results"]]
+            since = (await (await client.get("/tasks/changes", headers=alice)).get_json())["next_token"]
+
+            updated = await (await client.patch("/tasks/bulk", headers=bob, json={"taskUids": task_ids[:2], "done": True})).get_json()
+            deleted = await (await client.delete("/tasks/bulk", headers=alice, json={"taskUids": task_ids[1:] + ["missing"]})).get_json()
+
+            stats = await (await client.get("/tasks/stats", headers=alice)).get_json()
+            changes = await (await client.get("/tasks/changes", headers=bob, query_string={"since": since})).get_json()
+            return task_ids, updated, deleted, stats, changes
+        finally:
+            await async_conn.database.client.drop_database(config.CONST_DATABASE)
+            await async_conn.close()
+
+    task_ids, updated, deleted, stats, changes = asyncio.run(scenario())
+
+    assert (updated["matchedCount"], updated["modifiedCount"]) == (2, 2)
+    assert deleted["deleted"] == task_ids[1:] and deleted["tasksAffected"] == 2
+    assert deleted["rejected"] == [{"id": "missing", "error": "Invalid task ID"}]
+    assert stats["created"] == {"total": 1, "done": 1, "open": 0}
+    assert [task["_id"] for task in changes["changed"]] == task_ids[:1]
+    assert sorted(changes["deleted"]) == sorted(task_ids[1:])
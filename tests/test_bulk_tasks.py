@@ -0,0 +1,132 @@
+# Tests of the bulk task routes (/tasks/bulk).
+
+import mongomock.collection
+from bson.objectid import ObjectId
+
+import app_config as config
+from controllers.task_controller import delete_task, update_task
+
+def test_bulk_create_reports_the_result_of_each_task(client, db, make_user):
+    alice_id, alice = make_user("Alice")
+    bob_id, _ = make_user("Bob")
+
+    response = client.post("/tasks/bulk", headers=alice, json=[
+        {"description": "Mine", "assignedToUid": alice_id},
+        {"description": "Missing assignee"},
+        {"description": "Invalid assignee", "assignedToUid": "not-an-id"},
+        {"description": "Unknown assignee", "assignedToUid": str(ObjectId())},
+        {"description": "Bob's", "assignedToUid": bob_id},
+    ])
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["inserted"] == 2
+    assert [sorted(item) for item in result["results"]] == [["id", "index"], ["error", "index"], ["error", "index"], ["error", "index"], ["id", "index"]]
+    assert [item.get("error") for item in result["results"][1:4]] == ["Error validating information", "Invalid user information", "Invalid user information"]
+    bob_task = db[config.CONST_TASK_COLLECTION].find_one({"_id": ObjectId(result["results"][4]["id"])})
+    assert (bob_task["createdByName"], bob_task["assignedToName"]) == ("Alice", "Bob")
+
+def test_bulk_create_refuses_an_empty_or_oversized_batch(client, make_user, monkeypatch):
+    monkeypatch.setattr(config, "TASK_BULK_MAX_SIZE", 2)
+    user_id, headers = make_user("Alice")
+
+    assert client.post("/tasks/bulk", headers=headers, json=[]).status_code == 400
+    assert client.post("/tasks/bulk", headers=headers, json=[{"description": "Task", "assignedToUid": user_id}] * 3).status_code == 400
+
+def test_bulk_update_reports_partial_results(client, db, make_user, create_tasks, assert_no_drift):
+    alice_id, alice = make_user("Alice")
+    bob_id, bob = make_user("Bob")
+    alice_tasks = create_tasks(alice, alice_id, 2)
+    bob_tasks = create_tasks(bob, bob_id, 1)
+    client.patch("/tasks/bulk", headers=alice, json={"taskUids": [alice_tasks[1]], "done": True})
+
+    missing = str(ObjectId())
+    response = client.patch("/tasks/bulk", headers=alice, json={"taskUids": alice_tasks + bob_tasks + [missing, "not-an-id"], "done": True})
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["matched"] == alice_tasks
+    assert result["modified"] == [alice_tasks[0]]
+    assert sorted(result["rejected"], key=lambda rejection: rejection["id"]) == sorted([
+        {"id": "not-an-id", "error": "Invalid task ID"},
+        {"id": bob_tasks[0], "error": "Users can only change status when task is assigned to them."},
+        {"id": missing, "error": "Task not found"},
+    ], key=lambda rejection: rejection["id"])
+    assert db[config.CONST_TASK_COLLECTION].count_documents({"done": True}) == 2
+    assert_no_drift()
+
+def test_bulk_delete_reports_partial_results(client, db, make_user, create_tasks, assert_no_drift):
+    alice_id, alice = make_user("Alice")
+    bob_id, bob = make_user("Bob")
+    alice_tasks = create_tasks(alice, bob_id, 2)
+    bob_tasks = create_tasks(bob, alice_id, 1)
+
+    response = client.delete("/tasks/bulk", headers=alice, json={"taskUids": alice_tasks + bob_tasks})
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["deleted"] == alice_tasks
+    assert result["tasksAffected"] == 2
+    assert result["rejected"] == [{"id": bob_tasks[0], "error": "Users can only delete when task is created by them."}]
+    assert db[config.CONST_TASK_COLLECTION].count_documents({}) == 1
+    assert_no_drift()
+
+def _race_bulk_write(monkeypatch, race):
+    # Run race() just before the first bulk write of the tasks collection.
+    bulk_write = mongomock.collection.Collection.bulk_write
+    raced = []
+
+    def racing_bulk_write(collection, *args, **kwargs):
+        if collection.name == config.CONST_TASK_COLLECTION and not raced:
+            raced.append(True)
+            race()
+        return bulk_write(collection, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", racing_bulk_write)
+
+def test_bulk_update_racing_a_single_update(client, db, make_user, create_tasks, monkeypatch, assert_no_drift):
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 2)
+
+    # A single update sets the status of the second task just before the bulk update.
+    _race_bulk_write(monkeypatch, lambda: update_task({"id": user_id}, task_ids[1], True))
+
+    result = client.patch("/tasks/bulk", headers=headers, json={"taskUids": task_ids, "done": True}).get_json()
+
+    # The second task is reported once, as modified by the single update.
+    assert result["matched"] == task_ids
+    assert result["modified"] == [task_ids[0]]
+    assert result["rejected"] == []
+    assert db[config.CONST_TASK_COLLECTION].find_one({"_id": ObjectId(task_ids[1])})["version"] == 1
+    assert_no_drift()
+
+def test_bulk_delete_leaves_a_task_changed_after_it_was_read(client, db, make_user, create_tasks, monkeypatch, assert_no_drift):
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 3)
+
+    # A single update changes the second task between the read of the bulk delete and its write.
+    _race_bulk_write(monkeypatch, lambda: update_task({"id": user_id}, task_ids[1], True))
+
+    result = client.delete("/tasks/bulk", headers=headers, json={"taskUids": task_ids}).get_json()
+
+    assert result["deleted"] == [task_ids[0], task_ids[2]]
+    assert result["rejected"] == [{"id": task_ids[1], "error": "Task was changed by another request."}]
+    assert result["tasksAffected"] == 2
+    assert db[config.CONST_TASK_COLLECTION].count_documents({}) == 1
+    assert_no_drift()
+
+def test_bulk_delete_racing_a_single_delete(client, db, make_user, create_tasks, monkeypatch, capsys):
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 3)
+
+    # A single delete removes the second task between the read of the bulk delete and its write.
+    _race_bulk_write(monkeypatch, lambda: delete_task({"id": user_id}, task_ids[1]))
+
+    result = client.delete("/tasks/bulk", headers=headers, json={"taskUids": task_ids}).get_json()
+
+    # The bulk delete cannot tell which tasks it deleted itself, so it reports every task gone and leaves the counters to scripts/reconcile_stats.py.
+    assert result["deleted"] == task_ids
+    assert result["rejected"] == []
+    assert result["tasksAffected"] == 2
+    assert db[config.CONST_TASK_COLLECTION].count_documents({}) == 0
+    assert "run scripts/reconcile_stats.py" in capsys.readouterr().out
@@ -0,0 +1,76 @@
+# Tests of the lazy, fork-safe connection of database/db.py and of the startup of database/__init__.py.
+
+import os
+import threading
+import time
+
+import pytest
+
+import app_config as config
+from database import db as db_module
+from database.db import Database
+
+def _database():
+    return Database(database_name=config.CONST_DATABASE, connection_string=config.CONST_MONGO_URL)
+
+def test_the_connection_is_opened_on_first_use():
+    database = _database()
+    assert database.db_connection is None
+
+    assert database.database.name == config.CONST_DATABASE
+    assert database.db_connection is not None
+
+def test_a_forked_process_opens_its_own_connection(monkeypatch):
+    database = _database()
+    parent_client = database.database.client
+
+    monkeypatch.setattr(os, "getpid", lambda: -1)
+
+    assert database.database.client is not parent_client
+    assert database.database.client is database.database.client
+
+def test_threads_using_a_new_connection_at_once_share_one_client(monkeypatch):
+    database = _database()
+    clients = []
+    real_client = db_module.MongoClient
+
+    def slow_client(*args, **kwargs):
+        # Widen the window between the check and the connection, as a slow handshake would.
+        time.sleep(0.05)
+        clients.append(real_client(*args, **kwargs))
+        return clients[-1]
+
+    monkeypatch.setattr(db_module, "MongoClient", slow_client)
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(database.database.client)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(clients) == 1
+    assert all(client is clients[0] for client in seen)
+
+def test_configure_closes_the_connection_and_applies_the_new_settings():
+    database = _database()
+    database.database
+
+    database.configure("OtherDatabase", config.CONST_MONGO_URL)
+
+    assert database.db_connection is None
+    assert database.database.name == "OtherDatabase"
+
+def test_the_startup_fails_if_the_indexes_cannot_be_created(monkeypatch):
+    import database as database_package
+
+    def fail(indexes):
+        raise RuntimeError("not authorized to create indexes")
+
+    monkeypatch.setattr(database_package.conn, "ensure_indexes", fail)
+
+    with pytest.raises(RuntimeError, match="not authorized"):
+        database_package.init_database(config)
+
+    # Without ENSURE_INDEXES, the indexes are not created at startup.
+    monkeypatch.setattr(config, "ENSURE_INDEXES", False)
+    database_package.init_database(config)
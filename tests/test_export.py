@@ -0,0 +1,51 @@
+# Tests of the export routes (GET /tasks/export and /users/export) and of helpers/export.py.
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import app_config as config
+from helpers.export import _csv_value
+
+@pytest.mark.parametrize("text", ["=1+1", "+1", "-1", "@SUM(A1)", "\tx", "\rx"])
+def test_csv_cells_starting_like_a_formula_are_quoted(text):
+    assert _csv_value(text) == "'" + text
+
+@pytest.mark.parametrize("value, cell", [("Call Bob - today", "Call Bob - today"), ("", ""), (-1, -1), (True, "true"), (None, "")])
+def test_other_csv_cells_are_written_as_is(value, cell):
+    assert _csv_value(value) == cell
+
+def test_csv_export_never_writes_a_formula(client, make_user):
+    user_id, headers = make_user("Alice")
+    description = '=HYPERLINK("http://example.com")'
+    client.post("/tasks/", headers=headers, json={"description": description, "assignedToUid": user_id})
+
+    response = client.get("/tasks/export?format=csv", headers=headers)
+    row, = csv.DictReader(io.StringIO(response.get_data(as_text=True), newline=""))
+    ndjson = client.get("/tasks/export", headers=headers).get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert row["description"] == "'" + description
+    assert json.loads(ndjson.splitlines()[0])["description"] == description
+
+def test_exports_stream_every_document_across_batches_and_compress(client, make_user, create_tasks, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "EXPORT_CHUNK_SIZE", 16)
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 5)
+
+    response = client.get("/tasks/export", headers={**headers, "Accept-Encoding": "gzip"})
+    users = client.get("/users/export?format=csv", headers=headers)
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    lines = gzip.decompress(response.get_data()).decode("utf-8").splitlines()
+    assert [json.loads(line)["_id"] for line in lines] == task_ids
+    assert [row["name"] for row in csv.DictReader(io.StringIO(users.get_data(as_text=True), newline=""))] == ["Alice"]
+
+def test_an_unknown_export_format_is_rejected(client, make_user):
+    _, headers = make_user("Alice")
+
+    assert client.get("/tasks/export?format=xml", headers=headers).status_code == 400
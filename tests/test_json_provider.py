@@ -0,0 +1,46 @@
+# Tests of the JSON provider of helpers/json_provider.py, with and without orjson.
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+from bson.objectid import ObjectId
+
+from helpers import json_provider
+
+@pytest.fixture(params=["orjson", "json"])
+def provider(request, app, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_provider, "orjson", None)
+    return json_provider.FastJSONProvider(app)
+
+def test_mongodb_values_are_encoded_the_same_by_both_encoders(provider):
+    object_id = ObjectId()
+    document = {"_id": object_id, "at": datetime(2024, 5, 1, 12, 30), "aware": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+                "password": b"\x00\xff", "name": "Zoë"}
+
+    body = provider.dumps_bytes(document)
+
+    assert json.loads(body) == {"_id": str(object_id), "at": "2024-05-01T12:30:00+00:00", "aware": "2024-05-01T12:30:00+00:00",
+                                "password": "AP8=", "name": "Zoë"}
+    assert "Zoë".encode("utf-8") in body
+
+def test_keys_keep_their_order(provider):
+    assert list(json.loads(provider.dumps({"b": 1, "a": 2}))) == ["b", "a"]
+    assert provider.dumps_bytes({"b": 1, "a": 2}) == b'{"b":1,"a":2}'
+
+def test_unknown_values_are_refused(provider):
+    with pytest.raises(TypeError):
+        provider.dumps_bytes({"value": object()})
+
+def test_responses_carry_the_ids_of_the_documents_as_strings(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+
+    response = client.get("/tasks/createdby/", headers=headers)
+
+    assert response.mimetype == "application/json"
+    assert response.get_json()["tasks"][0]["_id"] == task_id
+    assert response.get_json()["tasks"][0]["createdByUid"] == user_id
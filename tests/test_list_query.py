@@ -0,0 +1,32 @@
+# Tests of the filters, sort and fields of the list routes (helpers/list_query.py).
+
+import pytest
+
+def test_task_lists_are_filtered_sorted_and_projected(client, make_user, create_tasks):
+    alice_id, alice = make_user("Alice")
+    bob_id, _ = make_user("Bob")
+    own_tasks = create_tasks(alice, alice_id, 2)
+    bob_tasks = create_tasks(alice, bob_id, 2)
+    client.patch(f"/tasks/{own_tasks[0]}", headers=alice, json={"done": True})
+
+    open_tasks = client.get("/tasks/createdby/?done=false", headers=alice).get_json()["tasks"]
+    assert [task["_id"] for task in open_tasks] == [own_tasks[1]] + bob_tasks
+
+    newest_first = client.get(f"/tasks/createdby/?assignedToUid={bob_id}&sort=-_id&fields=done", headers=alice).get_json()["tasks"]
+    assert newest_first == [{"_id": bob_tasks[1], "done": False}, {"_id": bob_tasks[0], "done": False}]
+
+def test_the_users_list_is_sorted_and_projected(client, make_user):
+    make_user("Carol")
+    make_user("Alice")
+    _, headers = make_user("Bob")
+
+    users = client.get("/users/?sort=-name&fields=name", headers=headers).get_json()["users"]
+
+    assert users == [{"name": "Carol"}, {"name": "Bob"}, {"name": "Alice"}]
+
+@pytest.mark.parametrize("query", ["done=maybe", "assignedToUid=not-an-id", "createdByUid={user_id}", "sort=description", "fields=password",
+                                   "colour=red", "done=true&done=false", "done=true&assignedToUid={user_id}"])
+def test_unsupported_task_list_queries_are_rejected(client, make_user, query):
+    user_id, headers = make_user("Alice")
+
+    assert client.get("/tasks/createdby/?" + query.format(user_id=user_id), headers=headers).status_code == 400
@@ -0,0 +1,75 @@
+# Tests of the password hashing of helpers/password_hashing.py.
+
+import asyncio
+import time
+
+import bcrypt
+import pytest
+
+import app_config as config
+from helpers import password_hashing
+from helpers.password_hashing import HashingPoolBusy
+
+@pytest.fixture
+def pool(monkeypatch):
+    """
+    A pool of one worker process without queue, with a short timeout, shut down after the test.
+    """
+    monkeypatch.setattr(config, "BCRYPT_POOL_SIZE", 1)
+    monkeypatch.setattr(config, "BCRYPT_QUEUE_DEPTH", 0)
+    monkeypatch.setattr(config, "BCRYPT_TIMEOUT", 0.1)
+    monkeypatch.setattr(password_hashing, "_executor", None)
+    yield
+    password_hashing._executor.shutdown(wait=True, cancel_futures=True)
+    password_hashing._executor = None
+
+def _wait_for_free_slot():
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if password_hashing._slots.acquire(blocking=False):
+            password_hashing._slots.release()
+            return
+        time.sleep(0.01)
+    pytest.fail("The slot of the timed out call was never released")
+
+def test_a_timed_out_call_keeps_its_slot_until_it_finishes(pool):
+    with pytest.raises(HashingPoolBusy, match="timed out"):
+        password_hashing._run(time.sleep, 0.5)
+
+    # The worker is still busy with the call, so the pool takes no more work.
+    with pytest.raises(HashingPoolBusy, match="queue is full"):
+        password_hashing._run(time.sleep, 0)
+
+    _wait_for_free_slot()
+    assert password_hashing._run(abs, -1) == 1
+
+def test_a_timed_out_async_call_keeps_its_slot_until_it_finishes(pool):
+    with pytest.raises(HashingPoolBusy, match="timed out"):
+        asyncio.run(password_hashing._run_async(time.sleep, 0.5))
+
+    with pytest.raises(HashingPoolBusy, match="queue is full"):
+        asyncio.run(password_hashing._run_async(time.sleep, 0))
+
+    _wait_for_free_slot()
+    assert asyncio.run(password_hashing._run_async(abs, -1)) == 1
+
+def test_a_hash_with_another_cost_factor_is_replaced_at_login(client, db):
+    old_hash = bcrypt.hashpw(b"secret", bcrypt.gensalt(5))
+    db[config.CONST_USER_COLLECTION].insert_one({"name": "Ada", "email": "ada@test.example", "password": old_hash})
+
+    response = client.post("/users/login", json={"email": "ada@test.example", "password": "secret"})
+    assert response.status_code == 200
+
+    new_hash = db[config.CONST_USER_COLLECTION].find_one({"email": "ada@test.example"})["password"]
+    assert new_hash != old_hash
+    assert not password_hashing.needs_rehash(new_hash)
+    assert password_hashing.check_password("secret", new_hash)
+
+def test_a_busy_pool_answers_503(client, monkeypatch):
+    def busy(*args):
+        raise HashingPoolBusy("Password hashing queue is full")
+    monkeypatch.setattr(password_hashing, "_run", busy)
+
+    response = client.post("/users/", json={"name": "Ada", "email": "ada@test.example", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,93 @@
+# Tests of the delta sync of the tasks (GET /tasks/changes) and of the tombstones of helpers/task_changes.py.
+
+import time
+
+import pytest
+from bson.objectid import ObjectId
+
+import app_config as config
+from helpers.task_changes import write_tombstones
+
+@pytest.fixture(autouse=True)
+def settled(monkeypatch):
+    # Let the tokens reach the latest writes, which the tests read at once.
+    monkeypatch.setattr(config, "TASK_CHANGES_SETTLE", 0)
+
+def test_a_sync_returns_the_changes_since_its_token(client, make_user, create_tasks):
+    alice_id, alice = make_user("Alice")
+    bob_id, bob = make_user("Bob")
+    kept_id, deleted_id = create_tasks(alice, bob_id, 2)
+
+    first = client.get("/tasks/changes", headers=bob).get_json()
+    assert sorted(task["_id"] for task in first["changed"]) == sorted([kept_id, deleted_id])
+    assert first["deleted"] == []
+
+    time.sleep(0.001)
+    client.patch(f"/tasks/{kept_id}", headers=bob, json={"done": True})
+    client.delete(f"/tasks/{deleted_id}", headers=alice)
+
+    second = client.get(f"/tasks/changes?since={first['next_token']}", headers=bob).get_json()
+    assert [(task["_id"], task["done"]) for task in second["changed"]] == [(kept_id, True)]
+    assert second["deleted"] == [deleted_id]
+    assert second["has_more"] is False
+
+    third = client.get(f"/tasks/changes?since={second['next_token']}", headers=alice).get_json()
+    assert (third["changed"], third["deleted"]) == ([], [])
+
+def test_a_sync_is_paged(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 3)
+
+    first = client.get("/tasks/changes?limit=2", headers=headers).get_json()
+    second = client.get(f"/tasks/changes?limit=2&since={first['next_token']}", headers=headers).get_json()
+
+    assert first["has_more"] is True
+    assert [task["_id"] for task in first["changed"] + second["changed"]] == task_ids
+    assert second["has_more"] is False
+
+def test_a_full_page_of_unsettled_changes_asks_to_retry_later(client, make_user, create_tasks, monkeypatch):
+    monkeypatch.setattr(config, "TASK_CHANGES_SETTLE", 60)
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 3)
+    since = str(int((time.time() - 30) * 1_000_000))
+
+    # The token cannot go past the changes of the last minute, so calling again at once would return the same page.
+    result = client.get(f"/tasks/changes?limit=2&since={since}", headers=headers).get_json()
+
+    assert [task["_id"] for task in result["changed"]] == task_ids[:2]
+    assert result["next_token"] == since
+    assert result["has_more"] is False
+    assert 1 <= result["retry_after"] <= 60
+
+def test_an_expired_or_invalid_token_is_refused(client, make_user):
+    _, headers = make_user("Alice")
+    expired = int((time.time() - config.TASK_TOMBSTONE_RETENTION - 60) * 1_000_000)
+
+    assert client.get(f"/tasks/changes?since={expired}", headers=headers).status_code == 410
+    assert client.get("/tasks/changes?since=x", headers=headers).status_code == 400
+
+def test_a_tombstone_written_twice_keeps_its_latest_deletion(db):
+    tombstones = db[config.CONST_TASK_TOMBSTONE_COLLECTION]
+    task = {"_id": ObjectId(), "createdByUid": "alice", "assignedToUid": "bob"}
+
+    write_tombstones(tombstones, [task])
+    first_seq = tombstones.find_one({"_id": task["_id"]})["seq"]
+    write_tombstones(tombstones, [task])
+
+    tombstone, = tombstones.find({"_id": task["_id"]})
+    assert tombstone["seq"] > first_seq
+    assert tombstone["users"] == ["alice", "bob"]
+
+def test_a_delete_and_a_bulk_delete_of_the_same_task_both_succeed(client, db, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    first_id, second_id = create_tasks(headers, user_id, 2)
+    # A tombstone of the first task was already written, as by a concurrent delete of another worker.
+    write_tombstones(db[config.CONST_TASK_TOMBSTONE_COLLECTION], [{"_id": ObjectId(first_id), "createdByUid": user_id, "assignedToUid": user_id}])
+
+    single = client.delete(f"/tasks/{first_id}", headers=headers)
+    bulk = client.delete("/tasks/bulk", headers=headers, json={"taskUids": [first_id, second_id]})
+
+    assert single.status_code == 200
+    assert bulk.status_code == 200
+    assert bulk.get_json()["deleted"] == [second_id]
+    assert db[config.CONST_TASK_TOMBSTONE_COLLECTION].count_documents({}) == 2
@@ -0,0 +1,115 @@
+# Tests of the task events of helpers/task_events.py and of the /tasks/stream route.
+
+import pytest
+from bson.objectid import ObjectId
+
+import app_config as config
+from helpers.task_events import StreamBusy, TaskEventHub, task_events
+
+def _task(created_by, assigned_to):
+    return {"_id": ObjectId(), "createdByUid": created_by, "assignedToUid": assigned_to, "done": False, "version": 0}
+
+def _event_ids(frames):
+    return [line.split(b": ", 1)[1].decode() for frame in frames for line in frame.split(b"\n") if line.startswith(b"id: ")]
+
+@pytest.fixture
+def hub():
+    return TaskEventHub(buffer_size=2, replay_size=3, max_subscribers=3, backend="local")
+
+def test_events_only_reach_the_streams_of_their_users(hub):
+    alice, _ = hub.subscribe("alice")
+    bob, _ = hub.subscribe("bob")
+    carol, _ = hub.subscribe("carol")
+
+    hub.publish("create", [_task("alice", "bob")])
+
+    assert len(alice.get(0)) == 1
+    assert len(bob.get(0)) == 1
+    assert carol.get(0) == []
+
+def test_a_resumed_stream_gets_the_events_it_missed(hub):
+    subscription, _ = hub.subscribe("alice")
+    hub.publish("create", [_task("alice", "alice")])
+    last_event_id, = _event_ids(subscription.get(0))
+    hub.unsubscribe(subscription)
+
+    hub.publish("update", [_task("alice", "alice")])
+    hub.publish("update", [_task("bob", "bob")])
+
+    _, frames = hub.subscribe("alice", last_event_id)
+    assert len(frames) == 1
+    assert b"event: update" in frames[0]
+    assert hub.stats()["resumed"] == 1
+
+def test_a_stream_resumed_from_a_forgotten_event_is_reset(hub):
+    subscription, _ = hub.subscribe("alice")
+    hub.publish("create", [_task("alice", "alice")])
+    last_event_id, = _event_ids(subscription.get(0))
+    hub.unsubscribe(subscription)
+
+    # The replay buffer keeps the last 3 events only.
+    hub.publish("create", [_task("alice", "alice") for _ in range(3)])
+
+    _, frames = hub.subscribe("alice", last_event_id)
+    assert len(frames) == 1
+    assert b"event: reset" in frames[0]
+    assert hub.stats()["resets"] == 1
+
+def test_a_stream_falling_behind_is_closed(hub):
+    subscription, _ = hub.subscribe("alice")
+
+    hub.publish("create", [_task("alice", "alice") for _ in range(3)])
+
+    assert subscription.overflowed
+    assert subscription.get(0) == []
+    assert list(hub.stream(subscription, [])) == [b"retry: %d\n\n" % config.TASK_STREAM_RETRY_MS]
+    assert hub.stats()["overflows"] == 1
+    assert hub.stats()["subscribers"] == 0
+
+def test_streams_beyond_the_limit_are_rejected(hub):
+    for _ in range(3):
+        hub.subscribe("alice")
+
+    with pytest.raises(StreamBusy):
+        hub.subscribe("bob")
+
+def test_change_stream_deletions_are_sent_to_the_users_of_their_tombstone(hub):
+    alice, _ = hub.subscribe("alice")
+    carol, _ = hub.subscribe("carol")
+    task_id = ObjectId()
+    dispatch_change = hub._TaskEventHub__dispatch_change
+
+    # The deletion of the task does not say whose task it was: it is skipped, and sent from its tombstone.
+    dispatch_change({"_id": {"_data": "1"}, "operationType": "delete", "ns": {"coll": config.CONST_TASK_COLLECTION}, "documentKey": {"_id": task_id}})
+    dispatch_change({"_id": {"_data": "2"}, "operationType": "insert", "ns": {"coll": config.CONST_TASK_TOMBSTONE_COLLECTION},
+                     "fullDocument": {"_id": task_id, "users": ["alice", "bob"], "seq": 1}})
+    # The removal of an expired tombstone is not a task event.
+    dispatch_change({"_id": {"_data": "3"}, "operationType": "delete", "ns": {"coll": config.CONST_TASK_TOMBSTONE_COLLECTION}, "documentKey": {"_id": task_id}})
+
+    frames = alice.get(0)
+    assert _event_ids(frames) == ["2"]
+    assert b"event: delete" in frames[0] and str(task_id).encode() in frames[0]
+    assert carol.get(0) == []
+    assert hub.stats()["published"] == 1
+
+def test_stream_route_replays_the_missed_events(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    # Listen to the hub of the worker to get the ID of the event of the creation, as a stream would.
+    subscription, _ = task_events.subscribe(user_id)
+    task_id, = create_tasks(headers, user_id, 1)
+    last_event_id, = _event_ids(subscription.get(0))
+    task_events.unsubscribe(subscription)
+
+    client.patch(f"/tasks/{task_id}", headers=headers, json={"done": True})
+    client.delete(f"/tasks/{task_id}", headers=headers)
+
+    response = client.get("/tasks/stream", headers={**headers, "Last-Event-ID": last_event_id}, buffered=False)
+    first_chunk = next(iter(response.response))
+    response.close()
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert first_chunk.startswith(b"retry: %d\n\n" % config.TASK_STREAM_RETRY_MS)
+    assert b"event: update" in first_chunk
+    assert b"event: delete" in first_chunk
+    assert b"event: create" not in first_chunk
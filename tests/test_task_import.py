@@ -0,0 +1,104 @@
+# Tests of the task import route (POST /tasks/import) and of helpers/task_import.py.
+
+import gzip
+import io
+import json
+
+import pytest
+
+import app_config as config
+from helpers import admission
+from helpers.task_import import ImportInterrupted, LineReader
+
+def _lines(user_id, count):
+    return b"".join(json.dumps({"description": f"Task {number}", "assignedToUid": user_id}).encode() + b"\n" for number in range(1, count + 1))
+
+def _import(client, headers, body, import_id=None, chunked=False):
+    url = "/tasks/import" + (f"?import_id={import_id}" if import_id else "")
+    if chunked:
+        # A chunked upload has no Content-Length: the server reads it until its end.
+        return client.post(url, headers={**headers, "Transfer-Encoding": "chunked"}, input_stream=io.BytesIO(body), environ_base={"wsgi.input_terminated": True})
+    return client.post(url, headers=headers, data=body)
+
+def _checkpoint(db, user_id, import_id):
+    return db[config.CONST_TASK_IMPORT_COLLECTION].find_one({"_id": f"{user_id}:{import_id}"})
+
+def test_an_import_without_content_length_must_end_with_a_newline(client, db, make_user):
+    user_id, headers = make_user("Alice")
+    # The upload is cut in the middle of its third line, where the part received still reads as a valid task.
+    cut = _lines(user_id, 2) + json.dumps({"description": "Task", "assignedToUid": user_id}).encode()
+
+    response = _import(client, headers, cut, "batch", chunked=True)
+
+    report = response.get_json()
+    assert response.status_code == 400
+    assert report["complete"] is False
+    assert (report["lines"], report["imported"]) == (2, 2)
+    assert _checkpoint(db, user_id, "batch")["lines"] == 2
+    assert db[config.CONST_TASK_COLLECTION].count_documents({"description": "Task"}) == 0
+
+def test_an_interrupted_import_resumes_from_its_checkpoint(client, db, make_user):
+    user_id, headers = make_user("Alice")
+    body = _lines(user_id, 5)
+    _import(client, headers, body[:body.index(b"Task 4")], "batch", chunked=True)
+
+    response = _import(client, headers, body, "batch", chunked=True)
+
+    report = response.get_json()
+    assert response.status_code == 200
+    assert report["complete"] is True
+    assert (report["resumed_from"], report["lines"], report["imported"]) == (3, 5, 5)
+    assert sorted(task["description"] for task in db[config.CONST_TASK_COLLECTION].find()) == [f"Task {number}" for number in range(1, 6)]
+
+def test_lines_saved_after_the_last_checkpoint_are_not_saved_twice(client, db, make_user):
+    user_id, headers = make_user("Alice")
+    body = _lines(user_id, 3)
+    _import(client, headers, body, "batch")
+    # The import was interrupted after its chunk was saved, but before its checkpoint was recorded.
+    db[config.CONST_TASK_IMPORT_COLLECTION].update_one({"_id": f"{user_id}:batch"}, {"$set": {"lines": 0, "imported": 0}})
+
+    report = _import(client, headers, body, "batch").get_json()
+
+    assert (report["lines"], report["imported"], report["failed"]) == (3, 3, 0)
+    assert db[config.CONST_TASK_COLLECTION].count_documents({}) == 3
+
+def test_the_last_line_of_a_complete_upload_needs_no_newline(client, db, make_user):
+    user_id, headers = make_user("Alice")
+
+    report = _import(client, headers, _lines(user_id, 2).rstrip(b"\n")).get_json()
+
+    assert (report["complete"], report["imported"]) == (True, 2)
+
+def test_a_gzip_upload_is_complete_at_the_end_of_its_stream(client, make_user):
+    user_id, headers = make_user("Alice")
+    body = gzip.compress(_lines(user_id, 2).rstrip(b"\n"))
+
+    complete = _import(client, {**headers, "Content-Encoding": "gzip"}, body, chunked=True)
+    cut = _import(client, {**headers, "Content-Encoding": "gzip"}, body[:-10], chunked=True)
+
+    assert (complete.status_code, complete.get_json()["imported"]) == (200, 2)
+    assert cut.status_code == 400
+
+def test_line_reader_keeps_a_cut_line():
+    reader = LineReader(False, None)
+
+    assert list(reader.feed(b'{"a": 1}\n{"b"')) == [(1, b'{"a": 1}')]
+    with pytest.raises(ImportInterrupted):
+        list(reader.finish())
+
+def test_imports_beyond_the_concurrency_limit_get_503(client, db, make_user, monkeypatch):
+    user_id, headers = make_user("Alice")
+    limiter = admission.route_limiters["task.importTasks"]
+    monkeypatch.setattr(limiter, "queue", 0)
+    # Other imports hold every slot.
+    for _ in range(limiter.limit):
+        assert limiter.acquire()
+    try:
+        response = _import(client, headers, _lines(user_id, 1))
+    finally:
+        for _ in range(limiter.limit):
+            limiter.release()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert db[config.CONST_TASK_COLLECTION].count_documents({}) == 0
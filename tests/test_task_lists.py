@@ -0,0 +1,73 @@
+# Tests of the ETags and of the response cache of the task list routes (GET /tasks/createdby/ and /tasks/assignedto/).
+
+import app_config as config
+from helpers.response_cache import ResponseCache, response_cache
+
+def test_unchanged_list_is_not_modified(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    create_tasks(headers, user_id, 2)
+
+    first = client.get("/tasks/createdby/", headers=headers)
+    etag = first.headers["ETag"]
+    not_modified = response_cache.not_modified
+    second = client.get("/tasks/createdby/", headers={**headers, "If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert len(first.get_json()["tasks"]) == 2
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert response_cache.not_modified == not_modified + 1
+
+def test_a_write_changes_the_etag_of_both_users(client, make_user, create_tasks):
+    alice_id, alice = make_user("Alice")
+    bob_id, bob = make_user("Bob")
+    task_id, = create_tasks(alice, bob_id, 1)
+    created_etag = client.get("/tasks/createdby/", headers=alice).headers["ETag"]
+    assigned_etag = client.get("/tasks/assignedto/", headers=bob).headers["ETag"]
+
+    client.patch(f"/tasks/{task_id}", headers=bob, json={"done": True})
+
+    created = client.get("/tasks/createdby/", headers={**alice, "If-None-Match": created_etag})
+    assigned = client.get("/tasks/assignedto/", headers={**bob, "If-None-Match": assigned_etag})
+    assert created.status_code == 200
+    assert created.get_json()["tasks"][0]["done"] is True
+    assert assigned.status_code == 200
+    assert assigned.get_json()["tasks"][0]["version"] == 1
+
+def test_a_write_through_another_worker_changes_the_etag(client, db, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    create_tasks(headers, user_id, 1)
+    etag = client.get("/tasks/createdby/", headers=headers).headers["ETag"]
+
+    # Another worker has its own response cache, but bumps the versions shared through the database.
+    ResponseCache(10).bump(db[config.CONST_TASK_LIST_VERSION_COLLECTION], [user_id])
+
+    response = client.get("/tasks/createdby/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_recreated_versions_never_reuse_an_etag(client, db, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    create_tasks(headers, user_id, 1)
+    etag = client.get("/tasks/createdby/", headers=headers).headers["ETag"]
+
+    # The versions collection is dropped and the user gets the same version number again.
+    db.drop_collection(config.CONST_TASK_LIST_VERSION_COLLECTION)
+    response_cache.bump(db[config.CONST_TASK_LIST_VERSION_COLLECTION], [user_id])
+
+    assert client.get("/tasks/createdby/", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+def test_pages_and_queries_are_cached_separately(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    create_tasks(headers, user_id, 3)
+
+    first_page = client.get("/tasks/createdby/?limit=2", headers=headers).get_json()
+    second_page = client.get(f"/tasks/createdby/?limit=2&after={first_page['next_cursor']}", headers=headers).get_json()
+    hits = response_cache.hits
+    again = client.get("/tasks/createdby/?limit=2", headers=headers).get_json()
+
+    assert len(first_page["tasks"]) == 2
+    assert len(second_page["tasks"]) == 1
+    assert again == first_page
+    assert response_cache.hits == hits + 1
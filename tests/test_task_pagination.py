@@ -0,0 +1,73 @@
+# Tests of the keyset pagination of the task list routes (GET /tasks/createdby/ and /tasks/assignedto/).
+
+import pytest
+from bson.objectid import ObjectId
+
+import app_config as config
+
+def _pages(client, url, headers, limit):
+    pages, after = [], None
+    while True:
+        page = client.get(f"{url}?limit={limit}" + (f"&after={after}" if after else ""), headers=headers).get_json()
+        pages.append([task["_id"] for task in page["tasks"]])
+        after = page["next_cursor"]
+        if after is None:
+            return pages
+
+@pytest.mark.parametrize("url", ["/tasks/createdby/", "/tasks/assignedto/"])
+def test_pages_follow_the_cursor_to_the_last_task(client, make_user, create_tasks, url):
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 5)
+
+    assert _pages(client, url, headers, 2) == [task_ids[:2], task_ids[2:4], task_ids[4:]]
+
+def test_a_full_last_page_has_no_next_cursor(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 4)
+
+    assert _pages(client, "/tasks/createdby/", headers, 2) == [task_ids[:2], task_ids[2:]]
+
+def test_a_page_after_the_last_task_is_empty(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+
+    page = client.get(f"/tasks/createdby/?after={task_id}", headers=headers).get_json()
+
+    assert page == {"tasks": [], "next_cursor": None}
+
+def test_the_cursor_of_a_deleted_task_still_continues_the_list(client, db, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_ids = create_tasks(headers, user_id, 3)
+    first_page = client.get("/tasks/createdby/?limit=1", headers=headers).get_json()
+    db[config.CONST_TASK_COLLECTION].delete_one({"_id": ObjectId(first_page["next_cursor"])})
+
+    page = client.get(f"/tasks/createdby/?after={first_page['next_cursor']}", headers=headers).get_json()
+
+    assert [task["_id"] for task in page["tasks"]] == task_ids[1:]
+
+def test_the_page_size_is_capped(client, make_user, create_tasks, monkeypatch):
+    monkeypatch.setattr(config, "TASK_MAX_PAGE_SIZE", 2)
+    user_id, headers = make_user("Alice")
+    create_tasks(headers, user_id, 3)
+
+    page = client.get("/tasks/createdby/?limit=1000", headers=headers).get_json()
+
+    assert len(page["tasks"]) == 2
+    assert page["next_cursor"] is not None
+
+def test_only_the_projected_fields_are_returned(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    create_tasks(headers, user_id, 1)
+
+    task, = client.get("/tasks/createdby/", headers=headers).get_json()["tasks"]
+
+    assert set(task) == {"_id", *config.TASK_PROJECTION}
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=-1", "limit=x", "after=x", "after=123"])
+def test_invalid_page_arguments_are_rejected(client, make_user, query):
+    _, headers = make_user("Alice")
+
+    response = client.get(f"/tasks/createdby/?{query}", headers=headers)
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
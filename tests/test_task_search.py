@@ -0,0 +1,65 @@
+# Tests of the task search route (GET /tasks/search) and of the in-process inverted index of helpers/task_search.py.
+#
+# mongomock has no text search, so the route switches to the inverted index, as a server without text index would.
+
+import pytest
+
+from helpers.task_search import search_index
+
+def _create(client, headers, assigned_to_uid, descriptions):
+    response = client.post("/tasks/bulk", headers=headers, json=[{"description": description, "assignedToUid": assigned_to_uid} for description in descriptions])
+    return [result["id"] for result in response.get_json()["results"]]
+
+def _search(client, headers, query, **args):
+    response = client.get("/tasks/search", headers=headers, query_string={"q": query, **args})
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_tasks_with_the_most_and_the_rarest_terms_come_first(client, make_user):
+    user_id, headers = make_user("Alice")
+    both, deploy, review, budget, _ = _create(client, headers, user_id, ["deploy dashboard", "deploy report", "review report", "review budget", "audit budget"])
+
+    # Both terms before one of them.
+    result = _search(client, headers, "deploy dashboard")
+    assert [task["_id"] for task in result["tasks"]] == [both, deploy]
+    assert result["tasks"][0]["score"] > result["tasks"][1]["score"]
+    assert result["next_cursor"] is None
+
+    # No task has both terms: the rarer one ranks first.
+    tasks = _search(client, headers, "dashboard review")["tasks"]
+    assert tasks[0]["_id"] == both
+    assert {task["_id"] for task in tasks[1:]} == {review, budget}
+
+def test_pages_follow_the_ranking(client, make_user):
+    user_id, headers = make_user("Alice")
+    both, deploy = _create(client, headers, user_id, ["deploy dashboard", "deploy report"])[:2]
+
+    first = _search(client, headers, "deploy dashboard", limit=1)
+    second = _search(client, headers, "deploy dashboard", limit=1, after=first["next_cursor"])
+
+    assert [task["_id"] for task in first["tasks"] + second["tasks"]] == [both, deploy]
+    assert second["next_cursor"] is None
+
+def test_the_search_switches_to_the_inverted_index_and_follows_the_writes(client, make_user, monkeypatch):
+    monkeypatch.setattr(search_index, "text_search", True)
+    user_id, headers = make_user("Alice")
+    other_id, other = make_user("Bob")
+    _create(client, other, other_id, ["deploy the release"])
+    first, = _create(client, headers, user_id, ["deploy the release"])
+
+    assert [task["_id"] for task in _search(client, headers, "release")["tasks"]] == [first]
+    assert search_index.text_search is False
+    builds = search_index.stats()["builds"]
+
+    # The entry of the user is updated by the writes, without being built again.
+    second, = _create(client, headers, user_id, ["release notes"])
+    client.delete(f"/tasks/{first}", headers=headers)
+
+    assert [task["_id"] for task in _search(client, headers, "release")["tasks"]] == [second]
+    assert search_index.stats()["builds"] == builds
+
+@pytest.mark.parametrize("query", [{}, {"q": "the a"}, {"q": "x" * 201}, {"q": "deploy", "after": "x"}, {"q": "deploy", "after": "1000"}])
+def test_invalid_searches_are_rejected(client, make_user, query):
+    _, headers = make_user("Alice")
+
+    assert client.get("/tasks/search", headers=headers, query_string=query).status_code == 400
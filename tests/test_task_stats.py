@@ -0,0 +1,54 @@
+# Tests of the task counters of GET /tasks/stats and of their reconciliation by scripts/reconcile_stats.py.
+
+import sys
+
+import pytest
+
+import app_config as config
+from scripts import reconcile_stats
+
+def _stats(client, headers):
+    response = client.get("/tasks/stats", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_a_user_without_tasks_has_zero_counters(client, make_user):
+    _, headers = make_user("Alice")
+
+    assert _stats(client, headers) == {"created": {"total": 0, "done": 0, "open": 0}, "assigned": {"total": 0, "done": 0, "open": 0}}
+
+def test_the_counters_follow_the_task_writes(client, make_user, create_tasks, assert_no_drift):
+    alice_id, alice = make_user("Alice")
+    bob_id, bob = make_user("Bob")
+    task_ids = create_tasks(alice, bob_id, 3)
+    client.post("/tasks/", headers=alice, json={"description": "Mine", "assignedToUid": alice_id})
+
+    client.patch(f"/tasks/{task_ids[0]}", headers=bob, json={"done": True})
+    # Setting the same status again does not count the task twice.
+    client.patch(f"/tasks/{task_ids[0]}", headers=bob, json={"done": True})
+    client.patch("/tasks/bulk", headers=bob, json={"taskUids": task_ids[1:], "done": True})
+    client.delete(f"/tasks/{task_ids[1]}", headers=alice)
+
+    assert _stats(client, alice) == {"created": {"total": 3, "done": 2, "open": 1}, "assigned": {"total": 1, "done": 0, "open": 1}}
+    assert _stats(client, bob) == {"created": {"total": 0, "done": 0, "open": 0}, "assigned": {"total": 2, "done": 2, "open": 0}}
+    assert_no_drift()
+
+def test_reconciliation_reports_and_rewrites_drifted_counters(client, db, make_user, create_tasks, assert_no_drift, monkeypatch):
+    alice_id, alice = make_user("Alice")
+    create_tasks(alice, alice_id, 2)
+    stats_collection = db[config.CONST_TASK_STATS_COLLECTION]
+    stats_collection.update_one({"_id": alice_id}, {"$inc": {"created": 5}})
+    stats_collection.insert_one({"_id": "departed-user", "created": 1, "createdDone": 0, "assigned": 0, "assignedDone": 0})
+
+    monkeypatch.setattr(sys, "argv", ["reconcile_stats.py", "--dry-run"])
+    with pytest.raises(SystemExit) as exit_info:
+        reconcile_stats.main()
+    assert exit_info.value.code == 1
+    assert stats_collection.find_one({"_id": alice_id})["created"] == 7
+
+    monkeypatch.setattr(sys, "argv", ["reconcile_stats.py"])
+    reconcile_stats.main()
+
+    assert stats_collection.find_one({"_id": "departed-user"}) is None
+    assert _stats(client, alice)["created"] == {"total": 2, "done": 0, "open": 2}
+    assert_no_drift()
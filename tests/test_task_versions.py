@@ -0,0 +1,99 @@
+# Tests of the optimistic concurrency of the task routes (PATCH and DELETE /tasks/<taskUid> with If-Match).
+
+from bson.objectid import ObjectId
+
+import app_config as config
+
+def test_update_returns_the_new_version_as_etag(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+
+    response = client.patch(f"/tasks/{task_id}", headers={**headers, "If-Match": '"0"'}, json={"done": True})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"taskUid": task_id, "version": 1}
+    assert response.headers["ETag"] == '"1"'
+
+def test_update_with_a_stale_version_is_rejected(client, db, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+    client.patch(f"/tasks/{task_id}", headers=headers, json={"done": True})
+
+    # The client read version 0, the task is now at version 1.
+    response = client.patch(f"/tasks/{task_id}", headers={**headers, "If-Match": '"0"'}, json={"done": False})
+
+    assert response.status_code == 412
+    task = db[config.CONST_TASK_COLLECTION].find_one({"_id": ObjectId(task_id)})
+    assert task["done"] is True
+    assert task["version"] == 1
+
+def test_update_with_an_invalid_etag_is_rejected(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+
+    response = client.patch(f"/tasks/{task_id}", headers={**headers, "If-Match": '"abc"'}, json={"done": True})
+
+    assert response.status_code == 412
+
+def test_update_with_any_version(client, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+
+    assert client.patch(f"/tasks/{task_id}", headers={**headers, "If-Match": "*"}, json={"done": True}).status_code == 200
+
+def test_update_of_a_task_without_version(client, db, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+    db[config.CONST_TASK_COLLECTION].update_one({"_id": ObjectId(task_id)}, {"$unset": {"version": ""}})
+
+    # Tasks created before versioning match version 0.
+    response = client.patch(f"/tasks/{task_id}", headers={**headers, "If-Match": '"0"'}, json={"done": True})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"1"'
+
+def test_update_tells_apart_missing_and_forbidden_tasks(client, make_user, create_tasks):
+    alice_id, alice = make_user("Alice")
+    bob_id, bob = make_user("Bob")
+    task_id, = create_tasks(alice, alice_id, 1)
+
+    missing = client.patch(f"/tasks/{ObjectId()}", headers={**alice, "If-Match": '"0"'}, json={"done": True})
+    forbidden = client.patch(f"/tasks/{task_id}", headers={**bob, "If-Match": '"0"'}, json={"done": True})
+
+    assert missing.status_code == 400
+    assert "Task not found" in missing.get_json()["error"]
+    assert forbidden.status_code == 400
+    assert "assigned to them" in forbidden.get_json()["error"]
+
+def test_delete_with_a_stale_version_is_rejected(client, db, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+    client.patch(f"/tasks/{task_id}", headers=headers, json={"done": True})
+
+    response = client.delete(f"/tasks/{task_id}", headers={**headers, "If-Match": '"0"'})
+
+    assert response.status_code == 412
+    assert db[config.CONST_TASK_COLLECTION].count_documents({"_id": ObjectId(task_id)}) == 1
+
+def test_delete_with_the_current_version(client, db, make_user, create_tasks):
+    user_id, headers = make_user("Alice")
+    task_id, = create_tasks(headers, user_id, 1)
+
+    response = client.delete(f"/tasks/{task_id}", headers={**headers, "If-Match": '"0"'})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"tasksAffected": 1}
+    assert db[config.CONST_TASK_COLLECTION].count_documents({}) == 0
+
+def test_delete_tells_apart_missing_and_forbidden_tasks(client, make_user, create_tasks):
+    alice_id, alice = make_user("Alice")
+    bob_id, bob = make_user("Bob")
+    task_id, = create_tasks(alice, bob_id, 1)
+
+    missing = client.delete(f"/tasks/{ObjectId()}", headers=alice)
+    forbidden = client.delete(f"/tasks/{task_id}", headers=bob)
+
+    assert missing.status_code == 400
+    assert "Task not found" in missing.get_json()["error"]
+    assert forbidden.status_code == 400
+    assert "created by them" in forbidden.get_json()["error"]
@@ -0,0 +1,53 @@
+# Tests of the authentication of the requests and of the claims cache of helpers/token_validation.py.
+
+import time
+from datetime import datetime, timedelta
+
+import jwt
+
+import app_config as config
+from helpers.token_validation import ClaimsCache, claims_cache
+
+def test_claims_cache_evicts_the_least_recently_used_token():
+    cache = ClaimsCache(2)
+    cache.put("a", {"id": "a"})
+    cache.put("b", {"id": "b"})
+    cache.get("a")
+    cache.put("c", {"id": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": "a"}
+    assert cache.get("c") == {"id": "c"}
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1}
+
+def test_claims_cache_drops_expired_tokens():
+    cache = ClaimsCache(2)
+    cache.put("a", {"id": "a", "exp": time.time() - 1})
+
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+def test_a_token_sent_again_is_served_from_the_cache(client, make_user):
+    _, headers = make_user("Alice")
+    hits = claims_cache.hits
+
+    first = client.get("/tasks/createdby/", headers=headers)
+    second = client.get("/tasks/createdby/", headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert claims_cache.hits == hits + 1
+
+def test_requests_without_a_valid_token_are_refused(client, make_user):
+    user_id, _ = make_user("Alice")
+    expired = jwt.encode({"id": user_id, "exp": datetime.utcnow() - timedelta(seconds=1)}, config.TOKEN_SECRET)
+    forged = jwt.encode({"id": user_id}, "not-the-secret")
+
+    assert client.get("/tasks/createdby/").status_code == 401
+    assert client.get("/tasks/createdby/", headers={"x-access-token": expired}).status_code == 403
+    assert client.get("/tasks/createdby/", headers={"x-access-token": forged}).status_code == 403
+    assert client.get("/users/", headers={"x-access-token": forged}).status_code == 401
+
+def test_public_user_routes_need_no_token(client):
+    response = client.post("/users/login", json={"email": "nobody@test.example", "password": "secret"})
+
+    assert response.get_json() == {"error": "Email not found."}
@@ -0,0 +1,69 @@
+# Tests of the user cache of helpers/user_cache.py and of its use by the controllers.
+
+import time
+
+from bson.objectid import ObjectId
+
+import app_config as config
+from helpers.user_cache import UserCache, user_cache
+
+def _user(name):
+    return {"_id": ObjectId(), "name": name, "email": f"{name.lower()}@test.example"}
+
+def test_the_least_recently_used_user_is_evicted_with_its_email():
+    cache = UserCache(max_size=2, ttl=60)
+    ada, bob, eve = _user("Ada"), _user("Bob"), _user("Eve")
+
+    cache.put(ada)
+    cache.put(bob)
+    assert cache.get_by_id(str(ada["_id"])) is ada
+    cache.put(eve)
+
+    assert cache.get_by_id(str(bob["_id"])) is None
+    assert cache.get_by_email("bob@test.example") is None
+    assert cache.get_by_email("ada@test.example") is ada
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    cache = UserCache(max_size=10, ttl=60)
+    ada = _user("Ada")
+    cache.put(ada)
+    cache.put_all([{"id": str(ada["_id"])}])
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+
+    assert cache.get_by_id(str(ada["_id"])) is None
+    assert cache.get_all() is None
+    assert cache.stats()["expirations"] == 1
+
+def test_a_user_whose_email_changed_is_not_found_by_its_old_email():
+    cache = UserCache(max_size=10, ttl=60)
+    ada = _user("Ada")
+    cache.put(ada)
+    cache.put({**ada, "email": "ada@new.example"})
+
+    assert cache.get_by_email("ada@test.example") is None
+    assert cache.get_by_email("ada@new.example")["_id"] == ada["_id"]
+
+def test_task_creation_resolves_users_from_the_cache(client, db, make_user):
+    ada_id, headers = make_user("Ada")
+    bob_id, _ = make_user("Bob")
+
+    response = client.post("/tasks/", headers=headers, json={"description": "Write tests", "assignedToUid": bob_id})
+    assert response.status_code == 200
+    assert user_cache.get_by_id(bob_id)["name"] == "Bob"
+
+    # The users are not read again while they are cached.
+    db[config.CONST_USER_COLLECTION].delete_many({})
+    response = client.post("/tasks/", headers=headers, json={"description": "Review tests", "assignedToUid": bob_id})
+    assert response.status_code == 200
+
+def test_user_creation_drops_the_cached_users_list(client, make_user):
+    _, headers = make_user("Ada")
+    assert [user["name"] for user in client.get("/users/", headers=headers).get_json()["users"]] == ["Ada"]
+
+    response = client.post("/users/", json={"name": "Bob", "email": "bob@test.example", "password": "secret"})
+    assert response.status_code == 200
+
+    assert sorted(user["name"] for user in client.get("/users/", headers=headers).get_json()["users"]) == ["Ada", "Bob"]
@@ -0,0 +1,14 @@
+# Tests of the user routes (/users/).
+
+import app_config as config
+
+def test_a_second_user_with_the_same_email_is_refused(client, db):
+    user = {"name": "Alice", "email": "alice@test.example", "password": "secret"}
+
+    first = client.post("/users/", json=user)
+    second = client.post("/users/", json={**user, "name": "Other Alice"})
+
+    assert first.status_code == 200
+    assert second.status_code == 400
+    assert second.get_json() == {"error": "There is already an user with this email."}
+    assert db[config.CONST_USER_COLLECTION].count_documents({}) == 1
@@ -0,0 +1,313 @@
+# Import the necessary modules.
+#
+# Async versions of the task views of views/task_view.py, used by the async serving mode (asgi.py).
+# The routes, request data, responses and status codes are the same as in views/task_view.py.
+
+from quart import Blueprint, Response, jsonify, request, g  # Import Quart modules # pip install quart
+import json  # Import JSON module
+
+from helpers.async_token_validation import require_jwt_async  # Import module for token validation
+from helpers.pagination import parse_page_arguments, parse_limit  # Import module for pagination query parameters
+from helpers.list_query import parse_task_list_query  # Import module for list query parameters
+from helpers.etags import task_etag, parse_if_match_version  # Import module for task ETags
+from helpers.response_cache import response_cache  # Import the cache of task list responses
+from helpers.task_search import parse_search_arguments  # Import module for search query parameters
+from helpers.task_events import task_events, StreamBusy  # Import the hub of the task events
+from helpers.task_changes import parse_since, SyncTokenExpired  # Import module for sync tokens
+from helpers.export import parse_export_arguments, export_headers, export_stream_async, TASK_EXPORT_FIELDS  # Import module for streaming exports
+from helpers.task_import import parse_import_arguments, LineReader, read_lines_async  # Import module for streaming imports
+from helpers.admission import limit_concurrency_async  # Import module for admission control
+from helpers.request_bodies import missing_field, task_info_of, created_tasks_body, updated_tasks_body, TASK_UPDATE_FIELDS, TASK_BULK_UPDATE_FIELDS, TASK_BULK_DELETE_FIELDS, VERSION_MISMATCH_ERROR  # Import module for request bodies
+from controllers.async_task_controller import (  # Import async controller functions for task related operations
+    create_task,
+    create_tasks,
+    import_tasks,
+    get_tasks_assigned_to_user,
+    get_task_created_by_user,
+    get_task_list_version,
+    get_task_stats,
+    search_tasks,
+    get_task_changes,
+    export_tasks,
+    update_task,
+    delete_task,
+    update_tasks,
+    delete_tasks
+)
+
+task = Blueprint("task", __name__)
+"""
+Blueprint for task related views of the async serving mode.
+
+It serves the same routes as the task blueprint of views/task_view.py.
+"""
+
+# Authenticate every request of the blueprint.
+task.before_request(require_jwt_async(
+    401, 'Token is missing in the request, please try again',
+    403, 'Invalid authentication token, please login again'))
+
+# Create task route.
+@task.route("/tasks/", methods=["POST"])
+async def createTask():
+    """
+    Create a new task. See task_view.createTask().
+    """
+    try:
+        user_info = g.user_information
+
+        task_info = task_info_of(await request.get_json(), user_info['id'])
+
+        created_task = await create_task(task_info)
+
+        return jsonify({'id': str(created_task.inserted_id)}), 200
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Bulk create tasks route.
+@task.route("/tasks/bulk", methods=["POST"])
+async def createTasks():
+    """
+    Create many tasks at once. See task_view.createTasks().
+    """
+    try:
+        results = await create_tasks(g.user_information['id'], await request.get_json())
+
+        return jsonify(created_tasks_body(results)), 200
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Import tasks route.
+@task.route("/tasks/import", methods=["POST"])
+@limit_concurrency_async("task.importTasks")
+async def importTasks():
+    """
+    Import tasks from an NDJSON upload. See task_view.importTasks().
+
+    The body is consumed as it arrives. Quart buffers the part of the upload not read yet, up to its MAX_CONTENT_LENGTH setting.
+    """
+    try:
+        import_id, compressed = parse_import_arguments(request.args, request.headers.get('Content-Encoding'))
+
+        report = await import_tasks(g.user_information['id'], read_lines_async(request.body, LineReader(compressed, request.content_length)), import_id)
+        return jsonify(report), 200 if report['complete'] else 400
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Function to answer a task list request from the response cache.
+async def _task_list_response(fetch_tasks, owner_field):
+    """
+    Answer a task list request of the current user, from the response cache when possible. See task_view._task_list_response().
+    """
+    user_id = g.user_information['id']
+
+    version = await get_task_list_version(user_id)
+    etag = response_cache.etag(version)
+
+    if request.if_none_match.contains(etag):
+        response_cache.count_not_modified()
+        response = Response(b'', status=304)
+    else:
+        key = (user_id, request.endpoint, version, request.query_string)
+        body = response_cache.get(key)
+
+        if body is None:
+            limit, after = parse_page_arguments(request.args)
+            filters, direction, projection = parse_task_list_query(request.args, owner_field)
+
+            tasks, next_cursor = await fetch_tasks(user_id, limit, after, filters, direction, projection)
+            body = await jsonify({'tasks': tasks, 'next_cursor': next_cursor}).get_data()
+            response_cache.put(key, body)
+
+        response = Response(body, mimetype='application/json')
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Get tasks created by the user route.
+@task.route("/tasks/createdby/", methods=["GET"])
+async def search_created_by():
+    """
+    Get one page of tasks created by the user. See task_view.search_created_by().
+    """
+    try:
+        return await _task_list_response(lambda user_id, limit, after, filters, direction, projection: get_task_created_by_user(
+            user_id=user_id, limit=limit, after=after, filters=filters, direction=direction, projection=projection), "createdByUid")
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Get tasks assigned to the user route.
+@task.route("/tasks/assignedto/", methods=["GET"])
+async def get_tasks_assigned_to_current_user():
+    """
+    Get one page of tasks assigned to the current user. See task_view.get_tasks_assigned_to_current_user().
+    """
+    try:
+        return await _task_list_response(lambda assignedToUid, limit, after, filters, direction, projection: get_tasks_assigned_to_user(
+            assignedToUid, limit=limit, after=after, filters=filters, direction=direction, projection=projection), "assignedToUid")
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Get the task counters of the user route.
+@task.route("/tasks/stats", methods=["GET"])
+async def get_stats_of_current_user():
+    """
+    Get the task counters of the current user. See task_view.get_stats_of_current_user().
+    """
+    try:
+        return jsonify(await get_task_stats(g.user_information['id'])), 200
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Search the tasks of the user route.
+@task.route("/tasks/search", methods=["GET"])
+async def search_tasks_of_current_user():
+    """
+    Search the tasks created by or assigned to the current user. See task_view.search_tasks_of_current_user().
+    """
+    try:
+        terms, limit, offset = parse_search_arguments(request.args)
+        tasks, next_cursor = await search_tasks(g.user_information['id'], terms, limit=limit, offset=offset)
+        return jsonify({'tasks': tasks, 'next_cursor': next_cursor}), 200
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Get the task changes of the user route.
+@task.route("/tasks/changes", methods=["GET"])
+async def get_changes_of_current_user():
+    """
+    Get the changes of the tasks of the current user since a sync token. See task_view.get_changes_of_current_user().
+    """
+    try:
+        since = parse_since(request.args)
+        limit = parse_limit(request.args)
+        return jsonify(await get_task_changes(g.user_information['id'], since, limit)), 200
+
+    except SyncTokenExpired as err:
+        return jsonify({"error": str(err)}), 410
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Stream the task events of the user route.
+@task.route("/tasks/stream", methods=["GET"])
+async def stream_tasks_of_current_user():
+    """
+    Stream the task events of the current user. See task_view.stream_tasks_of_current_user().
+    """
+    try:
+        subscription, frames = task_events.subscribe(g.user_information['id'], request.headers.get('Last-Event-ID'))
+    except StreamBusy as err:
+        return jsonify({'error': str(err)}), 503, {'Retry-After': '1'}
+
+    response = Response(task_events.stream_async(subscription, frames), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The stream stays open until the client disconnects.
+    response.timeout = None
+    return response
+
+# Export the tasks of the user route.
+@task.route("/tasks/export", methods=["GET"])
+async def export_tasks_of_current_user():
+    """
+    Export every task of the current user. See task_view.export_tasks_of_current_user().
+    """
+    try:
+        export_format, compress = parse_export_arguments(request.args, request.accept_encodings)
+        tasks = export_tasks(g.user_information['id'])
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+    mimetype, headers = export_headers("tasks", export_format, compress)
+    response = Response(export_stream_async(tasks, export_format, TASK_EXPORT_FIELDS, compress), mimetype=mimetype, headers=headers)
+    # A large export can take longer than the response timeout.
+    response.timeout = None
+    return response
+
+# Update task route.
+@task.route("/tasks/<taskUid>", methods=["PATCH"])
+async def updateTask(taskUid):
+    """
+    Update a task. See task_view.updateTask().
+    """
+    try:
+        data = json.loads(await request.get_data())
+
+        error = missing_field(data, TASK_UPDATE_FIELDS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        result = await update_task(g.user_information, taskUid, data["done"], expected_version=parse_if_match_version(request.if_match))
+
+        if result == "Version Mismatch":
+            return jsonify({"error": VERSION_MISMATCH_ERROR}), 412
+
+        response = jsonify({"taskUid": taskUid, "version": result["version"]})
+        response.set_etag(task_etag(result["version"]))
+        return response, 200
+
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+# Delete task route.
+@task.route("/tasks/<taskUid>", methods=["DELETE"])
+async def deleteTask(taskUid):
+    """
+    Delete a task. See task_view.deleteTask().
+    """
+    try:
+        deleted_task = await delete_task(user_information=g.user_information, task_id=taskUid, expected_version=parse_if_match_version(request.if_match))
+
+        if deleted_task == "Version Mismatch":
+            return jsonify({"error": VERSION_MISMATCH_ERROR}), 412
+
+        return jsonify({'tasksAffected': 1}), 200
+
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+# Bulk update tasks route.
+@task.route("/tasks/bulk", methods=["PATCH"])
+async def updateTasks():
+    """
+    Update the status of many tasks at once. See task_view.updateTasks().
+    """
+    try:
+        data = json.loads(await request.get_data())
+
+        error = missing_field(data, TASK_BULK_UPDATE_FIELDS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        result = await update_tasks(g.user_information, data["taskUids"], data["done"])
+
+        return jsonify(updated_tasks_body(result)), 200
+
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+# Bulk delete tasks route.
+@task.route("/tasks/bulk", methods=["DELETE"])
+async def deleteTasks():
+    """
+    Delete many tasks at once. See task_view.deleteTasks().
+    """
+    try:
+        data = json.loads(await request.get_data())
+
+        error = missing_field(data, TASK_BULK_DELETE_FIELDS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        result = await delete_tasks(user_information=g.user_information, task_ids=data["taskUids"])
+
+        return jsonify(result), 200
+
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
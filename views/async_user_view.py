@@ -0,0 +1,129 @@
+# Import the necessary modules.
+#
+# Async versions of the user views of views/user_view.py, used by the async serving mode (asgi.py).
+# The routes, request data, responses and status codes are the same as in views/user_view.py.
+
+from quart import Blueprint, Response, jsonify, request, g  # Import Quart modules # pip install quart
+import json  # Import JSON module
+
+from helpers.async_token_validation import require_jwt_async # Import module for token validation
+from helpers.password_hashing import HashingPoolBusy # Import the exception raised when password hashing is overloaded
+from helpers.admission import limit_concurrency_async, throttle_login # Import module for admission control
+from helpers.list_query import parse_user_list_query # Import module for list query parameters
+from helpers.request_bodies import missing_field, USER_CREATE_FIELDS, USER_LOGIN_FIELDS, BUSY_ERROR, login_error # Import module for request bodies
+from helpers.export import parse_export_arguments, export_headers, export_stream_async, USER_EXPORT_FIELDS # Import module for streaming exports
+from controllers.async_user_controller import ( # Import async controller functions for user related operations
+    create_user,
+    login_user,
+    fetch_all_users,
+    export_users
+)
+
+user = Blueprint("user", __name__)
+"""
+Blueprint for user related views of the async serving mode.
+
+It serves the same routes as the user blueprint of views/user_view.py, with the same concurrency limits. The requests waiting for a slot await it on the event loop instead of holding a thread.
+"""
+
+# Authenticate every request of the blueprint, except user creation and login.
+user.before_request(require_jwt_async(
+    400, 'Token is missing in the request.',
+    401, 'Invalid authentication token.',
+    public_endpoints=("user.create", "user.login")))
+
+@user.route("/users/", methods=["POST"])
+@limit_concurrency_async("user.create")
+async def create():
+    """
+    Create a new user. See user_view.create().
+    """
+    try:
+        data = json.loads(await request.get_data())
+
+        # Check if the required keys are in the request data
+        error = missing_field(data, USER_CREATE_FIELDS)
+        if error:
+            return jsonify({'error': error}), 400
+
+        created_user = await create_user(data)
+
+        if created_user == "Duplicated User":
+            return jsonify({'error': 'There is already an user with this email.'}), 400
+
+        return jsonify({'id': str(created_user.inserted_id)})
+    except HashingPoolBusy:
+        return jsonify({'error': BUSY_ERROR}), 503, {'Retry-After': '1'}
+    except ValueError:
+        return jsonify({'error': 'Error on creating user.'}), 500
+
+@user.route("/users/login", methods=["POST"])
+@limit_concurrency_async("user.login")
+async def login():
+    """
+    Login a user. See user_view.login().
+    """
+    try:
+        data = json.loads(await request.get_data())
+
+        # Check if the required keys are in the request data
+        error = missing_field(data, USER_LOGIN_FIELDS)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Reject the attempt before any password check if the email or the IP address made too many attempts
+        retry_after = throttle_login(data['email'], request.remote_addr)
+        if retry_after:
+            return jsonify({'error': 'Too many login attempts, please try again later.'}), 429, {'Retry-After': str(retry_after)}
+
+        login_attempt = await login_user(data)
+
+        error = login_error(login_attempt)
+        if error:
+            return jsonify({'error': error}), 401
+
+        return jsonify(login_attempt)
+    except HashingPoolBusy:
+        return jsonify({'error': BUSY_ERROR}), 503, {'Retry-After': '1'}
+    except ValueError:
+        return jsonify({'error': 'Error login user.'}), 500
+
+@user.route("/users/", methods=["GET"])
+@limit_concurrency_async("user.fetch")
+async def fetch():
+    """
+    Fetch all users. See user_view.fetch().
+    """
+    try:
+        sort, projection = parse_user_list_query(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    try:
+        users = await fetch_all_users(sort=sort, projection=projection)
+
+        return jsonify({'users': users, 'request_made_by': g.user_information})
+
+    except ValueError:
+        return jsonify({'error': 'Error fetching users.'}), 500
+
+@user.route("/users/export", methods=["GET"])
+async def export():
+    """
+    Export all users. See user_view.export().
+    """
+    try:
+        export_format, compress = parse_export_arguments(request.args, request.accept_encodings)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    try:
+        users = export_users()
+    except ValueError:
+        return jsonify({'error': 'Error exporting users.'}), 500
+
+    mimetype, headers = export_headers("users", export_format, compress)
+    response = Response(export_stream_async(users, export_format, USER_EXPORT_FIELDS, compress), mimetype=mimetype, headers=headers)
+    # A large export can take longer than the response timeout.
+    response.timeout = None
+    return response
@@ -0,0 +1,181 @@
+# Import the necessary modules.
+
+import inspect
+from functools import wraps
+
+from flask import Blueprint, request  # Import Flask modules
+
+from helpers.token_validation import claims_cache  # Import the cache of verified tokens
+from helpers.admission import admission_stats  # Import the statistics of the admission control
+from helpers.user_cache import user_cache  # Import the cache of users
+from helpers.response_cache import response_cache  # Import the cache of task list responses
+from helpers.task_search import search_index  # Import the in-process search index
+from helpers.task_events import task_events  # Import the hub of the task events
+from database.__init__ import conn  # Import the database connection
+from database.monitoring import pool_monitor, command_monitor  # Import the statistics of the MongoDB clients
+from database.slow_ops import slow_operations  # Import the recorder of the slow operations
+from helpers.metrics import render_metrics  # Import the metrics of the process
+import app_config as config
+
+# The handlers of the operational routes return a dict (sent as JSON) or a string with a status code and headers, so the same handlers serve Flask and Quart.
+
+# Decorator to serve a debug route only when the debug routes are enabled.
+def debug_route(handler):
+    """
+    Decorator to answer 404 on a debug route unless config.DEBUG_ROUTES_ENABLED is set.
+
+    Args:
+        handler (function): The handler of the route.
+
+    Returns:
+        function: The guarded handler.
+    """
+    @wraps(handler)
+    def guarded_handler(*args, **kwargs):
+        if not config.DEBUG_ROUTES_ENABLED:
+            return {'error': 'Not found.'}, 404
+        return handler(*args, **kwargs)
+
+    return guarded_handler
+
+# Statistics route.
+@debug_route
+def stats():
+    """
+    Return the statistics of the in-process caches, of the admission control and of the MongoDB clients.
+
+    This function handles the HTTP GET request to read the statistics of this worker, such as the hit and miss counters of the caches of verified tokens, users and task list responses, the rejection counters of the admission control, and the connection pool and command counters of MongoDB.
+
+    Returns:
+        A JSON response with the statistics and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 404 if the debug routes are disabled.
+    """
+    return {'jwt_cache': claims_cache.stats(), 'user_cache': user_cache.stats(), 'response_cache': response_cache.stats(), 'search_index': search_index.stats(), 'task_events': task_events.stats(), 'admission': admission_stats(),
+            'mongo': {'pool_options': conn.pool_options, 'pool': pool_monitor.stats(), 'commands': command_monitor.stats()}}, 200
+
+# Slow operations route.
+@debug_route
+def slow_ops(args):
+    """
+    Return the latest slow operations of this worker.
+
+    This function handles the HTTP GET request to read the MongoDB commands slower than SLOW_OP_THRESHOLD_MS and the requests slower than SLOW_REQUEST_THRESHOLD_MS, from the most recent.
+    It accepts the optional 'limit' query parameter to return fewer entries.
+
+    Args:
+        args (dict): The query parameters of the request.
+
+    Returns:
+        A JSON response with the thresholds and the entries and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400, or 404 if the debug routes are disabled.
+    """
+    try:
+        limit = int(args.get("limit", config.SLOW_OP_BUFFER_SIZE))
+    except ValueError:
+        return {'error': 'The limit parameter must be an integer.'}, 400
+
+    return {'threshold_ms': config.SLOW_OP_THRESHOLD_MS, 'request_threshold_ms': config.SLOW_REQUEST_THRESHOLD_MS,
+            'entries': slow_operations.entries(limit)}, 200
+
+# Metrics route.
+def metrics():
+    """
+    Return the metrics of this worker in the Prometheus text format.
+
+    This function handles the HTTP GET request of a Prometheus scrape. It returns the latency histograms of the requests by route, method and status code, of the MongoDB commands by collection and command, and of the JWT validations and bcrypt calls.
+
+    Returns:
+        A text response with the metrics and a HTTP status code of 200.
+    """
+    return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+# Liveness route.
+def healthz():
+    """
+    Report that the process is alive.
+
+    This function handles the HTTP GET request of a liveness probe. It does not depend on MongoDB, so that an outage of the database does not get the workers restarted; use /readyz to check the database.
+
+    Returns:
+        A JSON response with the status and a HTTP status code of 200.
+    """
+    return {'status': 'ok'}, 200
+
+# Readiness route.
+def readyz(error):
+    """
+    Report whether the process can serve requests.
+
+    This function answers the HTTP GET request of a readiness probe, once MongoDB was sent a ping with a timeout of HEALTH_CHECK_TIMEOUT_MS milliseconds.
+
+    Args:
+        error (Exception): The error of the ping, or None if MongoDB answered in time.
+
+    Returns:
+        A JSON response with the status and a HTTP status code of 200, or a JSON response with a fixed error message and a HTTP status code of 503 if MongoDB does not answer in time.
+    """
+    if error is not None:
+        # The error of the driver can name the servers and the user of the connection string, so it is only logged.
+        print(f"Readiness check failed: {error}")
+        return {'status': 'unavailable', 'error': 'The database is not available.'}, 503
+
+    return {'status': 'ready'}, 200
+
+# Function to create the blueprint of the operational routes.
+def create_ops_blueprint(blueprint_class, request, ping):
+    """
+    Create the blueprint of the operational routes, for the synchronous (Flask) or the async (Quart) serving mode.
+
+    This blueprint handles the following routes:
+    - GET /debug/stats: Returns the statistics of the in-process caches, of the admission control and of the MongoDB clients, if config.DEBUG_ROUTES_ENABLED is set.
+    - GET /debug/slow-ops: Returns the latest slow MongoDB commands and requests, if config.DEBUG_ROUTES_ENABLED is set.
+    - GET /metrics: Returns the metrics of the process in the Prometheus text format.
+    - GET /healthz: Returns 200 while the process serves requests.
+    - GET /readyz: Returns 200 if MongoDB answers a ping in time, 503 otherwise.
+
+    Args:
+        blueprint_class (type): flask.Blueprint or quart.Blueprint.
+        request: The request of the framework (flask.request or quart.request).
+        ping (function): The function sending a ping to MongoDB with a timeout in milliseconds, such as Database.ping(). A coroutine function makes every route a coroutine, for Quart.
+
+    Returns:
+        The blueprint.
+    """
+    is_async = inspect.iscoroutinefunction(ping)
+
+    # Function to adapt a handler to the serving mode: Quart runs plain functions on a thread pool, so they are wrapped in a coroutine.
+    def view(handler):
+        if not is_async:
+            return handler
+
+        @wraps(handler)
+        async def async_view():
+            return handler()
+
+        return async_view
+
+    if is_async:
+        async def check_database():
+            try:
+                await ping(config.HEALTH_CHECK_TIMEOUT_MS)
+            except Exception as err:
+                return readyz(err)
+            return readyz(None)
+    else:
+        def check_database():
+            try:
+                ping(config.HEALTH_CHECK_TIMEOUT_MS)
+            except Exception as err:
+                return readyz(err)
+            return readyz(None)
+
+    blueprint = blueprint_class("ops", __name__)
+    blueprint.add_url_rule("/debug/stats", "stats", view(stats), methods=["GET"])
+    blueprint.add_url_rule("/debug/slow-ops", "slow_ops", view(lambda: slow_ops(request.args)), methods=["GET"])
+    blueprint.add_url_rule("/metrics", "metrics", view(metrics), methods=["GET"])
+    blueprint.add_url_rule("/healthz", "healthz", view(healthz), methods=["GET"])
+    blueprint.add_url_rule("/readyz", "readyz", check_database, methods=["GET"])
+    return blueprint
+
+ops = create_ops_blueprint(Blueprint, request, conn.ping)
+"""
+Blueprint for operational views of the synchronous serving mode. See create_ops_blueprint().
+"""
@@ -1,20 +1,49 @@
 # Import the necessary modules.
 
-from flask import Blueprint, jsonify, request  # Import Flask modules
+from flask import Blueprint, Response, jsonify, request, g  # Import Flask modules
 import json  # Import JSON module
 
-from helpers.token_validation import validate_jwt  # Import module for token validation
+from helpers.token_validation import require_jwt  # Import module for token validation
+from helpers.pagination import get_page_arguments, parse_limit  # Import module for pagination query parameters
+from helpers.list_query import parse_task_list_query  # Import module for list query parameters
+from helpers.etags import task_etag, get_if_match_version  # Import module for task ETags
+from helpers.response_cache import response_cache  # Import the cache of task list responses
+from helpers.task_search import parse_search_arguments  # Import module for search query parameters
+from helpers.task_events import task_events, StreamBusy  # Import the hub of the task events
+from helpers.task_changes import parse_since, SyncTokenExpired  # Import module for sync tokens
+from helpers.export import parse_export_arguments, export_headers, export_stream, TASK_EXPORT_FIELDS  # Import module for streaming exports
+from helpers.task_import import parse_import_arguments, LineReader, read_lines  # Import module for streaming imports
+from helpers.admission import limit_concurrency  # Import module for admission control
+from helpers.request_bodies import missing_field, task_info_of, created_tasks_body, updated_tasks_body, TASK_UPDATE_FIELDS, TASK_BULK_UPDATE_FIELDS, TASK_BULK_DELETE_FIELDS, VERSION_MISMATCH_ERROR  # Import module for request bodies
 from controllers.task_controller import (  # Import controller functions for task related operations
     # Import controller functions for task creation
     create_task,
+    # Import controller functions for bulk task creation
+    create_tasks,
+    # Import controller functions for importing tasks
+    import_tasks,
     # Import controller functions for getting tasks assigned to a user
     get_tasks_assigned_to_user,
     # Import controller functions for getting tasks created by a user
     get_task_created_by_user,
+    # Import controller functions for getting the version of the task lists of a user
+    get_task_list_version,
+    # Import controller functions for getting the task counters of a user
+    get_task_stats,
+    # Import controller functions for searching the tasks of a user
+    search_tasks,
+    # Import controller functions for getting the task changes of a user
+    get_task_changes,
+    # Import controller functions for exporting the tasks of a user
+    export_tasks,
     # Import controller functions for updating tasks
     update_task,
     # Import controller functions for deleting tasks
-    delete_task
+    delete_task,
+    # Import controller functions for bulk updating tasks
+    update_tasks,
+    # Import controller functions for bulk deleting tasks
+    delete_tasks
 )
 
 # task = Blueprint("task", __name__, url_prefix="/tasks/")
@@ -25,13 +54,28 @@ Blueprint for task related views.
 
 This blueprint handles the following routes:
 - POST /tasks/: Creates a new task.
+- POST /tasks/bulk: Creates many tasks at once.
+- POST /tasks/import: Creates the tasks of an NDJSON upload, optionally gzip compressed.
 - GET /tasks/: Returns all tasks assigned to a specific user.
 - GET /tasks/user/: Returns all tasks created by a specific user.
+- GET /tasks/stats: Returns the number of created, assigned, done and open tasks of the user.
+- GET /tasks/search: Returns the tasks of the user whose description matches a text query, best matches first.
+- GET /tasks/changes: Returns the tasks of the user created, modified or deleted since a sync token.
+- GET /tasks/stream: Streams the creations, updates and deletions of the tasks of the user as Server-Sent Events.
+- GET /tasks/export: Streams every task of the user as NDJSON or CSV.
 - PUT /tasks/: Updates a task.
 - DELETE /tasks/: Deletes a task.
+- PATCH /tasks/bulk: Updates the status of many tasks at once.
+- DELETE /tasks/bulk: Deletes many tasks at once.
 
+Every route requires a valid JWT token in the 'x-access-token' header. The token is validated once by the before_request hook of the blueprint, which stores the user information in flask.g.user_information.
 """
 
+# Authenticate every request of the blueprint.
+task.before_request(require_jwt(
+    401, 'Token is missing in the request, please try again',
+    403, 'Invalid authentication token, please login again'))
+
 # Create task route.
 @task.route("/tasks/", methods=["POST"])
 def createTask():
@@ -57,26 +101,11 @@ def createTask():
     """
     
     try:
-        # Validate JWT token
-        user_info = validate_jwt()
-        
-        if user_info == 400:
-            return jsonify({"error": 'Token is missing in the request, please try again'}), 401
-        elif user_info == 401:
-            return jsonify({"error": 'Invalid authentication token, please login again'}), 403
-        
-        # Checking if required keys are in the request data
-        data = request.json
-        if 'description' not in data or 'assignedToUid' not in data:
-            raise ValueError('Error validating information')
+        # Get the user information from the validated JWT token
+        user_info = g.user_information
         
-        # Extracting the information from request data
-        description = data['description']
-        assigned_to_uid = data['assignedToUid']
-        created_by_uid = user_info['id']  # Extract user ID from token
-        
-        # Create a dictionary with task information
-        task_info = {'description': description, 'assigned_to_uid': assigned_to_uid, 'created_by_uid': created_by_uid}
+        # Create a dictionary with task information from the request data, with the user ID from the token
+        task_info = task_info_of(request.json, user_info['id'])
         
         # Call the create_task_controller function with task_info
         created_task = create_task(task_info)
@@ -88,6 +117,128 @@ def createTask():
         return jsonify({"error": str(err)}), 400
 
 
+# Bulk create tasks route.
+@task.route("/tasks/bulk", methods=["POST"])
+def createTasks():
+    """
+    Create many tasks at once.
+
+    This function handles the HTTP POST request to create many tasks. It expects the request data to be a JSON array of tasks, each containing the following keys:
+    - 'description': The description of the task.
+    - 'assignedToUid': The ID of the user to whom the task is assigned.
+
+    If the JWT token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    Each task is validated on its own, so invalid tasks do not prevent the valid ones from being created.
+
+    If the request is processed, it returns a JSON response with the result of each task (its 'index' and either its 'id' or an 'error'), the number of created tasks and a HTTP status code of 200.
+
+    If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
+
+    Returns:
+        A JSON response with the result of each task and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400, 401 or 403.
+    """
+    try:
+        # Get the user information from the validated JWT token
+        user_info = g.user_information
+
+        # Call the create_tasks controller function with the user ID from the token and the list of tasks
+        results = create_tasks(user_info['id'], request.json)
+
+        # Return the result of each task and the number of created tasks
+        return jsonify(created_tasks_body(results)), 200
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Import tasks route.
+@task.route("/tasks/import", methods=["POST"])
+@limit_concurrency("task.importTasks")
+def importTasks():
+    """
+    Import tasks from an NDJSON upload.
+
+    This function handles the HTTP POST request to create the tasks of a file, one JSON task per line, each containing the following keys:
+    - 'description': The description of the task.
+    - 'assignedToUid': The ID of the user to whom the task is assigned.
+    - 'done' (optional): The status of the task, false by default.
+
+    If the JWT token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    The body can be compressed with gzip (Content-Encoding: gzip). It is read as it arrives, so its size does not matter. Each line is validated on its own, so invalid lines do not prevent the valid ones from being imported.
+    With the optional 'import_id' query parameter, an interrupted import is resumed by sending the same file with the same 'import_id': the lines already imported are skipped.
+
+    If the upload is read to its end, it returns a JSON response with the report of the import (the numbers of read, imported and failed lines, the errors by line number and the throughput) and a HTTP status code of 200.
+    If the upload ends early, the complete lines are imported and it returns the report with 'complete' set to false and a HTTP status code of 400.
+    If too many imports are running, it returns a JSON response with an error message, a Retry-After header and a HTTP status code of 503.
+
+    If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
+
+    Returns:
+        A JSON response with the report of the import and a HTTP status code of 200 or 400, or a JSON response with an error message and a HTTP status code of 400, 401, 403 or 503.
+    """
+    try:
+        # Read the import ID and the encoding of the upload
+        import_id, compressed = parse_import_arguments(request.args, request.headers.get('Content-Encoding'))
+
+        # Import the lines of the upload as they are read
+        report = import_tasks(g.user_information['id'], read_lines(request.stream, LineReader(compressed, request.content_length)), import_id)
+        return jsonify(report), 200 if report['complete'] else 400
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Function to answer a task list request from the response cache.
+def _task_list_response(fetch_tasks, owner_field):
+    """
+    Function to answer a task list request of the current user, from the response cache when possible.
+
+    The ETag of the response is derived from the version of the task lists of the user, shared by all the workers. If the request has an If-None-Match header with this ETag, a 304 response is returned without reading the tasks.
+    Otherwise the serialized body is read from the response cache, or built with fetch_tasks and cached.
+
+    Args:
+        fetch_tasks (function): A function taking the user ID, the page size, the cursor, the filters, the sort direction and the projection, and returning one page of tasks and the cursor of the next page.
+        owner_field (str): The field of the task holding the current user in this list.
+
+    Returns:
+        A response with the tasks, the cursor of the next page and the ETag header.
+
+    Raises:
+        ValueError: If the query parameters are invalid or there is an error fetching the tasks.
+    """
+    user_id = g.user_information['id']
+
+    # Read the version before the tasks, so that a write made in the meantime gives a new version.
+    version = get_task_list_version(user_id)
+    etag = response_cache.etag(version)
+
+    # The client already has this version of the list.
+    if request.if_none_match.contains(etag):
+        response_cache.count_not_modified()
+        response = Response(status=304)
+    else:
+        key = (user_id, request.endpoint, version, request.query_string)
+        body = response_cache.get(key)
+
+        if body is None:
+            # Read the page size and cursor from the query parameters
+            limit, after = get_page_arguments()
+
+            # Read the filters, sort and fields from the query parameters
+            filters, direction, projection = parse_task_list_query(request.args, owner_field)
+
+            # Fetch one page of tasks and serialize it
+            tasks, next_cursor = fetch_tasks(user_id, limit, after, filters, direction, projection)
+            body = jsonify({'tasks': tasks, 'next_cursor': next_cursor}).get_data()
+            response_cache.put(key, body)
+
+        response = Response(body, mimetype='application/json')
+
+    # Clients and proxies must revalidate the list before reusing it.
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 # Get tasks created by the user route.
 @task.route("/tasks/createdby/", methods=["GET"])
 def search_created_by():
@@ -97,28 +248,21 @@ def search_created_by():
     This function handles the HTTP GET request to retrieve tasks created by the user.
     It expects the JWT token in the request header. If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
 
-    If the user's tasks are successfully fetched, it returns a JSON response with the tasks and a HTTP status code of 200.
+    It accepts the optional 'limit' and 'after' query parameters to page through the tasks. The 'next_cursor' of the response is passed as 'after' to fetch the next page.
+    It accepts the optional 'done' ('true' or 'false') and 'assignedToUid' query parameters to filter the tasks, 'sort' ('_id' or '-_id' for the newest tasks first) and 'fields' (a comma separated subset of the task fields).
+
+    If the user's tasks are successfully fetched, it returns a JSON response with the tasks, the cursor of the next page, an ETag header and a HTTP status code of 200.
+    If the If-None-Match header of the request contains the current ETag, it returns an empty response with a HTTP status code of 304 instead.
 
     If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
 
     Returns:
-        A JSON response with the tasks and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400 or 401.
+        A JSON response with the tasks and a HTTP status code of 200 or 304, or a JSON response with an error message and a HTTP status code of 400 or 401.
     """
     try:
-        # Validate the JWT token
-        token = validate_jwt()
-
-        if token == 400:
-            return jsonify({"error": 'Token is missing in the request.'}), 401
-        if token == 401:
-            return jsonify({"error": 'Invalid authentication token.'}), 403
-
-        user_id = token['id']
-
-        # Fetch tasks created by the user
-        tasks = get_task_created_by_user(user_id=user_id)
-
-        return jsonify(tasks)
+        # Fetch one page of tasks created by the user, or answer from the response cache
+        return _task_list_response(lambda user_id, limit, after, filters, direction, projection: get_task_created_by_user(
+            user_id=user_id, limit=limit, after=after, filters=filters, direction=direction, projection=projection), "createdByUid")
     except ValueError as err:
         return jsonify({"error": str(err)}), 400
     except Exception as error:
@@ -134,7 +278,58 @@ def get_tasks_assigned_to_current_user():
     This function handles the HTTP GET request to retrieve tasks assigned to the current user.
     It expects the JWT token in the request header. If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
 
-    If the user's tasks are successfully fetched, it returns a JSON response with the tasks and a HTTP status code of 200.
+    It accepts the optional 'limit' and 'after' query parameters to page through the tasks. The 'next_cursor' of the response is passed as 'after' to fetch the next page.
+    It accepts the optional 'done' ('true' or 'false') and 'createdByUid' query parameters to filter the tasks, 'sort' ('_id' or '-_id' for the newest tasks first) and 'fields' (a comma separated subset of the task fields).
+
+    If the user's tasks are successfully fetched, it returns a JSON response with the tasks, the cursor of the next page, an ETag header and a HTTP status code of 200.
+    If the If-None-Match header of the request contains the current ETag, it returns an empty response with a HTTP status code of 304 instead.
+
+    If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
+
+    Returns:
+        A JSON response with the tasks and a HTTP status code of 200 or 304, or a JSON response with an error message and a HTTP status code of 400 or 401.
+    """
+    try:
+        # Fetch one page of tasks assigned to the user, or answer from the response cache
+        return _task_list_response(lambda assignedToUid, limit, after, filters, direction, projection: get_tasks_assigned_to_user(
+            assignedToUid, limit=limit, after=after, filters=filters, direction=direction, projection=projection), "assignedToUid")
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Get the task counters of the user route.
+@task.route("/tasks/stats", methods=["GET"])
+def get_stats_of_current_user():
+    """
+    Get the task counters of the current user.
+
+    This function handles the HTTP GET request to retrieve the number of tasks created by and assigned to the current user, each split into done and open tasks.
+    It expects the JWT token in the request header. If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    The counters are read with a single lookup, without reading the tasks.
+
+    Returns:
+        A JSON response with the 'created' and 'assigned' counters and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400 or 401.
+    """
+    try:
+        # Fetch the counters of the user
+        return jsonify(get_task_stats(g.user_information['id'])), 200
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+# Search the tasks of the user route.
+@task.route("/tasks/search", methods=["GET"])
+def search_tasks_of_current_user():
+    """
+    Search the tasks created by or assigned to the current user.
+
+    This function handles the HTTP GET request to search the descriptions of the tasks of the current user.
+    It expects the JWT token in the request header. If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    It expects the 'q' query parameter with the searched text, and accepts the optional 'limit' and 'after' query parameters to page through the results. The 'next_cursor' of the response is passed as 'after' to fetch the next page.
+
+    If the search succeeds, it returns a JSON response with the matching tasks and their 'score', from the best to the worst match, the cursor of the next page and a HTTP status code of 200.
 
     If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
 
@@ -142,25 +337,105 @@ def get_tasks_assigned_to_current_user():
         A JSON response with the tasks and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400 or 401.
     """
     try:
-        # Validate the JWT token
-        token = validate_jwt()
+        # Read the search terms, page size and cursor from the query parameters
+        terms, limit, offset = parse_search_arguments(request.args)
+
+        # Search the tasks of the user
+        tasks, next_cursor = search_tasks(g.user_information['id'], terms, limit=limit, offset=offset)
+        return jsonify({'tasks': tasks, 'next_cursor': next_cursor}), 200
+
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
 
-        if token == 400:
-            return jsonify({"error": 'Token is missing in the request.'}), 401
-        if token == 401:
-            return jsonify({"error": 'Invalid authentication token.'}), 403
+# Get the task changes of the user route.
+@task.route("/tasks/changes", methods=["GET"])
+def get_changes_of_current_user():
+    """
+    Get the changes of the tasks of the current user since a sync token.
+
+    This function handles the HTTP GET request to synchronize a client with the tasks created by or assigned to the current user, without downloading the full task lists again.
+    It expects the JWT token in the request header. If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
 
-        # Retrieve assignedToUid from the token
-        assignedToUid = token['id']
+    It accepts the optional 'since' query parameter, the 'next_token' of the previous sync (without it, every task of the user is returned), and the optional 'limit' query parameter.
+    While 'has_more' is true, the client calls again with the new token to get the next changes.
 
-        # Fetch tasks assigned to the user
-        tasks = get_tasks_assigned_to_user(assignedToUid)
+    If the changes are fetched, it returns a JSON response with the changed tasks ('changed'), the IDs of the deleted tasks ('deleted'), 'next_token', 'has_more' and a HTTP status code of 200.
+    If the token is older than the retention of the deleted tasks, it returns a JSON response with an error message and a HTTP status code of 410: the client must sync again without token.
 
-        return jsonify({'tasks': tasks})
+    If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
 
+    Returns:
+        A JSON response with the changes and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400, 401 or 410.
+    """
+    try:
+        # Read the sync token and the page size from the query parameters
+        since = parse_since(request.args)
+        limit = parse_limit(request.args)
+
+        # Fetch the changes since the token
+        return jsonify(get_task_changes(g.user_information['id'], since, limit)), 200
+
+    except SyncTokenExpired as err:
+        return jsonify({"error": str(err)}), 410
     except ValueError as err:
         return jsonify({"error": str(err)}), 400
 
+# Stream the task events of the user route.
+@task.route("/tasks/stream", methods=["GET"])
+def stream_tasks_of_current_user():
+    """
+    Stream the task events of the current user.
+
+    This function handles the HTTP GET request to open a Server-Sent Events stream of the tasks created by or assigned to the current user, so clients do not have to poll the task lists.
+    It expects the JWT token in the request header. If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    Each event has an 'id', a type ('create' with the task, 'update' with its '_id', 'done' and 'version', or 'delete' with its '_id') and its data as JSON. A heartbeat comment is sent when the stream is idle.
+    A client reconnecting with the Last-Event-ID header gets the events it missed, or a 'reset' event if they are no longer kept, after which it must read its task lists again.
+
+    If the worker has too many open streams, it returns a JSON response with an error message, a Retry-After header and a HTTP status code of 503.
+
+    Returns:
+        A streamed response of type text/event-stream, or a JSON response with an error message and a HTTP status code of 401, 403 or 503.
+    """
+    try:
+        # Register the stream before reading the missed events, so no event falls in between
+        subscription, frames = task_events.subscribe(g.user_information['id'], request.headers.get('Last-Event-ID'))
+    except StreamBusy as err:
+        return jsonify({'error': str(err)}), 503, {'Retry-After': '1'}
+
+    # Proxies must neither cache nor buffer the stream.
+    return Response(task_events.stream(subscription, frames), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Export the tasks of the user route.
+@task.route("/tasks/export", methods=["GET"])
+def export_tasks_of_current_user():
+    """
+    Export every task created by or assigned to the current user.
+
+    This function handles the HTTP GET request to download all the tasks of the current user at once, in creation order.
+    It expects the JWT token in the request header. If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    It accepts the optional 'format' query parameter, 'ndjson' (one JSON task per line, the default) or 'csv'. The export is compressed with gzip if the Accept-Encoding header of the request allows it.
+    The tasks are streamed from the database as they are read, so the memory of the worker does not depend on the number of tasks. An error after the first chunk ends the response early.
+
+    If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
+
+    Returns:
+        A streamed response of type application/x-ndjson or text/csv, or a JSON response with an error message and a HTTP status code of 400 or 401.
+    """
+    try:
+        # Read the format and the compression of the export
+        export_format, compress = parse_export_arguments(request.args, request.accept_encodings)
+
+        # Open the cursor of the tasks of the user
+        tasks = export_tasks(g.user_information['id'])
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+    mimetype, headers = export_headers("tasks", export_format, compress)
+    return Response(export_stream(tasks, export_format, TASK_EXPORT_FIELDS, compress), mimetype=mimetype, headers=headers)
+
 # Update task route.
 @task.route("/tasks/<taskUid>", methods=["PATCH"])
 def updateTask(taskUid):
@@ -172,34 +447,38 @@ def updateTask(taskUid):
 
     It expects the request data to contain the 'done' key with a boolean value.
 
-    If the task is successfully updated, it returns a JSON response with the task UID and a HTTP status code of 200.
+    If the request has an If-Match header, the task is only updated if its ETag (version) matches. Otherwise a JSON response with an error message and a HTTP status code of 412 is returned.
+
+    If the task is successfully updated, it returns a JSON response with the task UID, the new ETag of the task in the ETag header and a HTTP status code of 200.
 
     If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
 
     Returns:
-        A JSON response with the task UID and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400 or 401.
+        A JSON response with the task UID and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400, 401, 403 or 412.
     """
     try:    
-        # Validate the JWT token
-        token = validate_jwt() 
-
-        if token == 400:
-            return jsonify({"error": 'Token is missing in the request, please try again'}), 401
-        if token == 401:
-           return jsonify({"error": 'Invalid authentication token, please login again'}), 403
+        # Get the user information from the validated JWT token
+        token = g.user_information
         
         # Load the request data
         data = json.loads(request.data)
 
         # Check if the 'done' key is present in the request data
-        if  "done" not in data:
-            return jsonify({"error": 'Status done not found in the request'}), 400
+        error = missing_field(data, TASK_UPDATE_FIELDS)
+        if error:
+            return jsonify({"error": error}), 400
        
-        # Call the update_task function of the controller function with arguments token as user_information, taskUid as task_id, and data["done"] as done.
-        result = update_task(token, taskUid, data["done"])
+        # Call the update_task function of the controller function with arguments token as user_information, taskUid as task_id, data["done"] as done and the version from the If-Match header as expected_version.
+        result = update_task(token, taskUid, data["done"], expected_version=get_if_match_version())
+
+        # Check if the task was modified since the client read it
+        if result == "Version Mismatch":
+            return jsonify({"error": VERSION_MISMATCH_ERROR}), 412
         
-        # Return the task UID in a JSON response with a HTTP status code of 200.
-        return  jsonify({"taskUid":taskUid}) , 200
+        # Return the task UID in a JSON response with a HTTP status code of 200, and the new version of the task as ETag.
+        response = jsonify({"taskUid":taskUid, "version": result["version"]})
+        response.set_etag(task_etag(result["version"]))
+        return response, 200
 
     except ValueError as error:
         # Return a JSON response with the error message and a HTTP status code of 400.
@@ -217,27 +496,28 @@ def deleteTask(taskUid):
     This function handles the HTTP DELETE request to delete a task. It expects the JWT token in the request header.
     If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
 
+    If the request has an If-Match header, the task is only deleted if its ETag (version) matches. Otherwise a JSON response with an error message and a HTTP status code of 412 is returned.
+
     If the task is successfully deleted, it returns a JSON response with the number of documents deleted from the task collection of the database and a HTTP status code of 200.
 
     If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
 
     Returns:
-        A JSON response with the number of documents deleted from the task collection of the database and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400 or 401.
+        A JSON response with the number of documents deleted from the task collection of the database and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400, 401, 403 or 412.
     """
     try:
-        # Validate the JWT token
-        token = validate_jwt()
-
-        if token == 400:
-            return jsonify({"error": 'Token is missing in the request, please try again'}), 401
-        if token == 401:
-           return jsonify({"error": 'Invalid authentication token, please login again'}), 403
+        # Get the user information from the validated JWT token
+        token = g.user_information
         
-        # Call the delete_task function of the controller function with arguments token as user_information and taskUid as task_id.
-        deleted_result = delete_task(user_information = token, task_id = taskUid)
+        # Call the delete_task function of the controller function with arguments token as user_information, taskUid as task_id and the version from the If-Match header as expected_version.
+        deleted_task = delete_task(user_information = token, task_id = taskUid, expected_version = get_if_match_version())
+
+        # Check if the task was modified since the client read it
+        if deleted_task == "Version Mismatch":
+            return jsonify({"error": VERSION_MISMATCH_ERROR}), 412
         
         # Return the number of documents deleted from the task collection of the database.
-        return jsonify({'tasksAffected': deleted_result.deleted_count}), 200
+        return jsonify({'tasksAffected': 1}), 200
         
     except ValueError as error:
         # Return a JSON response with the error message and a HTTP status code of 400.
@@ -245,3 +525,83 @@ def deleteTask(taskUid):
     except Exception as error:
         # Return a JSON response with the error message and a HTTP status code of 500.
         return jsonify({'error': error}), 500
+
+# Bulk update tasks route.
+@task.route("/tasks/bulk", methods=["PATCH"])
+def updateTasks():
+    """
+    Update the status of many tasks at once.
+
+    This function handles the HTTP PATCH request to update many tasks. It expects the JWT token in the request header.
+    If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    It expects the request data to contain the 'taskUids' key with a list of task IDs and the 'done' key with a boolean value.
+
+    If the request is processed, it returns a JSON response with the matched, modified and rejected task IDs and a HTTP status code of 200.
+
+    If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
+
+    Returns:
+        A JSON response with the matched, modified and rejected task IDs and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400, 401 or 403.
+    """
+    try:
+        # Get the user information from the validated JWT token
+        token = g.user_information
+
+        # Load the request data
+        data = json.loads(request.data)
+
+        # Check if the required keys are present in the request data
+        error = missing_field(data, TASK_BULK_UPDATE_FIELDS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Call the update_tasks function of the controller with the token as user_info, the task IDs and the new status.
+        result = update_tasks(token, data["taskUids"], data["done"])
+
+        # Return the matched, modified and rejected task IDs.
+        return jsonify(updated_tasks_body(result)), 200
+
+    except ValueError as error:
+        # Return a JSON response with the error message and a HTTP status code of 400.
+        return jsonify({'error': str(error)}), 400
+
+# Bulk delete tasks route.
+@task.route("/tasks/bulk", methods=["DELETE"])
+def deleteTasks():
+    """
+    Delete many tasks at once.
+
+    This function handles the HTTP DELETE request to delete many tasks. It expects the JWT token in the request header.
+    If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    It expects the request data to contain the 'taskUids' key with a list of task IDs.
+
+    If the request is processed, it returns a JSON response with the deleted and rejected task IDs, the number of documents deleted and a HTTP status code of 200.
+
+    If there is a ValueError during the execution of the function, it returns a JSON response with the error message and a HTTP status code of 400.
+
+    Returns:
+        A JSON response with the deleted and rejected task IDs and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400, 401 or 403.
+    """
+    try:
+        # Get the user information from the validated JWT token
+        token = g.user_information
+
+        # Load the request data
+        data = json.loads(request.data)
+
+        # Check if the task IDs are present in the request data
+        error = missing_field(data, TASK_BULK_DELETE_FIELDS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Call the delete_tasks function of the controller with the token as user_information and the task IDs.
+        result = delete_tasks(user_information = token, task_ids = data["taskUids"])
+
+        # Return the deleted and rejected task IDs.
+        return jsonify(result), 200
+
+    except ValueError as error:
+        # Return a JSON response with the error message and a HTTP status code of 400.
+        return jsonify({'error': str(error)}), 400
@@ -1,16 +1,23 @@
 # Import the necessary modules.
 
-from flask import Blueprint, jsonify, request  # Import Flask modules
+from flask import Blueprint, Response, jsonify, request, g  # Import Flask modules
 import json  # Import JSON module
 
-from helpers.token_validation import validate_jwt # Import module for token validation
+from helpers.token_validation import require_jwt # Import module for token validation
+from helpers.password_hashing import HashingPoolBusy # Import the exception raised when password hashing is overloaded
+from helpers.admission import limit_concurrency, throttle_login # Import module for admission control
+from helpers.list_query import parse_user_list_query # Import module for list query parameters
+from helpers.request_bodies import missing_field, USER_CREATE_FIELDS, USER_LOGIN_FIELDS, BUSY_ERROR, login_error # Import module for request bodies
+from helpers.export import parse_export_arguments, export_headers, export_stream, USER_EXPORT_FIELDS # Import module for streaming exports
 from controllers.user_controller import ( # Import controller functions for task related operations
      # Import controller functions for user creation
     create_user,
     # Import controller functions for user login
     login_user,
     # Import controller functions for fetching all users
-    fetch_all_users
+    fetch_all_users,
+    # Import controller functions for exporting all users
+    export_users
 )
 
 user = Blueprint("user", __name__)
@@ -20,11 +27,20 @@ Blueprint for user related views.
 This blueprint handles the following routes:
 - POST /users/: Creates a new user.
 - GET /users/: Fetches all users.
+- GET /users/export: Streams all users as NDJSON or CSV.
 - POST /users/login/: Logs in a user.
 
+Every route except user creation and login requires a valid JWT token in the 'x-access-token' header. The token is validated once by the before_request hook of the blueprint, which stores the user information in flask.g.user_information.
 """
 
+# Authenticate every request of the blueprint, except user creation and login.
+user.before_request(require_jwt(
+    400, 'Token is missing in the request.',
+    401, 'Invalid authentication token.',
+    public_endpoints=("user.create", "user.login")))
+
 @user.route("/users/", methods=["POST"])
+@limit_concurrency("user.create")
 def create():
     """
     Create a new user.
@@ -44,20 +60,19 @@ def create():
 
     If there is a ValueError during the execution of the function, it returns a JSON response with an error message and a HTTP status code of 500.
 
+    If the password hashing pool or the route is overloaded, it returns a JSON response with an error message, a Retry-After header and a HTTP status code of 503.
+
     Returns:
-        A JSON response with the ID of the created user and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400 or 500.
+        A JSON response with the ID of the created user and a HTTP status code of 200, or a JSON response with an error message and a HTTP status code of 400, 500 or 503.
     """
     try:
         # Load the request data
         data = json.loads(request.data)
 
         # Check if the required keys are in the request data
-        if 'email' not in data:
-            return jsonify({'error': 'Email is needed in the request.'}), 400
-        if 'password' not in data:
-            return jsonify({'error': 'Password is needed in the request.'}), 400
-        if 'name' not in data:
-            return jsonify({'error': 'Name is needed in the request.'}), 400
+        error = missing_field(data, USER_CREATE_FIELDS)
+        if error:
+            return jsonify({'error': error}), 400
 
         # Create the user
         created_user = create_user(data)
@@ -68,11 +83,15 @@ def create():
 
         # Return the ID of the created user
         return jsonify({'id': str(created_user.inserted_id)})
+    except HashingPoolBusy:
+        # Return an error message if the password hashing pool is overloaded
+        return jsonify({'error': BUSY_ERROR}), 503, {'Retry-After': '1'}
     except ValueError:
         # Return an error message if there was an issue creating the user
         return jsonify({'error': 'Error on creating user.'}), 500
 
 @user.route("/users/login", methods=["POST"])
+@limit_concurrency("user.login")
 def login():
     """
     Handle the HTTP POST request to login a user.
@@ -80,6 +99,10 @@ def login():
     This function expects the request data to contain the 'email' and 'password' keys.
     It returns a JSON response with the JWT token, expiration time, and logged user information.
 
+    If the email or the IP address made too many login attempts, it returns a JSON response with an error message, a Retry-After header and a HTTP status code of 429, without checking the password.
+
+    If the password hashing pool or the route is overloaded, it returns a JSON response with an error message, a Retry-After header and a HTTP status code of 503.
+
     Returns:
         A JSON response with the JWT token, expiration time, and logged user information.
     """
@@ -88,28 +111,35 @@ def login():
         data = json.loads(request.data)
 
         # Check if the required keys are in the request data
-        if 'email' not in data:
-            return jsonify({'error': 'Email is needed in the request.'}), 400
-        if 'password' not in data:
-            return jsonify({'error': 'Password is needed in the request.'}), 400
+        error = missing_field(data, USER_LOGIN_FIELDS)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Reject the attempt before any password check if the email or the IP address made too many attempts
+        retry_after = throttle_login(data['email'], request.remote_addr)
+        if retry_after:
+            return jsonify({'error': 'Too many login attempts, please try again later.'}), 429, {'Retry-After': str(retry_after)}
 
         # Attempt to login the user
         login_attempt = login_user(data)
 
         # Check the result of the login attempt
-        if login_attempt == "Invalid Email":
-            return jsonify({'error': 'Email not found.'}), 401
-        if login_attempt == "Invalid Password":
-            return jsonify({'error': 'Invalid Password.'}), 401
+        error = login_error(login_attempt)
+        if error:
+            return jsonify({'error': error}), 401
 
         # Return the login details
         return jsonify(login_attempt)
+    except HashingPoolBusy:
+        # Return an error message if the password hashing pool is overloaded
+        return jsonify({'error': BUSY_ERROR}), 503, {'Retry-After': '1'}
     except ValueError:
         # Return an error message if there was an issue logging in the user
         return jsonify({'error': 'Error login user.'}), 500
 
 
 @user.route("/users/", methods=["GET"])
+@limit_concurrency("user.fetch")
 def fetch():
     """
     Handle the HTTP GET request to fetch all users.
@@ -119,23 +149,27 @@ def fetch():
 
     It returns a JSON response with all the users and the user information from the token.
 
+    It accepts the optional 'sort' query parameter ('email' or 'name', prefixed with '-' for the descending order) and 'fields' query parameter (a comma separated subset of 'id', 'email' and 'name').
+    If a query parameter is invalid, it returns a JSON response with an error message and a HTTP status code of 400.
+
+    If the route is overloaded, it returns a JSON response with an error message, a Retry-After header and a HTTP status code of 503.
+
     Returns:
         A JSON response with all the users and the user information from the token,
         or a JSON response with an error message and a HTTP status code of 400 or 401.
     """
     try:
-        # Validate the JWT token
-        token = validate_jwt()
+        # Read the sort and fields from the query parameters
+        sort, projection = parse_user_list_query(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
 
-        if token == 400:
-            # Return an error message if the token is missing in the request
-            return jsonify({'error': 'Token is missing in the request.'}), 400
-        if token == 401:
-            # Return an error message if the token is invalid
-            return jsonify({'error': 'Invalid authentication token.'}), 401
+    try:
+        # Get the user information from the validated JWT token
+        token = g.user_information
 
         # Fetch all the users
-        users = fetch_all_users()
+        users = fetch_all_users(sort=sort, projection=projection)
 
         # Return the users along with the user information from the token
         return jsonify({'users': users, 'request_made_by': token})
@@ -143,3 +177,35 @@ def fetch():
     except ValueError:
         # Return an error message if there was an issue fetching the users
         return jsonify({'error': 'Error fetching users.'}), 500
+
+
+@user.route("/users/export", methods=["GET"])
+def export():
+    """
+    Handle the HTTP GET request to export all users.
+
+    This function expects the JWT token in the request header.
+    If the token is missing or invalid, it returns a JSON response with an error message and the appropriate HTTP status code.
+
+    It accepts the optional 'format' query parameter, 'ndjson' (one JSON user per line, the default) or 'csv'. The export is compressed with gzip if the Accept-Encoding header of the request allows it.
+    Each user has its ID, email and name. The users are streamed from the database as they are read, so the memory of the worker does not depend on the number of users.
+
+    Returns:
+        A streamed response of type application/x-ndjson or text/csv,
+        or a JSON response with an error message and a HTTP status code of 400, 401 or 500.
+    """
+    try:
+        # Read the format and the compression of the export
+        export_format, compress = parse_export_arguments(request.args, request.accept_encodings)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    try:
+        # Open the cursor of the users
+        users = export_users()
+    except ValueError:
+        # Return an error message if there was an issue opening the cursor
+        return jsonify({'error': 'Error exporting users.'}), 500
+
+    mimetype, headers = export_headers("users", export_format, compress)
+    return Response(export_stream(users, export_format, USER_EXPORT_FIELDS, compress), mimetype=mimetype, headers=headers)